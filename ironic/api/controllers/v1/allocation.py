@@ -70,7 +70,8 @@ def hide_fields_in_newer_versions(allocation):
         allocation.pop('owner', None)
 
 
-def convert_with_links(rpc_allocation, fields=None, sanitize=True):
+def convert_with_links(rpc_allocation, fields=None, sanitize=True,
+                       node_uuids=None):
 
     allocation = api_utils.object_to_dict(
         rpc_allocation,
@@ -87,7 +88,8 @@ def convert_with_links(rpc_allocation, fields=None, sanitize=True):
         )
     )
     try:
-        api_utils.populate_node_uuid(rpc_allocation, allocation)
+        api_utils.populate_node_uuid(rpc_allocation, allocation,
+                                     node_uuids=node_uuids)
     except exception.NodeNotFound:
         allocation['node_uuid'] = None
 
@@ -104,11 +106,39 @@ def allocation_sanitize(allocation, fields):
     api_utils.sanitize_dict(allocation, fields)
 
 
+def _get_node_uuids(rpc_allocations):
+    return api_utils.get_related_uuids(
+        rpc_allocations, node_id='nodes')['node_id']
+
+
 def list_convert_with_links(rpc_allocations, limit, url, fields=None,
                             **kwargs):
+    node_uuids = _get_node_uuids(rpc_allocations)
     return collection.list_convert_with_links(
         items=[convert_with_links(p, fields=fields,
-               sanitize=False) for p in rpc_allocations],
+               sanitize=False, node_uuids=node_uuids)
+               for p in rpc_allocations],
+        item_name='allocations',
+        limit=limit,
+        url=url,
+        fields=fields,
+        sanitize_func=allocation_sanitize,
+        **kwargs
+    )
+
+
+def list_stream_with_links(fetch_func, limit, url, fields=None, **kwargs):
+    def _convert(rpc_allocation, node_uuids):
+        api_utils.check_owner_policy('allocation',
+                                     'baremetal:allocation:get',
+                                     rpc_allocation.owner)
+        return convert_with_links(rpc_allocation, fields=fields,
+                                  sanitize=False, node_uuids=node_uuids)
+
+    return collection.stream_convert_with_links(
+        fetch_func,
+        _convert,
+        prefetch_func=lambda page: {'node_uuids': _get_node_uuids(page)},
         item_name='allocations',
         limit=limit,
         url=url,
@@ -213,6 +243,22 @@ class AllocationsController(pecan.rest.RestController):
         for key, value in possible_filters.items():
             if value is not None:
                 filters[key] = value
+        if collection.stream_enabled():
+            def _fetch(limit, marker):
+                return objects.Allocation.list(api.request.context,
+                                               limit=limit,
+                                               marker=marker,
+                                               sort_key=sort_key,
+                                               sort_dir=sort_dir,
+                                               filters=filters)
+
+            return list_stream_with_links(_fetch, limit,
+                                          url=resource_url,
+                                          fields=fields,
+                                          marker=marker_obj,
+                                          sort_key=sort_key,
+                                          sort_dir=sort_dir)
+
         allocations = objects.Allocation.list(api.request.context,
                                               limit=limit,
                                               marker=marker_obj,
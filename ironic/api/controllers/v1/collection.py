@@ -13,8 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+
 from ironic import api
 from ironic.api.controllers import link
+from ironic.api import method
+from ironic.conf import CONF
 
 
 def has_next(collection, limit):
@@ -72,11 +76,130 @@ def list_convert_with_links(items, item_name, limit, url, fields=None,
     return items_dict
 
 
+def stream_enabled():
+    """Return whether collections should be streamed to the client."""
+    return CONF.api.collection_stream_page_size > 0
+
+
+def _iter_pages(fetch_func, limit, marker=None):
+    page_size = CONF.api.collection_stream_page_size
+    remaining = limit
+    while remaining > 0:
+        page_limit = min(page_size, remaining)
+        page = fetch_func(limit=page_limit, marker=marker)
+        yield page
+        if len(page) < page_limit:
+            return
+        remaining -= len(page)
+        marker = page[-1]
+
+
+def stream_convert_with_links(fetch_func, convert_func, item_name, limit,
+                              url, fields=None, sanitize_func=None,
+                              key_field='uuid', sanitizer_args=None,
+                              marker=None, prefetch_func=None, **kwargs):
+    """Build a collection which is serialized while it is being sent.
+
+    This is the streaming counterpart of :func:`list_convert_with_links`:
+    items are fetched from the database in pages of
+    ``[api]collection_stream_page_size`` records, converted and written to
+    the response one page at a time. The first page is fetched and
+    converted before returning, so that the most common errors are still
+    reported with a proper status code.
+
+    :param fetch_func:
+        Callable accepting ``limit`` and ``marker`` keyword arguments and
+        returning a list of database objects. The marker is the last object
+        of the previous page.
+    :param convert_func:
+        Callable converting a database object into an unsanitized dict, or
+        returning None to skip the object.
+    :param item_name:
+        Name of dict key for items value
+    :param limit:
+        Paging limit, the number of database objects to fetch
+    :param url:
+        Base URL for building next link
+    :param fields:
+        Optional fields to use for sanitize function
+    :param sanitize_func:
+        Optional sanitize function run on each item
+    :param key_field:
+        Key name for building next URL
+    :param sanitizer_args:
+        Dictionary with additional arguments to be passed to the sanitizer.
+    :param marker:
+        Optional database object to start after
+    :param prefetch_func:
+        Optional callable accepting a page of database objects and returning
+        a dict of keyword arguments passed to ``convert_func`` for every
+        object of the page, e.g. to look up related resources in bulk.
+    :param kwargs:
+        other arguments passed to ``get_next``
+    :returns:
+        A :class:`ironic.api.method.StreamingResult` rendering the same
+        document as :func:`list_convert_with_links`.
+    """
+    assert url, "BUG: collections require a base URL"
+    assert isinstance(limit, int), \
+        f"BUG: limit must be int, got {type(limit)}"
+
+    def _convert(page):
+        items = []
+        convert_kwargs = prefetch_func(page) if prefetch_func and page else {}
+        for obj in page:
+            item = convert_func(obj, **convert_kwargs)
+            if item is None:
+                continue
+            # The marker is taken before sanitizing, like in get_next
+            item_marker = item.get(key_field)
+            if sanitize_func:
+                if sanitizer_args:
+                    sanitize_func(item, fields, **sanitizer_args)
+                else:
+                    sanitize_func(item, fields=fields)
+            items.append((item_marker, json.dumps(item)))
+        return items
+
+    pages = _iter_pages(fetch_func, limit, marker=marker)
+    first_page = _convert(next(pages, []))
+
+    def _chunks():
+        count = 0
+        last_marker = None
+        yield '{%s: [' % json.dumps(item_name)
+        page = first_page
+        while True:
+            for last_marker, item in page:
+                if count:
+                    yield ', '
+                yield item
+                count += 1
+            try:
+                page = _convert(next(pages))
+            except StopIteration:
+                break
+        yield ']'
+        if count and count == limit:
+            next_link = _make_next_link({key_field: last_marker}, limit, url,
+                                        key_field=key_field, fields=fields,
+                                        **kwargs)
+            yield ', "next": %s' % json.dumps(next_link)
+        yield '}'
+
+    return method.StreamingResult(_chunks())
+
+
 def get_next(collection, limit, url, key_field='uuid', **kwargs):
     """Return a link to the next subset of the collection."""
     if not has_next(collection, limit):
         return None
 
+    return _make_next_link(collection[-1], limit, url, key_field=key_field,
+                           **kwargs)
+
+
+def _make_next_link(last_item, limit, url, key_field='uuid', **kwargs):
     fields = kwargs.pop('fields', None)
     # NOTE(saga): If fields argument is present in kwargs and not None. It
     # is a list so convert it into a comma seperated string.
@@ -84,7 +207,6 @@ def get_next(collection, limit, url, key_field='uuid', **kwargs):
         kwargs['fields'] = ','.join(fields)
     q_args = ''.join(['%s=%s&' % (key, kwargs[key]) for key in kwargs])
 
-    last_item = collection[-1]
     # handle items which are either objects or dicts
     if hasattr(last_item, key_field):
         marker = getattr(last_item, key_field)
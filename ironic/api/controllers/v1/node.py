@@ -15,6 +15,7 @@
 
 import copy
 import datetime
+import functools
 from http import client as http_client
 import json
 
@@ -312,7 +313,7 @@ def hide_fields_in_newer_versions(obj):
     These fields are only made available when the request's API version
     matches or exceeds the versions when these fields were introduced.
     """
-    for field in api_utils.disallowed_fields():
+    for field in api_utils.get_request_features().disallowed_fields:
         obj.pop(field, None)
 
 
@@ -351,12 +352,13 @@ def update_state_in_older_versions(obj):
     :param obj: The dict being returned to the API client that is
                 to be updated by this method.
     """
+    features = api_utils.get_request_features()
     # if requested version is < 1.2, convert AVAILABLE to the old NOSTATE
-    if (api.request.version.minor < versions.MINOR_2_AVAILABLE_STATE
+    if (not features.available_state
             and obj.get('provision_state') == ir_states.AVAILABLE):
         obj['provision_state'] = ir_states.NOSTATE
     # if requested version < 1.39, convert INSPECTWAIT to INSPECTING
-    if (not api_utils.allow_inspect_wait_state()
+    if (not features.inspect_wait_state
             and obj.get('provision_state') == ir_states.INSPECTWAIT):
         obj['provision_state'] = ir_states.INSPECTING
 
@@ -1166,15 +1168,20 @@ def _check_steps(steps, step_type, schema):
                                               (step_type, exc))
 
 
-def _get_chassis_uuid(node):
+def _get_chassis_uuid(node, chassis_uuids=None):
     """Return the UUID of a node's chassis, or None.
 
     :param node: a Node object.
+    :param chassis_uuids: optional dict of chassis IDs to UUIDs, the chassis
+        is fetched if not provided.
     :returns: the UUID of the node's chassis, or None if the node has no
         chassis set.
     """
     if not node.chassis_id:
         return
+    if chassis_uuids is not None:
+        # A missing chassis has been deleted meanwhile, see below.
+        return chassis_uuids.get(node.chassis_id)
     try:
         chassis = objects.Chassis.get_by_id(api.request.context,
                                             node.chassis_id)
@@ -1413,12 +1420,30 @@ def _get_fields_for_node_query(fields=None):
         return object_fields
 
 
-def node_convert_with_links(rpc_node, fields=None, sanitize=True):
+def _get_related_uuids(rpc_nodes, fields=None):
+    """Look up the UUIDs of the chassis and allocations of nodes at once.
+
+    :param rpc_nodes: a list of Node objects.
+    :param fields: the fields requested, None for all of them.
+    :returns: a dict to pass as related_uuids to node_convert_with_links.
+    """
+    relations = {}
+    if fields is None or 'chassis_uuid' in fields:
+        relations['chassis_id'] = 'chassis'
+    if (api_utils.get_request_features().allocations
+            and (fields is None or 'allocation_uuid' in fields)):
+        relations['allocation_id'] = 'allocations'
+    return api_utils.get_related_uuids(rpc_nodes, **relations)
+
+
+def node_convert_with_links(rpc_node, fields=None, sanitize=True,
+                            related_uuids=None):
 
     # NOTE(TheJulia): This takes approximately 10% of the time to
     # collect and return requests to API consumer, specifically
     # for the nova sync query which is the most intense overhead
     # an integrated deployment can really face.
+    features = api_utils.get_request_features()
     node = api_utils.object_to_dict(
         rpc_node,
         link_resource='nodes',
@@ -1427,7 +1452,7 @@ def node_convert_with_links(rpc_node, fields=None, sanitize=True):
     if node.get('traits') is not None:
         node['traits'] = rpc_node.traits.get_trait_names()
 
-    if (api_utils.allow_expose_conductors()
+    if (features.expose_conductors
             and (fields is None or 'conductor' in fields)):
         # NOTE(kaifeng) It is possible a node gets orphaned in certain
         # circumstances, set conductor to None in such case.
@@ -1441,10 +1466,13 @@ def node_convert_with_links(rpc_node, fields=None, sanitize=True):
 
     # If allocations ever become the primary use path, this absolutely
     # needs to become a join. :\
-    if (api_utils.allow_allocations()
+    if (features.allocations
             and (fields is None or 'allocation_uuid' in fields)):
         node['allocation_uuid'] = None
-        if rpc_node.allocation_id:
+        if related_uuids is not None:
+            node['allocation_uuid'] = related_uuids['allocation_id'].get(
+                rpc_node.allocation_id)
+        elif rpc_node.allocation_id:
             try:
                 allocation = objects.Allocation.get_by_id(
                     api.request.context,
@@ -1453,16 +1481,18 @@ def node_convert_with_links(rpc_node, fields=None, sanitize=True):
             except exception.AllocationNotFound:
                 pass
     if fields is None or 'chassis_uuid' in fields:
-        node['chassis_uuid'] = _get_chassis_uuid(rpc_node)
+        node['chassis_uuid'] = _get_chassis_uuid(
+            rpc_node,
+            related_uuids['chassis_id'] if related_uuids is not None
+            else None)
 
     if fields is not None:
         api_utils.check_for_invalid_fields(
             fields, set(node))
 
-    show_states_links = (
-        api_utils.allow_links_node_states_and_driver_properties())
-    show_portgroups = api_utils.allow_portgroups_subcontrollers()
-    show_volume = api_utils.allow_volume()
+    show_states_links = features.links_node_states_and_driver_properties
+    show_portgroups = features.portgroups_subcontrollers
+    show_volume = features.volume
 
     url = api.request.public_url
 
@@ -1505,7 +1535,8 @@ def node_convert_with_links(rpc_node, fields=None, sanitize=True):
 def node_sanitize(node, fields, cdict=None,
                   show_driver_secrets=None,
                   show_instance_secrets=None,
-                  evaluate_additional_policies=None):
+                  evaluate_additional_policies=None,
+                  policy_cache=None):
     """Removes sensitive and unrequested data.
 
     Will only keep the fields specified in the ``fields`` parameter.
@@ -1526,6 +1557,10 @@ def node_sanitize(node, fields, cdict=None,
     :param evaluate_additional_policies: A boolean value to allow external
                                          evaluation of policy instead of once
                                          per node. Default None.
+    :param policy_cache: A ``policy.NodeDecisionCache`` for the current
+                         request, allowing per node policy decisions to be
+                         shared between nodes with the same owner and
+                         lessee. Default None.
     """
     # NOTE(TheJulia): As of ironic 18.0, this method is about 88% of
     # the time spent preparing to return a node to. If it takes us
@@ -1537,6 +1572,7 @@ def node_sanitize(node, fields, cdict=None,
 
     if not cdict:
         cdict = api.request.context.to_policy_values()
+    policy_cache = policy_cache or policy.NodeDecisionCache(cdict)
 
     # We need a new target_dict for each node as owner/lessee field have
     # explicit associations and target comparison.
@@ -1586,12 +1622,12 @@ def node_sanitize(node, fields, cdict=None,
     if evaluate_additional_policies:
         # Perform extended sanitization of nodes based upon policy
         # baremetal:node:get:filter_threshold
-        _node_sanitize_extended(node, node_keys, target_dict, cdict)
+        _node_sanitize_extended(node, node_keys, target_dict, policy_cache)
 
     if 'driver_info' in node_keys:
         if (evaluate_additional_policies
-            and not policy.check("baremetal:node:get:driver_info",
-                                 target_dict, cdict)):
+            and not policy_cache.check("baremetal:node:get:driver_info",
+                                       target_dict)):
             # Guard infrastructure intenral details from being visible.
             node['driver_info'] = {
                 'content': '** Redacted - requires baremetal:node:get:'
@@ -1627,40 +1663,36 @@ def node_sanitize(node, fields, cdict=None,
         update_state_in_older_versions(node)
     hide_fields_in_newer_versions(node)
 
-    show_states_links = (
-        api_utils.allow_links_node_states_and_driver_properties())
-    show_portgroups = api_utils.allow_portgroups_subcontrollers()
-    show_volume = api_utils.allow_volume()
-
-    if not show_volume:
+    features = api_utils.get_request_features()
+    if not features.volume:
         node.pop('volume', None)
-    if not show_portgroups:
+    if not features.portgroups_subcontrollers:
         node.pop('portgroups', None)
-    if not show_states_links:
+    if not features.links_node_states_and_driver_properties:
         node.pop('states', None)
 
 
-def _node_sanitize_extended(node, node_keys, target_dict, cdict):
+def _node_sanitize_extended(node, node_keys, target_dict, policy_cache):
     # NOTE(TheJulia): The net effect of this is that by default,
     # at least matching common/policy.py defaults. is these should
     # be stripped out.
     if ('last_error' in node_keys
-        and not policy.check("baremetal:node:get:last_error",
-                             target_dict, cdict)):
+        and not policy_cache.check("baremetal:node:get:last_error",
+                                   target_dict)):
         # Guard the last error from being visible as it can contain
         # hostnames revealing infrastucture internal details.
         node['last_error'] = ('** Value Redacted - Requires '
                               'baremetal:node:get:last_error '
                               'permission. **')
     if ('reservation' in node_keys
-        and not policy.check("baremetal:node:get:reservation",
-                             target_dict, cdict)):
+        and not policy_cache.check("baremetal:node:get:reservation",
+                                   target_dict)):
         # Guard conductor names from being visible.
         node['reservation'] = ('** Redacted - requires baremetal:'
                                'node:get:reservation permission. **')
     if ('driver_internal_info' in node_keys
-        and not policy.check("baremetal:node:get:driver_internal_info",
-                             target_dict, cdict)):
+        and not policy_cache.check("baremetal:node:get:driver_internal_info",
+                                   target_dict)):
         # Guard conductor names from being visible.
         node['driver_internal_info'] = {
             'content': '** Redacted - Requires baremetal:node:get:'
@@ -1673,10 +1705,10 @@ def _mask_fields(dictionary, fields, secret):
             dictionary[field] = secret
 
 
-def node_list_convert_with_links(nodes, limit, url, fields=None, **kwargs):
+def _node_list_sanitizer_args():
     cdict = api.request.context.to_policy_values()
     target_dict = dict(cdict)
-    sanitizer_args = {
+    return {
         'cdict': cdict,
         'show_driver_secrets': policy.check("show_password", cdict,
                                             target_dict),
@@ -1685,18 +1717,54 @@ def node_list_convert_with_links(nodes, limit, url, fields=None, **kwargs):
         'evaluate_additional_policies': not policy.check_policy(
             "baremetal:node:get:filter_threshold",
             target_dict, cdict),
+        # NOTE: Scoped to this request, and shared by every node
+        # of the collection.
+        'policy_cache': policy.NodeDecisionCache(cdict),
     }
 
+
+def node_list_convert_with_links(nodes, limit, url, fields=None, **kwargs):
+    related_uuids = _get_related_uuids(nodes, fields=fields)
     return collection.list_convert_with_links(
         items=[node_convert_with_links(n, fields=fields,
-                                       sanitize=False)
+                                       sanitize=False,
+                                       related_uuids=related_uuids)
                for n in nodes],
         item_name='nodes',
         limit=limit,
         url=url,
         fields=fields,
         sanitize_func=node_sanitize,
-        sanitizer_args=sanitizer_args,
+        sanitizer_args=_node_list_sanitizer_args(),
+        **kwargs
+    )
+
+
+def node_list_stream_with_links(fetch_func, limit, url, fields=None,
+                                **kwargs):
+    """Build a streamed node collection.
+
+    :param fetch_func: callable returning a page of nodes, see
+                       :func:`collection.stream_convert_with_links`.
+    """
+    def _convert(rpc_node, related_uuids):
+        return node_convert_with_links(rpc_node, fields=fields,
+                                       sanitize=False,
+                                       related_uuids=related_uuids)
+
+    def _prefetch(page):
+        return {'related_uuids': _get_related_uuids(page, fields=fields)}
+
+    return collection.stream_convert_with_links(
+        fetch_func,
+        _convert,
+        prefetch_func=_prefetch,
+        item_name='nodes',
+        limit=limit,
+        url=url,
+        fields=fields,
+        sanitize_func=node_sanitize,
+        sanitizer_args=_node_list_sanitizer_args(),
         **kwargs
     )
 
@@ -1926,6 +1994,22 @@ class NodeHistoryController(rest.RestController):
                                                          marker)
         limit = api_utils.validate_limit(limit)
 
+        if collection.stream_enabled():
+            def _fetch(limit, marker):
+                return objects.NodeHistory.list_by_node_id(
+                    api.request.context, node.id, marker=marker, limit=limit)
+
+            return collection.stream_convert_with_links(
+                _fetch,
+                functools.partial(self._history_event_convert_with_links,
+                                  node.uuid, detail=detail),
+                item_name='history',
+                url=f'nodes/{self.node_ident}/history',
+                fields=fields,
+                marker=marker_obj,
+                limit=limit,
+            )
+
         events = objects.NodeHistory.list_by_node_id(api.request.context,
                                                      node.id,
                                                      marker=marker_obj,
@@ -2074,6 +2158,57 @@ class NodesController(rest.RestController):
 
         return filtered_nodes
 
+    def _fetch_conductor_nodes(self, fetch_func, conductor, limit, marker):
+        """Fetch up to limit nodes mapped to a conductor.
+
+        The nodes are fetched with a filter on the hash partitions of the
+        conductor, which also matches some nodes mapped to its neighbours
+        in the hash ring. These are skipped, and more nodes are fetched
+        until the limit is reached, so that pages are only short at the
+        end of the collection.
+        """
+        nodes = []
+        while len(nodes) < limit:
+            batch_limit = limit - len(nodes)
+            batch = fetch_func(limit=batch_limit, marker=marker)
+            nodes.extend(self._filter_by_conductor(batch, conductor))
+            if len(batch) < batch_limit:
+                break
+            marker = batch[-1]
+        return nodes
+
+    def _get_obj_fields(self, fields, sort_key, conductor):
+        if not fields:
+            # map the name for the call, as we did not pickup a specific
+            # list of fields to return.
+            return fields
+        obj_fields = fields[:]
+        required_object_fields = ('allocation_id', 'chassis_id',
+                                  'uuid', 'owner', 'lessee',
+                                  'created_at', 'updated_at')
+        if conductor or 'conductor' in obj_fields:
+            # The conductor is not stored, it is found from these.
+            if 'conductor' in obj_fields:
+                obj_fields.remove('conductor')
+            required_object_fields += ('driver', 'conductor_group')
+        for req_field in required_object_fields:
+            if req_field not in obj_fields:
+                obj_fields.append(req_field)
+        if ((conductor or collection.stream_enabled())
+                and sort_key in objects.Node.fields
+                and sort_key not in obj_fields):
+            # The last node of a page is the marker of the next one.
+            obj_fields.append(sort_key)
+        return obj_fields
+
+    def _stream_nodes_collection(self, fetch_func, marker, limit,
+                                 resource_url, fields, parameters):
+        return node_list_stream_with_links(fetch_func, limit,
+                                           url=resource_url,
+                                           fields=fields,
+                                           marker=marker,
+                                           **parameters)
+
     def _get_nodes_collection(self, chassis_uuid, instance_uuid, associated,
                               maintenance, retired, provision_state, marker,
                               limit, sort_key, sort_dir, driver=None,
@@ -2131,31 +2266,14 @@ class NodesController(rest.RestController):
             if value is not None:
                 filters[key] = value
 
-        if fields:
-            obj_fields = fields[:]
-            required_object_fields = ('allocation_id', 'chassis_id',
-                                      'uuid', 'owner', 'lessee',
-                                      'created_at', 'updated_at')
-            for req_field in required_object_fields:
-                if req_field not in obj_fields:
-                    obj_fields.append(req_field)
-        else:
-            # map the name for the call, as we did not pickup a specific
-            # list of fields to return.
-            obj_fields = fields
-        # NOTE(TheJulia): When a data set of the nodes list is being
-        # requested, this method takes approximately 3-3.5% of the time
-        # when requesting specific fields aligning with Nova's sync
-        # process. (Local DB though)
-
-        nodes = objects.Node.list(api.request.context, limit, marker_obj,
-                                  sort_key=sort_key, sort_dir=sort_dir,
-                                  filters=filters, fields=obj_fields)
-
-        # Special filtering on results based on conductor field
         if conductor:
-            nodes = self._filter_by_conductor(nodes, conductor)
+            # NOTE: only fetch the nodes of the hash rings the conductor is
+            # in, and from its parts of them. Nothing matches if the
+            # conductor is not online.
+            filters['hash_ring_ranges'] = (
+                api.request.rpcapi.ring_manager.get_host_rings(conductor))
 
+        obj_fields = self._get_obj_fields(fields, sort_key, conductor)
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
         if associated:
             parameters['associated'] = associated
@@ -2163,10 +2281,34 @@ class NodesController(rest.RestController):
             parameters['maintenance'] = maintenance
         if retired:
             parameters['retired'] = retired
+        if conductor:
+            parameters['conductor'] = conductor
 
         if detail is not None:
             parameters['detail'] = detail
 
+        def _fetch(limit, marker):
+            return objects.Node.list(api.request.context, limit, marker,
+                                     sort_key=sort_key, sort_dir=sort_dir,
+                                     filters=filters, fields=obj_fields)
+
+        fetch_func = _fetch
+        if conductor:
+            fetch_func = functools.partial(self._fetch_conductor_nodes,
+                                           _fetch, conductor)
+
+        if collection.stream_enabled() and not instance_uuid:
+            return self._stream_nodes_collection(
+                fetch_func, marker_obj, limit, resource_url, fields,
+                parameters)
+
+        # NOTE(TheJulia): When a data set of the nodes list is being
+        # requested, this method takes approximately 3-3.5% of the time
+        # when requesting specific fields aligning with Nova's sync
+        # process. (Local DB though)
+
+        nodes = fetch_func(limit=limit, marker=marker_obj)
+
         if instance_uuid:
             # NOTE(rloo) if limit==1 and len(nodes)==1 (see
             # Collection.has_next()), a 'next' link will
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 from http import client as http_client
 
 from ironic_lib import metrics_utils
@@ -92,26 +93,28 @@ PORT_PATCH_VALIDATOR = args.and_valid(
 
 
 def hide_fields_in_newer_versions(port):
+    features = api_utils.get_request_features()
     # if requested version is < 1.18, hide internal_info field
-    if not api_utils.allow_port_internal_info():
+    if not features.port_internal_info:
         port.pop('internal_info', None)
     # if requested version is < 1.19, hide local_link_connection and
     # pxe_enabled fields
-    if not api_utils.allow_port_advanced_net_fields():
+    if not features.port_advanced_net_fields:
         port.pop('pxe_enabled', None)
         port.pop('local_link_connection', None)
     # if requested version is < 1.24, hide portgroup_uuid field
-    if not api_utils.allow_portgroups_subcontrollers():
+    if not features.portgroups_subcontrollers:
         port.pop('portgroup_uuid', None)
     # if requested version is < 1.34, hide physical_network field.
-    if not api_utils.allow_port_physical_network():
+    if not features.port_physical_network:
         port.pop('physical_network', None)
     # if requested version is < 1.53, hide is_smartnic field.
-    if not api_utils.allow_port_is_smartnic():
+    if not features.port_is_smartnic:
         port.pop('is_smartnic', None)
 
 
-def convert_with_links(rpc_port, fields=None, sanitize=True):
+def convert_with_links(rpc_port, fields=None, sanitize=True,
+                       portgroup_uuids=None):
     port = api_utils.object_to_dict(
         rpc_port,
         link_resource='ports',
@@ -126,11 +129,13 @@ def convert_with_links(rpc_port, fields=None, sanitize=True):
             'node_uuid',
         )
     )
-    if rpc_port.portgroup_id:
+    if not rpc_port.portgroup_id:
+        port['portgroup_uuid'] = None
+    elif portgroup_uuids is not None:
+        port['portgroup_uuid'] = portgroup_uuids.get(rpc_port.portgroup_id)
+    else:
         pg = objects.Portgroup.get(api.request.context, rpc_port.portgroup_id)
         port['portgroup_uuid'] = pg.uuid
-    else:
-        port['portgroup_uuid'] = None
 
     _validate_fields(port, fields)
 
@@ -160,17 +165,29 @@ def port_sanitize(port, fields=None):
     api_utils.sanitize_dict(port, fields)
 
 
+def _list_convert(rpc_port, fields=None, portgroup_uuids=None):
+    port = convert_with_links(rpc_port, fields=fields, sanitize=False,
+                              portgroup_uuids=portgroup_uuids)
+    # NOTE(dtantsur): node was deleted after we fetched the port
+    # list, meaning that the port was also deleted. Skip it.
+    if port['node_uuid'] is None:
+        return None
+    return port
+
+
+def _get_portgroup_uuids(rpc_ports):
+    return api_utils.get_related_uuids(
+        rpc_ports, portgroup_id='portgroups')['portgroup_id']
+
+
 def list_convert_with_links(rpc_ports, limit, url, fields=None, **kwargs):
     ports = []
+    portgroup_uuids = _get_portgroup_uuids(rpc_ports)
     for rpc_port in rpc_ports:
-        port = convert_with_links(rpc_port, fields=fields,
-                                  sanitize=False)
-        # NOTE(dtantsur): node was deleted after we fetched the port
-        # list, meaning that the port was also deleted. Skip it.
-        if port['node_uuid'] is None:
-            continue
-
-        ports.append(port)
+        port = _list_convert(rpc_port, fields=fields,
+                             portgroup_uuids=portgroup_uuids)
+        if port is not None:
+            ports.append(port)
     return collection.list_convert_with_links(
         items=ports,
         item_name='ports',
@@ -182,6 +199,21 @@ def list_convert_with_links(rpc_ports, limit, url, fields=None, **kwargs):
     )
 
 
+def list_stream_with_links(fetch_func, limit, url, fields=None, **kwargs):
+    return collection.stream_convert_with_links(
+        fetch_func,
+        functools.partial(_list_convert, fields=fields),
+        prefetch_func=lambda page: {
+            'portgroup_uuids': _get_portgroup_uuids(page)},
+        item_name='ports',
+        limit=limit,
+        url=url,
+        fields=fields,
+        sanitize_func=port_sanitize,
+        **kwargs
+    )
+
+
 class PortsController(rest.RestController):
     """REST controller for Ports."""
 
@@ -251,45 +283,63 @@ class PortsController(rest.RestController):
             if exclusive_filters > 1:
                 raise exception.OperationNotPermitted()
 
+        parameters = {}
+
+        if detail is not None:
+            parameters['detail'] = detail
+
+        if address and not (portgroup_ident or node_ident):
+            ports = self._get_ports_by_address(address, project=project)
+            return list_convert_with_links(ports, limit,
+                                           url=resource_url,
+                                           fields=fields,
+                                           sort_key=sort_key,
+                                           sort_dir=sort_dir,
+                                           **parameters)
+
         if portgroup_ident:
             # FIXME: Since all we need is the portgroup ID, we can
             #                 make this more efficient by only querying
             #                 for that column. This will get cleaned up
             #                 as we move to the object interface.
             portgroup = api_utils.get_rpc_portgroup(portgroup_ident)
-            ports = objects.Port.list_by_portgroup_id(api.request.context,
-                                                      portgroup.id, limit,
-                                                      marker_obj,
-                                                      sort_key=sort_key,
-                                                      sort_dir=sort_dir,
-                                                      project=project)
+
+            def _fetch(limit, marker):
+                return objects.Port.list_by_portgroup_id(
+                    api.request.context, portgroup.id, limit, marker,
+                    sort_key=sort_key, sort_dir=sort_dir, project=project)
         elif node_ident:
             # FIXME(comstud): Since all we need is the node ID, we can
             #                 make this more efficient by only querying
             #                 for that column. This will get cleaned up
             #                 as we move to the object interface.
             node = api_utils.get_rpc_node(node_ident)
-            ports = objects.Port.list_by_node_id(api.request.context,
-                                                 node.id, limit, marker_obj,
-                                                 sort_key=sort_key,
-                                                 sort_dir=sort_dir,
-                                                 project=project)
-        elif address:
-            ports = self._get_ports_by_address(address, project=project)
+
+            def _fetch(limit, marker):
+                return objects.Port.list_by_node_id(
+                    api.request.context, node.id, limit, marker,
+                    sort_key=sort_key, sort_dir=sort_dir, project=project)
         elif shard:
-            ports = objects.Port.list_by_node_shards(api.request.context,
-                                                     shard, limit,
-                                                     marker_obj, sort_key,
-                                                     sort_dir, project=project)
+            def _fetch(limit, marker):
+                return objects.Port.list_by_node_shards(
+                    api.request.context, shard, limit, marker, sort_key,
+                    sort_dir, project=project)
         else:
-            ports = objects.Port.list(api.request.context, limit,
-                                      marker_obj, sort_key=sort_key,
-                                      sort_dir=sort_dir, project=project)
-        parameters = {}
-
-        if detail is not None:
-            parameters['detail'] = detail
-
+            def _fetch(limit, marker):
+                return objects.Port.list(
+                    api.request.context, limit, marker, sort_key=sort_key,
+                    sort_dir=sort_dir, project=project)
+
+        if collection.stream_enabled():
+            return list_stream_with_links(_fetch, limit,
+                                          url=resource_url,
+                                          fields=fields,
+                                          marker=marker_obj,
+                                          sort_key=sort_key,
+                                          sort_dir=sort_dir,
+                                          **parameters)
+
+        ports = _fetch(limit, marker_obj)
         return list_convert_with_links(ports, limit,
                                        url=resource_url,
                                        fields=fields,
@@ -14,6 +14,7 @@
 #    under the License.
 
 import copy
+import functools
 from http import client as http_client
 import inspect
 import io
@@ -244,7 +245,30 @@ def object_to_dict(obj, include_created_at=True, include_updated_at=True,
     return to_dict
 
 
-def populate_node_uuid(obj, to_dict):
+def get_related_uuids(objs, **relations):
+    """Look up the UUIDs of the resources referenced by a list of objects.
+
+    Meant for converting a page of a collection with one query per type of
+    referenced resource, instead of one query per object.
+
+    :param objs:
+        objects referencing other resources by ID
+    :param relations:
+        mapping of the attributes of the objects holding the IDs, e.g.
+        ``node_id``, to the type of the referenced resources, e.g.
+        ``nodes``, see ``get_uuids_by_ids`` of the database API
+    :returns:
+        a dict mapping each attribute to a dict of IDs to UUIDs
+    """
+    result = {}
+    for attr, resource in relations.items():
+        ids = {getattr(obj, attr) for obj in objs} - {None}
+        result[attr] = (api.request.dbapi.get_uuids_by_ids(resource, ids)
+                        if ids else {})
+    return result
+
+
+def populate_node_uuid(obj, to_dict, node_uuids=None):
     """Look up the node referenced in the object and populate a dict.
 
     The node is fetched with the object ``node_id`` attribute and the
@@ -254,15 +278,22 @@ def populate_node_uuid(obj, to_dict):
         object to get the node_id attribute
     :param to_dict:
         dict to populate with a ``node_uuid`` value
+    :param node_uuids:
+        optional dict of node IDs to UUIDs, see ``get_related_uuids``. The
+        node is fetched if not provided.
     :raises:
         exception.NodeNotFound if the node is not found
     """
     if not obj.node_id:
         to_dict['node_uuid'] = None
         return
-    to_dict['node_uuid'] = objects.Node.get_by_id(
-        api.request.context,
-        obj.node_id).uuid
+    if node_uuids is None:
+        node_uuids = api.request.dbapi.get_uuids_by_ids('nodes',
+                                                        [obj.node_id])
+    try:
+        to_dict['node_uuid'] = node_uuids[obj.node_id]
+    except KeyError:
+        raise exception.NodeNotFound(node=obj.node_id)
 
 
 def replace_node_uuid_with_id(to_dict):
@@ -1463,6 +1494,62 @@ def allow_deploy_templates():
     return api.request.version.minor >= versions.MINOR_55_DEPLOY_TEMPLATES
 
 
+class RequestFeatures(object):
+    """Microversion dependent features of a request.
+
+    Converting a collection checks the same features for every item, so
+    they are evaluated once per request by
+    :class:`ironic.api.hooks.FeaturesHook` instead.
+
+    :param version: the API version of the request.
+    """
+
+    def __init__(self, version):
+        minor = version.minor
+        self.available_state = minor >= versions.MINOR_2_AVAILABLE_STATE
+        self.links_node_states_and_driver_properties = (
+            minor >= versions.MINOR_14_LINKS_NODESTATES_DRIVERPROPERTIES)
+        self.port_internal_info = (
+            minor >= versions.MINOR_18_PORT_INTERNAL_INFO)
+        self.port_advanced_net_fields = (
+            minor >= versions.MINOR_19_PORT_ADVANCED_NET_FIELDS)
+        self.portgroups_subcontrollers = (
+            minor >= versions.MINOR_24_PORTGROUPS_SUBCONTROLLERS)
+        self.volume = minor >= versions.MINOR_32_VOLUME
+        self.inspect_wait_state = minor >= versions.MINOR_39_INSPECT_WAIT
+        self.expose_conductors = minor >= versions.MINOR_49_CONDUCTORS
+        self.allocations = minor >= versions.MINOR_52_ALLOCATION
+        self._minor = minor
+        self.disallowed_fields = tuple(
+            field for field, min_minor in VERSIONED_FIELDS.items()
+            if minor < min_minor)
+
+    # NOTE: the port object checks depend on the pinned object versions
+    # and may raise, only evaluate them when ports are converted.
+    @functools.cached_property
+    def port_physical_network(self):
+        return (self._minor >= versions.MINOR_34_PORT_PHYSICAL_NETWORK
+                and objects.Port.supports_physical_network())
+
+    @functools.cached_property
+    def port_is_smartnic(self):
+        return (self._minor >= versions.MINOR_53_PORT_SMARTNIC
+                and objects.Port.supports_is_smartnic())
+
+
+def get_request_features():
+    """Get the microversion dependent features of the current request.
+
+    :returns: a :class:`RequestFeatures` instance.
+    """
+    features = getattr(api.request, 'features', None)
+    if not isinstance(features, RequestFeatures):
+        # NOTE: the request did not pass through the hooks, e.g. when
+        # called outside of the API service.
+        features = RequestFeatures(api.request.version)
+    return features
+
+
 def check_policy(policy_name):
     """Check if the specified policy is authorised for this request.
 
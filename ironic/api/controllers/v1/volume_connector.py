@@ -64,13 +64,15 @@ PATCH_ALLOWED_FIELDS = [
 ]
 
 
-def convert_with_links(rpc_connector, fields=None, sanitize=True):
+def convert_with_links(rpc_connector, fields=None, sanitize=True,
+                       node_uuids=None):
     connector = api_utils.object_to_dict(
         rpc_connector,
         link_resource='volume/connectors',
         fields=('connector_id', 'extra', 'type')
     )
-    api_utils.populate_node_uuid(rpc_connector, connector)
+    api_utils.populate_node_uuid(rpc_connector, connector,
+                                 node_uuids=node_uuids)
 
     if fields is not None:
         api_utils.check_for_invalid_fields(fields, connector)
@@ -87,8 +89,11 @@ def list_convert_with_links(rpc_connectors, limit, url, fields=None,
                             detail=None, **kwargs):
     if detail:
         kwargs['detail'] = detail
+    node_uuids = api_utils.get_related_uuids(
+        rpc_connectors, node_id='nodes')['node_id']
     return collection.list_convert_with_links(
-        items=[convert_with_links(p, fields=fields, sanitize=False)
+        items=[convert_with_links(p, fields=fields, sanitize=False,
+                                  node_uuids=node_uuids)
                for p in rpc_connectors],
         item_name='connectors',
         limit=limit,
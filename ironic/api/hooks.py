@@ -21,6 +21,7 @@ from oslo_config import cfg
 from oslo_log import log
 from pecan import hooks
 
+from ironic.api.controllers.v1 import utils as api_utils
 from ironic.common import context
 from ironic.common import policy
 from ironic.conductor import rpcapi
@@ -123,6 +124,18 @@ class RPCHook(hooks.PecanHook):
         state.request.rpcapi = rpcapi.ConductorAPI()
 
 
+class FeaturesHook(hooks.PecanHook):
+    """Attach the microversion dependent features to the request.
+
+    Runs after routing, which sets the API version of the request.
+    """
+
+    def before(self, state):
+        version = getattr(state.request, 'version', None)
+        if version is not None:
+            state.request.features = api_utils.RequestFeatures(version)
+
+
 class NoExceptionTracebackHook(hooks.PecanHook):
     """Workaround rpc.common: deserialize_remote_exception.
 
@@ -136,17 +149,18 @@ class NoExceptionTracebackHook(hooks.PecanHook):
     # catches and handles all the errors, so 'on_error' dedicated for unhandled
     # exceptions never fired.
     def after(self, state):
-        # Omit empty body. Some errors may not have body at this level yet.
-        if not state.response.body:
-            return
-
         # Do nothing if there is no error.
         # Status codes in the range 200 (OK) to 399 (400 = BAD_REQUEST) are not
-        # an error.
+        # an error. This is checked first, so that streamed bodies are not
+        # consumed here.
         if (http_client.OK <= state.response.status_int
                 < http_client.BAD_REQUEST):
             return
 
+        # Omit empty body. Some errors may not have body at this level yet.
+        if not state.response.body:
+            return
+
         json_body = state.response.json
         # Do not remove traceback when traceback config is set
         if cfg.CONF.debug_tracebacks_in_api:
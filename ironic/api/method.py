@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import functools
 from http import client as http_client
 import json
@@ -23,6 +24,7 @@ import traceback
 from oslo_config import cfg
 from oslo_log import log
 import pecan
+import pecan.core
 
 LOG = log.getLogger(__name__)
 
@@ -32,6 +34,81 @@ pecan_json_decorate = pecan.expose(
     generic=False)
 
 
+class StreamingResult(object):
+    """A controller result serialized while it is being sent.
+
+    :param chunks: An iterable of strings which, concatenated, form the
+                   JSON document to return. It is consumed after the
+                   controller has returned, with ``pecan.request`` and
+                   ``pecan.response`` still available.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+
+@contextlib.contextmanager
+def _bind_request(request, response):
+    """Make request and response the current pecan ones.
+
+    Pecan only binds them for the duration of the application call, while
+    a streamed body is consumed by the WSGI server afterwards.
+    """
+    state = pecan.core.state
+    previous = (getattr(state, 'request', None),
+                getattr(state, 'response', None))
+    state.request = request
+    state.response = response
+    try:
+        yield
+    finally:
+        if previous[0] is None:
+            del state.request
+            del state.response
+        else:
+            state.request, state.response = previous
+
+
+# Size of the buffer accumulated before passing it to the WSGI server.
+_STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def _stream_chunks(chunks, request, response):
+    chunks = iter(chunks)
+    done = False
+    while not done:
+        buf = []
+        size = 0
+        with _bind_request(request, response):
+            try:
+                while size < _STREAM_BUFFER_SIZE:
+                    chunk = next(chunks).encode('utf-8')
+                    buf.append(chunk)
+                    size += len(chunk)
+            except StopIteration:
+                done = True
+            except Exception:
+                # The status and headers have already been sent, the only
+                # thing left to do is to abort the connection.
+                LOG.exception('Server-side error while streaming the '
+                              'response to %(method)s %(path)s',
+                              {'method': request.method,
+                               'path': request.path})
+                raise
+        if buf:
+            yield b''.join(buf)
+
+
+def _streaming_response(result):
+    # Returning the actual response object (not the pecan.response proxy)
+    # tells pecan that it must not render anything.
+    request = pecan.request.environ['pecan.locals']['request']
+    response = pecan.request.environ['pecan.locals']['response']
+    response.content_type = 'application/json'
+    response.app_iter = _stream_chunks(result.chunks, request, response)
+    return response
+
+
 def expose(status_code=None):
 
     def decorate(f):
@@ -75,6 +152,9 @@ def expose(status_code=None):
             if result is None and pecan.response.status_code == 202:
                 return _empty()
 
+            if isinstance(result, StreamingResult):
+                return _streaming_response(result)
+
             return json.dumps(result)
 
         pecan_json_decorate(callfunction)
@@ -64,6 +64,9 @@ dbapi = db_api.get_instance()
 # object, in case it is lazy loaded. The attribute will be accessed when needed
 # by doing getattr on the object
 ONLINE_MIGRATIONS = (
+    # Added in 2023.2
+    (dbapi, 'backfill_node_async_jobs'),
+    (dbapi, 'update_node_hash_partitions'),
     # NOTE(rloo): Don't remove this; it should always be last
     (dbapi, 'update_to_latest_versions'),
 )
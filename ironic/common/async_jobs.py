@@ -0,0 +1,97 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+"""Asynchronous BMC job definitions.
+
+Each kind of job is tracked by a ``driver_internal_info`` key which holds a
+true value while the job is outstanding. The database keeps an index of the
+nodes with outstanding jobs, use the ``async_job_in`` node filter to find
+them without loading ``driver_internal_info`` of every node.
+
+Conductors of previous releases do not maintain the index, so it is only
+used once the release is no longer pinned and the jobs started before the
+upgrade have been recorded by the ``backfill_node_async_jobs`` online data
+migration. Use ``node_filters`` and ``has_jobs`` for node periodic tasks.
+"""
+
+from ironic.conf import CONF
+from ironic.db import api as dbapi
+
+FIRMWARE_UPDATES = 'firmware_updates'
+""" Redfish firmware update tasks. """
+
+RAID_CONFIGS = 'raid_configs'
+""" Redfish RAID configuration tasks. """
+
+RAID_CONFIG_JOB_IDS = 'raid_config_job_ids'
+""" iDRAC RAID configuration jobs. """
+
+RAID_TASK_MONITOR_URIS = 'raid_task_monitor_uris'
+""" iDRAC Redfish RAID configuration tasks. """
+
+BIOS_CONFIG_JOB_IDS = 'bios_config_job_ids'
+""" iDRAC BIOS configuration jobs. """
+
+FACTORY_RESET_TIME_BEFORE_REBOOT = 'factory_reset_time_before_reboot'
+""" iDRAC BIOS factory reset waiting for a reboot. """
+
+IMPORT_TASK_MONITOR_URL = 'import_task_monitor_url'
+""" iDRAC configuration import task. """
+
+VALID_ASYNC_JOBS = (FIRMWARE_UPDATES, RAID_CONFIGS, RAID_CONFIG_JOB_IDS,
+                    RAID_TASK_MONITOR_URIS, BIOS_CONFIG_JOB_IDS,
+                    FACTORY_RESET_TIME_BEFORE_REBOOT, IMPORT_TASK_MONITOR_URL)
+
+
+_index_ready = False
+
+
+def _use_index():
+    """Whether the node_async_jobs index can be used to find nodes."""
+    global _index_ready
+    if CONF.pin_release_version:
+        return False
+    if not _index_ready:
+        # The result is only cached once the index is ready, conductors
+        # of this release keep it up-to-date from then on.
+        _index_ready = dbapi.get_instance().check_node_async_jobs_backfilled()
+    return _index_ready
+
+
+def node_filters(kinds, **filters):
+    """Build the filters of a node periodic task polling jobs.
+
+    :param kinds: kinds of asynchronous jobs to poll.
+    :param filters: other filters for the nodes.
+    :returns: a callable returning the filters, with ``async_job_in`` when
+        the index can be used.
+    """
+    def _filters():
+        if _use_index():
+            return dict(filters, async_job_in=kinds)
+        return filters
+
+    return _filters
+
+
+def has_jobs(kinds):
+    """Build the predicate of a node periodic task polling jobs.
+
+    The predicate requires ``driver_internal_info`` in the
+    ``predicate_extra_fields`` of the task.
+
+    :param kinds: kinds of asynchronous jobs to poll.
+    :returns: a predicate accepting nodes with one of these jobs.
+    """
+    return lambda node: any(node.driver_internal_info.get(kind)
+                            for kind in kinds)
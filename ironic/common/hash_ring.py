@@ -13,9 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import hashlib
 import threading
 import time
 
+from ironic_lib import metrics_utils
 from oslo_log import log
 from tooz import hashring
 
@@ -27,6 +30,86 @@ from ironic.db import api as dbapi
 
 LOG = log.getLogger(__name__)
 
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
+# Number of leading bits of the hash of a node UUID stored as the hash
+# partition of the node.
+HASH_PARTITION_BITS = 16
+MAX_HASH_PARTITION = 2 ** HASH_PARTITION_BITS - 1
+
+
+def _hash(data, algorithm):
+    # NOTE: the same way tooz hashes the data it maps onto the ring.
+    if algorithm == 'md5':
+        return hashlib.md5(data, usedforsecurity=False)
+    return hashlib.new(algorithm, data)
+
+
+def get_hash_partition(node_uuid, algorithm=None):
+    """Get the hash partition of a node.
+
+    The hash partition is made of the leading bits of the hash used to map
+    the node onto the hash rings. Unlike the mapping itself, it does not
+    depend on the conductors, so it can be stored with the node.
+
+    :param node_uuid: the UUID of the node.
+    :param algorithm: the hash algorithm, defaults to
+        [DEFAULT]hash_ring_algorithm.
+    :returns: an integer between 0 and MAX_HASH_PARTITION.
+    """
+    digest = _hash(node_uuid.encode('utf-8'),
+                   algorithm or CONF.hash_ring_algorithm).digest()
+    return (int.from_bytes(digest, 'big')
+            >> (len(digest) * 8 - HASH_PARTITION_BITS))
+
+
+def _get_ring_points(hosts, partitions, algorithm):
+    """Get the points of hosts on a hash ring.
+
+    tooz has no public API to get the points of a host, they are computed
+    the same way tooz places the hosts on the ring.
+
+    :param hosts: a dictionary mapping the hosts of the ring to their
+        weights, as in the nodes of a tooz hash ring.
+    :param partitions: the number of partitions of the ring.
+    :param algorithm: the hash algorithm of the ring.
+    :returns: a sorted list of (point, host) tuples.
+    """
+    points = {}
+    for host, weight in hosts.items():
+        key = host.encode('utf-8')
+        key_hash = _hash(key, algorithm)
+        for _i in range(partitions * weight):
+            key_hash.update(key)
+            points[int(key_hash.hexdigest(), 16)] = host
+    return sorted(points.items())
+
+
+def _get_hash_partition_ranges(ring, host):
+    """Get the ranges of hash partitions mapped to a host in a hash ring.
+
+    :param ring: a tooz hash ring built by HashRingManager.
+    :param host: the host name of a conductor in the ring.
+    :returns: a list of (first, last) tuples of hash partitions, may be
+        overlapping.
+    """
+    # NOTE: tooz maps a hash to the first point of the ring above it.
+    algorithm = CONF.hash_ring_algorithm
+    points = _get_ring_points(ring.nodes, 2 ** CONF.hash_partition_exponent,
+                              algorithm)
+    shift = _hash(b'', algorithm).digest_size * 8 - HASH_PARTITION_BITS
+    ranges = []
+    for index, (point, owner) in enumerate(points):
+        if owner != host:
+            continue
+        last = max(point - 1, 0) >> shift
+        if index:
+            ranges.append((points[index - 1][0] >> shift, last))
+        else:
+            ranges.append((0, last))
+            ranges.append((points[-1][0] >> shift, MAX_HASH_PARTITION))
+    return ranges
+
 
 class HashRingManager(object):
     _hash_rings = (None, 0)
@@ -54,25 +137,115 @@ class HashRingManager(object):
         with self._lock:
             hash_rings, updated_at = self.__class__._hash_rings
             if hash_rings is None or updated_at < limit:
-                LOG.debug('Rebuilding cached hash rings')
-                hash_rings = self._load_hash_rings()
-                self.__class__._hash_rings = hash_rings, time.time()
-                LOG.debug('Finished rebuilding hash rings, available drivers '
-                          'are %s', ', '.join(hash_rings))
+                hash_rings = self._refresh_hash_rings(hash_rings)
             return hash_rings
 
-    def _load_hash_rings(self):
+    def _refresh_hash_rings(self, hash_rings):
+        """Refresh the cached hash rings. Must be called under the lock."""
+        LOG.debug('Rebuilding cached hash rings')
+        hash_rings = self._load_hash_rings(hash_rings)
+        self.__class__._hash_rings = hash_rings, time.time()
+        LOG.debug('Finished rebuilding hash rings, available drivers '
+                  'are %s', ', '.join(hash_rings))
+        return hash_rings
+
+    @METRICS.timer('HashRingManager._load_hash_rings')
+    def _load_hash_rings(self, previous=None):
+        """Load the hash rings from the active conductors.
+
+        :param previous: the currently cached hash rings, if any. Rings with
+            unchanged membership are reused as they are, rings with changed
+            membership only get the added or removed hosts updated.
+        :returns: a dictionary mapping ring keys to hash rings.
+        """
+        previous = previous or {}
         rings = {}
+        built = updated = 0
         d2c = self.dbapi.get_active_hardware_type_dict(
             use_groups=self.use_groups)
 
         for driver_name, hosts in d2c.items():
-            rings[driver_name] = hashring.HashRing(
-                hosts, partitions=2 ** CONF.hash_partition_exponent,
-                hash_function=CONF.hash_ring_algorithm)
+            ring = previous.get(driver_name)
+            if ring is None:
+                rings[driver_name] = hashring.HashRing(
+                    hosts, partitions=2 ** CONF.hash_partition_exponent,
+                    hash_function=CONF.hash_ring_algorithm)
+                built += 1
+                continue
+
+            known = set(ring.nodes)
+            if known != hosts:
+                # NOTE: the cached ring may be in use by other
+                # threads right now, update a copy of it.
+                ring = copy.deepcopy(ring)
+                for host in known - hosts:
+                    ring.remove_node(host)
+                ring.add_nodes(hosts - known)
+                updated += 1
+            rings[driver_name] = ring
 
+        METRICS.send_counter('HashRingManager.RingsBuilt', built)
+        METRICS.send_counter('HashRingManager.RingsUpdated', updated)
+        METRICS.send_counter('HashRingManager.RingsRemoved',
+                             len(set(previous) - set(rings)))
         return rings
 
+    def get_host_rings(self, host):
+        """Get the hash rings a host is in and its hash partitions in them.
+
+        Hash partitions are stored with nodes, see get_hash_partition. They
+        allow fetching only the nodes a conductor may be responsible for,
+        the mapping of each node still needs checking since a range of hash
+        partitions may be shared between several conductors.
+
+        :param host: the host name of a conductor.
+        :returns: a list of (conductor_group, drivers, ranges) tuples, where
+            conductor_group is None when groups are not used and ranges is a
+            sorted list of non-overlapping (first, last) tuples of hash
+            partitions or None if all hash partitions are mapped to the host.
+            Empty if the host is not in any ring.
+        """
+        rings = {}
+        for key, ring in self.ring.items():
+            if host not in ring.nodes:
+                continue
+            if self.use_groups:
+                group, driver = key.split(':', 1)
+            else:
+                group, driver = None, key
+            # NOTE: rings with the same conductors map nodes the same way.
+            rings.setdefault((group, frozenset(ring.nodes)),
+                             (ring, []))[1].append(driver)
+
+        result = []
+        for (group, _hosts), (ring, drivers) in rings.items():
+            merged = []
+            for first, last in sorted(_get_hash_partition_ranges(ring, host)):
+                if merged and first <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+                else:
+                    merged.append((first, last))
+            if merged == [(0, MAX_HASH_PARTITION)]:
+                merged = None
+            result.append((group, sorted(drivers), merged))
+        return result
+
+    def get_hash_ring_ranges(self, host):
+        """Get the hash partitions of the nodes that may be mapped to a host.
+
+        Unlike get_host_rings, this is meant for narrowing down the nodes
+        fetched by the host itself, which are all mapped to it when it is
+        the only host in its rings.
+
+        :param host: the host name of a conductor.
+        :returns: the result of get_host_rings, or None if the host is not in
+            any ring or is the only host in all its rings.
+        """
+        result = self.get_host_rings(host)
+        if all(ranges is None for _group, _drivers, ranges in result):
+            return None
+        return result
+
     @classmethod
     def reset(cls):
         with cls._lock:
@@ -80,6 +253,7 @@ class HashRingManager(object):
             cls._hash_rings = (None, 0)
 
     def get_ring(self, driver_name, conductor_group):
+        seen = self.__class__._hash_rings[1]
         try:
             return self._get_ring(driver_name, conductor_group)
         except (exception.DriverNotFound, exception.TemporaryFailure):
@@ -90,7 +264,14 @@ class HashRingManager(object):
                       {'driver': driver_name,
                        'group': conductor_group or '<none>'})
 
-        self.__class__.reset()
+        if self.cache:
+            with self._lock:
+                hash_rings, updated_at = self.__class__._hash_rings
+                # NOTE: many threads may hit the same missing ring
+                # at once, only refresh the rings if nobody has done it (or
+                # reset them) since we looked at them.
+                if updated_at == seen:
+                    self._refresh_hash_rings(hash_rings)
         return self._get_ring(driver_name, conductor_group)
 
     def _get_ring(self, driver_name, conductor_group):
@@ -19,14 +19,22 @@
 Handling of VM disk images.
 """
 
+import collections
+import contextlib
+import hashlib
+import io
 import os
+import re
 import shutil
+import threading
 import time
 
 from ironic_lib import disk_utils
+from ironic_lib import metrics_utils
 from oslo_concurrency import processutils
 from oslo_log import log as logging
 from oslo_utils import fileutils
+from oslo_utils import units
 import pycdlib
 
 from ironic.common import exception
@@ -37,6 +45,7 @@ from ironic.common import utils
 from ironic.conf import CONF
 
 LOG = logging.getLogger(__name__)
+METRICS = metrics_utils.get_metrics_logger(__name__)
 
 
 def _create_root_fs(root_directory, files_info):
@@ -175,7 +184,8 @@ def _label(files_info):
 
 
 def create_isolinux_image_for_bios(
-        output_file, kernel, ramdisk, kernel_params=None, inject_files=None):
+        output_file, kernel, ramdisk, kernel_params=None, inject_files=None,
+        label=None):
     """Creates an isolinux image on the specified file.
 
     Copies the provided kernel, ramdisk to a directory, generates the isolinux
@@ -191,6 +201,8 @@ def create_isolinux_image_for_bios(
         as the kernel cmdline.
     :param inject_files: Mapping of local source file paths to their location
         on the final ISO image.
+    :param label: volume label of the ISO image, guessed from
+        `inject_files` if not provided.
     :raises: ImageCreationFailed, if image creation failed while copying files
         or while running command to generate iso.
     """
@@ -238,7 +250,8 @@ def create_isolinux_image_for_bios(
         utils.write_to_file(isolinux_cfg, cfg)
 
         try:
-            utils.execute('mkisofs', '-r', '-V', _label(files_info),
+            utils.execute('mkisofs', '-r', '-V',
+                          label or _label(files_info),
                           '-J', '-l', '-no-emul-boot',
                           '-boot-load-size', '4', '-boot-info-table',
                           '-b', ISOLINUX_BIN, '-o', output_file, tmpdir)
@@ -249,7 +262,7 @@ def create_isolinux_image_for_bios(
 
 def create_esp_image_for_uefi(
         output_file, kernel, ramdisk, deploy_iso=None, esp_image=None,
-        kernel_params=None, inject_files=None):
+        kernel_params=None, inject_files=None, label=None):
     """Creates an ESP image on the specified file.
 
     Copies the provided kernel, ramdisk and EFI system partition image (ESP) to
@@ -271,6 +284,8 @@ def create_esp_image_for_uefi(
         as the kernel cmdline.
     :param inject_files: Mapping of local source file paths to their location
         on the final ISO image.
+    :param label: volume label of the ISO image, guessed from
+        `inject_files` if not provided.
     :raises: ImageCreationFailed, if image creation failed while copying files
         or while running command to generate iso.
     """
@@ -338,7 +353,8 @@ def create_esp_image_for_uefi(
 
         # Create the boot_iso.
         try:
-            utils.execute('mkisofs', '-r', '-V', _label(files_info),
+            utils.execute('mkisofs', '-r', '-V',
+                          label or _label(files_info),
                           '-l', '-e', e_img_rel_path, '-no-emul-boot',
                           '-o', output_file, tmpdir)
 
@@ -377,7 +393,7 @@ def fetch(context, image_href, path, force_raw=False):
         image_to_raw(image_href, path, "%s.part" % path)
 
 
-def get_source_format(image_href, path):
+def _get_source_info(image_href, path):
     data = disk_utils.qemu_img_info(path)
 
     fmt = data.file_format
@@ -393,7 +409,11 @@ def get_source_format(image_href, path):
             reason=_("fmt=%(fmt)s backed by: %(backing_file)s") %
             {'fmt': fmt, 'backing_file': backing_file})
 
-    return fmt
+    return data
+
+
+def get_source_format(image_href, path):
+    return _get_source_info(image_href, path).file_format
 
 
 def force_raw_will_convert(image_href, path_tmp):
@@ -404,28 +424,161 @@ def force_raw_will_convert(image_href, path_tmp):
     return False
 
 
+class _ConversionAdmission(object):
+    """Conductor-wide admission queue for image conversions.
+
+    Every conversion reserves its estimated memory and disk space. Waiting
+    conversions are admitted in arrival order, once the memory reserved by
+    the running conversions leaves room within
+    ``[DEFAULT]image_conversion_memory_budget`` and the disk space reserved
+    on the same file system leaves room in its free space. A conversion is
+    always admitted when no other conversion is running, so that one which
+    does not fit on its own still fails or succeeds as before.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # Waiting conversions, in arrival order.
+        self._queue = collections.deque()
+        self._running = 0
+        self._reserved_memory = 0
+        # File system device -> reserved disk space in bytes.
+        self._reserved_disk = {}
+
+    def _fits(self, memory, disk, directory, device):
+        if not self._running:
+            return True
+        budget = CONF.image_conversion_memory_budget * units.Mi
+        if self._reserved_memory + memory > budget:
+            return False
+        reserved_disk = self._reserved_disk.get(device, 0)
+        return (not reserved_disk
+                or reserved_disk + disk <= _free_disk_space(directory))
+
+    def _send_metrics(self):
+        METRICS.send_gauge('ImageConversionAdmission.QueueLength',
+                           len(self._queue))
+        METRICS.send_gauge('ImageConversionAdmission.ReservedMemory',
+                           self._reserved_memory)
+        METRICS.send_gauge('ImageConversionAdmission.ReservedDisk',
+                           sum(self._reserved_disk.values()))
+
+    @contextlib.contextmanager
+    def reserve(self, memory, disk, directory):
+        """Wait for the resources of a conversion and reserve them.
+
+        :param memory: estimated memory used by the conversion, in bytes.
+        :param disk: estimated disk space used by the converted image, in
+            bytes.
+        :param directory: directory the converted image is written to.
+        :raises: InsufficientMemory if the conversion was not admitted
+            within [DEFAULT]image_conversion_queue_timeout seconds.
+        """
+        device = os.stat(directory).st_dev
+        entry = object()
+        timeout = CONF.image_conversion_queue_timeout
+        start = time.monotonic()
+        with self._cond:
+            self._queue.append(entry)
+            self._send_metrics()
+            try:
+                while (self._queue[0] is not entry
+                       or not self._fits(memory, disk, directory, device)):
+                    remaining = (start + timeout - time.monotonic()
+                                 if timeout else 1)
+                    if remaining <= 0:
+                        LOG.error('Image conversion was not admitted within '
+                                  '%(timeout)s seconds, %(reserved)d bytes '
+                                  'of memory are reserved by %(running)d '
+                                  'running conversions.',
+                                  {'timeout': timeout,
+                                   'reserved': self._reserved_memory,
+                                   'running': self._running})
+                        raise exception.InsufficientMemory(
+                            free=(CONF.image_conversion_memory_budget
+                                  - self._reserved_memory // units.Mi),
+                            required=memory // units.Mi)
+                    # NOTE: the free disk space is not signalled, check it
+                    # again from time to time.
+                    self._cond.wait(min(remaining, 1))
+            finally:
+                self._queue.remove(entry)
+                # The next conversion may fit as well.
+                self._cond.notify_all()
+
+            self._running += 1
+            self._reserved_memory += memory
+            self._reserved_disk[device] = (
+                self._reserved_disk.get(device, 0) + disk)
+            self._send_metrics()
+
+        METRICS.send_timer('ImageConversionAdmission.WaitTime',
+                           (time.monotonic() - start) * 1000)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._reserved_memory -= memory
+                self._reserved_disk[device] -= disk
+                if not self._reserved_disk[device]:
+                    del self._reserved_disk[device]
+                self._send_metrics()
+                self._cond.notify_all()
+
+
+_conversion_admission = _ConversionAdmission()
+
+
+def _free_disk_space(path):
+    stat = os.statvfs(path)
+    return stat.f_frsize * stat.f_bavail
+
+
+def _reserve_conversion(data, path):
+    """Reserve the resources to convert an image to raw.
+
+    :param data: the qemu-img info of the image to convert.
+    :param path: path the converted image is written to.
+    :returns: a context manager holding the reservation.
+    """
+    if not CONF.image_conversion_memory_budget:
+        utils.is_memory_insufficient(raise_if_fail=True)
+        return contextlib.nullcontext()
+
+    disk_size = data.disk_size or 0
+    memory = min(disk_size,
+                 CONF.image_conversion_memory_estimate * units.Mi)
+    disk = data.virtual_size or 0
+    if disk_size:
+        disk = int(min(disk_size * CONF.raw_image_growth_factor, disk))
+    return _conversion_admission.reserve(
+        memory, disk, os.path.dirname(os.path.abspath(path)))
+
+
 def image_to_raw(image_href, path, path_tmp):
     with fileutils.remove_path_on_error(path_tmp):
-        fmt = get_source_format(image_href, path_tmp)
+        data = _get_source_info(image_href, path_tmp)
+        fmt = data.file_format
 
         if fmt != "raw":
             staged = "%s.converted" % path
 
-            utils.is_memory_insufficient(raise_if_fail=True)
-            LOG.debug("%(image)s was %(format)s, converting to raw",
-                      {'image': image_href, 'format': fmt})
-            with fileutils.remove_path_on_error(staged):
-                disk_utils.convert_image(path_tmp, staged, 'raw')
-                os.unlink(path_tmp)
-
-                data = disk_utils.qemu_img_info(staged)
-                if data.file_format != "raw":
-                    raise exception.ImageConvertFailed(
-                        image_id=image_href,
-                        reason=_("Converted to raw, but format is "
-                                 "now %s") % data.file_format)
-
-                os.rename(staged, path)
+            with _reserve_conversion(data, staged):
+                LOG.debug("%(image)s was %(format)s, converting to raw",
+                          {'image': image_href, 'format': fmt})
+                with fileutils.remove_path_on_error(staged):
+                    disk_utils.convert_image(path_tmp, staged, 'raw')
+                    os.unlink(path_tmp)
+
+                    data = disk_utils.qemu_img_info(staged)
+                    if data.file_format != "raw":
+                        raise exception.ImageConvertFailed(
+                            image_id=image_href,
+                            reason=_("Converted to raw, but format is "
+                                     "now %s") % data.file_format)
+
+                    os.rename(staged, path)
         else:
             os.rename(path_tmp, path)
 
@@ -495,6 +648,15 @@ def get_temp_url_for_glance_image(context, image_uuid):
     return glance_service.swift_temp_url(image_properties)
 
 
+def _boot_iso_params(root_uuid=None, kernel_params=None):
+    params = []
+    if root_uuid:
+        params.append('root=UUID=%s' % root_uuid)
+    if kernel_params:
+        params.append(kernel_params)
+    return params
+
+
 def create_boot_iso(context, output_filename, kernel_href,
                     ramdisk_href, deploy_iso_href=None, esp_image_href=None,
                     root_uuid=None, kernel_params=None, boot_mode=None,
@@ -532,11 +694,7 @@ def create_boot_iso(context, output_filename, kernel_href,
         fetch(context, kernel_href, kernel_path)
         fetch(context, ramdisk_href, ramdisk_path)
 
-        params = []
-        if root_uuid:
-            params.append('root=UUID=%s' % root_uuid)
-        if kernel_params:
-            params.append(kernel_params)
+        params = _boot_iso_params(root_uuid, kernel_params)
 
         if boot_mode == 'uefi':
 
@@ -568,6 +726,181 @@ def create_boot_iso(context, output_filename, kernel_href,
                 kernel_params=params, inject_files=inject_files)
 
 
+def base_boot_iso_name(kernel, ramdisk, esp_image=None, boot_mode=None,
+                       inject_files=None):
+    """Get a file name identifying a base ISO built from the given files.
+
+    The name changes when any of the local files is replaced, so the
+    kernel, ramdisk and ESP image should be links to master images kept
+    by an image cache rather than per-node copies.
+
+    :param kernel: the local path of the kernel.
+    :param ramdisk: the local path of the ramdisk.
+    :param esp_image: the local path of the ESP image (UEFI only).
+    :param boot_mode: the boot mode of the ISO.
+    :param inject_files: the files that will be added to the ISO by
+        `overlay_boot_iso`, only used to choose the volume label.
+    :returns: a file name.
+    """
+    digest = hashlib.sha256()
+    if boot_mode == 'uefi':
+        sources = [kernel, ramdisk, esp_image]
+        digest.update(CONF.grub_config_path.encode())
+    else:
+        sources = [kernel, ramdisk]
+        digest.update(('%s\n%s' % (CONF.isolinux_bin,
+                                   CONF.ldlinux_c32)).encode())
+    for path in sources:
+        if path is None:
+            digest.update(b'\nNone')
+            continue
+        stat = os.stat(path)
+        digest.update(('\n%d:%d:%d:%d' % (stat.st_dev, stat.st_ino,
+                                          stat.st_size,
+                                          stat.st_mtime_ns)).encode())
+    return 'base-%s-%s-%s.iso' % (boot_mode or 'bios',
+                                  _label(inject_files or {}).lower(),
+                                  digest.hexdigest())
+
+
+def create_base_boot_iso(output_filename, kernel, ramdisk, esp_image=None,
+                         boot_mode=None, inject_files=None):
+    """Creates a bootable ISO image without node-specific contents.
+
+    The result is turned into a node's boot ISO by `overlay_boot_iso`.
+
+    :param output_filename: the absolute path of the output ISO file.
+    :param kernel: the local path of the kernel.
+    :param ramdisk: the local path of the ramdisk.
+    :param esp_image: the local path of the ESP image, required in UEFI
+        boot mode.
+    :param boot_mode: the boot mode of the ISO.
+    :param inject_files: the files that will be added to the ISO by
+        `overlay_boot_iso`, only used to choose the volume label.
+    :raises: ImageCreationFailed, if creating the ISO image failed.
+    """
+    label = _label(inject_files or {})
+    if boot_mode == 'uefi':
+        create_esp_image_for_uefi(output_filename, kernel, ramdisk,
+                                  esp_image=esp_image, label=label)
+    else:
+        create_isolinux_image_for_bios(output_filename, kernel, ramdisk,
+                                       label=label)
+
+
+def _iso9660_name(iso, parent, name, is_dir):
+    """Generate a unique ISO9660 level 1 name for a Rock Ridge name."""
+    base, ext = os.path.splitext(name) if not is_dir else (name, '')
+    base = re.sub('[^A-Z0-9_]', '_', base.upper())[:8] or '_'
+    ext = re.sub('[^A-Z0-9_]', '_', ext[1:].upper())[:3]
+    for index in range(1000):
+        if index:
+            suffix = str(index)
+            candidate = base[:8 - len(suffix)] + suffix
+        else:
+            candidate = base
+        if not is_dir:
+            candidate = '%s.%s;1' % (candidate, ext)
+        path = parent.rstrip('/') + '/' + candidate
+        try:
+            iso.get_record(iso_path=path)
+        except pycdlib.pycdlibexception.PyCdlibInvalidInput:
+            return path
+    raise exception.ImageCreationFailed(
+        image_type='iso',
+        error=_('cannot find a free ISO9660 name for %s') % name)
+
+
+def _add_file_to_iso(iso, source, path):
+    """Add a file to an open ISO image, replacing the existing one."""
+    joliet = iso.has_joliet()
+    parent = '/'
+    iso_parent = '/'
+    components = path.strip('/').split('/')
+    for component in components[:-1]:
+        parent = parent.rstrip('/') + '/' + component
+        try:
+            record = iso.get_record(rr_path=parent)
+        except pycdlib.pycdlibexception.PyCdlibInvalidInput:
+            iso_path = _iso9660_name(iso, iso_parent, component, is_dir=True)
+            iso.add_directory(iso_path=iso_path, rr_name=component,
+                              joliet_path=parent if joliet else None)
+        else:
+            iso_path = iso.full_path_from_dirrecord(record)
+        iso_parent = iso_path
+
+    rr_path = parent.rstrip('/') + '/' + components[-1]
+    try:
+        record = iso.get_record(rr_path=rr_path)
+    except pycdlib.pycdlibexception.PyCdlibInvalidInput:
+        iso_path = _iso9660_name(iso, iso_parent, components[-1],
+                                 is_dir=False)
+    else:
+        iso_path = iso.full_path_from_dirrecord(record)
+        iso.rm_file(iso_path=iso_path)
+        if joliet:
+            # NOTE: depending on how the image was created, the Joliet
+            # record may have been removed together with the ISO9660 one.
+            try:
+                iso.rm_file(joliet_path=rr_path)
+            except pycdlib.pycdlibexception.PyCdlibInvalidInput:
+                pass
+
+    kwargs = {'iso_path': iso_path, 'rr_name': components[-1],
+              'joliet_path': rr_path if joliet else None}
+    if isinstance(source, bytes):
+        iso.add_fp(io.BytesIO(source), len(source), **kwargs)
+    else:
+        iso.add_file(source, **kwargs)
+
+
+def overlay_boot_iso(base_iso, output_filename, root_uuid=None,
+                     kernel_params=None, boot_mode=None, inject_files=None):
+    """Creates a node's boot ISO image from a base ISO image.
+
+    Copies the base ISO created by `create_base_boot_iso`, replacing its boot
+    loader configuration and adding the injected files. The kernel, ramdisk
+    and ESP image are copied as they are.
+
+    :param base_iso: the path of the base ISO file.
+    :param output_filename: the absolute path of the output ISO file.
+    :param root_uuid: optional uuid of the root partition.
+    :param kernel_params: a string containing whitespace separated values
+        kernel cmdline arguments of the form K=V or K (optional).
+    :param boot_mode: the boot mode of the base ISO.
+    :param inject_files: Mapping of local source file paths to their location
+        on the final ISO image.
+    :raises: ImageCreationFailed, if creating the ISO image failed.
+    """
+    params = _boot_iso_params(root_uuid, kernel_params)
+    if boot_mode == 'uefi':
+        cfg_path = CONF.grub_config_path.lstrip(' ' + os.sep)
+        cfg = _generate_cfg(params, CONF.grub_config_template,
+                            {'linux': '/vmlinuz', 'initrd': '/initrd'})
+    else:
+        cfg_path = 'isolinux/isolinux.cfg'
+        cfg = _generate_cfg(params, CONF.isolinux_config_template,
+                            {'kernel': '/vmlinuz', 'ramdisk': '/initrd'})
+
+    files_info = {cfg.encode(): cfg_path}
+    if inject_files:
+        files_info.update(inject_files)
+
+    iso = pycdlib.PyCdlib()
+    try:
+        iso.open(base_iso)
+        try:
+            for source, path in files_info.items():
+                _add_file_to_iso(iso, source, path)
+            iso.write(output_filename)
+        finally:
+            iso.close()
+    except (pycdlib.pycdlibexception.PyCdlibException,
+            EnvironmentError) as e:
+        LOG.exception("Creating ISO image from %s failed.", base_iso)
+        raise exception.ImageCreationFailed(image_type='iso', error=e)
+
+
 IMAGE_TYPE_PARTITION = 'partition'
 IMAGE_TYPE_WHOLE_DISK = 'whole-disk'
 VALID_IMAGE_TYPES = frozenset((IMAGE_TYPE_PARTITION, IMAGE_TYPE_WHOLE_DISK))
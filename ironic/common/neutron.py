@@ -10,8 +10,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import copy
 import ipaddress
+import threading
+import time
 
 import openstack
 from openstack.connection import exceptions as openstack_exc
@@ -42,6 +43,11 @@ VNIC_SMARTNIC = 'smart-nic'
 PHYSNET_PARAM_NAME = 'provider:physical_network'
 """Name of the neutron network API physical network parameter."""
 
+# Cache key -> (lookup result, expiry time), shared by the tasks of the
+# conductor, see [neutron]lookup_cache_ttl.
+_LOOKUP_CACHE = {}
+_LOOKUP_CACHE_LOCK = threading.Lock()
+
 
 def _get_neutron_session():
     global _NEUTRON_SESSION
@@ -52,6 +58,54 @@ def _get_neutron_session():
     return _NEUTRON_SESSION
 
 
+def _uses_service_auth(context):
+    """Check if get_client authenticates with the [neutron] credentials.
+
+    :param context: request context or None.
+    :returns: True unless the client is authenticated with the token of
+        the user of the context.
+    """
+    return (CONF.neutron.auth_type == 'none' or context is None
+            or not context.auth_token)
+
+
+def _cached_lookup(kind, context, key, lookup_func):
+    """Return the cached result of a neutron lookup or run it.
+
+    Results are kept for [neutron]lookup_cache_ttl seconds. Failed lookups
+    are not cached.
+
+    :param kind: the kind of lookup, e.g. 'network'.
+    :param context: request context or None. The resources visible in
+        neutron depend on the project of the user, lookups made with the
+        token of a user are cached for the project.
+    :param key: hashable identifier of the looked up resource.
+    :param lookup_func: callable without arguments doing the lookup.
+    :returns: the result of lookup_func.
+    """
+    ttl = CONF.neutron.lookup_cache_ttl
+    if not ttl:
+        return lookup_func()
+
+    scope = None if _uses_service_auth(context) else context.project_id
+    cache_key = (kind, scope, key)
+    now = time.monotonic()
+    with _LOOKUP_CACHE_LOCK:
+        cached = _LOOKUP_CACHE.get(cache_key)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    result = lookup_func()
+    with _LOOKUP_CACHE_LOCK:
+        # NOTE: drop expired entries, so that lookups which are not
+        # repeated do not accumulate.
+        for expired in [k for k, (_result, expires_at)
+                        in _LOOKUP_CACHE.items() if expires_at <= now]:
+            del _LOOKUP_CACHE[expired]
+        _LOOKUP_CACHE[cache_key] = (result, now + ttl)
+    return result
+
+
 def get_client(token=None, context=None, auth_from_config=False):
     """Retrieve a neutron client connection.
 
@@ -184,17 +238,23 @@ def update_port_address(port_id, address, context=None):
         raise exception.FailedToUpdateMacOnPort(port_id=port_id)
 
 
-def _verify_security_groups(security_groups, client):
+def _verify_security_groups(security_groups, client, context=None):
     """Verify that the security groups exist.
 
     :param security_groups: a list of security group UUIDs; may be None or
         empty
     :param client: Neutron client
+    :param context: request context the client was created for
     :raises: NetworkError
     """
 
     if not security_groups:
         return
+    _cached_lookup('security_groups', context, frozenset(security_groups),
+                   lambda: _find_security_groups(security_groups, client))
+
+
+def _find_security_groups(security_groups, client):
     try:
         neutron_sec_groups = set(
             x.id for x in client.security_groups(id=security_groups))
@@ -239,6 +299,131 @@ def _add_ip_addresses_for_ipv6_stateful(context, port, client):
         update_neutron_port(context, port.id, attrs, client=client)
 
 
+def _get_port_attrs(node, ironic_port, attrs, update_attrs, portmap,
+                    network_uuid):
+    """Build the attributes of the neutron port of an ironic port.
+
+    :returns: a tuple of the attributes to create the port with and the
+        attributes that can only be set by admins.
+    """
+    # Start with a clean state for each port, the nested values are not
+    # modified.
+    port_attrs = dict(attrs)
+    update_port_attrs = dict(update_attrs)
+
+    update_port_attrs['mac_address'] = ironic_port.address
+    binding_profile = {'local_link_information':
+                       [portmap[ironic_port.uuid]]}
+    update_port_attrs['binding:profile'] = binding_profile
+
+    if not ironic_port.pxe_enabled:
+        LOG.debug("Adding port %(port)s to network %(net)s for "
+                  "provisioning without an IP allocation.",
+                  {'port': ironic_port.uuid, 'net': network_uuid})
+        port_attrs['fixed_ips'] = []
+
+    if is_smartnic_port(ironic_port):
+        link_info = binding_profile['local_link_information'][0]
+        LOG.debug('Setting hostname as host_id in case of Smart NIC, '
+                  'port %(port_id)s, hostname %(hostname)s',
+                  {'port_id': ironic_port.uuid,
+                   'hostname': link_info['hostname']})
+        update_port_attrs['binding:host_id'] = link_info['hostname']
+
+        # TODO(hamdyk): use portbindings.VNIC_SMARTNIC from neutron-lib
+        port_attrs['binding:vnic_type'] = VNIC_SMARTNIC
+
+    client_id = ironic_port.extra.get('client-id')
+    if client_id:
+        port_attrs['extra_dhcp_opts'] = [
+            {'opt_name': DHCP_CLIENT_ID, 'opt_value': client_id}]
+
+    return port_attrs, update_port_attrs
+
+
+def _create_port(task, client, port_attrs, update_port_attrs, is_smart_nic):
+    """Create a neutron port, then set its admin only attributes.
+
+    :returns: the neutron port.
+    :raises: OpenStackCloudException
+    """
+    if is_smart_nic:
+        wait_for_host_agent(client, update_port_attrs['binding:host_id'])
+    port = client.create_port(**port_attrs)
+    port = update_neutron_port(task.context, port.id, update_port_attrs)
+    if CONF.neutron.dhcpv6_stateful_address_count > 1:
+        _add_ip_addresses_for_ipv6_stateful(task.context, port, client)
+    if is_smart_nic:
+        wait_for_port_status(client, port.id, 'ACTIVE')
+    return port
+
+
+def _create_ports_in_bulk(task, client, network_uuid, port_requests):
+    """Create the neutron ports of a node with a single request.
+
+    The admin only attributes are part of the request when the ports are
+    created with the [neutron] credentials, otherwise they are set on
+    every port afterwards.
+
+    :param task: a TaskManager instance.
+    :param client: Neutron client.
+    :param network_uuid: UUID of the neutron network of the ports.
+    :param port_requests: a list of tuples of an ironic port, the
+        attributes to create its neutron port with and the admin only
+        attributes.
+    :returns: a tuple of a dictionary in the form {port.uuid:
+        neutron_port['id']} and a list of UUIDs of the ironic ports whose
+        neutron port could not be set up, or None if the bulk request
+        failed.
+    """
+    bind_on_create = _uses_service_auth(task.context)
+    if bind_on_create:
+        data = [{**port_attrs, **update_port_attrs}
+                for _port, port_attrs, update_port_attrs in port_requests]
+    else:
+        data = [port_attrs for _port, port_attrs, _attrs in port_requests]
+
+    try:
+        created = list(client.create_ports(data))
+    except openstack_exc.OpenStackCloudException as e:
+        LOG.warning("Could not create the neutron ports of node %(node)s on "
+                    "the neutron network %(net)s in bulk, creating them one "
+                    "by one. %(exc)s",
+                    {'node': task.node.uuid, 'net': network_uuid, 'exc': e})
+        return None
+
+    admin_client = None
+    if not bind_on_create:
+        # NOTE: the ports were just created with the token of the user, so
+        # there is no need to check that the user can see them.
+        admin_client = get_client(context=task.context,
+                                  auth_from_config=True)
+
+    ports = {}
+    failures = []
+    for request, port in zip(port_requests, created):
+        ironic_port, _attrs, update_port_attrs = request
+        try:
+            if admin_client is not None:
+                port = update_neutron_port(task.context, port.id,
+                                           update_port_attrs,
+                                           client=admin_client)
+            if CONF.neutron.dhcpv6_stateful_address_count > 1:
+                _add_ip_addresses_for_ipv6_stateful(task.context, port,
+                                                    client)
+        except openstack_exc.OpenStackCloudException as e:
+            failures.append(ironic_port.uuid)
+            LOG.warning("Could not set up neutron port %(port)s for node's "
+                        "%(node)s port %(ir-port)s on the neutron network "
+                        "%(net)s. %(exc)s",
+                        {'port': port.id, 'net': network_uuid,
+                         'node': task.node.uuid, 'ir-port': ironic_port.uuid,
+                         'exc': e})
+        else:
+            ports[ironic_port.uuid] = port.id
+    return ports, failures
+
+
 def add_ports_to_network(task, network_uuid, security_groups=None):
     """Create neutron ports to boot the ramdisk.
 
@@ -249,6 +434,9 @@ def add_ports_to_network(task, network_uuid, security_groups=None):
     for non-pxe-enabled ports are also created -- these neutron ports
     will not have any assigned IP addresses.
 
+    If the config option 'neutron.create_ports_in_bulk' is set, the ports
+    which are not Smart NIC ports are created with a single request.
+
     :param task: a TaskManager instance.
     :param network_uuid: UUID of a neutron network where ports will be
         created.
@@ -262,7 +450,7 @@ def add_ports_to_network(task, network_uuid, security_groups=None):
     add_all_ports = CONF.neutron.add_all_ports
 
     # If Security Groups are specified, verify that they exist
-    _verify_security_groups(security_groups, client)
+    _verify_security_groups(security_groups, client, context=task.context)
 
     LOG.debug('For node %(node)s, creating neutron ports on network '
               '%(network_uuid)s using %(net_iface)s network interface.',
@@ -300,57 +488,33 @@ def add_ports_to_network(task, network_uuid, security_groups=None):
             "No available %(enabled)sports on node %(node)s.") %
             {'enabled': pxe_enabled, 'node': node.uuid})
 
+    port_requests = []
+    smart_nic_requests = []
     for ironic_port in ports_to_create:
-        # Start with a clean state for each port
-        port_attrs = copy.deepcopy(attrs)
-        update_port_attrs = copy.deepcopy(update_attrs)
-
         # Skip ports that are missing required information for deploy.
         if not validate_port_info(node, ironic_port):
             failures.append(ironic_port.uuid)
             continue
-
-        update_port_attrs['mac_address'] = ironic_port.address
-        binding_profile = {'local_link_information':
-                           [portmap[ironic_port.uuid]]}
-        update_port_attrs['binding:profile'] = binding_profile
-
-        if not ironic_port.pxe_enabled:
-            LOG.debug("Adding port %(port)s to network %(net)s for "
-                      "provisioning without an IP allocation.",
-                      {'port': ironic_port.uuid, 'net': network_uuid})
-            port_attrs['fixed_ips'] = []
-
-        is_smart_nic = is_smartnic_port(ironic_port)
-        if is_smart_nic:
-            link_info = binding_profile['local_link_information'][0]
-            LOG.debug('Setting hostname as host_id in case of Smart NIC, '
-                      'port %(port_id)s, hostname %(hostname)s',
-                      {'port_id': ironic_port.uuid,
-                       'hostname': link_info['hostname']})
-            update_port_attrs['binding:host_id'] = link_info['hostname']
-
-            # TODO(hamdyk): use portbindings.VNIC_SMARTNIC from neutron-lib
-            port_attrs['binding:vnic_type'] = VNIC_SMARTNIC
-
-        client_id = ironic_port.extra.get('client-id')
-        if client_id:
-            extra_dhcp_opts = port_attrs.get('extra_dhcp_opts', [])
-            extra_dhcp_opts.append(
-                {'opt_name': DHCP_CLIENT_ID, 'opt_value': client_id})
-            port_attrs['extra_dhcp_opts'] = extra_dhcp_opts
-
+        request = (ironic_port,) + _get_port_attrs(
+            node, ironic_port, attrs, update_attrs, portmap, network_uuid)
+        if is_smartnic_port(ironic_port):
+            smart_nic_requests.append(request)
+        else:
+            port_requests.append(request)
+
+    if CONF.neutron.create_ports_in_bulk and port_requests:
+        result = _create_ports_in_bulk(task, client, network_uuid,
+                                       port_requests)
+        if result is not None:
+            ports, bulk_failures = result
+            failures.extend(bulk_failures)
+            port_requests = []
+
+    for ironic_port, port_attrs, update_port_attrs in (
+            port_requests + smart_nic_requests):
         try:
-            if is_smart_nic:
-                wait_for_host_agent(
-                    client, update_port_attrs['binding:host_id'])
-            port = client.create_port(**port_attrs)
-            port = update_neutron_port(task.context, port.id,
-                                       update_port_attrs)
-            if CONF.neutron.dhcpv6_stateful_address_count > 1:
-                _add_ip_addresses_for_ipv6_stateful(task.context, port, client)
-            if is_smart_nic:
-                wait_for_port_status(client, port.id, 'ACTIVE')
+            port = _create_port(task, client, port_attrs, update_port_attrs,
+                                is_smartnic_port(ironic_port))
         except openstack_exc.OpenStackCloudException as e:
             failures.append(ironic_port.uuid)
             LOG.warning("Could not create neutron port for node's "
@@ -690,11 +854,13 @@ def validate_network(uuid_or_name, net_type=_('network'), context=None):
         raise exception.MissingParameterValue(
             _('UUID or name of %s is not set in configuration') % net_type)
 
-    client = get_client(context=context)
-    network = _get_network_by_uuid_or_name(client, uuid_or_name,
-                                           net_type=net_type)
+    def _lookup():
+        client = get_client(context=context)
+        network = _get_network_by_uuid_or_name(client, uuid_or_name,
+                                               net_type=net_type)
+        return network.id
 
-    return network.id
+    return _cached_lookup('network', context, uuid_or_name, _lookup)
 
 
 def validate_port_info(node, port):
@@ -834,7 +1000,7 @@ def _get_port_by_uuid(client, port_uuid):
     return port
 
 
-def get_physnets_by_port_uuid(client, port_uuid):
+def get_physnets_by_port_uuid(client, port_uuid, context=None):
     """Return the set of physical networks associated with a neutron port.
 
     Query the network to which the port is attached and return the set of
@@ -842,13 +1008,18 @@ def get_physnets_by_port_uuid(client, port_uuid):
 
     :param client: A Neutron client object.
     :param port_uuid: UUID of a Neutron port to query.
+    :param context: request context the client was created for.
     :returns: A set of physical networks.
     :raises: NetworkError if the network query fails.
     :raises: InvalidParameterValue for missing network.
     """
     port = _get_port_by_uuid(client, port_uuid)
-    network_uuid = port.network_id
+    return _cached_lookup(
+        'physnets', context, port.network_id,
+        lambda: _get_physnets_by_network_uuid(client, port.network_id))
+
 
+def _get_physnets_by_network_uuid(client, network_uuid):
     network = _get_network_by_uuid_or_name(client, network_uuid)
 
     if network.segments is not None:
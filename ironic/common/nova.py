@@ -10,6 +10,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
+
+from ironic_lib import metrics_utils
 from keystoneauth1 import exceptions as kaexception
 from oslo_log import log
 
@@ -19,6 +22,7 @@ from ironic.conf import CONF
 
 
 LOG = log.getLogger(__name__)
+METRICS = metrics_utils.get_metrics_logger(__name__)
 
 NOVA_API_VERSION = "2.1"
 NOVA_API_MICROVERSION = '2.76'
@@ -56,36 +60,139 @@ def _send_event(context, event, api_version=None):
         A boolean which indicates if the event was sent and received
         successfully.
     """
+    return _send_events(context, [event], api_version=api_version)[0]
+
 
+def _send_events(context, events, api_version=None):
+    """Sends events to Nova conveying power state changes in one request.
+
+    :param context:
+        request context,
+        instance of ironic.common.context.RequestContext
+    :param events:
+        A list of "power-update" events for nova to act upon.
+    :param api_version:
+        api version of nova
+    :returns:
+        A list of booleans, one per event in the same order, which
+        indicate if the event was sent and received successfully.
+    """
+    failed = [False] * len(events)
     try:
         nova = _get_nova_adapter()
         response = nova.post(
-            '/os-server-external-events', json={'events': [event]},
+            '/os-server-external-events', json={'events': events},
             microversion=api_version, global_request_id=context.global_id,
             raise_exc=False)
     except kaexception.ClientException as ex:
         LOG.warning('Could not connect to Nova to send a power notification, '
                     'please check configuration. %s', ex)
-        return False
+        return failed
 
     try:
         if response.status_code >= 400:
-            LOG.warning('Failed to notify nova on event: %s. %s.',
-                        event, response.text)
-            return False
-        resp_event = response.json()['events'][0]
-        code = resp_event['code']
+            for event in events:
+                LOG.warning('Failed to notify nova on event: %s. %s.',
+                            event, response.text)
+            return failed
+        # NOTE: nova answers with the events in the order of the request.
+        resp_events = response.json()['events']
+        codes = [resp_event['code'] for resp_event in resp_events]
+        if len(codes) != len(events):
+            raise ValueError('expected %d events, got %d'
+                             % (len(events), len(codes)))
     except Exception as e:
         LOG.error('Invalid response %s returned from nova for power-update '
-                  'event %s. %s.', response, event, e)
-        return False
-
-    if code >= 400:
-        LOG.warning('Nova event: %s returned with failed status.', resp_event)
-        return False
+                  'event %s. %s.', response,
+                  events[0] if len(events) == 1 else events, e)
+        return failed
+
+    results = []
+    for resp_event, code in zip(resp_events, codes):
+        if code >= 400:
+            LOG.warning('Nova event: %s returned with failed status.',
+                        resp_event)
+            results.append(False)
+        else:
+            LOG.debug('Nova event response: %s.', resp_event)
+            results.append(True)
+    return results
+
+
+class _PowerUpdateBatcher(object):
+    """Coalesces power-update events into multi-event requests to Nova.
+
+    Callers queue their event and wait for the result of the request
+    including it. The first caller of a batch waits for
+    ``[nova]power_update_batch_interval`` seconds, or until
+    ``[nova]power_update_batch_size`` events are queued, then sends the
+    whole batch.
+    """
 
-    LOG.debug('Nova event response: %s.', resp_event)
-    return True
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializes requests, so that the events reach nova in order.
+        self._send_lock = threading.Lock()
+        self._pending = []
+        self._batch = None
+
+    def send(self, context, event, api_version=None):
+        """Send an event as a part of a batch.
+
+        :param context: request context of the event. The global request
+            ID of the first event of a request is sent with it.
+        :param event: A "power-update" event for nova to act upon.
+        :param api_version: api version of nova
+        :returns: A boolean which indicates if the event was sent and
+            received successfully.
+        """
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = {'done': threading.Event(),
+                                       'full': threading.Event(),
+                                       'results': {}}
+            index = len(self._pending)
+            self._pending.append((context, event))
+            METRICS.send_gauge('NovaPowerUpdateBatcher.QueueDepth',
+                               len(self._pending))
+            if len(self._pending) >= CONF.nova.power_update_batch_size:
+                batch['full'].set()
+
+        if leader:
+            batch['full'].wait(CONF.nova.power_update_batch_interval)
+            with self._send_lock:
+                with self._lock:
+                    pending, self._pending = self._pending, []
+                    self._batch = None
+                try:
+                    batch['results'] = self._flush(pending, api_version)
+                finally:
+                    batch['done'].set()
+        else:
+            batch['done'].wait()
+
+        return batch['results'].get(index, False)
+
+    @METRICS.timer('NovaPowerUpdateBatcher.flush')
+    def _flush(self, pending, api_version):
+        results = {}
+        size = CONF.nova.power_update_batch_size
+        requests = range(0, len(pending), size)
+        for start in requests:
+            chunk = pending[start:start + size]
+            METRICS.send_gauge('NovaPowerUpdateBatcher.BatchSize',
+                               len(chunk))
+            sent = _send_events(chunk[0][0], [event for _ctx, event in chunk],
+                                api_version=api_version)
+            results.update(enumerate(sent, start))
+        LOG.debug('Sent %d power-update events to nova in %d requests',
+                  len(pending), len(requests))
+        return results
+
+
+_batcher = _PowerUpdateBatcher()
 
 
 def power_update(context, server_uuid, target_power_state):
@@ -113,5 +220,8 @@ def power_update(context, server_uuid, target_power_state):
         LOG.error('Invalid Power State %s.', target_power_state)
         return False
     event = _get_power_update_event(server_uuid, target_power_state)
+    if CONF.nova.power_update_batch_interval > 0:
+        return _batcher.send(context, event,
+                             api_version=NOVA_API_MICROVERSION)
     result = _send_event(context, event, api_version=NOVA_API_MICROVERSION)
     return result
@@ -1961,3 +1961,41 @@ def check_policy(rule, target, creds, *args, **kwargs):
         return True
     enforcer = get_enforcer()
     return enforcer.enforce(rule, target, creds, *args, **kwargs)
+
+
+class NodeDecisionCache(object):
+    """Memoizes node policy decisions for the duration of one API request.
+
+    Within a request the credentials are constant, and the default node
+    policies only look at the ``node.owner`` and ``node.lessee`` values of
+    the target. Decisions are therefore cached per rule and per (owner,
+    lessee) pair, so listing many nodes belonging to a handful of projects
+    evaluates each rule once per distinct pair rather than once per node.
+
+    An instance must not be shared between requests.
+    """
+
+    def __init__(self, creds):
+        """Create a cache for the given credentials.
+
+        :param creds: the policy values of the request context.
+        """
+        self.creds = creds
+        self._decisions = {}
+
+    def check(self, rule, target):
+        """A memoized shortcut for :func:`check`.
+
+        :param rule: the policy rule to check.
+        :param target: the target dictionary, which must only differ from
+            the credentials used for the cache by ``node.owner`` and
+            ``node.lessee``.
+        :returns: True or False, as returned by :func:`check`.
+        """
+        key = (rule, target.get('node.owner'), target.get('node.lessee'))
+        try:
+            return self._decisions[key]
+        except KeyError:
+            decision = check(rule, target, self.creds)
+            self._decisions[key] = decision
+            return decision
@@ -29,8 +29,10 @@ import re
 import shlex
 import shutil
 import tempfile
+import threading
 import time
 
+from ironic_lib import metrics_utils
 import jinja2
 from oslo_concurrency import processutils
 from oslo_log import log as logging
@@ -47,6 +49,7 @@ from ironic.common.i18n import _
 from ironic.conf import CONF
 
 LOG = logging.getLogger(__name__)
+METRICS = metrics_utils.get_metrics_logger(__name__)
 
 DATE_RE = r'(?P<year>-?\d{4,})-(?P<month>\d{2})-(?P<day>\d{2})'
 TIME_RE = r'(?P<hour>\d{2}):(?P<min>\d{2}):(?P<sec>\d{2})' + \
@@ -473,9 +476,83 @@ def validate_network_port(port, port_name="Port"):
         {'port_name': port_name, 'port': port})
 
 
+def _get_template_environment(loader, strict, bytecode_cache=None):
+    # NOTE(pas-ha) bandit does not seem to cope with such syntaxis
+    # and still complains with B701 for that line
+    # NOTE(pas-ha) not using default_for_string=False as we set the name
+    # of the template above for strings too.
+    return jinja2.Environment(  # nosec B701
+        loader=loader,
+        autoescape=jinja2.select_autoescape(),
+        undefined=jinja2.StrictUndefined if strict else jinja2.Undefined,
+        bytecode_cache=bytecode_cache
+    )
+
+
+class _TemplateRegistry(object):
+    """Process-wide cache of compiled template files.
+
+    A template is compiled again when the modification time of its file
+    changes. If ``[DEFAULT]template_bytecode_cache_dir`` is set, compiled
+    templates are also cached on disk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (path, strict) -> (modification time, compiled template)
+        self._templates = {}
+        self._bytecode_caches = {}
+
+    def _get_bytecode_cache(self):
+        cache_dir = CONF.template_bytecode_cache_dir
+        if not cache_dir:
+            return None
+        if cache_dir not in self._bytecode_caches:
+            fileutils.ensure_tree(cache_dir)
+            self._bytecode_caches[cache_dir] = (
+                jinja2.FileSystemBytecodeCache(cache_dir))
+        return self._bytecode_caches[cache_dir]
+
+    def get(self, path, strict=False):
+        """Get the compiled template of a file.
+
+        :param path: full path to the Jinja2 template file
+        :param strict: whether to use strict undefined variable handling
+        :returns: a jinja2.Template
+        :raises: OSError if the file cannot be accessed
+        """
+        mtime = os.stat(path).st_mtime_ns
+        key = (path, strict)
+        with self._lock:
+            cached = self._templates.get(key)
+            if cached is not None and cached[0] == mtime:
+                METRICS.send_counter('TemplateRegistry.Hit', 1)
+                return cached[1]
+
+            METRICS.send_counter('TemplateRegistry.Miss', 1)
+            tmpl_path, tmpl_name = os.path.split(path)
+            env = _get_template_environment(
+                jinja2.FileSystemLoader(tmpl_path), strict,
+                bytecode_cache=self._get_bytecode_cache())
+            tmpl = env.get_template(tmpl_name)
+            self._templates[key] = (mtime, tmpl)
+            return tmpl
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+_template_registry = _TemplateRegistry()
+
+
+@METRICS.timer('render_template')
 def render_template(template, params, is_file=True, strict=False):
     """Renders Jinja2 template file with given parameters.
 
+    Template files are compiled once per process and compiled again when
+    they change.
+
     :param template: full path to the Jinja2 template file
     :param params: dictionary with parameters to use when rendering
     :param is_file: whether template is file or string with template itself
@@ -483,22 +560,20 @@ def render_template(template, params, is_file=True, strict=False):
     :returns: Rendered template
     :raises: jinja2.exceptions.UndefinedError
     """
+    tmpl = None
     if is_file:
-        tmpl_path, tmpl_name = os.path.split(template)
-        loader = jinja2.FileSystemLoader(tmpl_path)
+        try:
+            tmpl = _template_registry.get(template, strict=strict)
+        except OSError:
+            # NOTE: let jinja2 report the missing template as before.
+            tmpl_path, tmpl_name = os.path.split(template)
+            loader = jinja2.FileSystemLoader(tmpl_path)
     else:
         tmpl_name = 'template'
         loader = jinja2.DictLoader({tmpl_name: template})
-    # NOTE(pas-ha) bandit does not seem to cope with such syntaxis
-    # and still complains with B701 for that line
-    # NOTE(pas-ha) not using default_for_string=False as we set the name
-    # of the template above for strings too.
-    env = jinja2.Environment(  # nosec B701
-        loader=loader,
-        autoescape=jinja2.select_autoescape(),
-        undefined=jinja2.StrictUndefined if strict else jinja2.Undefined
-    )
-    tmpl = env.get_template(tmpl_name)
+    if tmpl is None:
+        env = _get_template_environment(loader, strict)
+        tmpl = env.get_template(tmpl_name)
     return tmpl.render(params, enumerate=enumerate)
 
 
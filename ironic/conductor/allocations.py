@@ -24,7 +24,7 @@ from ironic.common import exception
 from ironic.common.i18n import _
 from ironic.common import states
 from ironic.conductor import task_manager
-from ironic import objects
+from ironic.db import api as dbapi
 
 
 CONF = cfg.CONF
@@ -102,7 +102,13 @@ def _traits_match(traits, node):
 
 
 def _candidate_nodes(context, allocation):
-    """Get a list of candidate nodes for the allocation."""
+    """Get a list of candidate nodes for the allocation.
+
+    Only the columns required to pick a candidate are fetched, the full node
+    is loaded when it gets reserved.
+
+    :returns: a list of rows with ``uuid`` and ``name`` attributes.
+    """
     # NOTE(dtantsur): not checking the retired flag because it's impossible
     # (by the API contract) to have a retired node in the available state.
     filters = {'resource_class': allocation.resource_class,
@@ -117,7 +123,19 @@ def _candidate_nodes(context, allocation):
     if allocation.owner:
         filters['project'] = allocation.owner
 
-    nodes = objects.Node.list(context, filters=filters)
+    db = dbapi.get_instance()
+    if allocation.traits:
+        nodes = db.get_nodeinfo_list(
+            columns=['uuid', 'name'],
+            filters=dict(filters, traits_all=allocation.traits))
+        # Only tell apart a trait mismatch from no nodes at all on failure.
+        if not nodes and db.get_nodeinfo_list(filters=filters, limit=1):
+            error = (_("no suitable nodes have the requested traits %s") %
+                     ', '.join(allocation.traits))
+            raise exception.AllocationFailed(uuid=allocation.uuid, error=error)
+    else:
+        nodes = db.get_nodeinfo_list(columns=['uuid', 'name'],
+                                     filters=filters)
 
     if not nodes:
         if allocation.candidate_nodes:
@@ -128,14 +146,7 @@ def _candidate_nodes(context, allocation):
                 allocation.resource_class)
         raise exception.AllocationFailed(uuid=allocation.uuid, error=error)
 
-    # TODO(dtantsur): database-level filtering?
-    if allocation.traits:
-        traits = set(allocation.traits)
-        nodes = [n for n in nodes if _traits_match(traits, n)]
-        if not nodes:
-            error = (_("no suitable nodes have the requested traits %s") %
-                     ', '.join(traits))
-            raise exception.AllocationFailed(uuid=allocation.uuid, error=error)
+    nodes = list(nodes)
 
     # NOTE(dtantsur): make sure that parallel allocations do not try the nodes
     # in the same order.
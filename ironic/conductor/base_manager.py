@@ -416,6 +416,12 @@ class BaseConductorManager(object):
         :return: generator yielding tuples of requested fields
         """
         columns = ['uuid', 'driver', 'conductor_group'] + list(fields or ())
+        # Only fetch the nodes from the parts of the hash rings this conductor
+        # is responsible for, their mapping is still checked below.
+        ranges = self.ring_manager.get_hash_ring_ranges(self.host)
+        if ranges is not None:
+            kwargs['filters'] = dict(kwargs.get('filters') or {},
+                                     hash_ring_ranges=ranges)
         node_list = self.dbapi.get_nodeinfo_list(columns=columns, **kwargs)
         for result in node_list:
             if self._shutdown:
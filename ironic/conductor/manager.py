@@ -86,6 +86,9 @@ METRICS = metrics_utils.get_metrics_logger(__name__)
 SYNC_EXCLUDED_STATES = (states.DEPLOYWAIT, states.CLEANWAIT, states.ENROLL,
                         states.ADOPTFAIL)
 
+# Maximum number of node history records removed by a single DELETE.
+NODE_HISTORY_DELETE_CHUNK = 500
+
 
 class ConductorManager(base_manager.BaseConductorManager):
     """Ironic Conductor manager main class."""
@@ -1373,7 +1376,17 @@ class ConductorManager(base_manager.BaseConductorManager):
                         enabled=CONF.conductor.sync_power_state_interval > 0)
     def _sync_power_states(self, context):
         """Periodic task to sync power states for the nodes."""
-        filters = {'maintenance': False}
+        batch_size = CONF.conductor.sync_power_state_batch_size
+        if batch_size:
+            # NOTE: Everything the workers would skip once they
+            # hold the node is filtered out by the database instead.
+            filters = {'maintenance': False,
+                       'reserved': False,
+                       'provision_state_not_in': SYNC_EXCLUDED_STATES}
+            worker = self._sync_power_state_nodes_batch_task
+        else:
+            filters = {'maintenance': False}
+            worker = self._sync_power_state_nodes_task
 
         # NOTE(etingof): prioritize non-responding nodes to fail them fast
         nodes = sorted(
@@ -1383,8 +1396,12 @@ class ConductorManager(base_manager.BaseConductorManager):
 
         nodes_queue = queue.Queue()
 
-        for node_info in nodes:
-            nodes_queue.put(node_info)
+        if batch_size:
+            for i in range(0, len(nodes), batch_size):
+                nodes_queue.put(nodes[i:i + batch_size])
+        else:
+            for node_info in nodes:
+                nodes_queue.put(node_info)
 
         number_of_workers = min(CONF.conductor.sync_power_state_workers,
                                 CONF.conductor.periodic_max_workers,
@@ -1394,8 +1411,7 @@ class ConductorManager(base_manager.BaseConductorManager):
         for worker_number in range(max(0, number_of_workers - 1)):
             try:
                 futures.append(
-                    self._spawn_worker(self._sync_power_state_nodes_task,
-                                       context, nodes_queue))
+                    self._spawn_worker(worker, context, nodes_queue))
             except exception.NoFreeConductorWorker:
                 LOG.warning("There are no more conductor workers for "
                             "power sync task. %(workers)d workers have "
@@ -1404,7 +1420,7 @@ class ConductorManager(base_manager.BaseConductorManager):
                 break
 
         try:
-            self._sync_power_state_nodes_task(context, nodes_queue)
+            worker(context, nodes_queue)
 
         finally:
             waiters.wait_for_all(futures)
@@ -1468,13 +1484,7 @@ class ConductorManager(base_manager.BaseConductorManager):
                             or task.node.target_power_state
                             or task.node.reservation):
                         continue
-                    count = do_sync_power_state(
-                        task, self.power_state_sync_count[node_uuid])
-                    if count:
-                        self.power_state_sync_count[node_uuid] = count
-                    else:
-                        # don't bloat the dict with non-failing nodes
-                        del self.power_state_sync_count[node_uuid]
+                    self._sync_power_state_and_count(task)
             except exception.NodeNotFound:
                 LOG.info("During sync_power_state, node %(node)s was not "
                          "found and presumed deleted by another process.",
@@ -1493,6 +1503,71 @@ class ConductorManager(base_manager.BaseConductorManager):
                 # Yield on every iteration
                 eventlet.sleep(0)
 
+    def _sync_power_state_nodes_batch_task(self, context, batches):
+        """Invokes power state sync on batches of nodes from a queue.
+
+        Unlike :meth:`_sync_power_state_nodes_task`, the nodes are expected
+        to be pre-filtered by the database query, so a single query loads
+        every node of a batch. Each node is then handed to a shared task
+        without reading it from the database again. A reservation is only
+        taken by :func:`do_sync_power_state` for nodes whose power state
+        needs to be updated.
+
+        :param context: request context
+        :param batches: a queue of lists of tuples as yielded by
+            :meth:`iter_nodes`.
+        """
+        while not self._shutdown:
+            try:
+                batch = batches.get_nowait()
+            except queue.Empty:
+                break
+
+            # NOTE: The filters are re-applied since the state of
+            # the nodes may have changed since the periodic task started.
+            node_list = objects.Node.list(
+                context,
+                filters={'uuid_in': [node_info[0] for node_info in batch],
+                         'maintenance': False,
+                         'reserved': False,
+                         'provision_state_not_in': SYNC_EXCLUDED_STATES})
+
+            for node in node_list:
+                if self._shutdown:
+                    break
+                # NOTE: it's pointless (and dangerous) to sync
+                # power state when a power action is in progress
+                if node.target_power_state:
+                    continue
+                try:
+                    with task_manager.acquire(context, node.uuid,
+                                              purpose='power state sync',
+                                              shared=True,
+                                              preloaded_node=node) as task:
+                        self._sync_power_state_and_count(task)
+                except exception.NodeNotFound:
+                    LOG.info("During sync_power_state, node %(node)s was "
+                             "not found and presumed deleted by another "
+                             "process.", {'node': node.uuid})
+                except exception.NodeLocked:
+                    LOG.info("During sync_power_state, node %(node)s was "
+                             "already locked by another process. Skip.",
+                             {'node': node.uuid})
+                finally:
+                    # Yield on every iteration
+                    eventlet.sleep(0)
+
+    def _sync_power_state_and_count(self, task):
+        """Sync the power state of a node and track its failure count."""
+        node_uuid = task.node.uuid
+        count = do_sync_power_state(
+            task, self.power_state_sync_count[node_uuid])
+        if count:
+            self.power_state_sync_count[node_uuid] = count
+        else:
+            # don't bloat the dict with non-failing nodes
+            del self.power_state_sync_count[node_uuid]
+
     @METRICS.timer('ConductorManager._power_failure_recovery')
     @periodics.node_periodic(
         purpose='power failure recovery',
@@ -3584,37 +3659,30 @@ class ConductorManager(base_manager.BaseConductorManager):
     def _manage_node_history(self, context):
         """Periodic task to keep the node history tidy."""
         max_batch = CONF.conductor.node_history_cleanup_batch_count
-        # NOTE(TheJulia): Asks the db for the list. Presently just gets
-        # the node id and the count. If we incorporate by date constraint
-        # or handling, then it will need to be something like the method
-        # needs to identify the explicit ID values to delete, and then
-        # the deletion process needs to erase in logical chunks.
-        entries_to_clean = self.dbapi.query_node_history_records_for_purge(
-            conductor_id=self.conductor.id)
-        count = 0
-        for node_id in entries_to_clean:
-            if count < max_batch:
-                # If we have not hit our total limit, proceed
-                if entries_to_clean[node_id]:
-                    # if we have work to do on this node, proceed.
-                    self.dbapi.bulk_delete_node_history_records(
-                        entries_to_clean[node_id])
-            else:
-                LOG.warning('While cleaning up node history records, '
-                            'we reached the maximum number of records '
-                            'permitted in a single batch. If this error '
-                            'is repeated, consider tuning node history '
-                            'configuration options to be more aggressive '
-                            'by increasing frequency and lowering the '
-                            'number of entries to be deleted to not '
-                            'negatively impact performance.')
-                break
-            count = count + len(entries_to_clean[node_id])
+        # The database works out which records to remove, ask for one more
+        # record than we are going to delete to know if work remains.
+        entries_to_clean = self.dbapi.query_node_history_ids_for_purge(
+            conductor_id=self.conductor.id, limit=max_batch + 1)
+        for start in range(0, min(len(entries_to_clean), max_batch),
+                           NODE_HISTORY_DELETE_CHUNK):
+            end = min(start + NODE_HISTORY_DELETE_CHUNK, max_batch)
+            self.dbapi.bulk_delete_node_history_records(
+                entries_to_clean[start:end])
             # Yield to other threads, since we also don't want to be
             # looping tightly deleting rows as that will negatively
             # impact DB access if done in excess.
             eventlet.sleep(0)
 
+        if len(entries_to_clean) > max_batch:
+            LOG.warning('While cleaning up node history records, '
+                        'we reached the maximum number of records '
+                        'permitted in a single batch. If this error '
+                        'is repeated, consider tuning node history '
+                        'configuration options to be more aggressive '
+                        'by increasing frequency and lowering the '
+                        'number of entries to be deleted to not '
+                        'negatively impact performance.')
+
     def _concurrent_action_limit(self, action):
         """Check Concurrency limits and block operations if needed.
 
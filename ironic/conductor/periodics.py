@@ -48,9 +48,19 @@ class Stop(Exception):
     """A signal to stop the current iteration of a periodic task."""
 
 
+def _check_predicate(predicate, accepts_manager, node, manager, node_kwargs):
+    """Check whether a node periodic should act on a node."""
+    if predicate is None:
+        return True
+    if accepts_manager:
+        return predicate(node, manager, **node_kwargs)
+    return predicate(node, **node_kwargs)
+
+
 def node_periodic(purpose, spacing, enabled=True, filters=None,
                   predicate=None, predicate_extra_fields=(), limit=None,
-                  shared_task=True, node_count_metric_name=None):
+                  shared_task=True, node_count_metric_name=None,
+                  prefetch=None):
     """A decorator to define a periodic task to act on nodes.
 
     Defines a periodic task that fetches the list of nodes mapped to the
@@ -72,7 +82,9 @@ def node_periodic(purpose, spacing, enabled=True, filters=None,
         "verifying that the cat is purring".
     :param spacing: how often (in seconds) to run the periodic task.
     :param enabled: whether the task is enabled; defaults to ``spacing > 0``.
-    :param filters: database-level filters for the nodes.
+    :param filters: database-level filters for the nodes. Can be a callable,
+        in which case it will be called on each iteration to determine the
+        filters.
     :param predicate: a callable to run on the fetched nodes *before* creating
         a task for them. The only parameter will be a named tuple with fields
         ``uuid``, ``driver``, ``conductor_group`` plus everything from
@@ -91,6 +103,12 @@ def node_periodic(purpose, spacing, enabled=True, filters=None,
     :param node_count_metric_name: A string value to identify a metric
         representing the count of matching nodes to be recorded upon the
         completion of the periodic.
+    :param prefetch: a callable to run once per iteration on the request
+        context and the list of fetched nodes (named tuples as passed into
+        the ``predicate``) *before* creating any task. It must return a
+        dictionary keyed by node UUID. The value for each node (``None`` if
+        missing) is passed as the ``prefetched`` keyword argument to the
+        ``predicate`` and to the decorated function.
     """
     node_type = collections.namedtuple(
         'Node',
@@ -99,8 +117,10 @@ def node_periodic(purpose, spacing, enabled=True, filters=None,
 
     # Accepting a conductor manager is a bit of an edge case, doing a bit of
     # a signature magic to avoid passing it everywhere.
-    accepts_manager = (predicate is not None
-                       and len(inspect.signature(predicate).parameters) > 1)
+    accepts_manager = (
+        predicate is not None
+        and len(set(inspect.signature(predicate).parameters)
+                - {'prefetched'}) > 1)
 
     def decorator(func):
         @periodic(spacing=spacing, enabled=enabled)
@@ -124,18 +144,21 @@ def node_periodic(purpose, spacing, enabled=True, filters=None,
                 local_limit = limit
             assert local_limit is None or local_limit > 0
             node_count = 0
-            nodes = manager.iter_nodes(filters=filters,
-                                       fields=predicate_extra_fields)
+            nodes = manager.iter_nodes(
+                filters=filters() if callable(filters) else filters,
+                fields=predicate_extra_fields)
+            node_kwargs = {}
+            if prefetch is not None:
+                nodes = [node_type(*node) for node in nodes]
+                prefetched = prefetch(context, nodes) if nodes else {}
             for (node_uuid, *other) in nodes:
                 node_count += 1
-                if predicate is not None:
-                    node = node_type(node_uuid, *other)
-                    if accepts_manager:
-                        result = predicate(node, manager)
-                    else:
-                        result = predicate(node)
-                    if not result:
-                        continue
+                if prefetch is not None:
+                    node_kwargs = {'prefetched': prefetched.get(node_uuid)}
+                if not _check_predicate(predicate, accepts_manager,
+                                        node_type(node_uuid, *other),
+                                        manager, node_kwargs):
+                    continue
 
                 try:
                     with task_manager.acquire(context, node_uuid,
@@ -146,7 +169,8 @@ def node_periodic(purpose, spacing, enabled=True, filters=None,
                             if not isinstance(impl, self.__class__):
                                 continue
 
-                        result = func(self, task, *args, **kwargs)
+                        result = func(self, task, *args, **kwargs,
+                                      **node_kwargs)
                 except exception.NodeNotFound:
                     LOG.info("During %(action)s, node %(node)s was not found "
                              "and presumed deleted by another process.",
@@ -176,7 +176,7 @@ class TaskManager(object):
 
     def __init__(self, context, node_id, shared=False,
                  purpose='unspecified action', retry=True, patient=False,
-                 load_driver=True):
+                 load_driver=True, preloaded_node=None):
         """Create a new TaskManager.
 
         Acquire a lock on a node. The lock can be either shared or
@@ -199,6 +199,10 @@ class TaskManager(object):
         :param load_driver: whether to load the ``driver`` object. Set this to
                             False if loading the driver is undesired or
                             impossible.
+        :param preloaded_node: an already loaded Node object to use instead
+                               of fetching it from the database again. Only
+                               honored for shared locks, exclusive locks
+                               always reload the node when reserving it.
         :raises: DriverNotFound
         :raises: InterfaceNotFoundInEntrypoint
         :raises: NodeNotFound
@@ -231,7 +235,10 @@ class TaskManager(object):
         self._saved_node = None
 
         try:
-            node = objects.Node.get(context, node_id)
+            if shared and preloaded_node is not None:
+                node = preloaded_node
+            else:
+                node = objects.Node.get(context, node_id)
             LOG.debug("Attempting to get %(type)s lock on node %(node)s (for "
                       "%(purpose)s)",
                       {'type': 'shared' if shared else 'exclusive',
@@ -47,6 +47,20 @@ opts = [
                mutable=True,
                help=_('The maximum number of items returned in a single '
                       'response from a collection resource.')),
+    cfg.IntOpt('collection_stream_page_size',
+               default=0,
+               min=0,
+               mutable=True,
+               help=_('When set to a positive value, the node, port, '
+                      'allocation and node history collections are '
+                      'serialized while being sent to the client instead '
+                      'of being built in memory first. Records are then '
+                      'fetched from the database at most this many at a '
+                      'time, which bounds the memory used by a single '
+                      'request regardless of the requested limit. An '
+                      'error happening after the response has started '
+                      'can only be reported by closing the connection. '
+                      'The default value of 0 disables streaming.')),
     cfg.StrOpt('public_endpoint',
                mutable=True,
                help=_("Public URL to use when building the links to the API "
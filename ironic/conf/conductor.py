@@ -86,6 +86,17 @@ opts = [
                help=_('The maximum number of worker threads that can be '
                       'started simultaneously to sync nodes power states from '
                       'the periodic task.')),
+    cfg.IntOpt('sync_power_state_batch_size',
+               default=0, min=0,
+               help=_('When set to a positive value, the power state sync '
+                      'periodic task filters out nodes in maintenance, in '
+                      'states excluded from power sync and nodes holding a '
+                      'reservation directly in the database query, then '
+                      'loads the remaining nodes in batches of this size '
+                      'instead of one database query per node. A node lock '
+                      'is only taken for nodes whose power state has '
+                      'drifted. Set to 0 (the default) to sync every node '
+                      'individually.')),
     cfg.IntOpt('periodic_max_workers',
                default=8,
                help=_('Maximum number of worker threads that can be started '
@@ -286,8 +297,6 @@ opts = [
                mutable=False,
                help=_('The target number of node history records to purge '
                       'from the database when performing clean-up. '
-                      'Deletes are performed by node, and a node with excess '
-                      'records for a node will still be deleted. '
                       'Defaults to 1000. Operators who find node history '
                       'building up may wish to '
                       'lower this threshold and decrease the time between '
@@ -183,7 +183,8 @@ hash_opts = [
                default=15,
                help=_('Time (in seconds) after which the hash ring is '
                       'considered outdated and is refreshed on the next '
-                      'access.')),
+                      'access. Only the rings whose conductor membership '
+                      'has changed are updated on refresh.')),
     cfg.StrOpt('hash_ring_algorithm',
                default='md5',
                advanced=True,
@@ -192,7 +193,9 @@ hash_opts = [
                       'If running on a FIPS system, do not use md5. '
                       'WARNING: all ironic services in a cluster MUST use '
                       'the same algorithm at all times. Changing the '
-                      'algorithm requires an offline update.')),
+                      'algorithm requires an offline update, including '
+                      'running "ironic-dbsync online_data_migrations" to '
+                      'update the hash partitions of nodes.')),
 ]
 
 image_opts = [
@@ -208,6 +211,39 @@ image_opts = [
                         'raw image converted from compact image '
                         'formats such as QCOW2. '
                         'Default is 2.0, must be greater than 1.0.')),
+    cfg.IntOpt('image_conversion_memory_budget',
+               default=0,
+               min=0,
+               mutable=True,
+               help=_('Memory in MiB which the image conversions running at '
+                      'the same time on a conductor may reserve. When set, '
+                      'every conversion to raw reserves its estimated '
+                      'memory and disk space, and waits in a first in, '
+                      'first out queue until the reservations of the '
+                      'running conversions leave room for it. The value '
+                      'of `0` disables the queue, conversions then wait '
+                      'for [DEFAULT]minimum_required_memory to be '
+                      'available instead.')),
+    cfg.IntOpt('image_conversion_memory_estimate',
+               default=1024,
+               min=1,
+               mutable=True,
+               help=_('Upper bound in MiB of the memory used by a single '
+                      'image conversion, used when '
+                      '[DEFAULT]image_conversion_memory_budget is set. A '
+                      'conversion reserves the smaller of this value and '
+                      'the size of the image on disk.')),
+    cfg.IntOpt('image_conversion_queue_timeout',
+               default=3600,
+               min=0,
+               mutable=True,
+               help=_('Time in seconds an image conversion waits to be '
+                      'admitted when [DEFAULT]image_conversion_memory_budget '
+                      'is set, before failing with an insufficient memory '
+                      'error. Conversions of large images may take several '
+                      'minutes each, so this should be long enough for the '
+                      'conversions queued in a wave of deployments. The '
+                      'value of `0` waits indefinitely.')),
     cfg.StrOpt('isolinux_bin',
                default='/usr/lib/syslinux/isolinux.bin',
                help=_('Path to isolinux binary file.')),
@@ -259,6 +295,16 @@ img_cache_opts = [
                default=20, min=1,
                help=_('How many image downloads and raw format conversions '
                       'to run in parallel. Only affects image caches.')),
+    cfg.IntOpt('image_cache_metadata_refresh_interval',
+               default=0, min=0,
+               mutable=True,
+               help=_('How long, in seconds, the image metadata retrieved '
+                      'from the image service is trusted by the master '
+                      'image caches. Within this interval, a cached image is '
+                      'used without asking the image service again whether '
+                      'it was updated or is still accessible to the '
+                      'requester. The default value of 0 retrieves the '
+                      'metadata on every use of the cache.')),
 ]
 
 netconf_opts = [
@@ -404,6 +450,13 @@ utils_opts = [
                sample_default=tempfile.gettempdir(),
                help=_('Temporary working directory, default is Python temp '
                       'dir.')),
+    cfg.StrOpt('template_bytecode_cache_dir',
+               help=_('Directory in which the compiled PXE, iPXE, GRUB, '
+                      'kickstart and ISO configuration templates are '
+                      'cached, so that they do not have to be compiled '
+                      'again after a restart. Compiled templates are always '
+                      'kept in memory while the process runs. If not set, '
+                      'no on-disk cache is used.')),
 ]
 
 webserver_opts = [
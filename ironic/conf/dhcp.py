@@ -21,7 +21,9 @@ opts = [
     cfg.StrOpt('dhcp_provider',
                default='neutron',
                help=_('DHCP provider to use. "neutron" uses Neutron, '
-                      '"dnsmasq" uses the Dnsmasq provider, and '
+                      '"dnsmasq" uses the Dnsmasq provider, '
+                      '"dnsmasq-batched" uses the Dnsmasq provider '
+                      'writing configuration changes in batches, and '
                       '"none" uses a no-op provider.')),
 ]
 
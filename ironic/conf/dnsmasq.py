@@ -36,6 +36,13 @@ opts = [
                       'discover IP addresses of managed nodes. Use the'
                       'same path for the dhcp-leasefile dnsmasq '
                       'configuration directive.')),
+    cfg.FloatOpt('write_batch_interval',
+                 default=0.1,
+                 min=0,
+                 mutable=True,
+                 help=_('Time in seconds the "dnsmasq-batched" provider '
+                        'waits for more configuration changes before '
+                        'writing a batch of them.')),
 ]
 
 
@@ -21,6 +21,14 @@ opts = [
     cfg.IntOpt('status_check_period', default=60,
                help=_('period (in seconds) to check status of nodes '
                       'on inspection')),
+    cfg.IntOpt('status_check_page_size', default=1000, min=0,
+               help=_('number of introspection statuses to request from '
+                      'ironic-inspector at once when checking the status of '
+                      'nodes on inspection. The statuses are listed '
+                      'instead of being requested for each node, and only '
+                      'the nodes whose inspection has finished are locked. '
+                      'Set to 0 to request the status of each node '
+                      'separately.')),
     cfg.StrOpt('extra_kernel_params', default='',
                help=_('extra kernel parameters to pass to the inspection '
                       'ramdisk when boot is managed by ironic (not '
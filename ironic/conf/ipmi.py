@@ -78,6 +78,32 @@ opts = [
                 help=_('List of possible cipher suites versions that can '
                        'be supported by the hardware in case the field '
                        '`cipher_suite` is not set for the node.')),
+    cfg.BoolOpt('use_persistent_sessions',
+                default=False,
+                mutable=True,
+                help=_('Run power and sensor commands through a long-lived '
+                       '"ipmitool shell" process per BMC instead of '
+                       'starting a new ipmitool process and IPMI session '
+                       'for every command. Only used with IPMI protocol '
+                       'version 2.0 (lanplus) and when the cipher suite '
+                       'does not need to be discovered. Commands fall back '
+                       'to a one-off ipmitool call when the shell fails. '
+                       'Commands sent through a shell are not spaced by '
+                       '[ipmi]min_command_interval.')),
+    cfg.IntOpt('persistent_session_idle_timeout',
+               default=60,
+               min=1,
+               mutable=True,
+               help=_('Time in seconds after which an unused persistent '
+                      'ipmitool shell is closed. Idle shells are checked '
+                      'whenever a shell is requested. Should be lower than '
+                      'the session timeout of the BMCs.')),
+    cfg.IntOpt('persistent_session_max_per_address',
+               default=1,
+               min=1,
+               help=_('Maximum number of persistent ipmitool shells, and '
+                      'thus of commands run concurrently, for each BMC '
+                      'address.')),
 ]
 
 
@@ -128,7 +128,30 @@ opts = [
                       'different CLID/IAID. Due to non-identical identifiers '
                       'multiple addresses must be reserved for the host to '
                       'ensure each step of the boot process can successfully '
-                      'lease addresses.'))
+                      'lease addresses.')),
+    cfg.BoolOpt('create_ports_in_bulk',
+                default=False,
+                mutable=True,
+                help=_('Create the neutron ports of a node for '
+                       'provisioning, cleaning, rescue or inspection with a '
+                       'single bulk request instead of one request per '
+                       'port. The binding attributes are included in the '
+                       'bulk request when the ports are created with the '
+                       'credentials from the [neutron] section, otherwise '
+                       'they are set on every port afterwards. Smart NIC '
+                       'ports are always created one by one. If the bulk '
+                       'request fails, the ports are created one by one.')),
+    cfg.IntOpt('lookup_cache_ttl',
+               default=0,
+               min=0,
+               mutable=True,
+               help=_('Time in seconds for which the results of looking up '
+                      'networks by UUID or name, the physical networks of '
+                      'a network and the existence of security groups are '
+                      'cached by a conductor and shared between its tasks. '
+                      'Changes to these resources in neutron may take up '
+                      'to this long to be noticed. The value of `0` '
+                      'disables the cache.')),
 ]
 
 
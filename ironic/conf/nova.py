@@ -22,7 +22,26 @@ opts = [
                 help=_('When set to True, it will enable the support '
                        'for power state change callbacks to nova. This '
                        'option should be set to False in deployments '
-                       'that do not have the openstack compute service.'))
+                       'that do not have the openstack compute service.')),
+    cfg.FloatOpt('power_update_batch_interval',
+                 default=0,
+                 min=0,
+                 mutable=True,
+                 help=_('Time in seconds for which a conductor collects '
+                        'power state change callbacks to nova before '
+                        'sending them together in a single request. '
+                        'Callers wait for the request to be sent, so this '
+                        'delays power state changes by up to this long. '
+                        'The value of `0` sends every callback in its own '
+                        'request.')),
+    cfg.IntOpt('power_update_batch_size',
+               default=100,
+               min=1,
+               mutable=True,
+               help=_('Maximum number of power state change callbacks sent '
+                      'to nova in a single request when '
+                      '[nova]power_update_batch_interval is set. A batch '
+                      'is sent as soon as it reaches this size.')),
 ]
 
 
@@ -37,6 +37,17 @@ opts = [
                       'Service). This option caps the maximum number of '
                       'connections to maintain. The value of `0` disables '
                       'client connection caching completely.')),
+    cfg.IntOpt('connection_cache_ttl',
+               min=0,
+               default=0,
+               mutable=True,
+               help=_('Time in seconds after which a cached Redfish client '
+                      'connection is discarded and a new session is '
+                      'established. Setting it below the session timeout '
+                      'of the BMCs avoids using sessions the BMC has '
+                      'already expired. The value of `0` keeps cached '
+                      'connections until they are evicted to honor '
+                      '[redfish]connection_cache_size or fail.')),
     cfg.StrOpt('auth_type',
                choices=[('basic', _('Use HTTP basic authentication')),
                         ('session', _('Use HTTP session authentication')),
@@ -105,6 +116,14 @@ opts = [
                       'from its original location using the firmware source '
                       'URL directly, or should serve it from ironic\'s Swift '
                       'or HTTP server.')),
+    cfg.StrOpt('firmware_cache_dir',
+               help=_('Directory where firmware images downloaded for '
+                      'staging are kept while nodes are being updated '
+                      'with them, so that each image is downloaded and '
+                      'verified once. Should be on the same file system as '
+                      '[deploy]http_root for staged images to be '
+                      'hard-linked rather than copied. Defaults to a '
+                      'subdirectory of [deploy]http_root.')),
     cfg.IntOpt('raid_config_status_interval',
                min=0,
                default=60,
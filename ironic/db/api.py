@@ -53,12 +53,20 @@ class Connection(object, metaclass=abc.ABCMeta):
         :param filters: Filters to apply. Defaults to None.
 
                         :associated: True | False
+                        :async_job_in: nodes with an outstanding
+                            asynchronous job of one of these kinds, see
+                            ironic.common.async_jobs
                         :chassis_uuid: uuid of chassis
                         :conductor_group: conductor group name
                         :console_enabled: True | False
                         :description_contains: substring in description
                         :driver: driver's name
                         :fault: current fault type
+                        :hash_ring_ranges: [(conductor_group, drivers,
+                            ranges)], nodes of one of these conductor groups
+                            and drivers with a hash partition in one of the
+                            (first, last) ranges or without one, see
+                            ironic.common.hash_ring
                         :id: numeric ID
                         :inspection_started_before:
                             nodes with inspection_started_at field before this
@@ -76,9 +84,12 @@ class Connection(object, metaclass=abc.ABCMeta):
                         :provision_state: provision state of node
                         :provision_state_in:
                             provision state of node (multiple possibilities)
+                        :provision_state_not_in:
+                            provision state of node is none of these
                         :provisioned_before:
                             nodes with provision_updated_at field before this
                             interval in seconds
+                        :traits_all: nodes having all of these traits
                         :uuid: uuid of node
                         :uuid_in: uuid of node (multiple possibilities)
                         :with_power_state: True | False
@@ -134,6 +145,17 @@ class Connection(object, metaclass=abc.ABCMeta):
             valid names or UUIDs.
         """
 
+    @abc.abstractmethod
+    def get_uuids_by_ids(self, resource, ids):
+        """Map the IDs of resources of one type to their UUIDs.
+
+        :param resource: the type of the resources, one of 'allocations',
+                         'chassis', 'nodes' and 'portgroups'.
+        :param ids: List of IDs.
+        :returns: A mapping from the IDs to the UUIDs. IDs of resources that
+            do not exist are omitted.
+        """
+
     @abc.abstractmethod
     def reserve_node(self, tag, node_id):
         """Reserve a node.
@@ -1005,6 +1027,50 @@ class Connection(object, metaclass=abc.ABCMeta):
                   of migrated objects.
         """
 
+    @abc.abstractmethod
+    def backfill_node_async_jobs(self, context, max_count):
+        """Records the asynchronous jobs of nodes created before the index.
+
+        Nodes updated by this version of ironic have their outstanding
+        asynchronous BMC jobs recorded automatically, this migration takes
+        care of jobs started before the upgrade. It also removes the records
+        of jobs finished by conductors which do not maintain them.
+
+        :param context: the admin context
+        :param max_count: The maximum number of jobs to record or remove.
+                          Must be >= 0. If zero, all the jobs will be
+                          recorded or removed.
+        :returns: A 2-tuple, 1. the total number of jobs that need to be
+                  recorded or removed (at the beginning of this call) and 2.
+                  the number of recorded or removed jobs.
+        """
+
+    @abc.abstractmethod
+    def check_node_async_jobs_backfilled(self):
+        """Checks that all outstanding asynchronous jobs are recorded.
+
+        :returns: A Boolean. True if the async_job_in node filter finds all
+                  nodes with outstanding asynchronous jobs; False if
+                  backfill_node_async_jobs still has jobs to record.
+        """
+
+    @abc.abstractmethod
+    def update_node_hash_partitions(self, context, max_count):
+        """Updates the hash partitions of nodes.
+
+        Nodes created by this version of ironic get their hash partition
+        automatically, this migration takes care of the nodes created before
+        the upgrade and of all nodes after [DEFAULT]hash_ring_algorithm is
+        changed.
+
+        :param context: the admin context
+        :param max_count: The maximum number of nodes to update. Must be
+                          >= 0. If zero, all the nodes will be updated.
+        :returns: A 2-tuple, 1. the total number of nodes that need to be
+                  updated (at the beginning of this call) and 2. the number
+                  of updated nodes.
+        """
+
     @abc.abstractmethod
     def set_node_traits(self, node_id, traits, version):
         """Replace all of the node traits with specified list of traits.
@@ -1419,6 +1485,20 @@ class Connection(object, metaclass=abc.ABCMeta):
                   and a list of values associated with the node.
         """
 
+    @abc.abstractmethod
+    def query_node_history_ids_for_purge(self, conductor_id, limit=None):
+        """Identify the node history records to purge.
+
+        For each node of the conductor, selects the records beyond the
+        most recent [conductor]node_history_max_entries ones, among the
+        records older than [conductor]node_history_minimum_days.
+
+        :param conductor_id: Id value for the conductor to perform this
+                             query on behalf of.
+        :param limit: Maximum number of record IDs to return.
+        :returns: A list of node history record IDs.
+        """
+
     @abc.abstractmethod
     def bulk_delete_node_history_records(self, node_id, limit):
         """Utility method to bulk delete node history entries.
@@ -0,0 +1,43 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""create node_async_jobs table
+
+Revision ID: 11af8cd936c1
+Revises: 4dbec778866e
+Create Date: 2026-10-17 09:12:41.503177
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '11af8cd936c1'
+down_revision = '4dbec778866e'
+
+
+def upgrade():
+    op.create_table(
+        'node_async_jobs',
+        sa.Column('version', sa.String(length=15), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('node_id', sa.Integer(), nullable=False,
+                  autoincrement=False),
+        sa.Column('kind', sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(['node_id'], ['nodes.id'], ),
+        sa.PrimaryKeyConstraint('node_id', 'kind'),
+        mysql_engine='InnoDB',
+        mysql_charset='UTF8MB3'
+    )
+    op.create_index('node_async_jobs_kind_idx', 'node_async_jobs', ['kind'],
+                    unique=False)
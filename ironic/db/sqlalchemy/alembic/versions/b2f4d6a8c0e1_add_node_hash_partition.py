@@ -0,0 +1,32 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""add node.hash_partition
+
+Revision ID: b2f4d6a8c0e1
+Revises: 11af8cd936c1
+Create Date: 2026-10-17 10:04:18.271436
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2f4d6a8c0e1'
+down_revision = '11af8cd936c1'
+
+
+def upgrade():
+    op.add_column('nodes', sa.Column('hash_partition', sa.Integer(),
+                                     nullable=True))
+    op.create_index('hash_partition_idx', 'nodes', ['hash_partition'],
+                    unique=False)
@@ -0,0 +1,40 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""add composite indexes for timeout periodics and node history
+
+Revision ID: e4a7c9b1d3f5
+Revises: b2f4d6a8c0e1
+Create Date: 2026-10-17 11:12:40.518377
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c9b1d3f5'
+down_revision = 'b2f4d6a8c0e1'
+
+
+def upgrade():
+    op.create_index('provision_timeout_idx', 'nodes',
+                    ['provision_state', 'maintenance',
+                     'provision_updated_at'],
+                    unique=False)
+    op.create_index('inspect_timeout_idx', 'nodes',
+                    ['provision_state', 'maintenance',
+                     'inspection_started_at'],
+                    unique=False)
+    op.create_index('history_node_id_created_at_idx', 'node_history',
+                    ['node_id', 'created_at'], unique=False)
+    # NOTE: history_node_id_idx is a prefix of the new index, which also
+    # serves the node_id foreign key, so it only slows down the writes.
+    op.drop_index('history_node_id_idx', 'node_history')
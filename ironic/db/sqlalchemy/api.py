@@ -19,7 +19,6 @@ import datetime
 import json
 import threading
 
-from oslo_concurrency import lockutils
 from oslo_db import api as oslo_db_api
 from oslo_db import exception as db_exc
 from oslo_db.sqlalchemy import enginefacade
@@ -38,7 +37,9 @@ from sqlalchemy.orm import Load
 from sqlalchemy.orm import selectinload
 from sqlalchemy import sql
 
+from ironic.common import async_jobs
 from ironic.common import exception
+from ironic.common import hash_ring
 from ironic.common.i18n import _
 from ironic.common import profiler
 from ironic.common import release_mappings
@@ -55,13 +56,14 @@ LOG = log.getLogger(__name__)
 _CONTEXT = threading.local()
 
 
-RESERVATION_SEMAPHORE = "reserve_node_db_lock"
-synchronized = lockutils.synchronized_with_prefix('ironic-')
-
 # NOTE(mgoddard): We limit the number of traits per node to 50 as this is the
 # maximum number of traits per resource provider allowed in placement.
 MAX_TRAITS_PER_NODE = 50
 
+# Number of stored hash partitions checked against the current hash ring
+# algorithm when updating the hash partitions of nodes.
+_HASH_PARTITION_SAMPLE = 10
+
 
 def get_backend():
     """The backend is this module itself."""
@@ -114,6 +116,128 @@ def _get_node_select():
                      selectinload(models.Node.traits)))
 
 
+def _supports_update_returning(session):
+    """Whether the database backend supports UPDATE .. RETURNING.
+
+    :param session: the session the statement will be executed in.
+    :returns: True if RETURNING can be used with UPDATE statements.
+    """
+    dialect = session.get_bind().dialect
+    # NOTE: SQLAlchemy 2.0 renamed full_returning to update_returning,
+    # added support for it to SQLite and deprecated full_returning, which
+    # must therefore only be read on SQLAlchemy 1.4.
+    if hasattr(type(dialect), 'update_returning'):
+        return dialect.update_returning
+    return getattr(dialect, 'full_returning', False)
+
+
+def _supports_window_functions(session):
+    """Whether the database backend supports window functions.
+
+    :param session: the session the statement will be executed in.
+    :returns: True if window functions such as ROW_NUMBER() can be used.
+    """
+    dialect = session.get_bind().dialect
+    version = dialect.server_version_info or ()
+    if dialect.name == 'sqlite':
+        return version >= (3, 25)
+    if dialect.name == 'mysql':
+        if getattr(dialect, 'is_mariadb', False):
+            return version >= (10, 2)
+        return version >= (8, 0)
+    return True
+
+
+def _async_job_kinds(driver_internal_info):
+    """Return the kinds of asynchronous jobs outstanding for a node.
+
+    :param driver_internal_info: the driver_internal_info of the node.
+    :returns: a set of kinds from ironic.common.async_jobs.
+    """
+    if not driver_internal_info:
+        return set()
+    return {kind for kind in async_jobs.VALID_ASYNC_JOBS
+            if driver_internal_info.get(kind)}
+
+
+def _set_node_async_jobs(session, node_id, kinds):
+    """Make the node_async_jobs rows of a node match the provided kinds.
+
+    :param session: the session to use.
+    :param node_id: the ID of the node.
+    :param kinds: a set of kinds of asynchronous jobs.
+    """
+    existing = set(session.scalars(
+        sa.select(models.NodeAsyncJob.kind)
+        .where(models.NodeAsyncJob.node_id == node_id)))
+    removed = existing - kinds
+    if removed:
+        session.execute(
+            sa.delete(models.NodeAsyncJob)
+            .where(models.NodeAsyncJob.node_id == node_id,
+                   models.NodeAsyncJob.kind.in_(removed))
+            .execution_options(synchronize_session=False))
+    for kind in kinds - existing:
+        session.add(models.NodeAsyncJob(node_id=node_id, kind=kind))
+
+
+def _async_job_in_clause(kinds):
+    """Return a clause matching nodes with outstanding jobs of these kinds.
+
+    :param kinds: a list of kinds from ironic.common.async_jobs.
+    :returns: a SQLAlchemy clause.
+    """
+    return models.Node.id.in_(
+        sa.select(models.NodeAsyncJob.node_id)
+        .where(models.NodeAsyncJob.kind.in_(kinds)))
+
+
+def _hash_ring_ranges_clause(hash_ring_ranges):
+    """Return a clause matching nodes in the provided parts of hash rings.
+
+    :param hash_ring_ranges: a list of (conductor_group, drivers, ranges)
+        tuples, see ironic.common.hash_ring.HashRingManager.
+        get_hash_ring_ranges.
+    :returns: a SQLAlchemy clause.
+    """
+    clauses = []
+    for group, drivers, ranges in hash_ring_ranges:
+        clause = [models.Node.driver.in_(drivers)]
+        if group is not None:
+            clause.append(models.Node.conductor_group == group)
+        if ranges is not None:
+            # Nodes created before the hash partitions were introduced
+            # have none until the online data migration.
+            clause.append(or_(
+                models.Node.hash_partition == sql.null(),
+                *(models.Node.hash_partition.between(first, last)
+                  for first, last in ranges)))
+        clauses.append(sql.and_(*clause))
+    return or_(sql.false(), *clauses)
+
+
+def _get_node_async_job_changes(session):
+    """Compare node_async_jobs with the jobs in driver_internal_info.
+
+    :param session: the session to use.
+    :returns: a tuple with the sorted lists of (node ID, kind) pairs of
+        outstanding jobs missing from node_async_jobs, and of records in
+        node_async_jobs whose job is no longer outstanding.
+    """
+    # Only look at nodes mentioning one of the keys, the JSON is decoded
+    # to check that the job is actually outstanding.
+    info = sa.type_coerce(models.Node.driver_internal_info, sa.Text)
+    query = sa.select(models.Node.id, models.Node.driver_internal_info)
+    query = query.where(or_(*(info.like('%%"%s"%%' % kind)
+                              for kind in async_jobs.VALID_ASYNC_JOBS)))
+    outstanding = {(node_id, kind)
+                   for node_id, driver_internal_info in session.execute(query)
+                   for kind in _async_job_kinds(driver_internal_info)}
+    existing = {tuple(row) for row in session.execute(
+        sa.select(models.NodeAsyncJob.node_id, models.NodeAsyncJob.kind))}
+    return sorted(outstanding - existing), sorted(existing - outstanding)
+
+
 def _get_deploy_template_select_with_steps():
     """Return a select object for the DeployTemplate joined with steps.
 
@@ -399,15 +523,25 @@ class Connection(api.Connection):
                           'owner', 'lessee', 'instance_uuid'}
     _NODE_IN_QUERY_FIELDS = {'%s_in' % field: field
                              for field in ('uuid', 'provision_state', 'shard')}
+    _NODE_NOT_IN_QUERY_FIELDS = {'%s_not_in' % field: field
+                                 for field in ('provision_state',)}
     _NODE_NON_NULL_FILTERS = {'associated': 'instance_uuid',
                               'reserved': 'reservation',
                               'with_power_state': 'power_state',
                               'sharded': 'shard'}
-    _NODE_FILTERS = ({'chassis_uuid', 'reserved_by_any_of',
-                      'provisioned_before', 'inspection_started_before',
-                      'description_contains', 'project'}
+    # Filters turned into a clause by a function of the filter value.
+    _NODE_CLAUSE_FILTERS = {
+        'reserved_by_any_of': lambda hosts: models.Node.reservation.in_(hosts),
+        'async_job_in': _async_job_in_clause,
+        'hash_ring_ranges': _hash_ring_ranges_clause,
+    }
+    _NODE_FILTERS = ({'chassis_uuid', 'provisioned_before',
+                      'inspection_started_before', 'description_contains',
+                      'project', 'traits_all'}
+                     | set(_NODE_CLAUSE_FILTERS)
                      | _NODE_QUERY_FIELDS
                      | set(_NODE_IN_QUERY_FIELDS)
+                     | set(_NODE_NOT_IN_QUERY_FIELDS)
                      | set(_NODE_NON_NULL_FILTERS))
 
     def __init__(self):
@@ -432,6 +566,10 @@ class Connection(api.Connection):
             if key in filters:
                 query = query.filter(
                     getattr(models.Node, field).in_(filters[key]))
+        for key, field in self._NODE_NOT_IN_QUERY_FIELDS.items():
+            if key in filters:
+                query = query.filter(
+                    getattr(models.Node, field).notin_(filters[key]))
         for key, field in self._NODE_NON_NULL_FILTERS.items():
             if key in filters:
                 column = getattr(models.Node, field)
@@ -445,9 +583,6 @@ class Connection(api.Connection):
             # is not found
             chassis_obj = self.get_chassis_by_uuid(filters['chassis_uuid'])
             query = query.filter_by(chassis_id=chassis_obj.id)
-        if 'reserved_by_any_of' in filters:
-            query = query.filter(models.Node.reservation.in_(
-                filters['reserved_by_any_of']))
         if 'provisioned_before' in filters:
             limit = (timeutils.utcnow()
                      - datetime.timedelta(
@@ -467,6 +602,21 @@ class Connection(api.Connection):
             project = filters['project']
             query = query.filter((models.Node.owner == project)
                                  | (models.Node.lessee == project))
+        if filters.get('traits_all'):
+            traits = set(filters['traits_all'])
+            # Nodes having every requested trait: group the matching rows of
+            # node_traits per node and keep the groups with all of them.
+            matching = (
+                sa.select(models.NodeTrait.node_id)
+                .where(models.NodeTrait.trait.in_(traits))
+                .group_by(models.NodeTrait.node_id)
+                .having(sa.func.count(models.NodeTrait.trait) == len(traits))
+                .subquery())
+            query = query.join(matching,
+                               models.Node.id == matching.c.node_id)
+        for key, clause in self._NODE_CLAUSE_FILTERS.items():
+            if key in filters:
+                query = query.filter(clause(filters[key]))
 
         return query
 
@@ -615,87 +765,84 @@ class Connection(api.Connection):
 
         return mapping
 
-    @synchronized(RESERVATION_SEMAPHORE, fair=True)
-    def _reserve_node_place_lock(self, tag, node_id, node):
+    _UUID_MODELS = {
+        'allocations': models.Allocation,
+        'chassis': models.Chassis,
+        'nodes': models.Node,
+        'portgroups': models.Portgroup,
+    }
+
+    def get_uuids_by_ids(self, resource, ids):
+        model = self._UUID_MODELS[resource]
+        ids = set(ids)
+        if not ids:
+            return {}
+        with _session_for_read() as session:
+            query = sa.select(model.id, model.uuid).where(model.id.in_(ids))
+            return dict(session.execute(query).all())
+
+    def _raise_node_reservation_error(self, node_id, tag=None):
+        """Raise the reason why a conditional reservation update failed.
+
+        :param node_id: the ID or UUID of the node.
+        :param tag: the expected reservation when releasing the node, None
+            when reserving it.
+        :raises: NodeNotFound if the node does not exist.
+        :raises: NodeLocked if the node is reserved by somebody else.
+        :raises: NodeNotLocked if releasing a node which is not reserved.
+        """
         try:
-            # NOTE(TheJulia): We explicitly do *not* synch the session
-            # so the other actions in the conductor do not become aware
-            # that the lock is in place and believe they hold the lock.
-            # This necessitates an overall lock in the code side, so
-            # we avoid conditions where two separate threads can believe
-            # they hold locks at the same time.
-            with _session_for_write() as session:
-                res = session.execute(
-                    sa.update(models.Node).
-                    where(models.Node.id == node.id).
-                    where(models.Node.reservation == None).  # noqa
-                    values(reservation=tag).
-                    execution_options(synchronize_session=False))
-                session.flush()
-            node = self._get_node_by_id_no_joins(node.id)
-            # NOTE(TheJulia): In SQLAlchemy 2.0 style, we don't
-            # magically get a changed node as they moved from the
-            # many ways to do things to singular ways to do things.
-            if res.rowcount != 1:
-                # Nothing updated and node exists. Must already be
-                # locked.
-                raise exception.NodeLocked(node=node.uuid,
-                                           host=node.reservation)
+            with _session_for_read() as session:
+                query = sa.select(models.NodeBase.uuid,
+                                  models.NodeBase.reservation)
+                query = add_identity_filter(query, node_id)
+                uuid, reservation = session.execute(query).one()
         except NoResultFound:
-            # In the event that someone has deleted the node on
-            # another thread.
             raise exception.NodeNotFound(node=node_id)
+        if tag is not None and reservation is None:
+            raise exception.NodeNotLocked(node=uuid)
+        raise exception.NodeLocked(node=uuid, host=reservation)
 
     @oslo_db_api.retry_on_deadlock
     def reserve_node(self, tag, node_id):
-        with _session_for_read() as session:
-            try:
-                # TODO(TheJulia): Figure out a good way to query
-                # this so that we do it as light as possible without
-                # the full object invocation, which will speed lock
-                # activities. Granted, this is all at the DB level
-                # so maybe that is okay in the grand scheme of things.
-                query = session.query(models.Node)
-                query = add_identity_filter(query, node_id)
-                node = query.one()
-            except NoResultFound:
-                raise exception.NodeNotFound(node=node_id)
-            if node.reservation:
-                # Fail fast, instead of attempt the update.
-                raise exception.NodeLocked(node=node.uuid,
-                                           host=node.reservation)
-        self._reserve_node_place_lock(tag, node_id, node)
+        # NOTE: The conditional update is atomic in the database,
+        # so there is no need to serialize reservations within the process.
+        # The transaction is committed before the node is returned, so no
+        # other session can read the node as not yet reserved afterwards.
+        query = add_identity_where(sa.update(models.Node), models.Node,
+                                   node_id)
+        query = (query.where(models.Node.reservation == None)  # noqa
+                 .values(reservation=tag)
+                 .execution_options(synchronize_session=False))
+        with _session_for_write() as session:
+            if _supports_update_returning(session):
+                # Learn the ID of the reserved node in the same round trip.
+                reserved_id = session.execute(
+                    query.returning(models.Node.id)).scalar()
+                updated = reserved_id is not None
+            else:
+                updated = session.execute(query).rowcount == 1
+                reserved_id = None
+        if not updated:
+            self._raise_node_reservation_error(node_id)
         # Return a node object as that is the contract for this method.
-        return self.get_node_by_id(node.id)
+        if reserved_id is not None:
+            return self.get_node_by_id(reserved_id)
+        if strutils.is_int_like(node_id):
+            return self.get_node_by_id(node_id)
+        return self.get_node_by_uuid(node_id)
 
     @oslo_db_api.retry_on_deadlock
     def release_node(self, tag, node_id):
-        with _session_for_read() as session:
-            try:
-                query = session.query(models.Node)
-                query = add_identity_filter(query, node_id)
-                node = query.one()
-            except NoResultFound:
-                raise exception.NodeNotFound(node=node_id)
+        query = add_identity_where(sa.update(models.Node), models.Node,
+                                   node_id)
+        query = (query.where(models.Node.reservation == tag)
+                 .values(reservation=None)
+                 .execution_options(synchronize_session=False))
         with _session_for_write() as session:
-            try:
-                res = session.execute(
-                    sa.update(models.Node).
-                    where(models.Node.id == node.id).
-                    where(models.Node.reservation == tag).
-                    values(reservation=None).
-                    execution_options(synchronize_session=False)
-                )
-                node = self.get_node_by_id(node.id)
-                if res.rowcount != 1:
-                    if node.reservation is None:
-                        raise exception.NodeNotLocked(node=node.uuid)
-                    else:
-                        raise exception.NodeLocked(node=node.uuid,
-                                                   host=node['reservation'])
-                session.flush()
-            except NoResultFound:
-                raise exception.NodeNotFound(node=node_id)
+            res = session.execute(query)
+        if res.rowcount != 1:
+            self._raise_node_reservation_error(node_id, tag)
 
     @oslo_db_api.retry_on_deadlock
     def create_node(self, values):
@@ -706,6 +853,8 @@ class Connection(api.Connection):
             values['power_state'] = states.NOSTATE
         if 'provision_state' not in values:
             values['provision_state'] = states.ENROLL
+        values['hash_partition'] = hash_ring.get_hash_partition(
+            values['uuid'])
 
         # TODO(zhenguo): Support creating node with tags
         if 'tags' in values:
@@ -730,6 +879,9 @@ class Connection(api.Connection):
                 node['tags'] = []
                 node['traits'] = []
                 session.flush()
+                kinds = _async_job_kinds(values.get('driver_internal_info'))
+                if kinds:
+                    _set_node_async_jobs(session, node.id, kinds)
         except db_exc.DBDuplicateEntry as exc:
             if 'name' in exc.columns:
                 raise exception.DuplicateName(name=values['name'])
@@ -740,20 +892,6 @@ class Connection(api.Connection):
             raise exception.NodeAlreadyExists(uuid=values['uuid'])
         return node
 
-    def _get_node_by_id_no_joins(self, node_id):
-        # TODO(TheJulia): Maybe replace with this with a minimal
-        # "get these three fields" thing.
-        try:
-            with _session_for_read() as session:
-                # Explicitly load NodeBase as the invocation of the
-                # priamary model object reesults in the join query
-                # triggering.
-                return session.execute(
-                    sa.select(models.NodeBase).filter_by(id=node_id).limit(1)
-                ).scalars().first()
-        except NoResultFound:
-            raise exception.NodeNotFound(node=node_id)
-
     def get_node_by_id(self, node_id):
         try:
             query = _get_node_select()
@@ -837,6 +975,10 @@ class Connection(api.Connection):
                 models.NodeTrait).filter_by(node_id=node_id)
             trait_query.delete()
 
+            async_job_query = session.query(
+                models.NodeAsyncJob).filter_by(node_id=node_id)
+            async_job_query.delete()
+
             volume_connector_query = session.query(
                 models.VolumeConnector).filter_by(node_id=node_id)
             volume_connector_query.delete()
@@ -914,6 +1056,13 @@ class Connection(api.Connection):
                       and values['provision_state'] == states.INSPECTFAIL):
                     values['inspection_started_at'] = None
 
+            if 'driver_internal_info' in values:
+                # Only touch node_async_jobs when a job starts or finishes,
+                # not on every driver_internal_info update.
+                kinds = _async_job_kinds(values['driver_internal_info'])
+                if kinds != _async_job_kinds(ref.driver_internal_info):
+                    _set_node_async_jobs(session, ref.id, kinds)
+
             ref.update(values)
 
         # Return the updated node model joined with all relevant fields.
@@ -1885,6 +2034,80 @@ class Connection(api.Connection):
 
         return total_to_migrate, total_migrated
 
+    def backfill_node_async_jobs(self, context, max_count):
+        with _session_for_write() as session:
+            missing, stale = _get_node_async_job_changes(session)
+            total = len(missing) + len(stale)
+            # Removing stale records first, they are the ones left behind
+            # by old conductors during a rolling upgrade.
+            stale = stale[:max_count] if max_count else stale
+            if max_count:
+                max_count -= len(stale)
+                missing = missing[:max_count] if max_count else []
+            if stale:
+                # Lock the nodes and look at them again, a job of the same
+                # kind may have started since they were read.
+                nodes = session.execute(
+                    sa.select(models.Node.id, models.Node.driver_internal_info)
+                    .where(models.Node.id.in_({n for n, _k in stale}))
+                    .with_for_update())
+                outstanding = {
+                    (node_id, kind)
+                    for node_id, driver_internal_info in nodes
+                    for kind in _async_job_kinds(driver_internal_info)}
+                stale = [job for job in stale if job not in outstanding]
+                for node_id, kind in stale:
+                    session.execute(
+                        sa.delete(models.NodeAsyncJob)
+                        .where(models.NodeAsyncJob.node_id == node_id,
+                               models.NodeAsyncJob.kind == kind)
+                        .execution_options(synchronize_session=False))
+            for node_id, kind in missing:
+                session.add(models.NodeAsyncJob(node_id=node_id, kind=kind))
+        return total, len(stale) + len(missing)
+
+    def check_node_async_jobs_backfilled(self):
+        with _session_for_read() as session:
+            missing, _stale = _get_node_async_job_changes(session)
+        # NOTE: stale records only make pollers look at nodes without a job,
+        # which they skip.
+        return not missing
+
+    def update_node_hash_partitions(self, context, max_count):
+        with _session_for_write() as session:
+            # NOTE: all stored hash partitions are computed with the same
+            # algorithm, checking a few of them is enough to find out that
+            # [DEFAULT]hash_ring_algorithm has changed. The partitions are
+            # then reset and computed again in batches.
+            sample = session.execute(
+                sa.select(models.Node.uuid, models.Node.hash_partition)
+                .where(models.Node.hash_partition != sql.null())
+                .order_by(models.Node.id)
+                .limit(_HASH_PARTITION_SAMPLE)).all()
+            if any(hash_ring.get_hash_partition(node_uuid) != partition
+                   for node_uuid, partition in sample):
+                session.execute(
+                    sa.update(models.Node)
+                    .values(hash_partition=None)
+                    .execution_options(synchronize_session=False))
+
+            missing = sa.select(models.Node.id, models.Node.uuid).where(
+                models.Node.hash_partition == sql.null())
+            total = session.execute(
+                sa.select(sa.func.count()).select_from(
+                    missing.subquery())).scalar()
+            if max_count:
+                missing = missing.limit(max_count)
+            to_update = session.execute(missing).all()
+            for node_id, node_uuid in to_update:
+                session.execute(
+                    sa.update(models.Node)
+                    .where(models.Node.id == node_id)
+                    .values(hash_partition=hash_ring.get_hash_partition(
+                        node_uuid))
+                    .execution_options(synchronize_session=False))
+        return total, len(to_update)
+
     @staticmethod
     def _verify_max_traits_per_node(node_id, num_traits):
         """Verify that an operation would not exceed the per-node trait limit.
@@ -2490,64 +2713,84 @@ class Connection(api.Connection):
         return _paginate_query(models.NodeHistory, limit, marker,
                                sort_key, sort_dir, query)
 
-    def query_node_history_records_for_purge(self, conductor_id):
+    def _query_node_history_for_purge(self, session, conductor_id,
+                                      limit=None):
+        """Find the node history records to purge.
+
+        :returns: a list of (node_id, id) tuples.
+        """
         min_days = CONF.conductor.node_history_minimum_days
         max_num = CONF.conductor.node_history_max_entries
 
-        with _session_for_read() as session:
-            # First, figure out our nodes.
-            nodes = session.query(
-                models.Node.id,
-            ).filter(
-                models.Node.conductor_affinity == conductor_id
-            )
-
-            # Build our query to get the node_id and record id.
-            query = session.query(
+        # First, figure out our nodes.
+        nodes = sa.select(models.Node.id).where(
+            models.Node.conductor_affinity == conductor_id)
+        conditions = [models.NodeHistory.node_id.in_(nodes)]
+        # Filter by minimum days
+        if min_days > 0:
+            before = datetime.datetime.now() - datetime.timedelta(
+                days=min_days)
+            conditions.append(models.NodeHistory.created_at < before)
+
+        if _supports_window_functions(session):
+            # Number the records of each node from the most recent one and
+            # keep the first max_num of them.
+            position = sa.func.row_number().over(
+                partition_by=models.NodeHistory.node_id,
+                order_by=(models.NodeHistory.created_at.desc(),
+                          models.NodeHistory.id.desc())).label('position')
+            numbered = sa.select(
                 models.NodeHistory.node_id,
                 models.NodeHistory.id,
-            )
-
-            # Filter by the nodes
-            query = query.filter(
-                models.NodeHistory.node_id.in_(nodes)
-            ).order_by(
-                # Order in an ascending order as older is always first.
-                models.NodeHistory.created_at.asc()
-            )
-
-            # Filter by minimum days
-            if min_days > 0:
-                before = datetime.datetime.now() - datetime.timedelta(
-                    days=min_days)
-                query = query.filter(
-                    models.NodeHistory.created_at < before
-                )
-
-            # Build our result set
-            result_set = {}
-            for entry in query.all():
-                if entry[0] not in result_set:
-                    result_set[entry[0]] = []
-                result_set[entry[0]].append(entry[1])
+                position,
+            ).where(*conditions).subquery()
+            query = sa.select(numbered.c.node_id, numbered.c.id).where(
+                numbered.c.position > max_num).order_by(
+                    numbered.c.node_id, numbered.c.position.desc())
+            if limit is not None:
+                query = query.limit(limit)
+            return [tuple(row) for row in session.execute(query)]
+
+        # Without window functions, find the nodes with too many records,
+        # then the oldest records of each of them.
+        count = sa.func.count(models.NodeHistory.id)
+        excess = session.execute(
+            sa.select(models.NodeHistory.node_id, count)
+            .where(*conditions)
+            .group_by(models.NodeHistory.node_id)
+            .having(count > max_num)
+            .order_by(models.NodeHistory.node_id)).all()
+        result = []
+        for node_id, num in excess:
+            num_to_remove = num - max_num
+            if limit is not None:
+                num_to_remove = min(num_to_remove, limit - len(result))
+                if num_to_remove <= 0:
+                    break
+            query = (sa.select(models.NodeHistory.node_id,
+                               models.NodeHistory.id)
+                     .where(*conditions)
+                     .where(models.NodeHistory.node_id == node_id)
+                     .order_by(models.NodeHistory.created_at.asc(),
+                               models.NodeHistory.id.asc())
+                     .limit(num_to_remove))
+            result.extend(tuple(row) for row in session.execute(query))
+        return result
 
+    def query_node_history_records_for_purge(self, conductor_id):
+        with _session_for_read() as session:
             final_set = {}
-            # Generate our final set of entries which should be removed
-            # by accounting for the number of permitted entries.
-            for entry in result_set:
-                final_set[entry] = []
-                set_len = len(result_set[entry])
-                # Any count <= the maximum number is okay
-                if set_len > max_num:
-                    # figure out how many entries need to be removed
-                    num_to_remove = set_len - max_num
-                    for i in range(0, num_to_remove):
-                        final_set[entry].append(result_set[entry][i])
-                        # remove the entries at the end of the list
-                        # which will be the more recent items as we
-                        # ordered ascending originally.
+            for node_id, history_id in self._query_node_history_for_purge(
+                    session, conductor_id):
+                final_set.setdefault(node_id, []).append(history_id)
             return final_set
 
+    def query_node_history_ids_for_purge(self, conductor_id, limit=None):
+        with _session_for_read() as session:
+            return [history_id for _node_id, history_id
+                    in self._query_node_history_for_purge(
+                        session, conductor_id, limit=limit)]
+
     def bulk_delete_node_history_records(self, entries):
         with _session_for_write() as session:
             # Uses input entry list, selects entries matching those ids
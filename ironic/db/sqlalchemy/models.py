@@ -135,6 +135,13 @@ class NodeBase(Base):
         Index('conductor_group_idx', 'conductor_group'),
         Index('resource_class_idx', 'resource_class'),
         Index('shard_idx', 'shard'),
+        Index('hash_partition_idx', 'hash_partition'),
+        # NOTE: shaped for the periodic tasks failing the nodes that timed
+        # out waiting in a state, see ConductorManager._fail_if_in_state.
+        Index('provision_timeout_idx', 'provision_state', 'maintenance',
+              'provision_updated_at'),
+        Index('inspect_timeout_idx', 'provision_state', 'maintenance',
+              'inspection_started_at'),
         table_args())
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36))
@@ -217,6 +224,11 @@ class NodeBase(Base):
 
     shard = Column(String(255), nullable=True)
 
+    # NOTE: the leading bits of the hash of the node UUID, see
+    #       ironic.common.hash_ring.get_hash_partition. Lets conductors only
+    #       fetch the nodes from their parts of the hash ring.
+    hash_partition = Column(Integer, nullable=True)
+
 
 class Node(NodeBase):
     """Represents a bare metal node."""
@@ -380,6 +392,18 @@ class NodeTrait(Base):
     )
 
 
+class NodeAsyncJob(Base):
+    """Represents an outstanding asynchronous BMC job of a node."""
+
+    __tablename__ = 'node_async_jobs'
+    __table_args__ = (
+        Index('node_async_jobs_kind_idx', 'kind'),
+        table_args())
+    node_id = Column(Integer, ForeignKey('nodes.id'),
+                     primary_key=True, nullable=False)
+    kind = Column(String(64), primary_key=True, nullable=False)
+
+
 class BIOSSetting(Base):
     """Represents a bios setting of a bare metal node."""
 
@@ -473,9 +497,9 @@ class NodeHistory(Base):
     __tablename__ = 'node_history'
     __table_args__ = (
         schema.UniqueConstraint('uuid', name='uniq_history0uuid'),
-        Index('history_node_id_idx', 'node_id'),
         Index('history_uuid_idx', 'uuid'),
         Index('history_conductor_idx', 'conductor'),
+        Index('history_node_id_created_at_idx', 'node_id', 'created_at'),
         table_args())
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36), nullable=False)
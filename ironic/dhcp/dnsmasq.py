@@ -13,8 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import os
+import tempfile
+import threading
+import time
+import uuid
 
+from ironic_lib import metrics_utils
+from ironic_lib import utils as ironic_utils
 from oslo_log import log as logging
 from oslo_utils import uuidutils
 
@@ -22,6 +29,11 @@ from ironic.conf import CONF
 from ironic.dhcp import base
 
 LOG = logging.getLogger(__name__)
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
+# Mode of the files written by the batching provider, the same as files
+# created with open() under the usual umask of 022.
+_CONFIG_FILE_MODE = 0o644
 
 
 class DnsmasqDHCPApi(base.BaseDHCP):
@@ -59,26 +71,34 @@ class DnsmasqDHCPApi(base.BaseDHCP):
 
         LOG.debug('Writing to %s:', opt_file)
         with open(opt_file, 'w') as f:
-            # Apply each option by tag
-            for option in options:
-                entry = 'tag:{tag},{opt_name},{opt_value}\n'.format(
-                    tag=tag,
-                    opt_name=option.get('opt_name'),
-                    opt_value=option.get('opt_value'),
-                )
-                LOG.debug(entry)
-                f.write(entry)
+            f.write(self._opts_entries(tag, options))
 
         for mac in macs:
             host_file = self._host_file_path(mac)
             LOG.debug('Writing to %s:', host_file)
             with open(host_file, 'w') as f:
-                # Tag each address with the unique uuid scoped to
-                # this node and DHCP transaction
-                entry = '{mac},set:{tag},set:ironic\n'.format(
-                    mac=mac, tag=tag)
-                LOG.debug(entry)
-                f.write(entry)
+                f.write(self._host_entry(mac, tag))
+
+    def _opts_entries(self, tag, options):
+        # Apply each option by tag
+        entries = ''.join(
+            'tag:{tag},{opt_name},{opt_value}\n'.format(
+                tag=tag,
+                opt_name=option.get('opt_name'),
+                opt_value=option.get('opt_value'))
+            for option in options)
+        LOG.debug(entries)
+        return entries
+
+    def _host_entry(self, mac, tag):
+        # Tag each address with the unique uuid scoped to
+        # this node and DHCP transaction
+        entry = '{mac},set:{tag},set:ironic\n'.format(mac=mac, tag=tag)
+        LOG.debug(entry)
+        return entry
+
+    def _ignore_entry(self, mac):
+        return '{mac},ignore\n'.format(mac=mac)
 
     def _opt_file_path(self, node):
         return os.path.join(CONF.dnsmasq.dhcp_optsdir,
@@ -132,8 +152,7 @@ class DnsmasqDHCPApi(base.BaseDHCP):
         for mac in macs:
             host_file = self._host_file_path(mac)
             with open(host_file, 'w') as f:
-                entry = '{mac},ignore\n'.format(mac=mac)
-                f.write(entry)
+                f.write(self._ignore_entry(mac))
 
         # Deleting the file containing dhcp-option won't remove the rules from
         # dnsmasq but no requests will be tagged with the dnsmasq_tag uuid so
@@ -157,3 +176,194 @@ class DnsmasqDHCPApi(base.BaseDHCP):
         :returns: True
         """
         return True
+
+
+class _BatchWriter(object):
+    """Coalesces configuration file changes into batches.
+
+    Callers queue the new content of the files they change and wait for the
+    batch including their changes to be written. The first caller of a batch
+    waits for ``[dnsmasq]write_batch_interval`` seconds for other changes to
+    arrive, then writes the whole batch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializes writes, so that batches are applied in order.
+        self._write_lock = threading.Lock()
+        self._pending = {}
+        self._batch = None
+
+    def write(self, files):
+        """Write files as a part of a batch.
+
+        :param files: a dict mapping file paths to their new content, or to
+            None to remove the file.
+        :raises: OSError if writing the batch failed.
+        """
+        with self._lock:
+            self._pending.update(files)
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = {'done': threading.Event(),
+                                       'error': None}
+
+        if leader:
+            time.sleep(CONF.dnsmasq.write_batch_interval)
+            with self._write_lock:
+                with self._lock:
+                    pending, self._pending = self._pending, {}
+                    self._batch = None
+                try:
+                    self._flush(pending)
+                except OSError as e:
+                    batch['error'] = e
+                finally:
+                    batch['done'].set()
+        else:
+            batch['done'].wait()
+
+        if batch['error'] is not None:
+            raise batch['error']
+
+    def _unchanged(self, path, content):
+        # The files are small, reading them is cheaper than having dnsmasq
+        # read a rewritten one.
+        try:
+            with open(path) as f:
+                return f.read() == content
+        except FileNotFoundError:
+            return content is None
+
+    @METRICS.timer('DnsmasqBatchWriter.flush')
+    def _flush(self, pending):
+        written = 0
+        for path, content in pending.items():
+            if self._unchanged(path, content):
+                continue
+            if content is None:
+                ironic_utils.unlink_without_raise(path)
+            else:
+                # dnsmasq ignores dot files, so it never reads a partially
+                # written file, and picks the file up once it is renamed.
+                directory, name = os.path.split(path)
+                with tempfile.NamedTemporaryFile(
+                        'w', dir=directory, prefix='.%s.' % name,
+                        delete=False) as f:
+                    f.write(content)
+                # NOTE: temporary files are only readable by their owner,
+                # dnsmasq usually runs as another user.
+                os.chmod(f.name, _CONFIG_FILE_MODE)
+                os.rename(f.name, path)
+            written += 1
+
+        METRICS.send_counter('DnsmasqBatchWriter.FilesWritten', written)
+        METRICS.send_counter('DnsmasqBatchWriter.FilesUnchanged',
+                             len(pending) - written)
+        LOG.debug('Wrote %(written)d of %(count)d dnsmasq configuration '
+                  'files in a batch', {'written': written,
+                                       'count': len(pending)})
+
+
+class _LeaseIndex(object):
+    """MAC to IP addresses index of a dnsmasq lease file.
+
+    The file is only parsed again when it changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stat = None
+        self._addresses = {}
+
+    def lookup(self, lease_path, macs):
+        """Get the IP addresses leased to the given MAC addresses."""
+        st = os.stat(lease_path)
+        stat_key = (lease_path, st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if stat_key != self._stat:
+                addresses = collections.defaultdict(list)
+                with open(lease_path, 'r') as f:
+                    for line in f:
+                        lease = line.split()
+                        if len(lease) >= 3:
+                            addresses[lease[1]].append(lease[2])
+                self._addresses = addresses
+                self._stat = stat_key
+            index = self._addresses
+        return [ip for mac in macs for ip in index.get(mac, ())]
+
+
+_batch_writer = _BatchWriter()
+_lease_index = _LeaseIndex()
+
+
+class BatchedDnsmasqDHCPApi(DnsmasqDHCPApi):
+    """Dnsmasq provider coalescing configuration writes.
+
+    Configuration changes of concurrent tasks are written in batches, each
+    file atomically replaced, and files whose content does not change are
+    left alone. The tag of the options is derived from the node and its
+    options, so it does not need to be stored on the node, and lease
+    lookups use an index of the lease file.
+    """
+
+    def _tag(self, node, options):
+        # The same options get the same tag, so reusing a tag never applies
+        # stale options, even if dnsmasq still holds rules of removed files.
+        return str(uuid.uuid5(uuid.UUID(node.uuid),
+                              self._opts_entries('', options)))
+
+    def update_dhcp_opts(self, task, options, vifs=None):
+        """Send or update the DHCP BOOT options for this node.
+
+        :param task: A TaskManager instance.
+        :param options: this will be a list of dicts, e.g.
+
+                        ::
+
+                         [{'opt_name': '67',
+                           'opt_value': 'pxelinux.0',
+                           'ip_version': 4},
+                          {'opt_name': '66',
+                           'opt_value': '123.123.123.456',
+                           'ip_version': 4}]
+        :param vifs: Ignored argument
+        """
+        node = task.node
+        tag = self._tag(node, options)
+        files = {self._opt_file_path(node): self._opts_entries(tag, options)}
+        for mac in set(self._pxe_enabled_macs(task.ports)):
+            files[self._host_file_path(mac)] = self._host_entry(mac, tag)
+        _batch_writer.write(files)
+
+    def clean_dhcp_opts(self, task):
+        """Clean up the DHCP BOOT options for the host in `task`.
+
+        :param task: A TaskManager instance.
+        """
+        node = task.node
+        # Only set by the dnsmasq provider.
+        if 'dnsmasq_tag' in node.driver_internal_info:
+            node.del_driver_internal_info('dnsmasq_tag')
+            node.save()
+
+        files = {self._opt_file_path(node): None}
+        for mac in set(self._pxe_enabled_macs(task.ports)):
+            files[self._host_file_path(mac)] = self._ignore_entry(mac)
+        _batch_writer.write(files)
+
+    def get_ip_addresses(self, task):
+        """Get IP addresses for all ports/portgroups in `task`.
+
+        :param task: a TaskManager instance.
+        :returns: List of IP addresses associated with
+                  task's ports/portgroups.
+        """
+        addresses = _lease_index.lookup(
+            CONF.dnsmasq.dhcp_leasefile,
+            set(self._pxe_enabled_macs(task.ports)))
+        LOG.debug('Found addresses for %s: %s',
+                  task.node.uuid, ', '.join(addresses))
+        return addresses
@@ -20,6 +20,7 @@ from oslo_log import log as logging
 from oslo_utils import importutils
 from oslo_utils import timeutils
 
+from ironic.common import async_jobs
 from ironic.common import exception
 from ironic.common.i18n import _
 from ironic.conductor import periodics
@@ -154,11 +155,14 @@ class DracWSManBIOS(base.BIOSInterface):
     @periodics.node_periodic(
         purpose='checking async bios configuration jobs',
         spacing=CONF.drac.query_raid_config_job_status_interval,
-        filters={'reserved': False, 'maintenance': False},
+        filters=async_jobs.node_filters(
+            [async_jobs.BIOS_CONFIG_JOB_IDS,
+             async_jobs.FACTORY_RESET_TIME_BEFORE_REBOOT],
+            reserved=False, maintenance=False),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: (
-            n.driver_internal_info.get('bios_config_job_ids')
-            or n.driver_internal_info.get('factory_reset_time_before_reboot')),
+        predicate=async_jobs.has_jobs(
+            [async_jobs.BIOS_CONFIG_JOB_IDS,
+             async_jobs.FACTORY_RESET_TIME_BEFORE_REBOOT]),
     )
     def _query_bios_config_job_status(self, task, manager, context):
         """Periodic task to check the progress of running BIOS config jobs.
@@ -29,6 +29,7 @@ from jsonschema import exceptions as json_schema_exc
 from oslo_log import log as logging
 from oslo_utils import importutils
 
+from ironic.common import async_jobs
 from ironic.common import boot_devices
 from ironic.common import exception
 from ironic.common.i18n import _
@@ -491,11 +492,11 @@ class DracRedfishManagement(redfish_management.RedfishManagement):
     @periodics.node_periodic(
         purpose='checking async import configuration task',
         spacing=CONF.drac.query_import_config_job_status_interval,
-        filters={'reserved': False, 'maintenance': False},
+        filters=async_jobs.node_filters(
+            [async_jobs.IMPORT_TASK_MONITOR_URL],
+            reserved=False, maintenance=False),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: (
-            n.driver_internal_info.get('import_task_monitor_url')
-        ),
+        predicate=async_jobs.has_jobs([async_jobs.IMPORT_TASK_MONITOR_URL]),
     )
     def _query_import_configuration_status(self, task, manager, context):
         """Period job to check import configuration task."""
@@ -24,6 +24,7 @@ from oslo_utils import importutils
 from oslo_utils import units
 import tenacity
 
+from ironic.common import async_jobs
 from ironic.common import exception
 from ironic.common.i18n import _
 from ironic.common import raid as raid_common
@@ -1563,11 +1564,11 @@ class DracRedfishRAID(redfish_raid.RedfishRAID):
     @periodics.node_periodic(
         purpose='checking async RAID tasks',
         spacing=CONF.drac.query_raid_config_job_status_interval,
-        filters={'reserved': False, 'maintenance': False},
+        filters=async_jobs.node_filters(
+            [async_jobs.RAID_TASK_MONITOR_URIS],
+            reserved=False, maintenance=False),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: (
-            n.driver_internal_info.get('raid_task_monitor_uris')
-        ),
+        predicate=async_jobs.has_jobs([async_jobs.RAID_TASK_MONITOR_URIS]),
     )
     def _query_raid_tasks_status(self, task, manager, context):
         """Periodic task to check the progress of running RAID tasks"""
@@ -1826,11 +1827,11 @@ class DracWSManRAID(base.RAIDInterface):
     @periodics.node_periodic(
         purpose='checking async raid configuration jobs',
         spacing=CONF.drac.query_raid_config_job_status_interval,
-        filters={'reserved': False, 'maintenance': False},
+        filters=async_jobs.node_filters(
+            [async_jobs.RAID_CONFIG_JOB_IDS],
+            reserved=False, maintenance=False),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: (
-            n.driver_internal_info.get('raid_config_job_ids')
-        ),
+        predicate=async_jobs.has_jobs([async_jobs.RAID_CONFIG_JOB_IDS]),
     )
     def _query_raid_config_job_status(self, task, manager, context):
         """Periodic task to check the progress of running RAID config jobs."""
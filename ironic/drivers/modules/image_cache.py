@@ -19,11 +19,14 @@ Utility for caching master images.
 """
 
 import os
+import stat as stat_mod
 import tempfile
 import threading
 import time
 import uuid
 
+from ironic_lib import metrics_utils
+from ironic_lib import utils as il_utils
 from oslo_concurrency import lockutils
 from oslo_log import log as logging
 from oslo_utils import fileutils
@@ -39,6 +42,8 @@ from ironic.conf import CONF
 
 LOG = logging.getLogger(__name__)
 
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
 # This would contain a sorted list of instances of ImageCache to be
 # considered for cleanup. This list will be kept sorted in non-increasing
 # order of priority.
@@ -47,6 +52,138 @@ _cache_cleanup_list = []
 
 _concurrency_semaphore = threading.Semaphore(CONF.image_download_concurrency)
 
+# Directory of the master directory keeping checksums of the master images.
+_CHECKSUMS_DIR = '.checksums'
+
+
+class _CacheIndex(object):
+    """In-memory state shared by all users of a master image directory.
+
+    ImageCache objects are usually created for a single operation, so the
+    state lives here, one instance per master directory.
+
+    All methods must be called with ``lock`` taken.
+    """
+
+    def __init__(self, master_dir):
+        self.master_dir = master_dir
+        # Taken to access the index, and while linking or deleting master
+        # images so that clean up does not race with fetching.
+        self.lock = threading.Lock()
+        # Master directory listing, path -> (last used time, stat result),
+        # loaded on first use.
+        self._files = None
+        # Image metadata, href -> (image info, time of retrieval).
+        self._metadata = {}
+        # In-flight downloads, master path -> threading.Event.
+        self.downloads = {}
+
+    @property
+    def files(self):
+        if self._files is None:
+            self._files = {}
+            for file_name in os.listdir(self.master_dir):
+                self.add(os.path.join(self.master_dir, file_name),
+                         last_used=None)
+        return self._files
+
+    def add(self, path, last_used=None):
+        """Add or refresh a file of the master directory.
+
+        :param path: full path to the file.
+        :param last_used: time of last use, the most recent modification,
+            access or status change time of the file if None.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.discard(path)
+            return
+        if not stat_mod.S_ISREG(stat.st_mode):
+            return
+        if last_used is None:
+            # NOTE(dtantsur): Detect most recently accessed files,
+            # seeing atime can be disabled by the mount option
+            # Also include ctime as it changes when image is linked to
+            last_used = max(stat.st_mtime, stat.st_atime, stat.st_ctime)
+        self.files[path] = (last_used, stat)
+
+    def discard(self, path):
+        if self._files is not None:
+            self._files.pop(path, None)
+
+    def touch(self, path):
+        """Mark a file as used now.
+
+        :returns: the size of the file in bytes, 0 if it is unknown.
+        """
+        entry = self.files.get(path)
+        if entry is None:
+            return 0
+        self.files[path] = (time.time(), entry[1])
+        return entry[1].st_size
+
+    def listing(self):
+        """List the files as (file name, last used time, stat) tuples."""
+        return [(path, last_used, stat)
+                for path, (last_used, stat) in self.files.items()]
+
+    def total_size(self):
+        return sum(stat.st_size for _last_used, stat in self.files.values())
+
+    def get_metadata(self, href):
+        """Get image metadata retrieved recently enough to be trusted."""
+        interval = CONF.image_cache_metadata_refresh_interval
+        entry = self._metadata.get(href)
+        if not interval or entry is None:
+            return None
+        img_info, retrieved_at = entry
+        if time.monotonic() - retrieved_at > interval:
+            del self._metadata[href]
+            return None
+        return img_info
+
+    def set_metadata(self, href, img_info):
+        if CONF.image_cache_metadata_refresh_interval:
+            self._metadata[href] = (img_info, time.monotonic())
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_index(master_dir):
+    """Get the index of a master directory, creating it if needed."""
+    with _indexes_lock:
+        index = _indexes.get(master_dir)
+        if index is None:
+            index = _indexes[master_dir] = _CacheIndex(master_dir)
+        return index
+
+
+def _content_key(img_info):
+    """Get a file name identifying the image contents, if known.
+
+    :param img_info: image information from the image service
+    :returns: the image checksum prefixed with its algorithm, or None if
+        the image service does not provide it.
+    """
+    algo = img_info.get('os_hash_algo')
+    value = img_info.get('os_hash_value')
+    if isinstance(algo, str) and isinstance(value, str) and algo and value:
+        return '%s-%s' % (algo, value)
+    checksum = img_info.get('checksum')
+    if isinstance(checksum, str) and checksum:
+        return 'md5-%s' % checksum
+    return None
+
+
+def _checksums_dir(master_dir, stat):
+    """Get the directory keeping the checksums of a master image."""
+    return os.path.join(master_dir, _CHECKSUMS_DIR,
+                        '%d-%d-%d-%d' % (stat.st_dev, stat.st_ino,
+                                         stat.st_size, stat.st_mtime_ns))
+
 
 class ImageCache(object):
     """Class handling access to cache for master images."""
@@ -65,6 +202,7 @@ class ImageCache(object):
         if master_dir is not None:
             fileutils.ensure_tree(master_dir)
 
+    @METRICS.timer('ImageCache.fetch_image')
     def fetch_image(self, href, dest_path, ctx=None, force_raw=True):
         """Fetch image by given href to the destination path.
 
@@ -75,6 +213,11 @@ class ImageCache(object):
         Otherwise downloads an image, stores it in cache and creates a hard
         link (dest_path) to it.
 
+        Images are cached by their checksum when the image service provides
+        it, so that several hrefs with the same contents share one master
+        copy. Concurrent requests for an image being downloaded wait for
+        that download instead of starting another one.
+
         :param href: image UUID or href to fetch
         :param dest_path: destination file path
         :param ctx: context
@@ -94,12 +237,24 @@ class ImageCache(object):
 
         # TODO(ghe): have hard links and counts the same behaviour in all fs
 
-        # NOTE(vdrok): File name is converted to UUID if it's not UUID already,
-        # so that two images with same file names do not collide
-        if service_utils.is_glance_image(href):
-            master_file_name = service_utils.parse_image_id(href)
-        else:
-            master_file_name = str(uuid.uuid5(uuid.NAMESPACE_URL, href))
+        index = _get_index(self.master_dir)
+        with index.lock:
+            img_info = index.get_metadata(href)
+        if img_info is None:
+            img_service = image_service.get_image_service(href, context=ctx)
+            img_info = img_service.show(href)
+            with index.lock:
+                index.set_metadata(href, img_info)
+
+        master_file_name = _content_key(img_info)
+        content_addressed = master_file_name is not None
+        if not content_addressed:
+            # NOTE(vdrok): File name is converted to UUID if it's not UUID
+            # already, so that two images with same file names do not collide
+            if service_utils.is_glance_image(href):
+                master_file_name = service_utils.parse_image_id(href)
+            else:
+                master_file_name = str(uuid.uuid5(uuid.NAMESPACE_URL, href))
         # NOTE(kaifeng) The ".converted" suffix acts as an indicator that the
         # image cached has gone through the conversion logic.
         if force_raw:
@@ -107,49 +262,197 @@ class ImageCache(object):
 
         master_path = os.path.join(self.master_dir, master_file_name)
 
-        if CONF.parallel_image_downloads:
-            img_download_lock_name = 'download-image:%s' % master_file_name
-
-        # TODO(dtantsur): lock expiration time
-        with lockutils.lock(img_download_lock_name):
-            img_service = image_service.get_image_service(href, context=ctx)
-            img_info = img_service.show(href)
-            # NOTE(vdrok): After rebuild requested image can change, so we
-            # should ensure that dest_path and master_path (if exists) are
-            # pointing to the same file and their content is up to date
-            cache_up_to_date = _delete_master_path_if_stale(master_path, href,
-                                                            img_info)
-            dest_up_to_date = _delete_dest_path_if_stale(master_path,
-                                                         dest_path)
-
-            if cache_up_to_date and dest_up_to_date:
-                LOG.debug("Destination %(dest)s already exists "
-                          "for image %(href)s",
-                          {'href': href, 'dest': dest_path})
-                return
-
-            if cache_up_to_date:
-                # NOTE(dtantsur): ensure we're not in the middle of clean up
-                with lockutils.lock('master_image'):
-                    os.link(master_path, dest_path)
-                LOG.debug("Master cache hit for image %(href)s",
-                          {'href': href})
-                return
+        shared = False
+        while True:
+            with index.lock:
+                if content_addressed or shared:
+                    # The contents cannot differ from the remote image
+                    cache_up_to_date = os.path.exists(master_path)
+                else:
+                    # NOTE(vdrok): After rebuild requested image can change,
+                    # so we should ensure that dest_path and master_path (if
+                    # exists) are pointing to the same file and their content
+                    # is up to date
+                    cache_up_to_date = _delete_master_path_if_stale(
+                        master_path, href, img_info)
+                dest_up_to_date = _delete_dest_path_if_stale(master_path,
+                                                             dest_path)
+
+                if cache_up_to_date:
+                    if dest_up_to_date:
+                        LOG.debug("Destination %(dest)s already exists "
+                                  "for image %(href)s",
+                                  {'href': href, 'dest': dest_path})
+                    else:
+                        os.link(master_path, dest_path)
+                        LOG.debug("Master cache hit for image %(href)s",
+                                  {'href': href})
+                    saved = index.touch(master_path)
+                    METRICS.send_counter('ImageCache.Hit', 1)
+                    METRICS.send_counter('ImageCache.BytesSaved', saved)
+                    return
+
+                index.discard(master_path)
+                download = index.downloads.get(master_path)
+                if download is None:
+                    download = threading.Event()
+                    index.downloads[master_path] = download
+                    break
+
+            LOG.debug("Image %(href)s is being downloaded to %(master)s, "
+                      "waiting for it", {'href': href, 'master': master_path})
+            download.wait()
+            shared = True
 
+        try:
             LOG.info("Master cache miss for image %(href)s, will download",
                      {'href': href})
-            self._download_image(
-                href, master_path, dest_path, img_info,
-                ctx=ctx, force_raw=force_raw)
+            METRICS.send_counter('ImageCache.Miss', 1)
+            if CONF.parallel_image_downloads:
+                self._download_image(
+                    href, master_path, dest_path, img_info,
+                    ctx=ctx, force_raw=force_raw)
+            else:
+                with lockutils.lock(img_download_lock_name):
+                    self._download_image(
+                        href, master_path, dest_path, img_info,
+                        ctx=ctx, force_raw=force_raw)
+            with index.lock:
+                index.add(master_path, last_used=time.time())
+        finally:
+            with index.lock:
+                del index.downloads[master_path]
+            download.set()
 
         # NOTE(dtantsur): we increased cache size - time to clean up
         self.clean_up()
 
+    def get_checksum(self, path, algorithm, compute):
+        """Get the checksum of an image linked to a master image.
+
+        The checksum is computed once per master image and algorithm and
+        kept in the master directory until the master image is evicted, so
+        that nodes sharing an image do not read it again.
+
+        :param path: path to a hard link to a master image.
+        :param algorithm: checksum algorithm.
+        :param compute: callable accepting the path and the algorithm and
+                        returning the checksum.
+        :returns: the checksum.
+        """
+        if self.master_dir is None:
+            return compute(path, algorithm)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return compute(path, algorithm)
+        if stat.st_nlink < 2:
+            # Not linked to a master image (e.g. caching disabled for it)
+            return compute(path, algorithm)
+
+        checksums_dir = _checksums_dir(self.master_dir, stat)
+        checksum_path = os.path.join(checksums_dir, algorithm)
+        with lockutils.lock('image-checksum-%s' % checksum_path):
+            try:
+                with open(checksum_path) as fp:
+                    checksum = fp.read().strip()
+            except FileNotFoundError:
+                checksum = None
+            if checksum:
+                LOG.debug("Using the known %(algo)s checksum of image "
+                          "%(path)s", {'algo': algorithm, 'path': path})
+                METRICS.send_counter('ImageCache.ChecksumHit', 1)
+                return checksum
+
+            METRICS.send_counter('ImageCache.ChecksumMiss', 1)
+            checksum = compute(path, algorithm)
+            fileutils.ensure_tree(checksums_dir)
+            tmp_path = '%s.%s.tmp' % (checksum_path, uuid.uuid4().hex)
+            try:
+                with open(tmp_path, 'w') as fp:
+                    fp.write(checksum)
+                os.replace(tmp_path, checksum_path)
+            except EnvironmentError as exc:
+                LOG.warning("Unable to save the checksum of image %(path)s: "
+                            "%(exc)s", {'path': path, 'exc': exc})
+                il_utils.unlink_without_raise(tmp_path)
+            return checksum
+
+    @METRICS.timer('ImageCache.build_image')
+    def build_image(self, name, dest_path, builder):
+        """Build an image once and link it to the destination path.
+
+        Works like fetch_image for images created locally rather than
+        downloaded, e.g. ISO images assembled from other cached images.
+        Concurrent requests for an image being built wait for that build
+        instead of starting another one.
+
+        :param name: master file name, it must change when the contents
+                     of the image would change.
+        :param dest_path: destination file path
+        :param builder: callable creating the image in the path passed to it
+        """
+        if self.master_dir is None:
+            builder(dest_path)
+            return
+
+        index = _get_index(self.master_dir)
+        master_path = os.path.join(self.master_dir, name)
+        while True:
+            with index.lock:
+                if os.path.exists(master_path):
+                    os.link(master_path, dest_path)
+                    LOG.debug("Master cache hit for built image %(name)s",
+                              {'name': name})
+                    saved = index.touch(master_path)
+                    METRICS.send_counter('ImageCache.Hit', 1)
+                    METRICS.send_counter('ImageCache.BytesSaved', saved)
+                    return
+
+                index.discard(master_path)
+                build = index.downloads.get(master_path)
+                if build is None:
+                    build = threading.Event()
+                    index.downloads[master_path] = build
+                    break
+
+            LOG.debug("Image %(name)s is being built, waiting for it",
+                      {'name': name})
+            build.wait()
+
+        try:
+            LOG.info("Master cache miss for built image %(name)s, "
+                     "will build it", {'name': name})
+            METRICS.send_counter('ImageCache.Miss', 1)
+            tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+            try:
+                tmp_path = os.path.join(tmp_dir, name)
+                builder(tmp_path)
+                os.link(tmp_path, master_path)
+                os.link(master_path, dest_path)
+            except OSError as exc:
+                msg = (_("Could not link built image %(name)s to "
+                         "%(dst_path)s, error: %(exc)s") %
+                       {'name': name, 'dst_path': dest_path, 'exc': exc})
+                LOG.error(msg)
+                raise exception.ImageDownloadFailed(msg)
+            finally:
+                utils.rmtree_without_raise(tmp_dir)
+            with index.lock:
+                index.add(master_path, last_used=time.time())
+        finally:
+            with index.lock:
+                del index.downloads[master_path]
+            build.set()
+
+        self.clean_up()
+
     def _download_image(self, href, master_path, dest_path, img_info,
                         ctx=None, force_raw=True):
         """Download image by href and store at a given path.
 
-        This method should be called with uuid-specific lock taken.
+        This method should be called by the thread registered as
+        downloading master_path.
 
         :param href: image UUID or href to fetch
         :param master_path: destination master path
@@ -190,13 +493,14 @@ class ImageCache(object):
         finally:
             utils.rmtree_without_raise(tmp_dir)
 
-    @lockutils.synchronized('master_image')
     def clean_up(self, amount=None):
         """Clean up directory with images, keeping cache of the latest images.
 
         Files with link count >1 are never deleted.
-        Protected by global lock, so that no one messes with master images
-        after we get listing and before we actually delete files.
+        Works on the in-memory index of the master directory, protected by
+        its lock, so that no one messes with master images while we are
+        deleting files. Only the files considered for deletion are checked
+        on disk.
 
         :param amount: if present, amount of space to reclaim in bytes,
                        cleaning will stop, if this goal was reached,
@@ -208,18 +512,50 @@ class ImageCache(object):
         LOG.debug("Starting clean up for master image cache %(dir)s",
                   {'dir': self.master_dir})
 
-        amount_copy = amount
-        listing = _find_candidates_for_deletion(self.master_dir)
-        survived, amount = self._clean_up_too_old(listing, amount)
-        if amount is not None and amount <= 0:
-            return
-        amount = self._clean_up_ensure_cache_size(survived, amount)
+        index = _get_index(self.master_dir)
+        with index.lock:
+            amount_copy = amount
+            listing = index.listing()
+            survived, amount = self._clean_up_too_old(listing, amount)
+            if amount is not None and amount <= 0:
+                return
+            amount = self._clean_up_ensure_cache_size(survived, amount)
         if amount is not None and amount > 0:
             LOG.warning("Cache clean up was unable to reclaim %(required)d "
                         "MiB of disk space, still %(left)d MiB required",
                         {'required': amount_copy / 1024 / 1024,
                          'left': amount / 1024 / 1024})
 
+    def _evict(self, file_name):
+        """Delete a file from the master directory unless it is in use.
+
+        Must be called with the index lock taken.
+
+        :returns: the stat result of the deleted file, or None if it was not
+            deleted.
+        """
+        index = _get_index(self.master_dir)
+        try:
+            stat = os.stat(file_name)
+        except FileNotFoundError:
+            index.discard(file_name)
+            return None
+        if stat.st_nlink > 1:
+            # In use, refresh the entry so that it is not tried again soon
+            index.add(file_name)
+            return None
+        try:
+            os.unlink(file_name)
+        except EnvironmentError as exc:
+            LOG.warning("Unable to delete file %(name)s from "
+                        "master image cache: %(exc)s",
+                        {'name': file_name, 'exc': exc})
+            return None
+        index.discard(file_name)
+        utils.rmtree_without_raise(_checksums_dir(self.master_dir, stat))
+        METRICS.send_counter('ImageCache.Eviction', 1)
+        return stat
+
     def _clean_up_too_old(self, listing, amount):
         """Clean up stage 1: drop images that are older than TTL.
 
@@ -228,7 +564,7 @@ class ImageCache(object):
         it starts removing files older than TTL seconds,
         oldest first, until the required 'amount' of space is reclaimed.
 
-        :param listing: list of tuples (file name, last used time)
+        :param listing: list of tuples (file name, last used time, stat)
         :param amount: if not None, amount of space to reclaim in bytes,
                        cleaning will stop, if this goal was reached,
                        even if it is possible to clean up more files
@@ -240,13 +576,8 @@ class ImageCache(object):
         count = 0
         for file_name, last_used, stat in listing:
             if last_used < threshold:
-                try:
-                    os.unlink(file_name)
-                except EnvironmentError as exc:
-                    LOG.warning("Unable to delete file %(name)s from "
-                                "master image cache: %(exc)s",
-                                {'name': file_name, 'exc': exc})
-                else:
+                stat = self._evict(file_name)
+                if stat is not None:
                     count += 1
                     if amount is not None:
                         amount -= stat.st_size
@@ -266,7 +597,7 @@ class ImageCache(object):
         Try to delete the oldest files until conditions is satisfied
         or no more files are eligible for deletion.
 
-        :param listing: list of tuples (file name, last used time)
+        :param listing: list of tuples (file name, last used time, stat)
         :param amount: amount of space to reclaim, if possible.
                        if amount is not None, it has higher priority than
                        cache size in settings
@@ -276,21 +607,13 @@ class ImageCache(object):
         listing = sorted(listing,
                          key=lambda entry: entry[1],
                          reverse=True)
-        total_listing = (os.path.join(self.master_dir, f)
-                         for f in os.listdir(self.master_dir))
-        total_size = sum(os.path.getsize(f)
-                         for f in total_listing)
+        total_size = _get_index(self.master_dir).total_size()
         count = 0
         while listing and (total_size > self._cache_size
                            or (amount is not None and amount > 0)):
             file_name, last_used, stat = listing.pop()
-            try:
-                os.unlink(file_name)
-            except EnvironmentError as exc:
-                LOG.warning("Unable to delete file %(name)s from "
-                            "master image cache: %(exc)s",
-                            {'name': file_name, 'exc': exc})
-            else:
+            stat = self._evict(file_name)
+            if stat is not None:
                 total_size -= stat.st_size
                 count += 1
                 if amount is not None:
@@ -309,24 +632,6 @@ class ImageCache(object):
         return max(amount, 0) if amount is not None else 0
 
 
-def _find_candidates_for_deletion(master_dir):
-    """Find files eligible for deletion i.e. with link count ==1.
-
-    :param master_dir: directory to operate on
-    :returns: iterator yielding tuples (file name, last used time, stat)
-    """
-    for filename in os.listdir(master_dir):
-        filename = os.path.join(master_dir, filename)
-        stat = os.stat(filename)
-        if not os.path.isfile(filename) or stat.st_nlink > 1:
-            continue
-        # NOTE(dtantsur): Detect most recently accessed files,
-        # seeing atime can be disabled by the mount option
-        # Also include ctime as it changes when image is linked to
-        last_used_time = max(stat.st_mtime, stat.st_atime, stat.st_ctime)
-        yield filename, last_used_time, stat
-
-
 def _free_disk_space_for(path):
     """Get free disk space on a drive where path is located."""
     stat = os.statvfs(path)
@@ -422,6 +422,67 @@ def cleanup_disk_image(task, prefix=None):
     ImageHandler.unpublish_image_for_node(task.node, prefix=prefix)
 
 
+def _create_boot_iso_from_base(task, output_filename, kernel_href,
+                               ramdisk_href, bootloader_href=None,
+                               root_uuid=None, kernel_params=None,
+                               boot_mode=None, inject_files=None):
+    """Create a node's boot ISO from a cached base ISO.
+
+    The kernel, ramdisk and bootloader are fetched through the master ISO
+    image cache. The base ISO built out of them is cached as well, so only
+    the boot loader configuration and the injected files are written for
+    each node.
+
+    :param task: a TaskManager instance containing the node to act on.
+    :param output_filename: the absolute path of the output ISO file.
+    :param kernel_href: URL or Glance UUID of the kernel to use
+    :param ramdisk_href: URL or Glance UUID of the ramdisk to use
+    :param bootloader_href: URL or Glance UUID of the EFI bootloader
+         image to use when creating UEFI bootable ISO
+    :param root_uuid: optional uuid of the root partition.
+    :param kernel_params: a string containing whitespace separated values
+        kernel cmdline arguments of the form K=V or K (optional).
+    :param boot_mode: the boot mode in which the deploy is to happen.
+    :param inject_files: Mapping of local source file paths to their location
+        on the final ISO image.
+    :raises: ImageCreationFailed, if creating ISO image failed.
+    """
+    cache = ISOImageCache()
+    with tempfile.TemporaryDirectory(dir=CONF.tempdir) as tmpdir:
+        kernel_path = os.path.join(tmpdir, 'kernel')
+        ramdisk_path = os.path.join(tmpdir, 'ramdisk')
+        cache.fetch_image(kernel_href, kernel_path, ctx=task.context,
+                          force_raw=False)
+        cache.fetch_image(ramdisk_href, ramdisk_path, ctx=task.context,
+                          force_raw=False)
+
+        esp_image_path = None
+        if boot_mode == 'uefi':
+            if bootloader_href:
+                esp_image_path = os.path.join(tmpdir, 'esp')
+                cache.fetch_image(bootloader_href, esp_image_path,
+                                  ctx=task.context, force_raw=False)
+            else:
+                esp_image_path = CONF.esp_image or None
+
+        base_iso_name = images.base_boot_iso_name(
+            kernel_path, ramdisk_path, esp_image=esp_image_path,
+            boot_mode=boot_mode, inject_files=inject_files)
+        base_iso_path = os.path.join(tmpdir, 'base.iso')
+        cache.build_image(
+            base_iso_name, base_iso_path,
+            functools.partial(images.create_base_boot_iso,
+                              kernel=kernel_path, ramdisk=ramdisk_path,
+                              esp_image=esp_image_path, boot_mode=boot_mode,
+                              inject_files=inject_files))
+
+        images.overlay_boot_iso(base_iso_path, output_filename,
+                                root_uuid=root_uuid,
+                                kernel_params=kernel_params,
+                                boot_mode=boot_mode,
+                                inject_files=inject_files)
+
+
 def _prepare_iso_image(task, kernel_href, ramdisk_href,
                        bootloader_href=None, root_uuid=None, params=None,
                        base_iso=None, inject_files=None):
@@ -533,14 +594,23 @@ def _prepare_iso_image(task, kernel_href, ramdisk_href,
                  'ramdisk_href': ramdisk_href,
                  'bootloader_href': bootloader_href,
                  'params': kernel_params})
-            images.create_boot_iso(
-                task.context, boot_iso_tmp_file,
-                kernel_href, ramdisk_href,
-                esp_image_href=bootloader_href,
-                root_uuid=root_uuid,
-                kernel_params=kernel_params,
-                boot_mode=boot_mode,
-                inject_files=inject_files)
+            if CONF.deploy.iso_master_path:
+                _create_boot_iso_from_base(
+                    task, boot_iso_tmp_file, kernel_href, ramdisk_href,
+                    bootloader_href=bootloader_href,
+                    root_uuid=root_uuid,
+                    kernel_params=kernel_params,
+                    boot_mode=boot_mode,
+                    inject_files=inject_files)
+            else:
+                images.create_boot_iso(
+                    task.context, boot_iso_tmp_file,
+                    kernel_href, ramdisk_href,
+                    esp_image_href=bootloader_href,
+                    root_uuid=root_uuid,
+                    kernel_params=kernel_params,
+                    boot_mode=boot_mode,
+                    inject_files=inject_files)
 
         iso_object_name = _get_name(task.node, prefix='boot', suffix='.iso')
 
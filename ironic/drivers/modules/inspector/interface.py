@@ -236,10 +236,55 @@ class Inspector(base.InspectInterface):
         purpose='checking hardware inspection status',
         spacing=CONF.inspector.status_check_period,
         filters={'provision_state': states.INSPECTWAIT},
+        prefetch=lambda context, nodes: _get_statuses(context, nodes),
+        predicate=lambda node, prefetched: _needs_check(prefetched),
     )
-    def _periodic_check_result(self, task, manager, context):
+    def _periodic_check_result(self, task, manager, context,
+                               prefetched=None):
         """Periodic task checking results of inspection."""
-        _check_status(task)
+        _check_status(task, status=prefetched)
+
+
+def _get_statuses(context, nodes):
+    """List the introspection statuses of the given nodes.
+
+    :param context: request context.
+    :param nodes: the nodes being inspected, as passed to the predicate of
+        a node periodic.
+    :returns: a dictionary mapping node UUIDs to their introspection status.
+        Nodes unknown to ironic-inspector or not found in the listing are
+        missing, so are all nodes if listing failed or is disabled.
+    """
+    page_size = CONF.inspector.status_check_page_size
+    if not page_size:
+        return {}
+
+    remaining = {node.uuid for node in nodes}
+    statuses = {}
+    try:
+        inspector_client = client.get_client(context)
+        # NOTE: ironic-inspector returns the most recent introspections
+        # first, so the listing usually stops after the first page.
+        for status in inspector_client.introspections(limit=page_size):
+            if status.id in remaining:
+                statuses[status.id] = status
+                remaining.discard(status.id)
+                if not remaining:
+                    break
+    except Exception:
+        LOG.exception('Unexpected exception while listing inspection '
+                      'statuses, will check each node separately')
+        return {}
+    return statuses
+
+
+def _needs_check(status):
+    """Whether a node has to be locked to check its inspection status.
+
+    :param status: the listed introspection status of the node or ``None``
+        if it is not known, in which case it is requested separately.
+    """
+    return status is None or bool(status.error) or status.is_finished
 
 
 def _start_inspection(node_uuid, context):
@@ -262,20 +307,25 @@ def _start_inspection(node_uuid, context):
                  node_uuid)
 
 
-def _check_status(task):
-    """Check inspection status for node given by a task."""
+def _check_status(task, status=None):
+    """Check inspection status for node given by a task.
+
+    :param task: a task from TaskManager.
+    :param status: the introspection status of the node if already known,
+        it is requested from ironic-inspector otherwise.
+    """
     node = task.node
     if node.provision_state != states.INSPECTWAIT:
         return
     if not isinstance(task.driver.inspect, Inspector):
         return
 
-    LOG.debug('Calling to inspector to check status of node %s',
-              task.node.uuid)
-
     try:
         inspector_client = client.get_client(task.context)
-        status = inspector_client.get_introspection(node.uuid)
+        if status is None:
+            LOG.debug('Calling to inspector to check status of node %s',
+                      task.node.uuid)
+            status = inspector_client.get_introspection(node.uuid)
     except Exception:
         # NOTE(dtantsur): get_status should not normally raise
         # let's assume it's a transient failure and retry later
@@ -55,6 +55,7 @@ from ironic.conf import CONF
 from ironic.drivers import base
 from ironic.drivers.modules import boot_mode_utils
 from ironic.drivers.modules import console_utils
+from ironic.drivers.modules import ipmitool_shell
 from ironic.drivers import utils as driver_utils
 
 
@@ -675,6 +676,48 @@ def _exec_ipmitool(driver_info, command, check_exit_code=None,
                 LAST_CMD_TIME[driver_info['address']] = time.time()
 
 
+def _exec_ipmitool_persistent(driver_info, command, expected, **kwargs):
+    """Execute the ipmitool command, in a persistent session if enabled.
+
+    With [ipmi]use_persistent_sessions the command is sent through a
+    long-lived ipmitool shell. Shells do not report whether a command
+    succeeded, so their output is only used if it matches ``expected``;
+    otherwise, and on any shell failure, the shell is discarded and the
+    command is executed with _exec_ipmitool.
+
+    :param driver_info: the ipmitool parameters for accessing a node.
+    :param command: the ipmitool command to be executed.
+    :param expected: regular expression the output of a successful command
+        matches.
+    :param kwargs: additional arguments for _exec_ipmitool.
+    :returns: (stdout, stderr) from executing the command.
+    :raises: PasswordFileFailedToCreate from creating or writing to the
+             temporary file.
+    :raises: processutils.ProcessExecutionError from executing the command.
+    """
+    use_shell = (CONF.ipmi.use_persistent_sessions
+                 and driver_info['protocol_version'] == '2.0'
+                 and (driver_info.get('cipher_suite') is not None
+                      or not CONF.ipmi.cipher_suite_versions))
+    if use_shell:
+        args = _get_ipmitool_args(driver_info) + _ipmitool_timing_args()
+        try:
+            out = ipmitool_shell.execute(driver_info['address'], args,
+                                         driver_info['password'] or '',
+                                         command,
+                                         CONF.ipmi.command_retry_timeout,
+                                         expected=expected)
+        except (exception.IPMIFailure, OSError) as e:
+            LOG.debug('Persistent ipmitool session failed to run "%(cmd)s" '
+                      'for node %(node)s, falling back to ipmitool: '
+                      '%(error)s', {'node': driver_info['uuid'],
+                                    'cmd': command, 'error': e})
+        else:
+            return out, ''
+
+    return _exec_ipmitool(driver_info, command, **kwargs)
+
+
 def _set_and_wait(task, power_action, driver_info, timeout=None):
     """Helper function for performing an IPMI power action
 
@@ -707,7 +750,8 @@ def _set_and_wait(task, power_action, driver_info, timeout=None):
     # retries.
     cmd = "power %s" % cmd_name
     try:
-        _exec_ipmitool(driver_info, cmd)
+        _exec_ipmitool_persistent(driver_info, cmd,
+                                  r'^Chassis Power Control: ')
     except (exception.PasswordFileFailedToCreate,
             processutils.ProcessExecutionError,
             subprocess.TimeoutExpired,
@@ -771,8 +815,9 @@ def _power_status(driver_info):
     """
     cmd = "power status"
     try:
-        out_err = _exec_ipmitool(
-            driver_info, cmd, kill_on_timeout=CONF.ipmi.kill_on_timeout)
+        out_err = _exec_ipmitool_persistent(
+            driver_info, cmd, r'\AChassis Power is (on|off)\n\Z',
+            kill_on_timeout=CONF.ipmi.kill_on_timeout)
     except (exception.PasswordFileFailedToCreate,
             processutils.ProcessExecutionError) as e:
         LOG.warning("IPMI power status failed for node %(node_id)s with "
@@ -1335,8 +1380,9 @@ class IPMIManagement(base.ManagementInterface):
         # extended sensor informations
         cmd = "sdr -v"
         try:
-            out, err = _exec_ipmitool(
-                driver_info, cmd, kill_on_timeout=CONF.ipmi.kill_on_timeout)
+            out, err = _exec_ipmitool_persistent(
+                driver_info, cmd, r'^Sensor ID\s*:',
+                kill_on_timeout=CONF.ipmi.kill_on_timeout)
         except (exception.PasswordFileFailedToCreate,
                 processutils.ProcessExecutionError) as e:
             raise exception.FailedToGetSensorData(node=task.node.uuid,
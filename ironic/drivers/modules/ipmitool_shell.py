@@ -0,0 +1,195 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Persistent ipmitool sessions.
+
+Keeps long-lived ``ipmitool shell`` processes, one IPMI session each, and
+pipelines commands through them. This avoids starting a process and
+negotiating a new RMCP+ session for every command.
+"""
+
+import collections
+import contextlib
+import os
+import re
+import threading
+import time
+
+import eventlet
+from eventlet.green import subprocess
+from oslo_log import log as logging
+
+from ironic.common import exception
+from ironic.conf import CONF
+
+
+LOG = logging.getLogger(__name__)
+
+PROMPT = b'ipmitool> '
+
+_READ_SIZE = 65536
+
+_lock = threading.Lock()
+# (arguments, password) -> list of idle shells
+_idle = collections.defaultdict(list)
+# BMC address -> semaphore limiting the shells in use
+_slots = {}
+
+
+class _Shell(object):
+    """A running ``ipmitool shell`` process."""
+
+    def __init__(self, args, password, timeout):
+        # NOTE: -E reads the password from the environment, no password file
+        # has to outlive the start of the process.
+        env = dict(os.environ, IPMI_PASSWORD=password)
+        self._proc = subprocess.Popen(args + ['-E', 'shell'],
+                                      stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT,
+                                      bufsize=0, env=env)
+        self.last_used = time.monotonic()
+        try:
+            self._read_until_prompt('shell', timeout)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def alive(self):
+        return self._proc.poll() is None
+
+    def _read_until_prompt(self, command, timeout):
+        output = b''
+        try:
+            with eventlet.Timeout(timeout):
+                while not output.endswith(PROMPT):
+                    chunk = self._proc.stdout.read(_READ_SIZE)
+                    if not chunk:
+                        raise exception.IPMIFailure(cmd=command)
+                    output += chunk
+        except eventlet.Timeout:
+            raise exception.IPMIFailure(cmd=command)
+        return output[:-len(PROMPT)].decode('utf-8', errors='replace')
+
+    def execute(self, command, timeout):
+        """Run a command and return its output (stdout and stderr)."""
+        self._proc.stdin.write(command.encode('utf-8') + b'\n')
+        output = self._read_until_prompt(command, timeout)
+        self.last_used = time.monotonic()
+        # Depending on how ipmitool was built, the command may be echoed.
+        first, sep, rest = output.partition('\n')
+        if first.strip() == command:
+            output = rest
+        return output
+
+    def close(self):
+        try:
+            if self.alive:
+                self._proc.stdin.write(b'exit\n')
+            self._proc.stdin.close()
+            with eventlet.Timeout(1):
+                self._proc.wait()
+        except (eventlet.Timeout, OSError):
+            self._proc.kill()
+            self._proc.wait()
+
+
+def _evict_idle():
+    """Remove the shells unused for longer than the idle timeout.
+
+    Must be called with the lock held. The shells are closed by the caller
+    once the lock is released, closing a shell may take a while.
+
+    :returns: a list of the removed shells.
+    """
+    deadline = time.monotonic() - CONF.ipmi.persistent_session_idle_timeout
+    evicted = []
+    for key in list(_idle):
+        stale = [s for s in _idle[key]
+                 if s.last_used < deadline or not s.alive]
+        for shell in stale:
+            _idle[key].remove(shell)
+        evicted.extend(stale)
+        if not _idle[key]:
+            del _idle[key]
+    return evicted
+
+
+@contextlib.contextmanager
+def _get_shell(address, args, password, timeout):
+    key = (tuple(args), password)
+    with _lock:
+        evicted = _evict_idle()
+        slots = _slots.get(address)
+        if slots is None:
+            slots = _slots[address] = threading.BoundedSemaphore(
+                CONF.ipmi.persistent_session_max_per_address)
+    for shell in evicted:
+        shell.close()
+
+    if not slots.acquire(timeout=timeout):
+        raise exception.IPMIFailure(cmd='shell')
+    try:
+        with _lock:
+            shell = _idle[key].pop() if _idle.get(key) else None
+        if shell is None:
+            LOG.debug('Starting a persistent ipmitool shell for %s', address)
+            shell = _Shell(list(args), password, timeout)
+
+        try:
+            yield shell
+        except Exception:
+            shell.close()
+            raise
+        with _lock:
+            _idle[key].append(shell)
+    finally:
+        slots.release()
+
+
+def execute(address, args, password, command, timeout, expected=None):
+    """Run an ipmitool command through a persistent shell.
+
+    :param address: the BMC address, used to limit concurrent shells.
+    :param args: the ipmitool arguments selecting and authenticating to the
+        BMC, without the password and the command.
+    :param password: the BMC password.
+    :param command: the ipmitool command to run.
+    :param timeout: time in seconds to wait for a shell and for the command
+        to finish.
+    :param expected: regular expression the output of a successful command
+        matches, if any. Shells do not report whether a command succeeded.
+    :raises: IPMIFailure if the shell could not be started, the command
+        did not complete or its output does not match ``expected``. The
+        shell is discarded in this case.
+    :returns: the combined output of the command.
+    """
+    with _get_shell(address, args, password, timeout) as shell:
+        output = shell.execute(command, timeout)
+        if expected is not None and not re.search(expected, output,
+                                                  re.MULTILINE):
+            LOG.debug('Unexpected output of "%(cmd)s" in a persistent '
+                      'ipmitool shell for %(address)s: %(out)s',
+                      {'cmd': command, 'address': address, 'out': output})
+            raise exception.IPMIFailure(cmd=command)
+        return output
+
+
+def close_all():
+    """Close all idle shells."""
+    with _lock:
+        shells = [shell for idle in _idle.values() for shell in idle]
+        _idle.clear()
+    for shell in shells:
+        shell.close()
@@ -540,7 +540,8 @@ class NeutronVIFPortIDMixin(VIFPortIDMixin):
         # they will not affect the VIF to port mapping.
         physnets = set()
         if any(port.physical_network is not None for port in task.ports):
-            physnets = neutron.get_physnets_by_port_uuid(client, vif_id)
+            physnets = neutron.get_physnets_by_port_uuid(
+                client, vif_id, context=task.context)
 
             if len(physnets) > 1:
                 # NOTE(mgoddard): Neutron cannot currently handle hosts which
@@ -11,12 +11,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import os
 import shutil
 import tempfile
 from urllib import parse as urlparse
 
+from ironic_lib import metrics_utils
 import jsonschema
+from oslo_concurrency import lockutils
 from oslo_log import log
 from oslo_utils import fileutils
 
@@ -28,6 +31,8 @@ from ironic.conf import CONF
 
 LOG = log.getLogger(__name__)
 
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
 _UPDATE_FIRMWARE_SCHEMA = {
     "$schema": "http://json-schema.org/schema#",
     "title": "update_firmware clean step schema",
@@ -64,6 +69,9 @@ _UPDATE_FIRMWARE_SCHEMA = {
     }
 }
 _FIRMWARE_SUBDIR = 'firmware'
+_CACHE_SUBDIR = '.cache'
+# Holds one empty file per node using a cached firmware file
+_REFS_SUBDIR = '.refs'
 
 
 def validate_update_firmware_args(firmware_images):
@@ -148,6 +156,89 @@ def verify_checksum(node, checksum, file_path):
                'calculated_checksum': calculated_checksum})
 
 
+def _cache_dir():
+    return (CONF.redfish.firmware_cache_dir
+            or os.path.join(CONF.deploy.http_root, _FIRMWARE_SUBDIR,
+                            _CACHE_SUBDIR))
+
+
+def _cache_lock(key):
+    return lockutils.lock('redfish-firmware-cache-%s' % key)
+
+
+def download_to_cache(node, url, checksum):
+    """Downloads and verifies a firmware file shared between nodes
+
+    The file is downloaded and its checksum verified once for a given URL
+    and checksum, then reused by every node updated with it. The node takes
+    a reference on the cached file, released by :func:`cleanup`. The file
+    is removed once no node references it.
+
+    :param node: Node for which to download the file
+    :param url: URL to download from
+    :param checksum: Expected checksum value
+    :returns: File path of the cached file
+    :raises RedfishError: When checksum does not match
+    """
+    key = hashlib.sha256(('%s\n%s' % (url, checksum)).encode()).hexdigest()
+    entry_dir = os.path.join(_cache_dir(), key)
+    refs_dir = os.path.join(entry_dir, _REFS_SUBDIR)
+    cached_file = os.path.join(
+        entry_dir, os.path.basename(urlparse.urlparse(url).path))
+    with _cache_lock(key):
+        if os.path.exists(cached_file):
+            LOG.debug('For node %(node)s firmware at %(url)s is already '
+                      'cached at %(cached_file)s',
+                      {'node': node.uuid, 'url': url,
+                       'cached_file': cached_file})
+            METRICS.send_counter('RedfishFirmwareCache.Hit', 1)
+        else:
+            METRICS.send_counter('RedfishFirmwareCache.Miss', 1)
+            os.makedirs(refs_dir, exist_ok=True)
+            try:
+                temp_file = download_to_temp(node, url)
+                verify_checksum(node, checksum, temp_file)
+                # Only complete files are visible under the final name
+                partial_file = cached_file + '.part'
+                shutil.move(temp_file, partial_file)
+                os.rename(partial_file, cached_file)
+            except Exception:
+                if not os.listdir(refs_dir):
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                raise
+        open(os.path.join(refs_dir, node.uuid), 'w').close()
+    return cached_file
+
+
+def _release_cached_files(node):
+    """Release the references of a node on cached firmware files
+
+    :param node: Node for which to release the references
+    """
+    cache_dir = _cache_dir()
+    try:
+        keys = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return
+
+    for key in keys:
+        refs_dir = os.path.join(cache_dir, key, _REFS_SUBDIR)
+        ref = os.path.join(refs_dir, node.uuid)
+        if not os.path.exists(ref):
+            continue
+        with _cache_lock(key):
+            try:
+                os.unlink(ref)
+            except FileNotFoundError:
+                continue
+            if not os.listdir(refs_dir):
+                LOG.debug('Removing cached firmware %(key)s, node %(node)s '
+                          'was the last one using it',
+                          {'key': key, 'node': node.uuid})
+                shutil.rmtree(os.path.join(cache_dir, key),
+                              ignore_errors=True)
+
+
 def stage(node, source, temp_file):
     """Stage temporary file to configured location
 
@@ -227,6 +318,8 @@ def cleanup(node):
               '%(temp_dir)s.', {'node': node.uuid, 'temp_dir': temp_dir})
     shutil.rmtree(temp_dir, ignore_errors=True)
 
+    _release_cached_files(node)
+
     cleanup = node.driver_internal_info.get('firmware_cleanup')
     if not cleanup:
         return
@@ -21,6 +21,7 @@ from oslo_log import log
 from oslo_utils import importutils
 from oslo_utils import timeutils
 
+from ironic.common import async_jobs
 from ironic.common import boot_devices
 from ironic.common import boot_modes
 from ironic.common import components
@@ -887,10 +888,11 @@ class RedfishManagement(base.ManagementInterface):
     @periodics.node_periodic(
         purpose='checking if async firmware update failed',
         spacing=CONF.redfish.firmware_update_fail_interval,
-        filters={'reserved': False, 'provision_state': states.CLEANFAIL,
-                 'maintenance': True},
+        filters=async_jobs.node_filters(
+            [async_jobs.FIRMWARE_UPDATES], reserved=False,
+            provision_state=states.CLEANFAIL, maintenance=True),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: n.driver_internal_info.get('firmware_updates'),
+        predicate=async_jobs.has_jobs([async_jobs.FIRMWARE_UPDATES]),
     )
     def _query_firmware_update_failed(self, task, manager, context):
         """Periodic job to check for failed firmware updates."""
@@ -909,9 +911,11 @@ class RedfishManagement(base.ManagementInterface):
     @periodics.node_periodic(
         purpose='checking async firmware update tasks',
         spacing=CONF.redfish.firmware_update_status_interval,
-        filters={'reserved': False, 'provision_state': states.CLEANWAIT},
+        filters=async_jobs.node_filters(
+            [async_jobs.FIRMWARE_UPDATES], reserved=False,
+            provision_state=states.CLEANWAIT),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: n.driver_internal_info.get('firmware_updates'),
+        predicate=async_jobs.has_jobs([async_jobs.FIRMWARE_UPDATES]),
     )
     def _query_firmware_update_status(self, task, manager, context):
         """Periodic job to check firmware update tasks."""
@@ -1064,13 +1068,12 @@ class RedfishManagement(base.ManagementInterface):
                            'temp_url': temp_url})
                 return temp_url, None
 
-            # For remaining, download the image to temporary location
-            temp_file = firmware_utils.download_to_temp(node, url)
+            # For remaining, download the image to the cache shared with
+            # other nodes, unless it is already there
+            cached_file = firmware_utils.download_to_cache(
+                node, url, firmware_update.get('checksum'))
 
-            firmware_utils.verify_checksum(
-                node, firmware_update.get('checksum'), temp_file)
-
-            return firmware_utils.stage(node, source, temp_file)
+            return firmware_utils.stage(node, source, cached_file)
 
         except exception.IronicException as error:
             firmware_utils.cleanup(node)
@@ -21,6 +21,7 @@ from oslo_log import log
 from oslo_utils import importutils
 from oslo_utils import units
 
+from ironic.common import async_jobs
 from ironic.common import exception
 from ironic.common.i18n import _
 from ironic.common import raid as raid_common
@@ -960,10 +961,12 @@ class RedfishRAID(base.RAIDInterface):
     @periodics.node_periodic(
         purpose='checking async RAID config failed',
         spacing=CONF.redfish.raid_config_fail_interval,
-        filters={'reserved': False, 'provision_state_in': {
-            states.CLEANFAIL, states.DEPLOYFAIL}, 'maintenance': True},
+        filters=async_jobs.node_filters(
+            [async_jobs.RAID_CONFIGS], reserved=False,
+            provision_state_in={states.CLEANFAIL, states.DEPLOYFAIL},
+            maintenance=True),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: n.driver_internal_info.get('raid_configs'),
+        predicate=async_jobs.has_jobs([async_jobs.RAID_CONFIGS]),
     )
     def _query_raid_config_failed(self, task, manager, context):
         """Periodic job to check for failed RAID configuration."""
@@ -983,10 +986,11 @@ class RedfishRAID(base.RAIDInterface):
     @periodics.node_periodic(
         purpose='checking async RAID config tasks',
         spacing=CONF.redfish.raid_config_status_interval,
-        filters={'reserved': False, 'provision_state_in': {
-            states.CLEANWAIT, states.DEPLOYWAIT}},
+        filters=async_jobs.node_filters(
+            [async_jobs.RAID_CONFIGS], reserved=False,
+            provision_state_in={states.CLEANWAIT, states.DEPLOYWAIT}),
         predicate_extra_fields=['driver_internal_info'],
-        predicate=lambda n: n.driver_internal_info.get('raid_configs'),
+        predicate=async_jobs.has_jobs([async_jobs.RAID_CONFIGS]),
     )
     def _query_raid_config_status(self, task, manager, context):
         """Periodic job to check RAID config tasks."""
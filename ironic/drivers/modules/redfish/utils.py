@@ -17,8 +17,11 @@
 import collections
 import hashlib
 import os
+import threading
+import time
 from urllib import parse as urlparse
 
+from ironic_lib import metrics_utils
 from oslo_log import log
 from oslo_utils import excutils
 from oslo_utils import importutils
@@ -33,6 +36,7 @@ from ironic.conf import CONF
 sushy = importutils.try_import('sushy')
 
 LOG = log.getLogger(__name__)
+METRICS = metrics_utils.get_metrics_logger(__name__)
 
 REQUIRED_PROPERTIES = {
     'redfish_address': _('The URL address to the Redfish controller. It '
@@ -187,7 +191,11 @@ def parse_driver_info(node):
 
 
 class SessionCache(object):
-    """Cache of HTTP sessions credentials"""
+    """Cache of HTTP sessions credentials
+
+    A least recently used cache of sushy clients, optionally expiring
+    clients after ``[redfish]connection_cache_ttl`` seconds.
+    """
     AUTH_CLASSES = {}
     if sushy:
         AUTH_CLASSES.update(
@@ -196,17 +204,13 @@ class SessionCache(object):
             auto=sushy.auth.SessionOrBasicAuth
         )
 
+    # Session key -> (sushy client, creation time)
     _sessions = collections.OrderedDict()
+    # Fingerprint of the credentials -> derived password hash
+    _password_hashes = collections.OrderedDict()
+    _lock = threading.Lock()
 
     def __init__(self, driver_info):
-        # Hash the password in the data structure, so we can
-        # include it in the session key.
-        # NOTE(TheJulia): Multiplying the address by 4, to ensure
-        # we meet a minimum of 16 bytes for salt.
-        pw_hash = hashlib.pbkdf2_hmac(
-            'sha512',
-            driver_info.get('password').encode('utf-8'),
-            str(driver_info.get('address') * 4).encode('utf-8'), 40)
         self._driver_info = driver_info
         # Assemble the session key and append the hashed password to it,
         # which forces new sessions to be established when the saved password
@@ -214,15 +218,59 @@ class SessionCache(object):
         self._session_key = tuple(
             self._driver_info.get(key)
             for key in ('address', 'username', 'verify_ca')
-        ) + (pw_hash.hex(),)
+        ) + (self._password_hash(driver_info),)
+
+    @classmethod
+    def _password_hash(cls, driver_info):
+        """Hash the password, so that it can be included in the session key.
+
+        Deriving the key is deliberately expensive, it is only done once per
+        set of credentials.
+        """
+        password = driver_info.get('password').encode('utf-8')
+        # NOTE(TheJulia): Multiplying the address by 4, to ensure
+        # we meet a minimum of 16 bytes for salt.
+        salt = str(driver_info.get('address') * 4).encode('utf-8')
+        fingerprint = hashlib.sha256(salt + b'\0' + password).digest()
+        with cls._lock:
+            try:
+                cls._password_hashes.move_to_end(fingerprint)
+                return cls._password_hashes[fingerprint]
+            except KeyError:
+                pass
+
+        pw_hash = hashlib.pbkdf2_hmac('sha512', password, salt, 40).hex()
+        with cls._lock:
+            cls._password_hashes[fingerprint] = pw_hash
+            while (len(cls._password_hashes)
+                   > max(CONF.redfish.connection_cache_size, 1)):
+                cls._password_hashes.popitem(last=False)
+        return pw_hash
+
+    def _get_cached(self):
+        with self._lock:
+            try:
+                conn, created_at = self._sessions.pop(self._session_key)
+            except KeyError:
+                return None
+            ttl = CONF.redfish.connection_cache_ttl
+            if ttl and time.monotonic() - created_at > ttl:
+                METRICS.send_counter('RedfishSessionCache.Expired', 1)
+                return None
+            # Re-insert to mark the session as the most recently used.
+            self._sessions[self._session_key] = (conn, created_at)
+        METRICS.send_counter('RedfishSessionCache.Hit', 1)
+        return conn
 
     def __enter__(self):
-        try:
-            return self.__class__._sessions[self._session_key]
-        except KeyError:
-            LOG.debug('A cached redfish session for Redfish endpoint '
-                      '%(endpoint)s was not detected, initiating a session.',
-                      {'endpoint': self._driver_info['address']})
+        conn = self._get_cached()
+        if conn is not None:
+            return conn
+
+        METRICS.send_counter('RedfishSessionCache.Miss', 1)
+        LOG.debug('A cached redfish session for Redfish endpoint '
+                  '%(endpoint)s was not detected, initiating a session.',
+                  {'endpoint': self._driver_info['address']})
 
         auth_type = self._driver_info['auth_type']
 
@@ -243,40 +291,40 @@ class SessionCache(object):
         )
 
         if CONF.redfish.connection_cache_size:
-            self.__class__._sessions[self._session_key] = conn
-            # Save a secure hash of the password into memory, so if we
-            # observe it change, we can detect the session is no longer valid.
-
-            if (len(self.__class__._sessions)
-                    > CONF.redfish.connection_cache_size):
-                self._expire_oldest_session()
+            with self._lock:
+                self._sessions[self._session_key] = (conn, time.monotonic())
+                while (len(self._sessions)
+                       > CONF.redfish.connection_cache_size):
+                    self._expire_oldest_session()
 
         return conn
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         # NOTE(etingof): perhaps this session token is no good
-        if isinstance(exc_val, sushy.exceptions.ConnectionError):
-            self.__class__._sessions.pop(self._session_key, None)
         # NOTE(TheJulia): A hard access error has surfaced, we
         # likely need to eliminate the session.
-        if isinstance(exc_val, sushy.exceptions.AccessError):
-            self.__class__._sessions.pop(self._session_key, None)
         # NOTE(TheJulia): Something very bad has happened, such
         # as the session is out of date, and refresh of the SessionService
         # failed resulting in an AttributeError surfacing.
         # https://storyboard.openstack.org/#!/story/2009719
-        if isinstance(exc_val, AttributeError):
-            self.__class__._sessions.pop(self._session_key, None)
+        if isinstance(exc_val, (sushy.exceptions.ConnectionError,
+                                sushy.exceptions.AccessError,
+                                AttributeError)):
+            with self._lock:
+                self._sessions.pop(self._session_key, None)
 
     @classmethod
     def _expire_oldest_session(cls):
-        """Expire oldest session"""
-        session_keys = list(cls._sessions)
-        session_key = next(iter(session_keys))
+        """Expire the least recently used session.
+
+        Must be called with the lock held.
+        """
+        session_key = next(iter(cls._sessions))
         # NOTE(etingof): GC should cause sushy to HTTP DELETE session
         # at BMC. Trouble is that contemporary sushy (1.6.0) does
         # does not do that.
         cls._sessions.pop(session_key, None)
+        METRICS.send_counter('RedfishSessionCache.Eviction', 1)
 
 
 def get_update_service(node):
@@ -166,6 +166,19 @@ class TestListAllocations(test_api_base.BaseApiTest):
         uuids = [n['uuid'] for n in data['allocations']]
         self.assertCountEqual(allocations, uuids)
 
+    def test_many_streamed(self):
+        for id_ in range(5):
+            obj_utils.create_test_allocation(
+                self.context, node_id=self.node.id,
+                uuid=uuidutils.generate_uuid(),
+                name='allocation%s' % id_)
+        expected = self.get_json('/allocations?limit=5', headers=self.headers)
+        self.config(collection_stream_page_size=2, group='api')
+        data = self.get_json('/allocations?limit=5', headers=self.headers)
+        self.assertEqual(expected, data)
+        self.assertEqual(5, len(data['allocations']))
+        self.assertIn('next', data)
+
     def test_links(self):
         uuid = uuidutils.generate_uuid()
         obj_utils.create_test_allocation(self.context,
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
 from unittest import mock
 
 from oslo_utils import uuidutils
@@ -100,3 +101,87 @@ class TestCollection(base.TestCase):
             'http://192.0.2.1:5050/v1/foo?limit=3&'
             'marker=%s' % col[-1]['identifier'],
             collection.get_next(col, 3, 'foo', key_field='identifier'))
+
+    def _stream(self, col, limit, page_size, **kwargs):
+        self.config(collection_stream_page_size=page_size, group='api')
+        fetches = []
+
+        def fetch(limit, marker):
+            start = col.index(marker) + 1 if marker else 0
+            fetches.append(limit)
+            return col[start:start + limit]
+
+        result = collection.stream_convert_with_links(
+            fetch, dict, 'things', limit, url='thing', **kwargs)
+        return json.loads(''.join(result.chunks)), fetches
+
+    def test_stream_convert_with_links(self):
+        col = self._generate_collection(10)
+
+        # build with next link, fetching pages of 4 items
+        result, fetches = self._stream(col, 10, 4)
+        self.assertEqual(
+            collection.list_convert_with_links(col, 'things', 10,
+                                               url='thing'),
+            result)
+        self.assertIn('next', result)
+        self.assertEqual([4, 4, 2], fetches)
+
+        # build without next link
+        result, fetches = self._stream(col[:7], 10, 4)
+        self.assertEqual({'things': col[:7]}, result)
+        self.assertEqual([4, 4], fetches)
+
+        # empty collection
+        result, fetches = self._stream([], 10, 4)
+        self.assertEqual({'things': []}, result)
+        self.assertEqual([4], fetches)
+
+    def test_stream_convert_with_links_sanitize(self):
+        col = self._generate_collection(3)
+
+        def sanitize(item, fields):
+            item.pop('uuid')
+
+        # the marker is taken before sanitizing
+        result, _ = self._stream(col, 3, 2, sanitize_func=sanitize)
+        self.assertEqual({
+            'things': [{'name': 'thing-0'}, {'name': 'thing-1'},
+                       {'name': 'thing-2'}],
+            'next': 'http://192.0.2.1:5050/v1/thing?limit=3&'
+                    'marker=%s' % col[2]['uuid']
+        }, result)
+
+    def test_stream_convert_with_links_prefetch(self):
+        col = self._generate_collection(3)
+        self.config(collection_stream_page_size=2, group='api')
+
+        def convert(item, page_names):
+            return dict(item, page=page_names)
+
+        def prefetch(page):
+            return {'page_names': [item['name'] for item in page]}
+
+        result = collection.stream_convert_with_links(
+            lambda limit, marker: col[:limit] if marker is None
+            else col[col.index(marker) + 1:][:limit],
+            convert, 'things', 3, url='thing', prefetch_func=prefetch)
+        self.assertEqual(
+            [['thing-0', 'thing-1'], ['thing-0', 'thing-1'], ['thing-2']],
+            [item['page'] for item in
+             json.loads(''.join(result.chunks))['things']])
+
+    def test_stream_convert_with_links_skip(self):
+        col = self._generate_collection(4)
+        self.config(collection_stream_page_size=2, group='api')
+
+        def convert(item):
+            return None if item['name'] == 'thing-3' else dict(item)
+
+        result = collection.stream_convert_with_links(
+            lambda limit, marker: col[:limit] if marker is None
+            else col[col.index(marker) + 1:][:limit],
+            convert, 'things', 4, url='thing')
+        # fewer items than the limit were returned, no next link
+        self.assertEqual({'things': col[:3]},
+                         json.loads(''.join(result.chunks)))
@@ -13,6 +13,7 @@
 Tests for the API /nodes/ methods.
 """
 
+import collections
 import datetime
 from http import client as http_client
 import json
@@ -40,6 +41,7 @@ from ironic.common import boot_modes
 from ironic.common import components
 from ironic.common import driver_factory
 from ironic.common import exception
+from ironic.common import hash_ring
 from ironic.common import indicator_states
 from ironic.common import policy
 from ironic.common import states
@@ -751,6 +753,14 @@ class TestListNodes(test_api_base.BaseApiTest):
             headers={api_base.Version.string: '1.49'})
         self.assertIn('conductor', response)
 
+    def test_get_collection_conductor_field(self):
+        obj_utils.create_test_node(self.context, chassis_id=self.chassis.id)
+        response = self.get_json(
+            '/nodes?fields=uuid,conductor',
+            headers={api_base.Version.string: '1.49'})
+        self.assertEqual('fake.conductor', response['nodes'][0]['conductor'])
+        self.assertNotIn('driver', response['nodes'][0])
+
     def test_get_owner_fields(self):
         node = obj_utils.create_test_node(self.context, owner='fred')
         fields = 'owner'
@@ -800,6 +810,48 @@ class TestListNodes(test_api_base.BaseApiTest):
         token_value = response['driver_internal_info']['agent_secret_token']
         self.assertEqual('******', token_value)
 
+    @mock.patch.object(objects.Allocation, 'get_by_id', autospec=True)
+    @mock.patch.object(objects.Chassis, 'get_by_id', autospec=True)
+    def _test_detail_related_uuids(self, mock_chassis, mock_allocation):
+        allocation = obj_utils.create_test_allocation(self.context)
+        nodes = [
+            obj_utils.create_test_node(self.context, chassis_id=chassis_id,
+                                       allocation_id=allocation_id,
+                                       uuid=uuidutils.generate_uuid())
+            for chassis_id, allocation_id in ((self.chassis.id, None),
+                                              (None, allocation.id),
+                                              (self.chassis.id, None))]
+        with mock.patch.object(self.dbapi, 'get_uuids_by_ids',
+                               autospec=True,
+                               side_effect=self.dbapi.get_uuids_by_ids
+                               ) as mock_get_uuids:
+            data = self.get_json(
+                '/nodes/detail',
+                headers={api_base.Version.string: str(api_v1.max_version())})
+        result = {node['uuid']: (node['chassis_uuid'],
+                                 node['allocation_uuid'])
+                  for node in data['nodes']}
+        self.assertEqual({nodes[0].uuid: (self.chassis.uuid, None),
+                          nodes[1].uuid: (None, allocation.uuid),
+                          nodes[2].uuid: (self.chassis.uuid, None)},
+                         result)
+        mock_chassis.assert_not_called()
+        mock_allocation.assert_not_called()
+        return mock_get_uuids
+
+    def test_detail_related_uuids(self):
+        mock_get_uuids = self._test_detail_related_uuids()
+        mock_get_uuids.assert_has_calls([
+            mock.call('chassis', {self.chassis.id}),
+            mock.call('allocations', mock.ANY)])
+        self.assertEqual(2, mock_get_uuids.call_count)
+
+    def test_detail_related_uuids_stream(self):
+        self.config(collection_stream_page_size=2, group='api')
+        mock_get_uuids = self._test_detail_related_uuids()
+        # Two pages, one with an allocation
+        self.assertEqual(3, mock_get_uuids.call_count)
+
     def test_detail(self):
         node = obj_utils.create_test_node(self.context,
                                           chassis_id=self.chassis.id)
@@ -1136,6 +1188,88 @@ class TestListNodes(test_api_base.BaseApiTest):
         uuids = [n['uuid'] for n in data['nodes']]
         self.assertEqual(sorted(nodes), sorted(uuids))
 
+    @mock.patch.object(policy, 'check_policy', autospec=True)
+    def test_list_policy_decisions_cached(self, mock_check_policy):
+        # 1000 nodes spread over a few owners and lessees, listed by a
+        # project scoped reader against the default RBAC policies.
+        mock_check_policy.return_value = False
+        owners = ['12345', '54321', 'abcde', None]
+        lessees = ['12345', '67890', None]
+        for i in range(1000):
+            obj_utils.create_test_node(self.context,
+                                       uuid=uuidutils.generate_uuid(),
+                                       owner=owners[i % len(owners)],
+                                       lessee=lessees[i % len(lessees)],
+                                       last_error='meow',
+                                       reservation='fake-host')
+        headers = {api_base.Version.string: str(api_v1.max_version()),
+                   'X-Project-Id': '12345',
+                   'X-Roles': 'reader'}
+        url = ('/nodes?fields=uuid,owner,lessee,last_error,reservation,'
+               'driver_info,driver_internal_info')
+        real_check = policy.check
+
+        def _uncached_check(cache, rule, target):
+            return real_check(rule, target, cache.creds)
+
+        with mock.patch.object(policy.NodeDecisionCache, 'check',
+                               autospec=True,
+                               side_effect=_uncached_check):
+            uncached = self.get_json(url, headers=headers)
+
+        with mock.patch.object(policy, 'check', autospec=True,
+                               side_effect=real_check) as mock_check:
+            cached = self.get_json(url, headers=headers)
+
+        self.assertEqual(1000, len(cached['nodes']))
+        self.assertEqual(uncached, cached)
+        rules = collections.Counter(c[0][0] for c in mock_check.call_args_list)
+        # Only the 12 owner and lessee combinations are evaluated.
+        for rule in ('baremetal:node:get:last_error',
+                     'baremetal:node:get:reservation',
+                     'baremetal:node:get:driver_internal_info',
+                     'baremetal:node:get:driver_info'):
+            self.assertEqual(12, rules[rule])
+        for node in cached['nodes']:
+            if node['owner'] == '12345':
+                self.assertEqual('meow', node['last_error'])
+                self.assertEqual('fake-host', node['reservation'])
+            else:
+                self.assertEqual('** Value Redacted - Requires '
+                                 'baremetal:node:get:last_error '
+                                 'permission. **', node['last_error'])
+
+    def _test_streamed(self, url):
+        for i in range(5):
+            obj_utils.create_test_node(self.context,
+                                       uuid=uuidutils.generate_uuid(),
+                                       name='node-%d' % (4 - i),
+                                       properties={'cpus': i})
+        headers = {api_base.Version.string: str(api_v1.max_version())}
+        expected = self.get_json(url, headers=headers)
+        self.config(collection_stream_page_size=2, group='api')
+        with mock.patch.object(objects.Node, 'list', autospec=True,
+                               side_effect=objects.Node.list) as mock_list:
+            response = self.get_json(url, headers=headers,
+                                     expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertEqual(expected, response.json)
+        self.assertEqual([2, 2], [c[0][1] for c in mock_list.call_args_list])
+        return response.json
+
+    def test_detail_streamed(self):
+        data = self._test_streamed('/nodes/detail?limit=4')
+        self.assertEqual(4, len(data['nodes']))
+        self.assertIn('properties', data['nodes'][0])
+        self.assertIn('next', data)
+
+    def test_list_streamed_fields_sort_key(self):
+        data = self._test_streamed(
+            '/nodes?fields=uuid,properties&sort_key=name&limit=4')
+        self.assertEqual([{'cpus': 4}, {'cpus': 3}, {'cpus': 2}, {'cpus': 1}],
+                         [n['properties'] for n in data['nodes']])
+        self.assertIn('sort_key=name', data['next'])
+
     def test_mask_available_state(self):
         node = obj_utils.create_test_node(self.context,
                                           provision_state=states.AVAILABLE)
@@ -2252,7 +2386,10 @@ class TestListNodes(test_api_base.BaseApiTest):
         self.assertEqual(http_client.NOT_ACCEPTABLE, response.status_code)
         self.assertTrue(response.json['error_message'])
 
-    def test_get_nodes_by_conductor(self):
+    @mock.patch.object(hash_ring.HashRingManager, 'get_host_rings',
+                       autospec=True)
+    def test_get_nodes_by_conductor(self, mock_rings):
+        mock_rings.return_value = [(None, ['fake-hardware'], None)]
         node1 = obj_utils.create_test_node(self.context,
                                            uuid=uuidutils.generate_uuid())
         node2 = obj_utils.create_test_node(self.context,
@@ -2262,6 +2399,7 @@ class TestListNodes(test_api_base.BaseApiTest):
                                  headers={api_base.Version.string: "1.49"})
         uuids = [n['uuid'] for n in response['nodes']]
         self.assertFalse(uuids)
+        mock_rings.assert_called_with(mock.ANY, 'rocky.rocks')
 
         response = self.get_json('/nodes?conductor=fake.conductor',
                                  headers={api_base.Version.string: "1.49"})
@@ -2279,7 +2417,78 @@ class TestListNodes(test_api_base.BaseApiTest):
         self.assertNotIn(node1.uuid, uuids)
         self.assertIn(node2.uuid, uuids)
 
-    def test_get_nodes_by_conductor_no_valid_host(self):
+    @mock.patch.object(hash_ring.HashRingManager, 'get_host_rings',
+                       autospec=True)
+    def test_get_nodes_by_conductor_hash_ring(self, mock_rings):
+        node = obj_utils.create_test_node(self.context,
+                                          uuid=uuidutils.generate_uuid())
+        partition = hash_ring.get_hash_partition(node.uuid)
+        obj_utils.create_test_node(self.context,
+                                   uuid=uuidutils.generate_uuid(),
+                                   driver='manual-management')
+        obj_utils.create_test_node(self.context,
+                                   uuid=uuidutils.generate_uuid(),
+                                   conductor_group='other')
+
+        mock_rings.return_value = [('', ['fake-hardware', 'other'],
+                                    [(partition, partition)])]
+        with mock.patch.object(objects.Node, 'list', autospec=True,
+                               side_effect=objects.Node.list) as mock_list:
+            response = self.get_json('/nodes?conductor=fake.conductor',
+                                     headers={api_base.Version.string: "1.49"})
+        self.assertEqual([node.uuid], [n['uuid'] for n in response['nodes']])
+        mock_list.assert_called_once_with(
+            mock.ANY, 1000, None, sort_key='id', sort_dir='asc',
+            filters={'hash_ring_ranges': mock_rings.return_value},
+            fields=mock.ANY)
+
+        # Not an online conductor
+        mock_rings.return_value = []
+        self.mock_get_conductor_for.reset_mock()
+        response = self.get_json('/nodes?conductor=fake.conductor',
+                                 headers={api_base.Version.string: "1.49"})
+        self.assertEqual([], response['nodes'])
+        self.assertFalse(self.mock_get_conductor_for.called)
+
+    def _test_get_nodes_by_conductor_paginated(self):
+        nodes = [obj_utils.create_test_node(self.context,
+                                            uuid=uuidutils.generate_uuid())
+                 for _ in range(5)]
+        # The first and fourth nodes are mapped to a neighbour
+        self.mock_get_conductor_for.side_effect = lambda _, node: (
+            'other.conductor' if node.uuid in (nodes[0].uuid, nodes[3].uuid)
+            else 'fake.conductor')
+        headers = {api_base.Version.string: str(api_v1.max_version())}
+        with mock.patch.object(hash_ring.HashRingManager, 'get_host_rings',
+                               autospec=True,
+                               return_value=[(None, ['fake-hardware'],
+                                              None)]):
+            data = self.get_json(
+                '/nodes?conductor=fake.conductor&fields=uuid,name&limit=2',
+                headers=headers)
+            next_data = self.get_json(
+                '/nodes?conductor=fake.conductor&fields=uuid,name&limit=2'
+                '&marker=%s' % data['nodes'][-1]['uuid'], headers=headers)
+        self.assertEqual([nodes[1].uuid, nodes[2].uuid],
+                         [n['uuid'] for n in data['nodes']])
+        self.assertEqual({'uuid', 'name', 'links'}, set(data['nodes'][0]))
+        self.assertIn('marker=%s' % nodes[2].uuid, data['next'])
+        self.assertIn('conductor=fake.conductor', data['next'])
+        self.assertEqual([nodes[4].uuid],
+                         [n['uuid'] for n in next_data['nodes']])
+        self.assertNotIn('next', next_data)
+
+    def test_get_nodes_by_conductor_paginated(self):
+        self._test_get_nodes_by_conductor_paginated()
+
+    def test_get_nodes_by_conductor_paginated_stream(self):
+        self.config(collection_stream_page_size=2, group='api')
+        self._test_get_nodes_by_conductor_paginated()
+
+    @mock.patch.object(hash_ring.HashRingManager, 'get_host_rings',
+                       autospec=True)
+    def test_get_nodes_by_conductor_no_valid_host(self, mock_rings):
+        mock_rings.return_value = [(None, ['fake-hardware'], None)]
         obj_utils.create_test_node(self.context,
                                    uuid=uuidutils.generate_uuid())
 
@@ -7890,6 +8099,14 @@ class TestNodeHistory(test_api_base.BaseApiTest):
                 self.assertNotIn(field, entries[entry])
             self.assertIn('severity', entries[entry])
 
+    def test_get_all_history_streamed(self):
+        self._add_history_entries()
+        url = '/nodes/%s/history?detail=true' % self.node.uuid
+        headers = {api_base.Version.string: self.version}
+        expected = self.get_json(url, headers=headers)
+        self.config(collection_stream_page_size=2, group='api')
+        self.assertEqual(expected, self.get_json(url, headers=headers))
+
     def test_get_all_history_returns_detail(self):
         self._add_history_entries()
         ret = self.get_json('/nodes/%s/history?detail=true' % self.node.uuid,
@@ -488,6 +488,36 @@ class TestListPorts(test_api_base.BaseApiTest):
         # regardless of which fields are specified.
         self.assertCountEqual(['uuid', 'is_smartnic', 'links'], response)
 
+    @mock.patch.object(objects.Portgroup, 'get', autospec=True)
+    def test_detail_portgroup_uuids(self, mock_get_portgroup):
+        portgroups = [
+            obj_utils.create_test_portgroup(
+                self.context, node_id=self.node.id,
+                uuid=uuidutils.generate_uuid(), name='pg%d' % i,
+                address='52:54:00:cf:2d:4%d' % i)
+            for i in range(2)]
+        ports = {}
+        for i, portgroup in enumerate(portgroups + portgroups + [None]):
+            port = obj_utils.create_test_port(
+                self.context, node_id=self.node.id,
+                portgroup_id=portgroup.id if portgroup else None,
+                uuid=uuidutils.generate_uuid(),
+                address='52:54:00:cf:2d:3%d' % i)
+            ports[port.uuid] = portgroup.uuid if portgroup else None
+        with mock.patch.object(self.dbapi, 'get_uuids_by_ids',
+                               autospec=True,
+                               side_effect=self.dbapi.get_uuids_by_ids
+                               ) as mock_get_uuids:
+            data = self.get_json(
+                '/ports/detail',
+                headers={api_base.Version.string: str(api_v1.max_version())}
+            )
+        self.assertEqual(ports, {port['uuid']: port['portgroup_uuid']
+                                 for port in data['ports']})
+        mock_get_uuids.assert_called_once_with(
+            'portgroups', {portgroup.id for portgroup in portgroups})
+        mock_get_portgroup.assert_not_called()
+
     def test_detail(self):
         llc = {'switch_info': 'switch', 'switch_id': 'aa:bb:cc:dd:ee:ff',
                'port_id': 'Gig0/1'}
@@ -604,6 +634,19 @@ class TestListPorts(test_api_base.BaseApiTest):
         uuids = [n['uuid'] for n in data['ports']]
         self.assertCountEqual(ports, uuids)
 
+    def test_many_streamed(self):
+        for id_ in range(5):
+            obj_utils.create_test_port(
+                self.context, node_id=self.node.id,
+                uuid=uuidutils.generate_uuid(),
+                address='52:54:00:cf:2d:3%s' % id_)
+        expected = self.get_json('/ports/detail?limit=4')
+        self.config(collection_stream_page_size=3, group='api')
+        data = self.get_json('/ports/detail?limit=4')
+        self.assertEqual(expected, data)
+        self.assertEqual(4, len(data['ports']))
+        self.assertIn('next', data)
+
     @mock.patch.object(policy, 'authorize', spec=True)
     def test_many_non_admin(self, mock_authorize):
         def mock_authorize_function(rule, target, creds):
@@ -25,6 +25,7 @@ from oslo_utils import uuidutils
 from ironic import api
 from ironic.api.controllers.v1 import node as api_node
 from ironic.api.controllers.v1 import utils
+from ironic.api.controllers.v1 import versions
 from ironic.common import context as ironic_context
 from ironic.common import exception
 from ironic.common import policy
@@ -890,25 +891,6 @@ class TestNodeIdent(base.TestCase):
                           utils.get_rpc_node,
                           self.valid_name)
 
-    @mock.patch.object(objects.Node, 'get_by_id', autospec=True)
-    def test_populate_node_uuid(self, mock_gbi, mock_pr):
-        port = obj_utils.get_test_port(self.context)
-        node = obj_utils.get_test_node(self.context, id=port.node_id)
-        mock_gbi.return_value = node
-
-        # successful lookup
-        d = {}
-        utils.populate_node_uuid(port, d)
-        self.assertEqual({
-            'node_uuid': '1be26c0b-03f2-4d2e-ae87-c02d7f33c123'
-        }, d)
-
-        # not found, raise exception
-        mock_gbi.side_effect = exception.NodeNotFound(node=port.node_id)
-        d = {}
-        self.assertRaises(exception.NodeNotFound,
-                          utils.populate_node_uuid, port, d)
-
     @mock.patch.object(utils, 'check_owner_policy', autospec=True)
     @mock.patch.object(objects.Node, 'get_by_uuid', autospec=True)
     def test_replace_node_uuid_with_id(self, mock_gbu, mock_check, mock_pr):
@@ -950,6 +932,109 @@ class TestNodeIdent(base.TestCase):
         self.assertEqual(400, e.code)
 
 
+@mock.patch.object(api, 'request', spec_set=['context', 'dbapi'])
+class TestRelatedUUIDs(base.TestCase):
+
+    def test_populate_node_uuid(self, mock_pr):
+        port = obj_utils.get_test_port(self.context)
+        mock_pr.dbapi.get_uuids_by_ids.return_value = {
+            port.node_id: '1be26c0b-03f2-4d2e-ae87-c02d7f33c123'}
+
+        # successful lookup
+        d = {}
+        utils.populate_node_uuid(port, d)
+        self.assertEqual({
+            'node_uuid': '1be26c0b-03f2-4d2e-ae87-c02d7f33c123'
+        }, d)
+        mock_pr.dbapi.get_uuids_by_ids.assert_called_once_with(
+            'nodes', [port.node_id])
+
+        # not found, raise exception
+        mock_pr.dbapi.get_uuids_by_ids.return_value = {}
+        d = {}
+        self.assertRaises(exception.NodeNotFound,
+                          utils.populate_node_uuid, port, d)
+
+    def test_populate_node_uuid_known(self, mock_pr):
+        port = obj_utils.get_test_port(self.context)
+        d = {}
+        utils.populate_node_uuid(port, d, {port.node_id: 'uuid'})
+        self.assertEqual({'node_uuid': 'uuid'}, d)
+        self.assertRaises(exception.NodeNotFound,
+                          utils.populate_node_uuid, port, d, {})
+        mock_pr.dbapi.get_uuids_by_ids.assert_not_called()
+
+    def test_get_related_uuids(self, mock_pr):
+        nodes = [obj_utils.get_test_node(self.context, id=1, chassis_id=1,
+                                         allocation_id=None),
+                 obj_utils.get_test_node(self.context, id=2, chassis_id=1,
+                                         allocation_id=2)]
+        mock_pr.dbapi.get_uuids_by_ids.side_effect = [
+            {1: 'chassis-uuid'}, {2: 'allocation-uuid'}]
+
+        self.assertEqual(
+            {'chassis_id': {1: 'chassis-uuid'},
+             'allocation_id': {2: 'allocation-uuid'}},
+            utils.get_related_uuids(nodes, chassis_id='chassis',
+                                    allocation_id='allocations'))
+        mock_pr.dbapi.get_uuids_by_ids.assert_has_calls([
+            mock.call('chassis', {1}), mock.call('allocations', {2})])
+
+
+@mock.patch.object(api, 'request', spec_set=['version', 'features'])
+class TestRequestFeatures(base.TestCase):
+
+    def test_features(self, mock_request):
+        for minor in range(versions.MINOR_1_INITIAL_VERSION,
+                           versions.MINOR_MAX_VERSION + 1):
+            mock_request.version.minor = minor
+            features = utils.RequestFeatures(mock_request.version)
+            self.assertEqual(
+                utils.allow_links_node_states_and_driver_properties(),
+                features.links_node_states_and_driver_properties)
+            self.assertEqual(utils.allow_port_internal_info(),
+                             features.port_internal_info)
+            self.assertEqual(utils.allow_port_advanced_net_fields(),
+                             features.port_advanced_net_fields)
+            self.assertEqual(utils.allow_portgroups_subcontrollers(),
+                             features.portgroups_subcontrollers)
+            self.assertEqual(utils.allow_volume(), features.volume)
+            self.assertEqual(utils.allow_inspect_wait_state(),
+                             features.inspect_wait_state)
+            self.assertEqual(utils.allow_expose_conductors(),
+                             features.expose_conductors)
+            self.assertEqual(utils.allow_allocations(), features.allocations)
+            self.assertEqual(utils.allow_port_physical_network(),
+                             features.port_physical_network)
+            self.assertEqual(utils.allow_port_is_smartnic(),
+                             features.port_is_smartnic)
+            self.assertEqual(list(utils.disallowed_fields()),
+                             list(features.disallowed_fields))
+
+    @mock.patch.object(objects.Port, 'supports_physical_network',
+                       autospec=True)
+    def test_port_physical_network_lazy(self, mock_spn, mock_request):
+        mock_request.version.minor = versions.MINOR_34_PORT_PHYSICAL_NETWORK
+        mock_spn.return_value = False
+        features = utils.RequestFeatures(mock_request.version)
+        mock_spn.assert_not_called()
+        self.assertFalse(features.port_physical_network)
+        self.assertFalse(features.port_physical_network)
+        mock_spn.assert_called_once_with()
+
+    def test_get_request_features(self, mock_request):
+        mock_request.version.minor = versions.MINOR_MAX_VERSION
+        mock_request.features = utils.RequestFeatures(mock_request.version)
+        self.assertIs(mock_request.features, utils.get_request_features())
+
+    def test_get_request_features_not_set(self, mock_request):
+        mock_request.version.minor = versions.MINOR_31_DYNAMIC_INTERFACES
+        mock_request.features = None
+        features = utils.get_request_features()
+        self.assertFalse(features.volume)
+        self.assertIn('conductor', features.disallowed_fields)
+
+
 class TestVendorPassthru(base.TestCase):
 
     def test_method_not_specified(self):
@@ -20,13 +20,17 @@ from unittest import mock
 
 from oslo_config import cfg
 import oslo_messaging as messaging
+from oslo_utils import uuidutils
 
+from ironic.api.controllers import base as api_base
 from ironic.api.controllers import root
+from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api import hooks
 from ironic.common import context
 from ironic.common import policy
 from ironic.tests import base as tests_base
 from ironic.tests.unit.api import base
+from ironic.tests.unit.objects import utils as obj_utils
 
 
 class FakeRequest(object):
@@ -291,3 +295,32 @@ class TestPublicUrlHook(base.BaseApiTest):
         trusted_call_hook = hooks.PublicUrlHook()
         trusted_call_hook.before(reqstate)
         self.assertEqual('http://foo', reqstate.request.public_url)
+
+
+class TestFeaturesHook(base.BaseApiTest):
+
+    def test_before(self):
+        reqstate = FakeRequestState(headers=fake_headers())
+        reqstate.request.version = api_base.Version(
+            {api_base.Version.string: '1.32'}, '1.1', '1.82')
+        hooks.FeaturesHook().before(reqstate)
+        self.assertIsInstance(reqstate.request.features,
+                              api_utils.RequestFeatures)
+        self.assertTrue(reqstate.request.features.volume)
+        self.assertFalse(reqstate.request.features.allocations)
+
+    def test_before_no_version(self):
+        reqstate = FakeRequestState(headers=fake_headers())
+        del reqstate.request.version
+        hooks.FeaturesHook().before(reqstate)
+        self.assertFalse(hasattr(reqstate.request, 'features'))
+
+    @mock.patch.object(api_utils.RequestFeatures, '__init__', autospec=True,
+                       side_effect=api_utils.RequestFeatures.__init__)
+    def test_features_once_per_request(self, mock_init):
+        for i in range(3):
+            obj_utils.create_test_node(self.context,
+                                       uuid=uuidutils.generate_uuid())
+        data = self.get_json('/nodes/detail')
+        self.assertEqual(3, len(data['nodes']))
+        mock_init.assert_called_once_with(mock.ANY, mock.ANY)
@@ -33,6 +33,7 @@ class MyThingController(pecan.rest.RestController):
         'response_content': ['GET'],
         'response_custom_status': ['GET'],
         'ouch': ['GET'],
+        'streamed': ['GET'],
     }
 
     @method.expose()
@@ -59,6 +60,16 @@ class MyThingController(pecan.rest.RestController):
     def ouch(self):
         raise Exception('ouch')
 
+    @method.expose()
+    def streamed(self):
+        def _chunks():
+            yield '['
+            for i in range(3):
+                # The request is still available while streaming
+                yield '%s, "%s", ' % (i, api.request.method)
+            yield '3]'
+        return method.StreamingResult(_chunks())
+
     @method.expose(status_code=201)
     @method.body('body')
     @args.validate(body=args.schema({
@@ -138,6 +149,12 @@ class TestExpose(test_api_base.BaseApiTest):
         self.assertEqual('Server', error_message['faultcode'])
         self.assertEqual('ouch', error_message['faultstring'])
 
+    def test_response_streamed(self):
+        response = self.get_json('/things/streamed', expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertEqual('application/json', response.content_type)
+        self.assertEqual([0, 'GET', 1, 'GET', 2, 'GET', 3], response.json)
+
     def test_post_body(self):
         data = {
             'three': 'three',
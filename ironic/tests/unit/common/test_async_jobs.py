@@ -0,0 +1,61 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+from unittest import mock
+
+from ironic.common import async_jobs
+from ironic.db import api as dbapi
+from ironic.tests import base
+
+
+@mock.patch.object(async_jobs, '_index_ready', False)
+@mock.patch.object(dbapi, 'get_instance', autospec=True)
+class NodeFiltersTestCase(base.TestCase):
+
+    def setUp(self):
+        super(NodeFiltersTestCase, self).setUp()
+        self.filters = async_jobs.node_filters(
+            [async_jobs.FIRMWARE_UPDATES], reserved=False)
+
+    def test_index_ready(self, mock_dbapi):
+        mock_check = mock_dbapi.return_value.check_node_async_jobs_backfilled
+        mock_check.return_value = True
+        expected = {'reserved': False,
+                    'async_job_in': [async_jobs.FIRMWARE_UPDATES]}
+        self.assertEqual(expected, self.filters())
+        self.assertEqual(expected, self.filters())
+        # Only checked until the index is ready
+        mock_check.assert_called_once_with()
+
+    def test_not_backfilled(self, mock_dbapi):
+        mock_check = mock_dbapi.return_value.check_node_async_jobs_backfilled
+        mock_check.return_value = False
+        self.assertEqual({'reserved': False}, self.filters())
+        self.assertEqual({'reserved': False}, self.filters())
+        self.assertEqual(2, mock_check.call_count)
+
+    def test_pinned(self, mock_dbapi):
+        self.config(pin_release_version='2023.1')
+        self.assertEqual({'reserved': False}, self.filters())
+        mock_dbapi.assert_not_called()
+
+
+class HasJobsTestCase(base.TestCase):
+
+    def test_has_jobs(self):
+        node_type = collections.namedtuple('Node', ['driver_internal_info'])
+        predicate = async_jobs.has_jobs([async_jobs.RAID_CONFIG_JOB_IDS,
+                                         async_jobs.BIOS_CONFIG_JOB_IDS])
+        self.assertTrue(predicate(node_type({'bios_config_job_ids': ['1']})))
+        self.assertFalse(predicate(node_type({'bios_config_job_ids': []})))
+        self.assertFalse(predicate(node_type({'firmware_updates': ['x']})))
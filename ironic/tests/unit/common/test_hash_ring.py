@@ -13,9 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import time
+from unittest import mock
 
 from oslo_config import cfg
+from oslo_utils import uuidutils
 
 from ironic.common import exception
 from ironic.common import hash_ring
@@ -134,6 +137,90 @@ class HashRingManagerTestCase(db_base.DbTestCase):
         ring = self.ring_manager.get_ring('hardware-type', '')
         self.assertEqual(2, len(ring))
 
+    def _expire_rings(self):
+        self.ring_manager.__class__._hash_rings = (
+            self.ring_manager.__class__._hash_rings[0],
+            time.time() - CONF.hash_ring_reset_interval - 1
+        )
+
+    def test_hash_ring_manager_reuses_unchanged_rings(self):
+        self.register_conductors()
+        rings = self.ring_manager.ring
+        self._expire_rings()
+        new_rings = self.ring_manager.ring
+        self.assertEqual(set(rings), set(new_rings))
+        for key, ring in rings.items():
+            self.assertIs(ring, new_rings[key])
+
+    def test_hash_ring_manager_updates_changed_rings(self):
+        self.register_conductors()
+        ring = self.ring_manager.get_ring('hardware-type', '')
+        nodes = set(ring.nodes)
+        self.dbapi.unregister_conductor('host2')
+        c6 = self.dbapi.register_conductor({
+            'hostname': 'host6',
+            'drivers': ['driver1'],
+        })
+        self.dbapi.register_conductor_hardware_interfaces(
+            c6.id,
+            [{'hardware_type': 'hardware-type', 'interface_type': 'deploy',
+              'interface_name': 'ansible', 'default': True}]
+        )
+        self._expire_rings()
+
+        new_ring = self.ring_manager.get_ring('hardware-type', '')
+        self.assertIsNot(ring, new_ring)
+        # The previous ring is left intact for its current users
+        self.assertEqual(nodes, set(ring.nodes))
+        self.assertEqual(nodes - {'host2'} | {'host6'}, set(new_ring.nodes))
+
+        hash_ring.HashRingManager.reset()
+        fresh_ring = self.ring_manager.get_ring('hardware-type', '')
+        self.assertEqual(set(fresh_ring.nodes), set(new_ring.nodes))
+        for uuid in ('node-%d' % i for i in range(64)):
+            self.assertEqual(fresh_ring.get_nodes(uuid.encode()),
+                             new_ring.get_nodes(uuid.encode()))
+
+    @mock.patch.object(hash_ring.METRICS, 'send_counter', autospec=True)
+    def test_hash_ring_manager_metrics(self, mock_counter):
+        self.register_conductors()
+        rings = self.ring_manager.ring
+        mock_counter.assert_has_calls([
+            mock.call('HashRingManager.RingsBuilt', len(rings)),
+            mock.call('HashRingManager.RingsUpdated', 0),
+            mock.call('HashRingManager.RingsRemoved', 0)])
+
+    def test_hash_ring_manager_retry_coalesced(self):
+        self.register_conductors()
+        self.ring_manager.get_ring('hardware-type', '')
+        seen = hash_ring.HashRingManager._hash_rings
+
+        def _refreshed_by_another_thread(*args, **kwargs):
+            if mock_get_ring.call_count > 1:
+                return mock.sentinel.ring
+            # Simulate another thread refreshing the rings after the miss
+            hash_ring.HashRingManager._hash_rings = (seen[0], seen[1] + 1)
+            raise exception.DriverNotFound(driver_name='driver3')
+
+        with mock.patch.object(self.ring_manager, '_get_ring',
+                               autospec=True) as mock_get_ring, \
+                mock.patch.object(self.ring_manager, '_load_hash_rings',
+                                  autospec=True) as mock_load:
+            mock_get_ring.side_effect = [
+                exception.DriverNotFound(driver_name='driver3'),
+                mock.sentinel.ring]
+            self.assertEqual(mock.sentinel.ring,
+                             self.ring_manager.get_ring('driver3', ''))
+            # Nobody else refreshed the rings, so this thread does
+            mock_load.assert_called_once_with(seen[0])
+
+            mock_load.reset_mock()
+            mock_get_ring.reset_mock()
+            mock_get_ring.side_effect = _refreshed_by_another_thread
+            self.assertEqual(mock.sentinel.ring,
+                             self.ring_manager.get_ring('driver3', ''))
+            self.assertFalse(mock_load.called)
+
     def test_hash_ring_manager_uncached(self):
         ring_mgr = hash_ring.HashRingManager(cache=False,
                                              use_groups=self.use_groups)
@@ -141,6 +228,99 @@ class HashRingManagerTestCase(db_base.DbTestCase):
         self.assertIsNotNone(ring)
         self.assertEqual((None, 0), hash_ring.HashRingManager._hash_rings)
 
+    def test_get_hash_ring_ranges(self):
+        self.register_conductors()
+        ring = self.ring_manager.get_ring('hardware-type', '')
+        ranges = {}
+        for host in ring.nodes:
+            (group, drivers, ranges[host]), = (
+                self.ring_manager.get_hash_ring_ranges(host))
+            self.assertEqual(None if not self.use_groups else '', group)
+            self.assertEqual(['hardware-type'], drivers)
+            self.assertEqual(sorted(ranges[host]), ranges[host])
+            self.assertLess(
+                sum(last - first + 1 for first, last in ranges[host]),
+                hash_ring.MAX_HASH_PARTITION)
+        for _ in range(1000):
+            node_uuid = uuidutils.generate_uuid()
+            host, = ring.get_nodes(node_uuid.encode('utf-8'))
+            partition = hash_ring.get_hash_partition(node_uuid)
+            self.assertTrue(any(first <= partition <= last
+                                for first, last in ranges[host]))
+
+    def test_get_ring_points(self):
+        # NOTE: tooz does not expose the points of its hash rings, make sure
+        # they are computed the same way.
+        self.register_conductors()
+        ring = self.ring_manager.get_ring('hardware-type', '')
+        self.assertEqual(
+            sorted(ring._ring.items()),
+            hash_ring._get_ring_points(
+                ring.nodes, 2 ** CONF.hash_partition_exponent,
+                CONF.hash_ring_algorithm))
+
+    def test_get_hash_ring_ranges_single_conductor(self):
+        self.dbapi.register_conductor_hardware_interfaces(
+            self.dbapi.register_conductor({'hostname': 'host1',
+                                           'drivers': []}).id,
+            [{'hardware_type': 'hardware-type', 'interface_type': 'deploy',
+              'interface_name': 'direct', 'default': True}])
+        self.assertIsNone(self.ring_manager.get_hash_ring_ranges('host1'))
+
+    def test_get_hash_ring_ranges_only_conductor_of_driver(self):
+        self.register_conductors()
+        c6 = self.dbapi.register_conductor({'hostname': 'host6',
+                                            'drivers': []})
+        self.dbapi.register_conductor_hardware_interfaces(
+            c6.id,
+            [{'hardware_type': 'hardware-type', 'interface_type': 'deploy',
+              'interface_name': 'direct', 'default': True},
+             {'hardware_type': 'other-type', 'interface_type': 'deploy',
+              'interface_name': 'direct', 'default': True}])
+        group = '' if self.use_groups else None
+        (group1, drivers1, ranges1), (group2, drivers2, ranges2) = sorted(
+            self.ring_manager.get_hash_ring_ranges('host6'),
+            key=lambda item: item[1])
+        self.assertEqual((group, ['hardware-type']), (group1, drivers1))
+        self.assertIsNotNone(ranges1)
+        self.assertEqual((group, ['other-type'], None),
+                         (group2, drivers2, ranges2))
+
+    def test_get_hash_ring_ranges_unknown_host(self):
+        self.register_conductors()
+        self.assertIsNone(self.ring_manager.get_hash_ring_ranges('foo'))
+
+    def test_get_host_rings_single_conductor(self):
+        self.dbapi.register_conductor_hardware_interfaces(
+            self.dbapi.register_conductor({'hostname': 'host1',
+                                           'drivers': []}).id,
+            [{'hardware_type': 'hardware-type', 'interface_type': 'deploy',
+              'interface_name': 'direct', 'default': True}])
+        group = '' if self.use_groups else None
+        self.assertEqual([(group, ['hardware-type'], None)],
+                         self.ring_manager.get_host_rings('host1'))
+
+    def test_get_host_rings_unknown_host(self):
+        self.register_conductors()
+        self.assertEqual([], self.ring_manager.get_host_rings('foo'))
+
+
+class HashPartitionTestCase(db_base.DbTestCase):
+
+    def test_get_hash_partition(self):
+        node_uuid = uuidutils.generate_uuid()
+        expected = int(hashlib.md5(node_uuid.encode()).hexdigest(), 16) >> 112
+        self.assertEqual(expected, hash_ring.get_hash_partition(node_uuid))
+
+    def test_get_hash_partition_algorithm(self):
+        CONF.set_override('hash_ring_algorithm', 'sha256')
+        node_uuid = uuidutils.generate_uuid()
+        expected = (int(hashlib.sha256(node_uuid.encode()).hexdigest(), 16)
+                    >> 240)
+        self.assertEqual(expected, hash_ring.get_hash_partition(node_uuid))
+        self.assertEqual(expected,
+                         hash_ring.get_hash_partition(node_uuid, 'sha256'))
+
 
 class HashRingManagerWithGroupsTestCase(HashRingManagerTestCase):
 
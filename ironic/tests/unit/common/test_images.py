@@ -17,13 +17,19 @@
 
 import builtins
 import io
+import itertools
 import os
 import shutil
+import time
 from unittest import mock
 
+import eventlet
+import fixtures
 from ironic_lib import disk_utils
 from oslo_concurrency import processutils
 from oslo_config import cfg
+from oslo_utils import units
+import pycdlib
 
 from ironic.common import exception
 from ironic.common.glance_service import service_utils as glance_utils
@@ -154,6 +160,40 @@ class IronicImagesTestCase(base.TestCase):
         qemu_img_info_mock.assert_called_once_with('path_tmp')
         rename_mock.assert_called_once_with('path_tmp', 'path')
 
+    @mock.patch.object(utils, 'is_memory_insufficient', autospec=True)
+    @mock.patch.object(images._conversion_admission, 'reserve',
+                       autospec=True)
+    @mock.patch.object(os, 'rename', autospec=True)
+    @mock.patch.object(os, 'unlink', autospec=True)
+    @mock.patch.object(disk_utils, 'convert_image', autospec=True)
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
+    def test_image_to_raw_admission(self, qemu_img_info_mock,
+                                    convert_image_mock, unlink_mock,
+                                    rename_mock, reserve_mock, memory_mock):
+        self.config(image_conversion_memory_budget=4096,
+                    image_conversion_memory_estimate=512)
+        info = self.FakeImgInfo()
+        info.file_format = 'fmt'
+        info.backing_file = None
+        info.disk_size = 1024 * 1024 * 1024
+        info.virtual_size = 10 * 1024 * 1024 * 1024
+        qemu_img_info_mock.return_value = info
+
+        def convert_side_effect(source, dest, out_format):
+            reserve_mock.return_value.__enter__.assert_called_once_with()
+            info.file_format = 'raw'
+        convert_image_mock.side_effect = convert_side_effect
+
+        images.image_to_raw('image_href', '/dir/path', 'path_tmp')
+
+        reserve_mock.assert_called_once_with(
+            512 * 1024 * 1024, 2 * 1024 * 1024 * 1024, '/dir')
+        reserve_mock.return_value.__exit__.assert_called_once_with(
+            None, None, None)
+        memory_mock.assert_not_called()
+        rename_mock.assert_called_once_with('/dir/path.converted',
+                                            '/dir/path')
+
     @mock.patch.object(image_service, 'get_image_service', autospec=True)
     def test_image_show_no_image_service(self, image_service_mock):
         images.image_show('context', 'image_href')
@@ -1019,3 +1059,233 @@ class FsImageTestCase(base.TestCase):
 
         glance_service_mock.show.assert_called_once_with('glance_uuid')
         self.assertEqual('temp-url', temp_url)
+
+
+class BootIsoOverlayTestCase(base.TestCase):
+
+    def setUp(self):
+        super(BootIsoOverlayTestCase, self).setUp()
+        self.tmpdir = self.useFixture(fixtures.TempDir()).path
+        self.kernel = self._write('kernel', b'KERNEL')
+        self.ramdisk = self._write('ramdisk', b'RAMDISK' * 1000)
+        self.esp_image = self._write('esp', b'ESP' * 1000)
+
+    def _write(self, name, contents):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as fp:
+            fp.write(contents)
+        return path
+
+    def _read(self, iso_file, path):
+        iso = pycdlib.PyCdlib()
+        iso.open(iso_file)
+        try:
+            result = {}
+            for kind in ('rr_path', 'joliet_path'):
+                if kind == 'joliet_path' and not iso.has_joliet():
+                    continue
+                data = io.BytesIO()
+                iso.get_file_from_iso_fp(data, **{kind: path})
+                result[kind] = data.getvalue()
+            return result
+        finally:
+            iso.close()
+
+    def _create_base(self, boot_mode):
+        # NOTE: a small ISO laid out like the mkisofs output
+        iso = pycdlib.PyCdlib()
+        joliet = 3 if boot_mode == 'bios' else None
+        iso.new(interchange_level=3, rock_ridge='1.09', joliet=joliet,
+                vol_ident='VMEDIA_BOOT_ISO')
+
+        def _add(contents, iso_path, rr_path):
+            iso.add_fp(io.BytesIO(contents), len(contents),
+                       iso_path=iso_path, rr_name=rr_path.split('/')[-1],
+                       joliet_path=rr_path if joliet else None)
+
+        _add(b'KERNEL', '/VMLINUZ.;1', '/vmlinuz')
+        _add(b'RAMDISK', '/INITRD.;1', '/initrd')
+        if boot_mode == 'bios':
+            iso.add_directory('/ISOLINUX', rr_name='isolinux',
+                              joliet_path='/isolinux')
+            _add(b'\0' * 2048, '/ISOLINUX/ISOLINUX.BIN;1',
+                 '/isolinux/isolinux.bin')
+            _add(b'empty', '/ISOLINUX/ISOLINUX.CFG;1',
+                 '/isolinux/isolinux.cfg')
+            iso.add_eltorito('/ISOLINUX/ISOLINUX.BIN;1',
+                             bootcatfile='/BOOT.CAT;1',
+                             rr_bootcatname='boot.cat',
+                             joliet_bootcatfile='/boot.cat',
+                             boot_load_size=4, boot_info_table=True)
+        else:
+            for iso_path, rr_name in (('/BOOT', 'boot'),
+                                      ('/BOOT/GRUB', 'grub')):
+                iso.add_directory(iso_path, rr_name=rr_name)
+            _add(b'ESP', '/BOOT/GRUB/EFIBOOT.IMG;1', '/boot/grub/efiboot.img')
+            _add(b'empty', '/BOOT/GRUB/GRUB.CFG;1', '/boot/grub/grub.cfg')
+            iso.add_eltorito('/BOOT/GRUB/EFIBOOT.IMG;1',
+                             bootcatfile='/BOOT.CAT;1',
+                             rr_bootcatname='boot.cat', efi=True)
+        path = os.path.join(self.tmpdir, 'base.iso')
+        iso.write(path)
+        iso.close()
+        return path
+
+    def test_base_boot_iso_name(self):
+        name = images.base_boot_iso_name(self.kernel, self.ramdisk)
+        self.assertTrue(name.startswith('base-bios-vmedia_boot_iso-'))
+        self.assertEqual(
+            name, images.base_boot_iso_name(self.kernel, self.ramdisk,
+                                            boot_mode='bios'))
+
+        uefi_name = images.base_boot_iso_name(
+            self.kernel, self.ramdisk, esp_image=self.esp_image,
+            boot_mode='uefi')
+        self.assertTrue(uefi_name.startswith('base-uefi-vmedia_boot_iso-'))
+
+        config_drive_name = images.base_boot_iso_name(
+            self.kernel, self.ramdisk,
+            inject_files={b'{}': 'openstack/latest/network_data.json'})
+        self.assertTrue(config_drive_name.startswith('base-bios-config-2-'))
+
+        # A new master image is a new base ISO
+        os.unlink(self.kernel)
+        self._write('kernel', b'KERNEL2')
+        self.assertNotEqual(
+            name, images.base_boot_iso_name(self.kernel, self.ramdisk))
+
+    @mock.patch.object(images, 'create_esp_image_for_uefi', autospec=True)
+    @mock.patch.object(images, 'create_isolinux_image_for_bios',
+                       autospec=True)
+    def test_create_base_boot_iso(self, mock_bios, mock_uefi):
+        images.create_base_boot_iso('output', 'kernel', 'ramdisk',
+                                    inject_files={'/crt': 'ironic.crt'})
+        mock_bios.assert_called_once_with('output', 'kernel', 'ramdisk',
+                                          label='VMEDIA_BOOT_ISO')
+        self.assertFalse(mock_uefi.called)
+
+        images.create_base_boot_iso(
+            'output', 'kernel', 'ramdisk', esp_image='esp', boot_mode='uefi',
+            inject_files={b'{}': 'openstack/latest/network_data.json'})
+        mock_uefi.assert_called_once_with('output', 'kernel', 'ramdisk',
+                                          esp_image='esp', label='config-2')
+
+    def test_overlay_boot_iso_bios(self):
+        base_iso = self._create_base('bios')
+        output = os.path.join(self.tmpdir, 'boot.iso')
+        crt = self._write('crt', b'CERT')
+        images.overlay_boot_iso(
+            base_iso, output, root_uuid='1234', kernel_params='foo=bar',
+            boot_mode='bios',
+            inject_files={crt: 'etc/ironic-python-agent/ironic.crt',
+                          b'{}': 'openstack/latest/network_data.json'})
+
+        cfg = self._read(output, '/isolinux/isolinux.cfg')
+        self.assertIn(b'append initrd=/initrd text root=UUID=1234 foo=bar',
+                      cfg['rr_path'])
+        self.assertEqual(cfg['rr_path'], cfg['joliet_path'])
+        self.assertEqual(
+            {'rr_path': b'CERT', 'joliet_path': b'CERT'},
+            self._read(output, '/etc/ironic-python-agent/ironic.crt'))
+        self.assertEqual(
+            {'rr_path': b'{}', 'joliet_path': b'{}'},
+            self._read(output, '/openstack/latest/network_data.json'))
+        self.assertEqual(b'KERNEL',
+                         self._read(output, '/vmlinuz')['rr_path'])
+
+        iso = pycdlib.PyCdlib()
+        iso.open(output)
+        self.addCleanup(iso.close)
+        self.assertIsNotNone(iso.eltorito_boot_catalog)
+        # The base ISO is left untouched
+        self.assertEqual(b'empty', self._read(
+            base_iso, '/isolinux/isolinux.cfg')['rr_path'])
+
+    def test_overlay_boot_iso_uefi(self):
+        self.config(grub_config_path='/boot/grub/grub.cfg')
+        base_iso = self._create_base('uefi')
+        output = os.path.join(self.tmpdir, 'boot.iso')
+        images.overlay_boot_iso(base_iso, output, kernel_params='foo=bar',
+                                boot_mode='uefi')
+
+        cfg = self._read(output, '/boot/grub/grub.cfg')['rr_path']
+        self.assertIn(b'linuxefi /vmlinuz foo=bar --', cfg)
+        self.assertEqual(b'ESP',
+                         self._read(output,
+                                    '/boot/grub/efiboot.img')['rr_path'])
+
+    def test_overlay_boot_iso_fails(self):
+        self.assertRaises(exception.ImageCreationFailed,
+                          images.overlay_boot_iso,
+                          os.path.join(self.tmpdir, 'missing.iso'),
+                          os.path.join(self.tmpdir, 'boot.iso'))
+
+
+@mock.patch.object(images, '_free_disk_space', autospec=True,
+                   return_value=100)
+class ConversionAdmissionTestCase(base.TestCase):
+
+    def setUp(self):
+        super(ConversionAdmissionTestCase, self).setUp()
+        self.config(image_conversion_memory_budget=1,
+                    image_conversion_queue_timeout=5)
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.admission = images._ConversionAdmission()
+        self.order = []
+
+    def _convert(self, name, memory, disk=10):
+        with self.admission.reserve(memory, disk, self.directory):
+            self.order.append(name)
+            eventlet.sleep(0.01)
+
+    def _run(self, *conversions):
+        pool = eventlet.GreenPool()
+        for conversion in conversions:
+            pool.spawn(self._convert, *conversion)
+            # Let the conversion queue up before the next one.
+            eventlet.sleep(0)
+        pool.waitall()
+
+    def test_within_budget(self, free_mock):
+        half = units.Mi // 2
+        with self.admission.reserve(half, 10, self.directory):
+            with self.admission.reserve(half, 10, self.directory):
+                self.assertEqual(2 * half, self.admission._reserved_memory)
+        self.assertEqual(0, self.admission._reserved_memory)
+        self.assertEqual({}, self.admission._reserved_disk)
+
+    def test_alone_over_budget(self, free_mock):
+        with self.admission.reserve(10 * units.Mi, 1000, self.directory):
+            self.assertEqual(1, self.admission._running)
+
+    def test_fifo(self, free_mock):
+        self._run(('first', units.Mi), ('second', units.Mi // 2),
+                  ('third', units.Mi // 2))
+        self.assertEqual(['first', 'second', 'third'], self.order)
+
+    def test_disk_space(self, free_mock):
+        with self.admission.reserve(1, 60, self.directory):
+            self.assertFalse(self.admission._fits(
+                1, 60, self.directory,
+                os.stat(self.directory).st_dev))
+            self.assertTrue(self.admission._fits(
+                1, 40, self.directory,
+                os.stat(self.directory).st_dev))
+
+    def test_no_timeout(self, free_mock):
+        self.config(image_conversion_queue_timeout=0,
+                    minimum_memory_wait_retries=0,
+                    minimum_memory_wait_time=0)
+        self._run(('first', units.Mi), ('second', units.Mi))
+        self.assertEqual(['first', 'second'], self.order)
+
+    @mock.patch.object(time, 'monotonic', autospec=True)
+    def test_timeout(self, mock_time, free_mock):
+        # Every reading of the clock is 10 seconds after the previous one.
+        mock_time.side_effect = itertools.count(0, 10)
+        with self.admission.reserve(units.Mi, 10, self.directory):
+            self.assertRaises(exception.InsufficientMemory,
+                              self.admission.reserve(
+                                  units.Mi, 10, self.directory).__enter__)
+        self.assertEqual(0, len(self.admission._queue))
+        self.assertEqual(0, self.admission._running)
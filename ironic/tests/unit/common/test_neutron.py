@@ -337,6 +337,92 @@ class TestNeutronNetworkActions(db_base.DbTestCase):
         self._test_add_ports_to_network(is_client_id=False,
                                         security_groups=sg_ids)
 
+    def _test_add_ports_to_network_bulk(self, update_mock):
+        self.config(add_all_ports=True, create_ports_in_bulk=True,
+                    group='neutron')
+        self.node.network_interface = 'neutron'
+        self.node.save()
+        port = self.ports[0]
+        port2 = object_utils.create_test_port(
+            self.context, node_id=self.node.id,
+            uuid=uuidutils.generate_uuid(),
+            address='54:00:00:cf:2d:22',
+            pxe_enabled=False)
+        neutron_port2 = stubs.FakeNeutronPort(
+            id='132f871f-eaec-4fed-9475-0d54465e0f01',
+            mac_address=port2.address, fixed_ips=[])
+        self.client_mock.create_ports.return_value = iter(
+            [self.neutron_port, neutron_port2])
+        update_mock.side_effect = [self.neutron_port, neutron_port2]
+        create_attrs = {
+            'network_id': self.network_uuid,
+            'admin_state_up': True,
+            'binding:vnic_type': 'baremetal',
+            'device_id': self.node.uuid
+        }
+        update_attrs = {
+            'device_owner': 'baremetal:none',
+            'binding:host_id': self.node.uuid,
+            'binding:profile': {
+                'local_link_information': [port.local_link_connection]
+            }
+        }
+        expected_create = [dict(create_attrs),
+                           dict(create_attrs, fixed_ips=[])]
+        expected_update = [dict(update_attrs, mac_address=port.address),
+                           dict(update_attrs, mac_address=port2.address)]
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            ports = neutron.add_ports_to_network(task, self.network_uuid)
+        self.assertEqual({port.uuid: self.neutron_port.id,
+                          port2.uuid: neutron_port2.id}, ports)
+        self.assertFalse(self.client_mock.create_port.called)
+        return expected_create, expected_update
+
+    @mock.patch.object(neutron, 'update_neutron_port', autospec=True)
+    def test_add_ports_to_network_bulk(self, update_mock):
+        expected_create, expected_update = (
+            self._test_add_ports_to_network_bulk(update_mock))
+        self.client_mock.create_ports.assert_called_once_with(
+            [dict(expected_create[0], **expected_update[0]),
+             dict(expected_create[1], **expected_update[1])])
+        self.assertFalse(update_mock.called)
+
+    @mock.patch.object(neutron, 'update_neutron_port', autospec=True)
+    def test_add_ports_to_network_bulk_user_token(self, update_mock):
+        self.config(auth_type='password', group='neutron')
+        self.context.auth_token = 'user-token'
+        expected_create, expected_update = (
+            self._test_add_ports_to_network_bulk(update_mock))
+        self.client_mock.create_ports.assert_called_once_with(
+            expected_create)
+        neutron.get_client.assert_called_with(context=self.context,
+                                              auth_from_config=True)
+        update_mock.assert_has_calls([
+            mock.call(self.context, self.neutron_port.id,
+                      expected_update[0], client=self.client_mock),
+            mock.call(self.context, '132f871f-eaec-4fed-9475-0d54465e0f01',
+                      expected_update[1], client=self.client_mock)])
+
+    @mock.patch.object(neutron, 'update_neutron_port', autospec=True)
+    def test_add_ports_to_network_bulk_failure(self, update_mock):
+        self.config(create_ports_in_bulk=True, group='neutron')
+        self.client_mock.create_ports.side_effect = (
+            openstack_exc.OpenStackCloudException('bulk not supported'))
+        self.client_mock.create_port.return_value = self.neutron_port
+        update_mock.return_value = self.neutron_port
+        port = self.ports[0]
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            ports = neutron.add_ports_to_network(task, self.network_uuid)
+        self.assertEqual({port.uuid: self.neutron_port.id}, ports)
+        self.assertEqual(1, self.client_mock.create_ports.call_count)
+        self.client_mock.create_port.assert_called_once_with(
+            network_id=self.network_uuid, admin_state_up=True,
+            device_id=self.node.uuid, **{'binding:vnic_type': 'baremetal'})
+        update_mock.assert_called_once_with(
+            self.context, self.neutron_port.id, mock.ANY)
+
     @mock.patch.object(neutron, 'update_neutron_port', autospec=True)
     def test__add_ip_addresses_for_ipv6_stateful(self, mock_update):
         subnet_id = uuidutils.generate_uuid()
@@ -1089,6 +1175,93 @@ class TestValidateNetwork(base.TestCase):
         net_mock.assert_called_once_with('name', ignore_missing=False)
 
 
+@mock.patch.object(time, 'monotonic', autospec=True, return_value=1000)
+@mock.patch.object(neutron, 'get_client', autospec=True)
+class TestLookupCache(base.TestCase):
+    def setUp(self):
+        super(TestLookupCache, self).setUp()
+        self.config(lookup_cache_ttl=60, group='neutron')
+        neutron._LOOKUP_CACHE.clear()
+        self.addCleanup(neutron._LOOKUP_CACHE.clear)
+        self.uuid = uuidutils.generate_uuid()
+        self.context = context.RequestContext()
+
+    def test_validate_network(self, client_mock, mock_time):
+        net_mock = client_mock.return_value.find_network
+        net_mock.return_value = stubs.FakeNeutronNetwork(id=self.uuid)
+        for _ in range(2):
+            self.assertEqual(self.uuid, neutron.validate_network(
+                'name', context=self.context))
+        net_mock.assert_called_once_with('name', ignore_missing=False)
+        client_mock.assert_called_once_with(context=self.context)
+
+    def test_validate_network_expired(self, client_mock, mock_time):
+        net_mock = client_mock.return_value.find_network
+        net_mock.return_value = stubs.FakeNeutronNetwork(id=self.uuid)
+        neutron.validate_network('name', context=self.context)
+        mock_time.return_value = 1060
+        neutron.validate_network('name', context=self.context)
+        self.assertEqual(2, net_mock.call_count)
+        # The expired entry is replaced.
+        self.assertEqual(1, len(neutron._LOOKUP_CACHE))
+
+    def test_validate_network_disabled(self, client_mock, mock_time):
+        self.config(lookup_cache_ttl=0, group='neutron')
+        net_mock = client_mock.return_value.find_network
+        net_mock.return_value = stubs.FakeNeutronNetwork(id=self.uuid)
+        neutron.validate_network('name', context=self.context)
+        neutron.validate_network('name', context=self.context)
+        self.assertEqual(2, net_mock.call_count)
+        self.assertEqual({}, neutron._LOOKUP_CACHE)
+
+    def test_validate_network_failure_not_cached(self, client_mock,
+                                                 mock_time):
+        net_mock = client_mock.return_value.find_network
+        net_mock.side_effect = [openstack_exc.ResourceNotFound(),
+                                stubs.FakeNeutronNetwork(id=self.uuid)]
+        self.assertRaises(exception.InvalidParameterValue,
+                          neutron.validate_network, 'name',
+                          context=self.context)
+        self.assertEqual(self.uuid, neutron.validate_network(
+            'name', context=self.context))
+        self.assertEqual(2, net_mock.call_count)
+
+    def test_validate_network_per_project(self, client_mock, mock_time):
+        self.config(auth_type='password', group='neutron')
+        net_mock = client_mock.return_value.find_network
+        net_mock.return_value = stubs.FakeNeutronNetwork(id=self.uuid)
+        for project in ('project1', 'project2', 'project1'):
+            ctx = context.RequestContext(auth_token='token',
+                                         project_id=project)
+            neutron.validate_network('name', context=ctx)
+        self.assertEqual(2, net_mock.call_count)
+
+    def test_verify_security_groups(self, client_mock, mock_time):
+        sg_ids = [uuidutils.generate_uuid()]
+        client = mock.MagicMock()
+        client.security_groups.side_effect = lambda id: iter(
+            [stubs.FakeNeutronSecurityGroup(id=sg_ids[0])])
+        for _ in range(2):
+            neutron._verify_security_groups(sg_ids, client,
+                                            context=self.context)
+        client.security_groups.assert_called_once_with(id=sg_ids)
+
+    @mock.patch.object(neutron, '_get_network_by_uuid_or_name',
+                       autospec=True)
+    def test_get_physnets_by_port_uuid(self, mock_gn, client_mock,
+                                       mock_time):
+        client = mock.MagicMock()
+        client.get_port.return_value = stubs.FakeNeutronPort(
+            network_id=self.uuid)
+        mock_gn.return_value = stubs.FakeNeutronNetwork(
+            **{'provider:physical_network': 'physnet1'})
+        for port_uuid in ('port1', 'port2'):
+            self.assertEqual({'physnet1'}, neutron.get_physnets_by_port_uuid(
+                client, port_uuid, context=self.context))
+        self.assertEqual(2, client.get_port.call_count)
+        mock_gn.assert_called_once_with(client, self.uuid)
+
+
 @mock.patch.object(neutron, 'get_client', autospec=True)
 class TestUpdatePortAddress(base.TestCase):
 
@@ -13,6 +13,7 @@
 from unittest import mock
 
 import ddt
+import eventlet
 from keystoneauth1 import exceptions as kaexception
 import requests
 
@@ -208,3 +209,106 @@ class NovaApiTestCase(base.TestCase):
         self.assertFalse(result)
         mock_log.warning.assert_called_once_with(*msg)
         mock_adapter.assert_called_once_with()
+
+
+@mock.patch.object(nova, '_get_nova_adapter', autospec=True)
+class SendEventsTestCase(base.TestCase):
+    def setUp(self):
+        super(SendEventsTestCase, self).setUp()
+        self.ctx = context.get_admin_context()
+        self.events = [nova._get_power_update_event('server-id-%d' % i,
+                                                    'POWER_OFF')
+                       for i in range(3)]
+
+    def _response(self, status_code, result):
+        response = requests.Response()
+        response.status_code = status_code
+        response.json = lambda: result
+        return response
+
+    def test_send_events(self, mock_adapter):
+        mock_adapter.return_value.post.return_value = self._response(
+            207, {'events': [{'code': 200}, {'code': 404}, {'code': 200}]})
+        self.assertEqual([True, False, True],
+                         nova._send_events(self.ctx, self.events))
+        mock_adapter.return_value.post.assert_called_once_with(
+            '/os-server-external-events', json={'events': self.events},
+            microversion=None, global_request_id=self.ctx.global_id,
+            raise_exc=False)
+
+    def test_send_events_failed(self, mock_adapter):
+        mock_adapter.return_value.post.return_value = self._response(
+            404, {})
+        self.assertEqual([False] * 3,
+                         nova._send_events(self.ctx, self.events))
+
+    def test_send_events_missing_events(self, mock_adapter):
+        mock_adapter.return_value.post.return_value = self._response(
+            207, {'events': [{'code': 200}]})
+        self.assertEqual([False] * 3,
+                         nova._send_events(self.ctx, self.events))
+
+
+@mock.patch.object(nova, '_send_events', autospec=True)
+class PowerUpdateBatcherTestCase(base.TestCase):
+    def setUp(self):
+        super(PowerUpdateBatcherTestCase, self).setUp()
+        self.config(power_update_batch_interval=0.1, group='nova')
+        self.ctx = context.get_admin_context()
+        self.batcher = nova._PowerUpdateBatcher()
+
+    def _send(self, count):
+        pool = eventlet.GreenPool()
+        threads = [pool.spawn(self.batcher.send, self.ctx,
+                              {'server_uuid': 'server-id-%d' % i},
+                              api_version='2.76')
+                   for i in range(count)]
+        return [thread.wait() for thread in threads]
+
+    def test_send_coalesced(self, mock_send):
+        mock_send.return_value = [True, False, True, True, False]
+        self.assertEqual([True, False, True, True, False], self._send(5))
+        mock_send.assert_called_once_with(
+            self.ctx, [{'server_uuid': 'server-id-%d' % i}
+                       for i in range(5)],
+            api_version='2.76')
+
+    def test_send_batch_size(self, mock_send):
+        # The interval is not waited for once the batch is full.
+        self.config(power_update_batch_interval=60,
+                    power_update_batch_size=2, group='nova')
+        mock_send.side_effect = lambda ctx, events, api_version: (
+            [True] * len(events))
+        self.assertEqual([True, True], self._send(2))
+        mock_send.assert_called_once_with(
+            self.ctx, [{'server_uuid': 'server-id-0'},
+                       {'server_uuid': 'server-id-1'}],
+            api_version='2.76')
+
+    def test_send_split(self, mock_send):
+        self.config(power_update_batch_size=2, group='nova')
+        mock_send.side_effect = [[True, True], [False, True], [True]]
+        self.assertEqual([True, True, False, True, True], self._send(5))
+        self.assertEqual([2, 2, 1], [len(call[0][1])
+                                     for call in mock_send.call_args_list])
+
+    def test_send_error(self, mock_send):
+        mock_send.side_effect = RuntimeError('boom')
+        pool = eventlet.GreenPool()
+        threads = [pool.spawn(self.batcher.send, self.ctx,
+                              {'server_uuid': 'server-id-%d' % i})
+                   for i in range(2)]
+        # The leader gets the error, the other callers a failure.
+        self.assertRaises(RuntimeError, threads[0].wait)
+        self.assertFalse(threads[1].wait())
+
+    @mock.patch.object(nova, '_batcher', autospec=True)
+    def test_power_update_batched(self, mock_batcher, mock_send):
+        mock_batcher.send.return_value = True
+        self.assertTrue(nova.power_update(self.ctx, 'server-id-1',
+                                          'power on'))
+        mock_batcher.send.assert_called_once_with(
+            self.ctx, {'name': 'power-update', 'server_uuid': 'server-id-1',
+                       'tag': 'POWER_ON'},
+            api_version='2.76')
+        mock_send.assert_not_called()
@@ -278,3 +278,37 @@ class PolicyTestCase(base.TestCase):
         mock_cfg.assert_called_once_with(['--config-file', 'my.cfg'],
                                          project='ironic')
         self.assertEqual(1, mock_gpe.call_count)
+
+
+@mock.patch.object(policy, 'check', autospec=True)
+class NodeDecisionCacheTestCase(base.TestCase):
+
+    def setUp(self):
+        super(NodeDecisionCacheTestCase, self).setUp()
+        self.creds = {'project_id': '12345', 'roles': ['reader']}
+        self.cache = policy.NodeDecisionCache(self.creds)
+
+    def _target(self, owner=None, lessee=None):
+        target = dict(self.creds)
+        target['node.owner'] = owner
+        target['node.lessee'] = lessee
+        return target
+
+    def test_check_cached(self, mock_check):
+        mock_check.return_value = True
+        for i in range(3):
+            self.assertTrue(self.cache.check('rule', self._target('12345')))
+        mock_check.assert_called_once_with('rule', self._target('12345'),
+                                           self.creds)
+
+    def test_check_per_rule_owner_and_lessee(self, mock_check):
+        mock_check.side_effect = lambda rule, target, creds: (
+            target['node.owner'] == '12345')
+        self.assertTrue(self.cache.check('rule', self._target('12345')))
+        self.assertFalse(self.cache.check('rule', self._target('54321')))
+        self.assertFalse(self.cache.check('rule',
+                                          self._target('54321', '12345')))
+        self.assertTrue(self.cache.check('other', self._target('12345')))
+        self.assertTrue(self.cache.check('rule', self._target('12345')))
+        self.assertFalse(self.cache.check('rule', self._target('54321')))
+        self.assertEqual(4, mock_check.call_count)
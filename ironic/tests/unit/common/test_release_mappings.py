@@ -99,9 +99,10 @@ class ReleaseMappingsTestCase(base.TestCase):
         # versioned objects. Do not add an exception for such objects,
         # initialize them with the version 1.0 instead.
         # NodeBase is also excluded as it is covered by Node.
+        # NodeAsyncJob is an index derived from driver_internal_info.
         exceptions = set(['NodeTag', 'ConductorHardwareInterfaces',
                           'NodeTrait', 'DeployTemplateStep',
-                          'NodeBase'])
+                          'NodeBase', 'NodeAsyncJob'])
         model_names -= exceptions
         # NodeTrait maps to two objects
         model_names |= set(['Trait', 'TraitList'])
@@ -615,6 +615,64 @@ class JinjaTemplatingTestCase(base.TestCase):
                                                self.params))
         jinja_fsl_mock.assert_called_once_with('/path/to')
 
+    def _write_template(self, content, mtime_ns=None):
+        path = os.path.join(self.tmpdir, 'template.j2')
+        with open(path, 'w') as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def _setup_registry(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.addCleanup(utils._template_registry.clear)
+        utils._template_registry.clear()
+
+    def test_render_file_cached(self):
+        self._setup_registry()
+        path = self._write_template(self.template)
+        with mock.patch.object(jinja2, 'FileSystemLoader', autospec=True,
+                               side_effect=jinja2.FileSystemLoader
+                               ) as mock_fsl:
+            for _ in range(3):
+                self.assertEqual(self.expected,
+                                 utils.render_template(path, self.params))
+        mock_fsl.assert_called_once_with(self.tmpdir)
+
+    def test_render_file_changed(self):
+        self._setup_registry()
+        path = self._write_template(self.template, mtime_ns=10 ** 18)
+        self.assertEqual(self.expected,
+                         utils.render_template(path, self.params))
+        self._write_template('{{ bar }}', mtime_ns=2 * 10 ** 18)
+        self.assertEqual('ham', utils.render_template(path, self.params))
+
+    def test_render_file_strict(self):
+        self._setup_registry()
+        path = self._write_template(self.template)
+        self.assertEqual(' ham', utils.render_template(path, {'bar': 'ham'}))
+        self.assertRaises(jinja2.exceptions.UndefinedError,
+                          utils.render_template, path, {'bar': 'ham'},
+                          strict=True)
+
+    def test_render_file_bytecode_cache(self):
+        self._setup_registry()
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        self.config(template_bytecode_cache_dir=cache_dir)
+        path = self._write_template(self.template)
+        self.assertEqual(self.expected,
+                         utils.render_template(path, self.params))
+        self.assertEqual(1, len(os.listdir(cache_dir)))
+
+        # A restarted process loads the compiled template from disk.
+        utils._template_registry.clear()
+        with mock.patch.object(jinja2.Environment, 'compile',
+                               autospec=True) as mock_compile:
+            self.assertEqual(self.expected,
+                             utils.render_template(path, self.params))
+        mock_compile.assert_not_called()
+
 
 class ValidateConductorGroupTestCase(base.TestCase):
     def test_validate_conductor_group_success(self):
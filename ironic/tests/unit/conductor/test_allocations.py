@@ -377,6 +377,29 @@ class DoAllocateTestCase(db_base.DbTestCase):
         # All nodes are filtered out on the database level.
         self.assertFalse(mock_acquire.called)
 
+    @mock.patch.object(objects.Node, 'list', autospec=True)
+    @mock.patch.object(task_manager, 'acquire', autospec=True,
+                       side_effect=task_manager.acquire)
+    def test_nodes_filtered_out_traits(self, mock_acquire, mock_list):
+        node = obj_utils.create_test_node(self.context,
+                                          uuid=uuidutils.generate_uuid(),
+                                          resource_class='x-large',
+                                          power_state='power off',
+                                          provision_state='available')
+        db_utils.create_test_node_traits(['tr1'], node_id=node.id)
+
+        allocation = obj_utils.create_test_allocation(self.context,
+                                                      resource_class='x-large',
+                                                      traits=['tr1', 'tr2'])
+        allocations.do_allocate(self.context, allocation)
+        self.assertIn('no suitable nodes have the requested traits',
+                      allocation['last_error'])
+        self.assertEqual('error', allocation['state'])
+
+        # All nodes are filtered out on the database level.
+        self.assertFalse(mock_acquire.called)
+        self.assertFalse(mock_list.called)
+
     @mock.patch.object(task_manager, 'acquire', autospec=True,
                        side_effect=task_manager.acquire)
     def test_nodes_locked(self, mock_acquire):
@@ -40,6 +40,7 @@ from ironic.common import components
 from ironic.common import driver_factory
 from ironic.common import exception
 from ironic.common import faults
+from ironic.common import hash_ring
 from ironic.common import images
 from ironic.common import indicator_states
 from ironic.common import nova
@@ -2365,6 +2366,26 @@ class CheckTimeoutsTestCase(mgr_utils.ServiceSetUpMixin, db_base.DbTestCase):
         mock_clean_up.assert_called_once_with(mock.ANY, mock.ANY)
         node_power_mock.assert_called_once_with(mock.ANY, states.POWER_OFF)
 
+    def test_timeout_periodics_query_plan(self):
+        self._start_service(start_consoles=False, start_allocations=False)
+        for option in ('deploy_callback_timeout', 'clean_callback_timeout',
+                       'rescue_callback_timeout', 'inspect_wait_timeout'):
+            CONF.set_override(option, 1, group='conductor')
+        for periodic, index in [
+                (self.service._check_deploy_timeouts,
+                 'provision_timeout_idx'),
+                (self.service._check_cleanwait_timeouts,
+                 'provision_timeout_idx'),
+                (self.service._check_rescuewait_timeouts,
+                 'provision_timeout_idx'),
+                (self.service._check_inspect_wait_timeouts,
+                 'inspect_timeout_idx')]:
+            plan, = self.explain_queries(lambda: periodic(self.context),
+                                         'nodes')
+            self.assertIn('USING INDEX %s (provision_state=? AND '
+                          'maintenance=? AND ' % index, plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
 
 @mgr_utils.mock_record_keepalive
 class DoNodeTearDownTestCase(mgr_utils.ServiceSetUpMixin, db_base.DbTestCase):
@@ -3555,6 +3576,55 @@ class MiscTestCase(mgr_utils.ServiceSetUpMixin, mgr_utils.CommonMixIn,
                                     last_error=mock.ANY)]
         mock_fail_if_state.assert_has_calls(expected_calls)
 
+    @mock.patch.object(hash_ring.HashRingManager,
+                       'get_hash_ring_ranges', autospec=True)
+    @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list', autospec=True)
+    def test_iter_nodes_hash_partitions(self, mock_nodeinfo_list,
+                                        mock_ranges):
+        mock_nodeinfo_list.return_value = []
+        ranges = [('', ['fake-hardware'], [(0, 42), (100, 200)])]
+        mock_ranges.return_value = ranges
+        self._start_service()
+        mock_nodeinfo_list.reset_mock()
+        mock_ranges.reset_mock()
+
+        result = list(self.service.iter_nodes(
+            fields=['id'], filters={'provision_state': 'deploying'}))
+        self.assertEqual([], result)
+        mock_nodeinfo_list.assert_called_once_with(
+            columns=['uuid', 'driver', 'conductor_group', 'id'],
+            filters={'provision_state': 'deploying',
+                     'hash_ring_ranges': ranges})
+        mock_ranges.assert_called_once_with(self.service.ring_manager,
+                                            self.service.host)
+
+    def test_iter_nodes_other_conductor(self):
+        self._start_service()
+        other = self.dbapi.register_conductor({'hostname': 'other-host',
+                                               'drivers': []})
+        self.dbapi.register_conductor_hardware_interfaces(
+            other.id,
+            [{'hardware_type': 'fake-hardware', 'interface_type': 'deploy',
+              'interface_name': 'fake', 'default': True}])
+        self.service.ring_manager.reset()
+        ring = self.service.ring_manager.get_ring('fake-hardware', '')
+        nodes = [obj_utils.create_test_node(self.context,
+                                            uuid=uuidutils.generate_uuid(),
+                                            driver='fake-hardware')
+                 for _ in range(20)]
+        expected = sorted(
+            node.uuid for node in nodes
+            if self.service.host in ring.get_nodes(node.uuid.encode('utf-8')))
+        self.assertNotIn(len(expected), (0, len(nodes)))
+
+        with mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list',
+                               side_effect=self.dbapi.get_nodeinfo_list,
+                               autospec=True) as mock_nodeinfo_list:
+            result = list(self.service.iter_nodes())
+        self.assertEqual(expected, sorted(r[0] for r in result))
+        self.assertIn('hash_ring_ranges',
+                      mock_nodeinfo_list.call_args[1]['filters'])
+
     @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list', autospec=True)
     def test_iter_nodes_shutdown(self, mock_nodeinfo_list):
         self._start_service()
@@ -5440,6 +5510,8 @@ class ManagerSyncPowerStatesTestCase(mgr_utils.CommonMixIn,
     def setUp(self):
         super(ManagerSyncPowerStatesTestCase, self).setUp()
         self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.ring_manager = mock.Mock(
+            **{'get_hash_ring_ranges.return_value': None})
         self.service.dbapi = self.dbapi
         self.node = self._create_node()
         self.filters = {'maintenance': False}
@@ -5701,6 +5773,91 @@ class ManagerSyncPowerStatesTestCase(mgr_utils.CommonMixIn,
         self.assertEqual(sync_calls, sync_mock.call_args_list)
 
 
+@mock.patch.object(waiters, 'wait_for_all',
+                   new=mock.MagicMock(return_value=(0, 0)))
+@mock.patch.object(manager.ConductorManager, '_spawn_worker',
+                   new=lambda self, fun, *args: fun(*args))
+@mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor',
+                   new=mock.MagicMock(return_value=True))
+@mock.patch.object(manager, 'do_sync_power_state', autospec=True)
+class BatchedPowerSyncTestCase(db_base.DbTestCase):
+
+    def setUp(self):
+        super(BatchedPowerSyncTestCase, self).setUp()
+        self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.ring_manager = mock.Mock(
+            **{'get_hash_ring_ranges.return_value': None})
+        self.service.dbapi = self.dbapi
+        CONF.set_override('sync_power_state_batch_size', 2,
+                          group='conductor')
+
+    def _create_node(self, **kwargs):
+        return obj_utils.create_test_node(
+            self.context, uuid=uuidutils.generate_uuid(),
+            driver='fake-hardware', **kwargs)
+
+    def test_sync_power_states(self, sync_mock):
+        synced = []
+
+        def _sync(task, count):
+            self.assertTrue(task.shared)
+            synced.append(task.node.uuid)
+            return 0
+
+        sync_mock.side_effect = _sync
+        nodes = [self._create_node(provision_state=states.ACTIVE)
+                 for _ in range(3)]
+        self._create_node(maintenance=True)
+        self._create_node(reservation='host1')
+        self._create_node(provision_state=states.DEPLOYWAIT)
+        self._create_node(target_power_state=states.POWER_ON)
+
+        with mock.patch.object(objects.Node, 'get',
+                               autospec=True) as get_mock:
+            self.service._sync_power_states(self.context)
+            self.assertFalse(get_mock.called)
+
+        self.assertEqual(sorted(n.uuid for n in nodes), sorted(synced))
+        self.assertEqual({}, self.service.power_state_sync_count)
+
+    def test_sync_power_states_counts_failures(self, sync_mock):
+        sync_mock.return_value = 2
+        node = self._create_node()
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual({node.uuid: 2}, self.service.power_state_sync_count)
+
+    def test_sync_power_states_node_changed(self, sync_mock):
+        node = self._create_node()
+
+        with mock.patch.object(self.service, 'iter_nodes',
+                               autospec=True) as iter_mock:
+            iter_mock.return_value = [(node.uuid, node.driver,
+                                       node.conductor_group, node.id)]
+            # Put into maintenance after the node list has been fetched
+            node.maintenance = True
+            node.save()
+            self.service._sync_power_states(self.context)
+            iter_mock.assert_called_once_with(
+                fields=['id'],
+                filters={'maintenance': False, 'reserved': False,
+                         'provision_state_not_in':
+                         manager.SYNC_EXCLUDED_STATES})
+
+        self.assertFalse(sync_mock.called)
+
+    @mock.patch.object(task_manager, 'acquire', autospec=True)
+    def test_sync_power_states_node_locked(self, acquire_mock, sync_mock):
+        self._create_node()
+        acquire_mock.side_effect = exception.NodeLocked(node='fake',
+                                                        host='fake')
+
+        self.service._sync_power_states(self.context)
+
+        self.assertFalse(sync_mock.called)
+
+
 @mock.patch.object(task_manager, 'acquire', autospec=True)
 @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor',
                    autospec=True)
@@ -5710,6 +5867,8 @@ class ManagerPowerRecoveryTestCase(mgr_utils.CommonMixIn,
     def setUp(self):
         super(ManagerPowerRecoveryTestCase, self).setUp()
         self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.ring_manager = mock.Mock(
+            **{'get_hash_ring_ranges.return_value': None})
         self.service.dbapi = self.dbapi
         self.driver = mock.Mock(spec_set=drivers_base.BareDriver)
         self.power = self.driver.power
@@ -5879,6 +6038,8 @@ class ManagerCheckDeployTimeoutsTestCase(mgr_utils.CommonMixIn,
         super(ManagerCheckDeployTimeoutsTestCase, self).setUp()
         self.config(deploy_callback_timeout=300, group='conductor')
         self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.ring_manager = mock.Mock(
+            **{'get_hash_ring_ranges.return_value': None})
         self.service.dbapi = self.dbapi
 
         self.node = self._create_node(provision_state=states.DEPLOYWAIT,
@@ -6298,7 +6459,8 @@ class ManagerSyncLocalStateTestCase(mgr_utils.CommonMixIn, db_base.DbTestCase):
 
         self.service.conductor = mock.Mock()
         self.service.dbapi = self.dbapi
-        self.service.ring_manager = mock.Mock()
+        self.service.ring_manager = mock.Mock(
+            **{'get_hash_ring_ranges.return_value': None})
 
         self.node = self._create_node(provision_state=states.ACTIVE,
                                       target_provision_state=states.NOSTATE)
@@ -6552,6 +6714,8 @@ class ManagerCheckInspectWaitTimeoutsTestCase(mgr_utils.CommonMixIn,
         super(ManagerCheckInspectWaitTimeoutsTestCase, self).setUp()
         self.config(inspect_wait_timeout=300, group='conductor')
         self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.ring_manager = mock.Mock(
+            **{'get_hash_ring_ranges.return_value': None})
         self.service.dbapi = self.dbapi
 
         self.node = self._create_node(provision_state=states.INSPECTWAIT,
@@ -8255,6 +8419,25 @@ class NodeHistoryRecordCleanupTestCase(mgr_utils.ServiceSetUpMixin,
         self.assertEqual('two', events[1].event)
         self.assertEqual('three', events[2].event)
 
+    @mock.patch.object(manager, 'NODE_HISTORY_DELETE_CHUNK', 2)
+    def test_history_is_pruned_in_chunks(self):
+        CONF.set_override('node_history_cleanup_batch_count', 5,
+                          group='conductor')
+        for node in self.nodes:
+            for event in ['one', 'two', 'three']:
+                conductor_utils.node_history_record(node, event=event)
+        conductor_utils.node_history_record(self.node1, event="final")
+        dbapi = self.service.dbapi
+        delete = dbapi.bulk_delete_node_history_records
+        with mock.patch.object(dbapi, 'bulk_delete_node_history_records',
+                               autospec=True,
+                               side_effect=delete) as mock_delete:
+            self.service._manage_node_history(self.context)
+        self.assertEqual([2, 2], [len(c[0][0])
+                                  for c in mock_delete.call_args_list])
+        events = objects.NodeHistory.list(self.context)
+        self.assertEqual(6, len(events))
+
     def test_history_is_pruned_to_config_two_pass(self):
         for node in self.nodes:
             for event in ['one', 'two', 'three']:
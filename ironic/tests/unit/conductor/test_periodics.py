@@ -47,12 +47,25 @@ class PeriodicTestService(base_manager.BaseConductorManager):
         self.test.assertFalse(task.shared)
         self.nodes.append(task.node.uuid)
 
+    @periodics.node_periodic(purpose="herding cats", spacing=42,
+                             filters=lambda: dict(_FILTERS, reserved=False))
+    def callable_filters(self, task, context):
+        self.nodes.append(task.node.uuid)
+
     @periodics.node_periodic(purpose="never running", spacing=42,
                              predicate=lambda n: n.cat != 'meow',
                              predicate_extra_fields=['cat'])
     def never_run(self, task, context):
         self.test.fail(f"Was not supposed to run, ran with {task.node}")
 
+    @periodics.node_periodic(
+        purpose="herding cats", spacing=42,
+        prefetch=lambda context, nodes: {n.uuid: n.driver for n in nodes},
+        predicate=lambda n, prefetched: prefetched != 'driver1')
+    def prefetch(self, task, context, prefetched=None):
+        self.test.assertIsInstance(context, ironic_context.RequestContext)
+        self.nodes.append((task.node.uuid, prefetched))
+
     @periodics.node_periodic(purpose="herding cats", spacing=42, limit=3)
     def limit(self, task, context):
         self.test.assertIsInstance(context, ironic_context.RequestContext)
@@ -117,6 +130,18 @@ class NodePeriodicTestCase(db_base.DbTestCase):
                                                 fields=())
         self.assertEqual([self.uuid], self.service.nodes)
 
+    def test_callable_filters(self, mock_iter_nodes):
+        mock_iter_nodes.return_value = iter([
+            (self.uuid, 'driver2', 'group'),
+        ])
+
+        self.service.callable_filters(self.ctx)
+
+        mock_iter_nodes.assert_called_once_with(
+            self.service, filters={'maintenance': False, 'reserved': False},
+            fields=())
+        self.assertEqual([self.uuid], self.service.nodes)
+
     @mock.patch.object(task_manager, 'acquire', autospec=True)
     def test_never_run(self, mock_acquire, mock_iter_nodes):
         mock_iter_nodes.return_value = iter([
@@ -131,6 +156,38 @@ class NodePeriodicTestCase(db_base.DbTestCase):
         self.assertEqual([], self.service.nodes)
         mock_acquire.assert_not_called()
 
+    @mock.patch.object(task_manager, 'acquire', autospec=True)
+    def test_prefetch(self, mock_acquire, mock_iter_nodes):
+        mock_iter_nodes.return_value = iter([
+            (uuidutils.generate_uuid(), 'driver1', ''),
+            (self.uuid, 'driver2', 'group'),
+        ])
+        mock_acquire.return_value.__enter__.return_value.node.uuid = self.uuid
+
+        self.service.prefetch(self.ctx)
+
+        mock_iter_nodes.assert_called_once_with(self.service,
+                                                filters=None, fields=())
+        mock_acquire.assert_called_once_with(self.ctx, self.uuid,
+                                             purpose="herding cats",
+                                             shared=True)
+        self.assertEqual([(self.uuid, 'driver2')], self.service.nodes)
+
+    @mock.patch.object(task_manager, 'acquire', autospec=True)
+    def test_prefetch_no_nodes(self, mock_acquire, mock_iter_nodes):
+        mock_iter_nodes.return_value = iter([])
+        prefetch = mock.Mock(return_value={})
+
+        @periodics.node_periodic(purpose="herding cats", spacing=42,
+                                 prefetch=prefetch)
+        def func(self, task, context, prefetched=None):
+            pass
+
+        func(self.service, self.ctx)
+
+        prefetch.assert_not_called()
+        mock_acquire.assert_not_called()
+
     @mock.patch.object(task_manager, 'acquire', autospec=True)
     def test_limit(self, mock_acquire, mock_iter_nodes):
         mock_iter_nodes.return_value = iter([
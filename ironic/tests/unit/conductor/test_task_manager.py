@@ -415,6 +415,36 @@ class TaskManagerTestCase(db_base.DbTestCase):
         get_volconn_mock.assert_called_once_with(self.context, self.node.id)
         get_voltgt_mock.assert_called_once_with(self.context, self.node.id)
 
+    def test_shared_lock_preloaded_node(
+            self, get_voltgt_mock, get_volconn_mock, get_portgroups_mock,
+            get_ports_mock, build_driver_mock,
+            reserve_mock, release_mock, node_get_mock):
+        with task_manager.TaskManager(self.context, 'fake-node-id',
+                                      shared=True,
+                                      preloaded_node=self.node) as task:
+            self.assertEqual(self.node, task.node)
+            self.assertTrue(task.shared)
+            build_driver_mock.assert_called_once_with(task)
+
+        self.assertFalse(node_get_mock.called)
+        self.assertFalse(reserve_mock.called)
+        self.assertFalse(release_mock.called)
+
+    def test_excl_lock_ignores_preloaded_node(
+            self, get_voltgt_mock, get_volconn_mock, get_portgroups_mock,
+            get_ports_mock, build_driver_mock,
+            reserve_mock, release_mock, node_get_mock):
+        reserve_mock.return_value = self.node
+        node = mock.Mock(spec_set=objects.Node)
+        with task_manager.TaskManager(self.context, 'fake-node-id',
+                                      preloaded_node=node) as task:
+            self.assertEqual(self.node, task.node)
+            self.assertFalse(task.shared)
+
+        node_get_mock.assert_called_once_with(self.context, 'fake-node-id')
+        reserve_mock.assert_called_once_with(self.context, self.host,
+                                             'fake-node-id')
+
     def test_shared_lock_node_get_exception(
             self, get_voltgt_mock, get_volconn_mock, get_portgroups_mock,
             get_ports_mock, build_driver_mock,
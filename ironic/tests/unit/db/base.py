@@ -15,9 +15,12 @@
 
 """Ironic DB test base class."""
 
+import re
+
 import fixtures
 from oslo_config import cfg
 from oslo_db.sqlalchemy import enginefacade
+import sqlalchemy
 
 from ironic.db import api as dbapi
 from ironic.db.sqlalchemy import migration
@@ -74,3 +77,34 @@ class DbTestCase(base.TestCase):
             _DB_CACHE = Database(engine, migration,
                                  sql_connection=CONF.database.connection)
         self.useFixture(_DB_CACHE)
+
+    def explain_queries(self, func, table):
+        """Call a function and get the plans of its queries on a table.
+
+        :param func: a callable without arguments.
+        :param table: the name of the table the queries select from.
+        :returns: a list with the SQLite query plan of every query, as a
+            string.
+        """
+        engine = enginefacade.writer.get_engine()
+        pattern = re.compile(r'\bFROM %s\b' % table)
+        statements = []
+
+        def _capture(conn, cursor, statement, parameters, *args):
+            if (statement.lstrip().startswith('SELECT')
+                    and pattern.search(statement)):
+                statements.append((statement, parameters))
+
+        sqlalchemy.event.listen(engine, 'before_cursor_execute', _capture)
+        try:
+            func()
+        finally:
+            sqlalchemy.event.remove(engine, 'before_cursor_execute',
+                                    _capture)
+        plans = []
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement,
+                                            parameters)
+                plans.append(' '.join(row[-1] for row in rows))
+        return plans
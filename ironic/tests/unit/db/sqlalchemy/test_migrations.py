@@ -1261,6 +1261,39 @@ class MigrationCheckersMixin(object):
         nodes = db_utils.get_table(engine, 'nodes')
         self.assertIsInstance(nodes.c.shard.type, sqlalchemy.types.String)
 
+    def _check_11af8cd936c1(self, engine, data):
+        node_async_jobs = db_utils.get_table(engine, 'node_async_jobs')
+        col_names = [column.name for column in node_async_jobs.c]
+        self.assertIn('node_id', col_names)
+        self.assertIsInstance(node_async_jobs.c.node_id.type,
+                              sqlalchemy.types.Integer)
+        self.assertIn('kind', col_names)
+        self.assertIsInstance(node_async_jobs.c.kind.type,
+                              sqlalchemy.types.String)
+
+    def _check_b2f4d6a8c0e1(self, engine, data):
+        nodes = db_utils.get_table(engine, 'nodes')
+        col_names = [column.name for column in nodes.c]
+        self.assertIn('hash_partition', col_names)
+        self.assertIsInstance(nodes.c.hash_partition.type,
+                              sqlalchemy.types.Integer)
+
+    def _check_e4a7c9b1d3f5(self, engine, data):
+        insp = sqlalchemy.inspect(engine)
+        indexes = {index['name']: index['column_names']
+                   for index in insp.get_indexes('nodes')}
+        self.assertEqual(
+            ['provision_state', 'maintenance', 'provision_updated_at'],
+            indexes['provision_timeout_idx'])
+        self.assertEqual(
+            ['provision_state', 'maintenance', 'inspection_started_at'],
+            indexes['inspect_timeout_idx'])
+        indexes = {index['name']: index['column_names']
+                   for index in insp.get_indexes('node_history')}
+        self.assertEqual(['node_id', 'created_at'],
+                         indexes['history_node_id_created_at_idx'])
+        self.assertNotIn('history_node_id_idx', indexes)
+
     def test_upgrade_and_version(self):
         with patch_with_engine(self.engine):
             self.migration_api.upgrade('head')
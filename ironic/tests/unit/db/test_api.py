@@ -20,8 +20,11 @@ from testtools import matchers
 
 from ironic.common import context
 from ironic.common import exception
+from ironic.common import hash_ring
 from ironic.common import release_mappings
 from ironic.db import api as db_api
+from ironic.db.sqlalchemy import api as sqlalchemy_api
+from ironic.db.sqlalchemy import models
 from ironic.tests.unit.db import base
 from ironic.tests.unit.db import utils
 
@@ -276,3 +279,189 @@ class UpdateToLatestVersionsTestCase(base.DbTestCase):
         for uuid in nodes:
             node = self.dbapi.get_node_by_uuid(uuid)
             self.assertEqual(self.node_ver, node.version)
+
+
+class BackfillNodeAsyncJobsTestCase(base.DbTestCase):
+
+    def setUp(self):
+        super(BackfillNodeAsyncJobsTestCase, self).setUp()
+        self.context = context.get_admin_context()
+        self.dbapi = db_api.get_instance()
+        self.node1 = utils.create_test_node(
+            uuid=uuidutils.generate_uuid(),
+            driver_internal_info={'firmware_updates': [{'url': 'x'}],
+                                  'raid_configs': {'task': 'y'}})
+        self.node2 = utils.create_test_node(
+            uuid=uuidutils.generate_uuid(),
+            driver_internal_info={'raid_config_job_ids': ['42'],
+                                  'bios_config_job_ids': []})
+        utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                               driver_internal_info={'other': 'firmware'})
+        # Simulate jobs started before the upgrade
+        with sqlalchemy_api._session_for_write() as session:
+            session.execute(sa.delete(models.NodeAsyncJob))
+
+    def _jobs(self):
+        with sqlalchemy_api._session_for_read() as session:
+            return sorted(session.execute(
+                sa.select(models.NodeAsyncJob.node_id,
+                          models.NodeAsyncJob.kind)))
+
+    def test_backfill(self):
+        self.assertEqual((3, 3), self.dbapi.backfill_node_async_jobs(
+            self.context, 0))
+        self.assertEqual([(self.node1.id, 'firmware_updates'),
+                          (self.node1.id, 'raid_configs'),
+                          (self.node2.id, 'raid_config_job_ids')],
+                         self._jobs())
+        self.assertEqual((0, 0), self.dbapi.backfill_node_async_jobs(
+            self.context, 0))
+
+    def test_backfill_max_count(self):
+        self.assertEqual((3, 2), self.dbapi.backfill_node_async_jobs(
+            self.context, 2))
+        self.assertEqual(2, len(self._jobs()))
+        self.assertEqual((1, 1), self.dbapi.backfill_node_async_jobs(
+            self.context, 2))
+        self.assertEqual(3, len(self._jobs()))
+
+    def _finish_jobs(self, node, driver_internal_info):
+        # Simulate a conductor of the previous release finishing jobs
+        with sqlalchemy_api._session_for_write() as session:
+            session.execute(
+                sa.update(models.Node)
+                .where(models.Node.id == node.id)
+                .values(driver_internal_info=driver_internal_info))
+
+    def test_backfill_stale(self):
+        self.dbapi.backfill_node_async_jobs(self.context, 0)
+        self._finish_jobs(self.node1, {'raid_configs': {'task': 'y'}})
+        self._finish_jobs(self.node2, {})
+
+        self.assertEqual((2, 2), self.dbapi.backfill_node_async_jobs(
+            self.context, 0))
+        self.assertEqual([(self.node1.id, 'raid_configs')], self._jobs())
+        self.assertEqual((0, 0), self.dbapi.backfill_node_async_jobs(
+            self.context, 0))
+
+    def test_backfill_stale_first(self):
+        self.dbapi.backfill_node_async_jobs(self.context, 0)
+        self._finish_jobs(self.node2, {})
+        with sqlalchemy_api._session_for_write() as session:
+            session.execute(sa.delete(models.NodeAsyncJob).where(
+                models.NodeAsyncJob.node_id == self.node1.id))
+
+        self.assertEqual((3, 1), self.dbapi.backfill_node_async_jobs(
+            self.context, 1))
+        self.assertEqual([], self._jobs())
+        self.assertEqual((2, 2), self.dbapi.backfill_node_async_jobs(
+            self.context, 2))
+        self.assertEqual([(self.node1.id, 'firmware_updates'),
+                          (self.node1.id, 'raid_configs')],
+                         self._jobs())
+
+    def test_backfill_stale_job_restarted(self):
+        self.dbapi.backfill_node_async_jobs(self.context, 0)
+        # The job was seen finished, then started again before the update
+        with mock.patch.object(
+                sqlalchemy_api, '_get_node_async_job_changes', autospec=True,
+                return_value=([], [(self.node2.id, 'raid_config_job_ids')])):
+            self.assertEqual((1, 0), self.dbapi.backfill_node_async_jobs(
+                self.context, 0))
+        self.assertIn((self.node2.id, 'raid_config_job_ids'), self._jobs())
+
+    def test_check_backfilled(self):
+        self.assertFalse(self.dbapi.check_node_async_jobs_backfilled())
+        self.dbapi.backfill_node_async_jobs(self.context, 0)
+        self.assertTrue(self.dbapi.check_node_async_jobs_backfilled())
+        # Stale records do not prevent using the index
+        self._finish_jobs(self.node2, {})
+        self.assertTrue(self.dbapi.check_node_async_jobs_backfilled())
+
+
+class UpdateNodeHashPartitionsTestCase(base.DbTestCase):
+
+    def setUp(self):
+        super(UpdateNodeHashPartitionsTestCase, self).setUp()
+        self.context = context.get_admin_context()
+        self.dbapi = db_api.get_instance()
+        self.nodes = [utils.create_test_node(uuid=uuidutils.generate_uuid())
+                      for _ in range(3)]
+        # Simulate nodes created before the upgrade
+        with sqlalchemy_api._session_for_write() as session:
+            session.execute(sa.update(models.Node).values(hash_partition=None))
+
+    def _partitions(self):
+        return [self.dbapi.get_node_by_id(node.id).hash_partition
+                for node in self.nodes]
+
+    def test_update(self):
+        self.assertEqual((3, 3), self.dbapi.update_node_hash_partitions(
+            self.context, 0))
+        self.assertEqual([hash_ring.get_hash_partition(node.uuid)
+                          for node in self.nodes], self._partitions())
+        self.assertEqual((0, 0), self.dbapi.update_node_hash_partitions(
+            self.context, 0))
+
+    def test_update_max_count(self):
+        self.assertEqual((3, 2), self.dbapi.update_node_hash_partitions(
+            self.context, 2))
+        self.assertEqual(1, self._partitions().count(None))
+        self.assertEqual((1, 1), self.dbapi.update_node_hash_partitions(
+            self.context, 2))
+        self.assertNotIn(None, self._partitions())
+
+    def test_update_algorithm_changed(self):
+        self.dbapi.update_node_hash_partitions(self.context, 0)
+        self.config(hash_ring_algorithm='sha256')
+        self.assertEqual((3, 3), self.dbapi.update_node_hash_partitions(
+            self.context, 0))
+        self.assertEqual([hash_ring.get_hash_partition(node.uuid, 'sha256')
+                          for node in self.nodes], self._partitions())
+
+    def test_update_algorithm_changed_max_count(self):
+        self.dbapi.update_node_hash_partitions(self.context, 0)
+        self.config(hash_ring_algorithm='sha256')
+        self.assertEqual((3, 2), self.dbapi.update_node_hash_partitions(
+            self.context, 2))
+        self.assertEqual(1, self._partitions().count(None))
+        self.assertEqual((1, 1), self.dbapi.update_node_hash_partitions(
+            self.context, 2))
+        self.assertEqual([hash_ring.get_hash_partition(node.uuid, 'sha256')
+                          for node in self.nodes], self._partitions())
+
+    @mock.patch.object(hash_ring, 'get_hash_partition', autospec=True,
+                       side_effect=hash_ring.get_hash_partition)
+    def test_update_only_missing(self, mock_partition):
+        self.dbapi.update_node_hash_partitions(self.context, 2)
+        mock_partition.reset_mock()
+        self.assertEqual((1, 1), self.dbapi.update_node_hash_partitions(
+            self.context, 0))
+        # The two stored partitions are checked, only the missing one is
+        # computed for the update.
+        self.assertEqual(3, mock_partition.call_count)
+
+
+class GetUUIDsByIdsTestCase(base.DbTestCase):
+
+    def test_get_uuids_by_ids(self):
+        nodes = [utils.create_test_node(uuid=uuidutils.generate_uuid())
+                 for _ in range(3)]
+        self.assertEqual(
+            {nodes[0].id: nodes[0].uuid, nodes[2].id: nodes[2].uuid},
+            self.dbapi.get_uuids_by_ids('nodes',
+                                        [nodes[0].id, nodes[2].id, 42]))
+
+    def test_get_uuids_by_ids_other_resources(self):
+        chassis = utils.create_test_chassis()
+        node = utils.create_test_node(chassis_id=chassis.id)
+        portgroup = utils.create_test_portgroup(node_id=node.id)
+        allocation = utils.create_test_allocation(node_id=node.id)
+        for resource, obj in (('chassis', chassis),
+                              ('portgroups', portgroup),
+                              ('allocations', allocation)):
+            self.assertEqual({obj.id: obj.uuid},
+                             self.dbapi.get_uuids_by_ids(resource, [obj.id]))
+
+    def test_get_uuids_by_ids_empty(self):
+        self.assertEqual({}, self.dbapi.get_uuids_by_ids('nodes', []))
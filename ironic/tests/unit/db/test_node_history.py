@@ -10,9 +10,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+from unittest import mock
+
 from oslo_utils import uuidutils
 
 from ironic.common import exception
+from ironic.db.sqlalchemy import api as sqlalchemy_api
 from ironic.tests.unit.db import base
 from ironic.tests.unit.db import utils as db_utils
 
@@ -92,3 +96,98 @@ class DBNodeHistoryTestCase(base.DbTestCase):
         self.assertEqual(self.history.event, res[0].event)
         self.assertEqual(self.history.event_type, res[0].event_type)
         self.assertEqual(self.history.severity, res[0].severity)
+
+
+class DBNodeHistoryPurgeTestCase(base.DbTestCase):
+
+    def setUp(self):
+        super(DBNodeHistoryPurgeTestCase, self).setUp()
+        self.config(node_history_max_entries=2,
+                    node_history_minimum_days=0,
+                    group='conductor')
+        self.conductor = self.dbapi.register_conductor(
+            {'hostname': 'test-conductor', 'drivers': ['fake-hardware']})
+        self.expected = []
+        start = datetime.datetime(2022, 1, 1)
+        for i, count in enumerate((5, 2, 3)):
+            node = db_utils.create_test_node(
+                id=i + 1, uuid=uuidutils.generate_uuid(),
+                conductor_affinity=self.conductor.id)
+            for j in range(count):
+                history = db_utils.create_test_history(
+                    id=i * 10 + j + 1, uuid=uuidutils.generate_uuid(),
+                    node_id=node.id,
+                    created_at=start + datetime.timedelta(hours=j))
+                if j < count - 2:
+                    self.expected.append(history.id)
+        # Records of nodes managed by another conductor are left alone.
+        other = db_utils.create_test_node(id=4,
+                                          uuid=uuidutils.generate_uuid())
+        for j in range(5):
+            db_utils.create_test_history(id=100 + j,
+                                         uuid=uuidutils.generate_uuid(),
+                                         node_id=other.id)
+
+    def test_query_node_history_ids_for_purge(self):
+        res = self.dbapi.query_node_history_ids_for_purge(self.conductor.id)
+        self.assertEqual([1, 2, 3, 21], sorted(res))
+        self.assertEqual(self.expected, sorted(res))
+
+    def test_query_node_history_ids_for_purge_limit(self):
+        res = self.dbapi.query_node_history_ids_for_purge(self.conductor.id,
+                                                          limit=2)
+        self.assertEqual(2, len(res))
+        self.assertTrue(set(res).issubset(self.expected))
+
+    def test_query_node_history_records_for_purge(self):
+        res = self.dbapi.query_node_history_records_for_purge(
+            self.conductor.id)
+        self.assertEqual({1: [1, 2, 3], 3: [21]},
+                         {k: sorted(v) for k, v in res.items()})
+
+    def test_query_node_history_minimum_days(self):
+        self.config(node_history_minimum_days=1, group='conductor')
+        db_utils.create_test_history(id=50, uuid=uuidutils.generate_uuid(),
+                                     node_id=2,
+                                     created_at=datetime.datetime.now())
+        res = self.dbapi.query_node_history_ids_for_purge(self.conductor.id)
+        # The recent record is neither removed nor counted.
+        self.assertEqual(self.expected, sorted(res))
+
+    @mock.patch.object(sqlalchemy_api, '_supports_window_functions',
+                       autospec=True, return_value=False)
+    def test_query_node_history_ids_for_purge_no_window(self, mock_supports):
+        res = self.dbapi.query_node_history_ids_for_purge(self.conductor.id)
+        self.assertEqual(self.expected, sorted(res))
+        self.assertTrue(mock_supports.called)
+
+    @mock.patch.object(sqlalchemy_api, '_supports_window_functions',
+                       autospec=True, return_value=False)
+    def test_query_node_history_ids_for_purge_no_window_limit(
+            self, mock_supports):
+        res = self.dbapi.query_node_history_ids_for_purge(self.conductor.id,
+                                                          limit=2)
+        self.assertEqual([1, 2], sorted(res))
+
+    def _explain_history_queries(self):
+        return self.explain_queries(
+            lambda: self.dbapi.query_node_history_ids_for_purge(
+                self.conductor.id),
+            'node_history')
+
+    def test_query_node_history_ids_for_purge_query_plan(self):
+        plan, = self._explain_history_queries()
+        self.assertIn('USING COVERING INDEX history_node_id_created_at_idx '
+                      '(node_id=?)', plan)
+
+    @mock.patch.object(sqlalchemy_api, '_supports_window_functions',
+                       autospec=True, return_value=False)
+    def test_query_node_history_ids_for_purge_no_window_query_plan(
+            self, mock_supports):
+        plans = self._explain_history_queries()
+        # Counting the records of all nodes, then finding the oldest
+        # records of the two nodes with too many of them.
+        self.assertEqual(3, len(plans))
+        for plan in plans:
+            self.assertIn('USING COVERING INDEX '
+                          'history_node_id_created_at_idx (node_id=?)', plan)
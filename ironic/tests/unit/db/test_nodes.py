@@ -23,7 +23,9 @@ from oslo_utils import uuidutils
 from sqlalchemy.orm import exc as sa_exc
 
 from ironic.common import exception
+from ironic.common import hash_ring
 from ironic.common import states
+from ironic.db.sqlalchemy import api as sqlalchemy_api
 from ironic.tests.unit.db import base
 from ironic.tests.unit.db import utils
 
@@ -34,6 +36,8 @@ class DbNodeTestCase(base.DbTestCase):
         node = utils.create_test_node()
         self.assertEqual([], node.tags)
         self.assertEqual([], node.traits)
+        self.assertEqual(hash_ring.get_hash_partition(node.uuid),
+                         node.hash_partition)
 
     def test_create_node_with_tags(self):
         self.assertRaises(exception.InvalidParameterValue,
@@ -237,8 +241,8 @@ class DbNodeTestCase(base.DbTestCase):
         node2 = utils.create_test_node(uuid=uuidutils.generate_uuid(),
                                        provision_state=states.DEPLOYWAIT)
         # node without timeout
-        utils.create_test_node(uuid=uuidutils.generate_uuid(),
-                               provision_updated_at=next)
+        node3 = utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                                       provision_updated_at=next)
 
         mock_utcnow.return_value = present
         res = self.dbapi.get_nodeinfo_list(filters={'provisioned_before': 300})
@@ -252,6 +256,11 @@ class DbNodeTestCase(base.DbTestCase):
             filters={'provision_state_in': [states.ACTIVE, states.DEPLOYING]})
         self.assertEqual([node1.id], [r[0] for r in res])
 
+        res = self.dbapi.get_nodeinfo_list(
+            filters={'provision_state_not_in': [states.DEPLOYING,
+                                                states.DEPLOYWAIT]})
+        self.assertEqual([node3.id], [r[0] for r in res])
+
     @mock.patch.object(timeutils, 'utcnow', autospec=True)
     def test_get_nodeinfo_list_inspection(self, mock_utcnow):
         past = datetime.datetime(2000, 1, 1, 0, 0)
@@ -291,6 +300,106 @@ class DbNodeTestCase(base.DbTestCase):
                                                     'World!'})
         self.assertEqual([node2.id], [r[0] for r in res])
 
+    def test_get_nodeinfo_list_traits_all(self):
+        node1 = utils.create_test_node(uuid=uuidutils.generate_uuid())
+        node2 = utils.create_test_node(uuid=uuidutils.generate_uuid())
+        node3 = utils.create_test_node(uuid=uuidutils.generate_uuid())
+        utils.create_test_node_traits(['tr1', 'tr2', 'tr3'],
+                                      node_id=node1.id)
+        utils.create_test_node_traits(['tr1', 'tr2'], node_id=node2.id)
+        utils.create_test_node_traits(['tr1'], node_id=node3.id)
+
+        res = self.dbapi.get_nodeinfo_list(
+            filters={'traits_all': ['tr1', 'tr2']})
+        self.assertEqual([node1.id, node2.id], sorted(r[0] for r in res))
+
+        res = self.dbapi.get_nodeinfo_list(
+            columns=['uuid'], filters={'traits_all': ['tr3', 'tr1'],
+                                       'uuid_in': [node1.uuid, node2.uuid]})
+        self.assertEqual([node1.uuid], [r[0] for r in res])
+
+        res = self.dbapi.get_nodeinfo_list(
+            filters={'traits_all': ['tr1', 'tr4']})
+        self.assertEqual([], res)
+
+        # An empty list does not filter anything out
+        res = self.dbapi.get_nodeinfo_list(filters={'traits_all': []})
+        self.assertEqual(3, len(res))
+
+    def test_get_nodeinfo_list_async_job_in(self):
+        node1 = utils.create_test_node(
+            uuid=uuidutils.generate_uuid(),
+            driver_internal_info={'firmware_updates': [{'url': 'x'}]})
+        node2 = utils.create_test_node(
+            uuid=uuidutils.generate_uuid(),
+            driver_internal_info={'raid_configs': {'task_monitor_uri': ['y']},
+                                  'firmware_updates': []})
+        utils.create_test_node(uuid=uuidutils.generate_uuid())
+
+        res = self.dbapi.get_nodeinfo_list(
+            filters={'async_job_in': ['firmware_updates']})
+        self.assertEqual([node1.id], [r[0] for r in res])
+
+        res = self.dbapi.get_nodeinfo_list(
+            filters={'async_job_in': ['firmware_updates', 'raid_configs']})
+        self.assertEqual([node1.id, node2.id], sorted(r[0] for r in res))
+
+    def test_get_nodeinfo_list_hash_ring_ranges(self):
+        nodes = []
+        # Nodes created before the hash partitions always match
+        for partition, driver, group in ((10, 'fake-hardware', ''),
+                                         (20, 'fake-hardware', ''),
+                                         (30, 'fake-hardware', ''),
+                                         (None, 'fake-hardware', ''),
+                                         (10, 'fake-hardware', 'group'),
+                                         (20, 'other', ''),
+                                         (20, 'ipmi', 'group')):
+            node = utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                                          driver=driver,
+                                          conductor_group=group)
+            self.dbapi.update_node(node.id, {'hash_partition': partition})
+            nodes.append(node)
+
+        res = self.dbapi.get_nodeinfo_list(filters={'hash_ring_ranges': [
+            ('', ['fake-hardware'], [(0, 10), (25, 35)]),
+            ('', ['other'], None),
+            ('group', ['ipmi'], [(0, 10)]),
+        ]})
+        self.assertEqual([nodes[i].id for i in (0, 2, 3, 5)],
+                         sorted(r[0] for r in res))
+
+        res = self.dbapi.get_nodeinfo_list(filters={'hash_ring_ranges': [
+            (None, ['fake-hardware'], [(15, 25)])]})
+        self.assertEqual([nodes[i].id for i in (1, 3)],
+                         sorted(r[0] for r in res))
+
+    def test_update_node_async_jobs(self):
+        node = utils.create_test_node(driver_internal_info={})
+        filters = {'async_job_in': ['firmware_updates']}
+        self.assertEqual([], self.dbapi.get_nodeinfo_list(filters=filters))
+
+        self.dbapi.update_node(node.id, {'driver_internal_info': {
+            'firmware_updates': [{'url': 'x'}]}})
+        res = self.dbapi.get_nodeinfo_list(filters=filters)
+        self.assertEqual([node.id], [r[0] for r in res])
+
+        # Updates not starting or finishing a job do not change anything
+        self.dbapi.update_node(node.id, {'driver_internal_info': {
+            'firmware_updates': [{'url': 'y'}], 'other': 'value'}})
+        res = self.dbapi.get_nodeinfo_list(filters=filters)
+        self.assertEqual([node.id], [r[0] for r in res])
+
+        self.dbapi.update_node(node.id, {'driver_internal_info': {
+            'other': 'value'}})
+        self.assertEqual([], self.dbapi.get_nodeinfo_list(filters=filters))
+
+    def test_destroy_node_async_jobs(self):
+        node = utils.create_test_node(
+            driver_internal_info={'firmware_updates': [{'url': 'x'}]})
+        self.dbapi.destroy_node(node.id)
+        self.assertEqual([], self.dbapi.get_nodeinfo_list(
+            filters={'async_job_in': ['firmware_updates']}))
+
     def test_get_node_list(self):
         uuids = []
         for i in range(1, 6):
@@ -950,6 +1059,44 @@ class DbNodeTestCase(base.DbTestCase):
         res = self.dbapi.get_node_by_uuid(uuid)
         self.assertEqual(r1, res.reservation)
 
+    def test_reserve_node_by_id(self):
+        node = utils.create_test_node()
+
+        res = self.dbapi.reserve_node('fake-reservation', node.id)
+        self.assertEqual(node.uuid, res.uuid)
+        self.assertEqual('fake-reservation', res.reservation)
+
+    @mock.patch.object(sqlalchemy_api, '_supports_update_returning',
+                       autospec=True)
+    def test_reserve_node_without_returning(self, mock_returning):
+        mock_returning.return_value = False
+        node = utils.create_test_node()
+
+        res = self.dbapi.reserve_node('fake-reservation', node.uuid)
+        self.assertEqual(node.id, res.id)
+        self.assertEqual('fake-reservation', res.reservation)
+        self.assertRaises(exception.NodeLocked,
+                          self.dbapi.reserve_node, 'another', node.id)
+
+    def test_supports_update_returning(self):
+        # NOTE: use the real dialect, reading its deprecated attributes
+        # raises a SADeprecationWarning in tests.
+        with sqlalchemy_api._session_for_read() as session:
+            supported = sqlalchemy_api._supports_update_returning(session)
+            if hasattr(type(session.get_bind().dialect), 'update_returning'):
+                self.assertEqual(session.get_bind().dialect.update_returning,
+                                 supported)
+
+    def test_supports_update_returning_sqlalchemy_14(self):
+        class Dialect(object):
+            full_returning = True
+
+        session = mock.Mock()
+        session.get_bind.return_value.dialect = Dialect()
+        self.assertTrue(sqlalchemy_api._supports_update_returning(session))
+        Dialect.full_returning = False
+        self.assertFalse(sqlalchemy_api._supports_update_returning(session))
+
     def test_release_reservation(self):
         node = utils.create_test_node()
         uuid = node.uuid
@@ -14,11 +14,17 @@
 #    under the License.
 
 import os
+import stat
 import tempfile
+from unittest import mock
+
+import eventlet
 
 from ironic.common import dhcp_factory
 from ironic.common import utils as common_utils
 from ironic.conductor import task_manager
+from ironic.dhcp import dnsmasq
+from ironic import objects
 from ironic.tests.unit.db import base as db_base
 from ironic.tests.unit.objects import utils as object_utils
 
@@ -49,6 +55,8 @@ class TestDnsmasqDHCPApi(db_base.DbTestCase):
         self.config(dhcp_hostsdir=self.hostsdir, group='dnsmasq')
 
         dhcp_factory.DHCPFactory._dhcp_provider = None
+        self.addCleanup(setattr, dhcp_factory.DHCPFactory, '_dhcp_provider',
+                        None)
         self.api = dhcp_factory.DHCPFactory()
         self.opts = [
             {
@@ -138,3 +146,128 @@ class TestDnsmasqDHCPApi(db_base.DbTestCase):
                 '52:54:00:cf:2d:32,ignore\n',
                 f.readline())
         self.assertFalse(os.path.isfile(optsfile))
+
+
+class TestBatchedDnsmasqDHCPApi(TestDnsmasqDHCPApi):
+
+    def setUp(self):
+        super(TestBatchedDnsmasqDHCPApi, self).setUp()
+        self.config(dhcp_provider='dnsmasq-batched', group='dhcp')
+        self.config(write_batch_interval=0, group='dnsmasq')
+        dhcp_factory.DHCPFactory._dhcp_provider = None
+        self.addCleanup(setattr, dhcp_factory.DHCPFactory, '_dhcp_provider',
+                        None)
+        self.api = dhcp_factory.DHCPFactory()
+        self.hostfile = os.path.join(self.hostsdir,
+                                     'ironic-52:54:00:cf:2d:32.conf')
+        self.optsfile = os.path.join(self.optsdir,
+                                     'ironic-%s.conf' % self.node.uuid)
+
+    def _read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    @mock.patch.object(objects.Node, 'save', autospec=True)
+    def test_update_dhcp(self, mock_save):
+        with task_manager.acquire(self.context,
+                                  self.node.uuid) as task:
+            self.api.update_dhcp(task, self.opts)
+            self.assertNotIn('dnsmasq_tag', task.node.driver_internal_info)
+
+        tag = self._read(self.hostfile).split(',')[1][len('set:'):]
+        self.assertEqual(36, len(tag))
+        self.assertEqual('52:54:00:cf:2d:32,set:%s,set:ironic\n' % tag,
+                         self._read(self.hostfile))
+        self.assertEqual(
+            'tag:%(tag)s,67,bootx64.efi\n'
+            'tag:%(tag)s,210,/tftpboot/\n'
+            'tag:%(tag)s,66,192.0.2.135\n'
+            'tag:%(tag)s,150,192.0.2.135\n'
+            'tag:%(tag)s,255,192.0.2.135\n' % {'tag': tag},
+            self._read(self.optsfile))
+        self.assertFalse(mock_save.called)
+        # Only the configuration files are left behind
+        self.assertEqual([os.path.basename(self.hostfile)],
+                         os.listdir(self.hostsdir))
+
+    def test_update_dhcp_file_mode(self):
+        with task_manager.acquire(self.context,
+                                  self.node.uuid) as task:
+            self.api.update_dhcp(task, self.opts)
+        for path in (self.hostfile, self.optsfile):
+            self.assertEqual(0o644, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_update_dhcp_unchanged(self):
+        with task_manager.acquire(self.context,
+                                  self.node.uuid) as task:
+            self.api.update_dhcp(task, self.opts)
+            inode = os.stat(self.optsfile).st_ino
+            host_content = self._read(self.hostfile)
+
+            # Unchanged files are not rewritten
+            self.api.update_dhcp(task, self.opts)
+            self.assertEqual(inode, os.stat(self.optsfile).st_ino)
+
+            # New options get a new tag
+            self.api.update_dhcp(task, self.opts[:2])
+            self.assertNotEqual(inode, os.stat(self.optsfile).st_ino)
+            self.assertNotEqual(host_content, self._read(self.hostfile))
+
+    @mock.patch.object(dnsmasq._BatchWriter, '_flush', autospec=True)
+    def test_write_coalesced(self, mock_flush):
+        self.config(write_batch_interval=0.1, group='dnsmasq')
+        writer = dnsmasq._BatchWriter()
+        pool = eventlet.GreenPool()
+        for i in range(5):
+            pool.spawn(writer.write, {'/path/%d' % i: 'content'})
+        pool.waitall()
+        mock_flush.assert_called_once_with(
+            writer, {'/path/%d' % i: 'content' for i in range(5)})
+
+    @mock.patch.object(dnsmasq._BatchWriter, '_flush', autospec=True)
+    def test_write_error(self, mock_flush):
+        self.config(write_batch_interval=0.1, group='dnsmasq')
+        mock_flush.side_effect = OSError('boom')
+        writer = dnsmasq._BatchWriter()
+        pool = eventlet.GreenPool()
+        threads = [pool.spawn(writer.write, {'/path/%d' % i: 'content'})
+                   for i in range(2)]
+        for thread in threads:
+            self.assertRaises(OSError, thread.wait)
+        mock_flush.assert_called_once_with(
+            writer, {'/path/0': 'content', '/path/1': 'content'})
+
+    def test_get_ip_addresses_index(self):
+        with task_manager.acquire(self.context,
+                                  self.node.uuid) as task:
+            with tempfile.NamedTemporaryFile() as fp:
+                self.config(dhcp_leasefile=fp.name, group='dnsmasq')
+                fp.write(b"1659975057 52:54:00:cf:2d:32 192.0.2.198 * *\n"
+                         b"1659975057 52:54:00:cf:2d:33 192.0.2.199 * *\n")
+                fp.flush()
+                self.assertEqual(
+                    ['192.0.2.198'],
+                    self.api.provider.get_ip_addresses(task))
+
+                # Not parsed again until the file changes
+                with mock.patch('builtins.open', autospec=True) as mock_open:
+                    self.assertEqual(
+                        ['192.0.2.198'],
+                        self.api.provider.get_ip_addresses(task))
+                    self.assertFalse(mock_open.called)
+
+                fp.write(b"1659975058 52:54:00:cf:2d:32 192.0.2.200 * *\n")
+                fp.flush()
+                self.assertEqual(
+                    ['192.0.2.198', '192.0.2.200'],
+                    self.api.provider.get_ip_addresses(task))
+
+    def test_clean_dhcp_opts_legacy_tag(self):
+        self.node.set_driver_internal_info('dnsmasq_tag', 'tag')
+        self.node.save()
+        with task_manager.acquire(self.context,
+                                  self.node.uuid) as task:
+            self.api.clean_dhcp(task)
+            self.assertNotIn('dnsmasq_tag', task.node.driver_internal_info)
+        self.assertEqual('52:54:00:cf:2d:32,ignore\n',
+                         self._read(self.hostfile))
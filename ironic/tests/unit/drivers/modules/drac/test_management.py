@@ -1027,6 +1027,8 @@ class DracRedfishManagementTestCase(test_utils.BaseDracTest):
                                                            self.context)
 
         self.management._check_import_configuration_task.assert_not_called()
+        filters = mock_manager.iter_nodes.call_args[1]['filters']
+        self.assertEqual(['import_task_monitor_url'], filters['async_job_in'])
 
     @mock.patch.object(periodics.LOG, 'info', autospec=True)
     @mock.patch.object(task_manager, 'acquire', autospec=True)
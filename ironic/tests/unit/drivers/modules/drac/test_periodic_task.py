@@ -112,6 +112,8 @@ class DracPeriodicTaskTestCase(db_base.DbTestCase):
         raid._query_raid_config_job_status(mock_manager, None)
 
         self.assertEqual(0, raid._check_node_raid_jobs.call_count)
+        filters = mock_manager.iter_nodes.call_args[1]['filters']
+        self.assertEqual(['raid_config_job_ids'], filters['async_job_in'])
 
     def test__query_raid_config_job_status_no_nodes(self):
         # mock manager
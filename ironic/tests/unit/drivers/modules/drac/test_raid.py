@@ -2732,6 +2732,8 @@ class DracRedfishRAIDTestCase(test_utils.BaseDracTest):
         self.raid._query_raid_tasks_status(mock_manager, self.context)
 
         self.raid._check_raid_tasks_status.assert_not_called()
+        filters = mock_manager.iter_nodes.call_args[1]['filters']
+        self.assertEqual(['raid_task_monitor_uris'], filters['async_job_in'])
 
     @mock.patch.object(redfish_utils, 'get_task_monitor', autospec=True)
     def test__check_raid_tasks_status(self, mock_get_task_monitor):
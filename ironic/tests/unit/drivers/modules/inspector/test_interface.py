@@ -548,6 +548,132 @@ class CheckStatusTestCase(BaseTestCase):
         mock_get.assert_called_once_with(self.node.uuid)
         mock_get_data.assert_not_called()
 
+    def test_status_known(self, mock_client):
+        mock_get = mock_client.return_value.get_introspection
+        status = mock.Mock(is_finished=True, error=None,
+                           spec=['is_finished', 'error'])
+        inspector._check_status(self.task, status=status)
+        self.assertFalse(mock_get.called)
+        self.task.process_event.assert_called_once_with('done')
+
+
+@mock.patch.object(inspector, '_check_status', autospec=True)
+@mock.patch.object(task_manager, 'acquire', autospec=True)
+@mock.patch.object(client, 'get_client', autospec=True)
+class PeriodicCheckResultTestCase(BaseTestCase):
+    def setUp(self):
+        super(PeriodicCheckResultTestCase, self).setUp()
+        self.manager = mock.Mock(spec=['iter_nodes'])
+        self.uuids = ['1be26c0b-03f2-4d2e-ae87-c02d7f33c123',
+                      '2be26c0b-03f2-4d2e-ae87-c02d7f33c123',
+                      '3be26c0b-03f2-4d2e-ae87-c02d7f33c123']
+        self.manager.iter_nodes.return_value = [
+            (uuid, 'fake-hardware', '') for uuid in self.uuids]
+        self.task = mock.Mock(spec=task_manager.TaskManager,
+                              driver=mock.Mock(inspect=self.iface))
+
+    def _status(self, uuid, is_finished=False, error=None):
+        return mock.Mock(id=uuid, is_finished=is_finished, error=error,
+                         spec=['id', 'is_finished', 'error'])
+
+    def _checked(self, mock_acquire):
+        return [c[0][1] for c in mock_acquire.call_args_list]
+
+    def _run(self, mock_acquire):
+        mock_acquire.return_value.__enter__.return_value = self.task
+        self.iface._periodic_check_result(self.manager, self.context)
+
+    def test_only_finished_locked(self, mock_client, mock_acquire,
+                                  mock_check):
+        running = self._status(self.uuids[0])
+        finished = self._status(self.uuids[1], is_finished=True)
+        failed = self._status(self.uuids[2], is_finished=True, error='boom')
+        mock_list = mock_client.return_value.introspections
+        mock_list.return_value = iter([running, finished, failed])
+
+        self._run(mock_acquire)
+
+        self.manager.iter_nodes.assert_called_once_with(
+            filters={'provision_state': states.INSPECTWAIT}, fields=())
+        mock_list.assert_called_once_with(limit=1000)
+        self.assertFalse(mock_client.return_value.get_introspection.called)
+        self.assertEqual(self.uuids[1:], self._checked(mock_acquire))
+        for call in mock_acquire.call_args_list:
+            self.assertTrue(call[1]['shared'])
+        mock_check.assert_has_calls([mock.call(self.task, status=finished),
+                                     mock.call(self.task, status=failed)])
+
+    def test_listing_stops_when_all_found(self, mock_client, mock_acquire,
+                                          mock_check):
+        self.manager.iter_nodes.return_value = [
+            (self.uuids[0], 'fake-hardware', '')]
+        other = self._status(self.uuids[1])
+        mock_list = mock_client.return_value.introspections
+        mock_list.return_value = iter(
+            [self._status(self.uuids[0]), other])
+
+        self._run(mock_acquire)
+
+        self.assertEqual([other], list(mock_list.return_value))
+        self.assertFalse(mock_acquire.called)
+
+    def test_missing_checked_separately(self, mock_client, mock_acquire,
+                                        mock_check):
+        mock_list = mock_client.return_value.introspections
+        mock_list.return_value = iter([self._status(self.uuids[0])])
+
+        self._run(mock_acquire)
+
+        self.assertEqual(self.uuids[1:], self._checked(mock_acquire))
+        mock_check.assert_has_calls([mock.call(self.task, status=None)] * 2)
+
+    def test_listing_fails(self, mock_client, mock_acquire, mock_check):
+        mock_list = mock_client.return_value.introspections
+        mock_list.side_effect = RuntimeError('boom')
+
+        self._run(mock_acquire)
+
+        self.assertEqual(self.uuids, self._checked(mock_acquire))
+
+    def test_listing_disabled(self, mock_client, mock_acquire, mock_check):
+        CONF.set_override('status_check_page_size', 0, group='inspector')
+
+        self._run(mock_acquire)
+
+        self.assertFalse(mock_client.return_value.introspections.called)
+        self.assertEqual(self.uuids, self._checked(mock_acquire))
+
+    def test_no_nodes(self, mock_client, mock_acquire, mock_check):
+        self.manager.iter_nodes.return_value = []
+
+        self._run(mock_acquire)
+
+        self.assertFalse(mock_client.called)
+        self.assertFalse(mock_acquire.called)
+
+    def test_node_locked_or_deleted(self, mock_client, mock_acquire,
+                                    mock_check):
+        CONF.set_override('status_check_page_size', 0, group='inspector')
+        mock_acquire.side_effect = [
+            exception.NodeLocked(node=self.uuids[0], host='host'),
+            exception.NodeNotFound(node=self.uuids[1]),
+            mock.MagicMock(**{'__enter__.return_value': self.task})]
+
+        self._run(mock_acquire)
+
+        self.assertEqual(self.uuids, self._checked(mock_acquire))
+        mock_check.assert_called_once_with(self.task, status=None)
+
+    def test_other_interface_skipped(self, mock_client, mock_acquire,
+                                     mock_check):
+        CONF.set_override('status_check_page_size', 0, group='inspector')
+        self.task.driver.inspect = mock.Mock()
+
+        self._run(mock_acquire)
+
+        self.assertEqual(self.uuids, self._checked(mock_acquire))
+        self.assertFalse(mock_check.called)
+
 
 @mock.patch.object(client, 'get_client', autospec=True)
 class InspectHardwareAbortTestCase(BaseTestCase):
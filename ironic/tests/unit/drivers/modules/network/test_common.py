@@ -769,7 +769,8 @@ class TestNeutronVifPortIDMixin(db_base.DbTestCase):
             mock_upa.assert_called_once_with(
                 "fake_vif_id", self.port.address, context=task.context)
         mock_gpbpi.assert_called_once_with(mock_client.return_value,
-                                           'fake_vif_id')
+                                           'fake_vif_id',
+                                           context=task.context)
         mock_gfp.assert_called_once_with(task, 'fake_vif_id', {'physnet1'},
                                          {'id': 'fake_vif_id'})
         mock_save.assert_called_once_with(self.port, "fake_vif_id")
@@ -871,7 +872,8 @@ class TestNeutronVifPortIDMixin(db_base.DbTestCase):
                 self.interface.vif_attach, task, vif)
             mock_client.assert_called_once_with(context=task.context)
         mock_gpbpi.assert_called_once_with(mock_client.return_value,
-                                           'fake_vif_id')
+                                           'fake_vif_id',
+                                           context=task.context)
         self.assertFalse(mock_save.called)
 
     @mock.patch.object(common.VIFPortIDMixin, '_save_vif_to_port_like_obj',
@@ -896,7 +898,8 @@ class TestNeutronVifPortIDMixin(db_base.DbTestCase):
                 self.interface.vif_attach, task, vif)
             mock_client.assert_called_once_with(context=task.context)
         mock_gpbpi.assert_called_once_with(mock_client.return_value,
-                                           'fake_vif_id')
+                                           'fake_vif_id',
+                                           context=task.context)
         self.assertFalse(mock_upa.called)
         self.assertFalse(mock_save.called)
 
@@ -923,7 +926,8 @@ class TestNeutronVifPortIDMixin(db_base.DbTestCase):
                 self.interface.vif_attach, task, vif)
             mock_client.assert_called_once_with(context=task.context)
         mock_gpbpi.assert_called_once_with(mock_client.return_value,
-                                           'fake_vif_id')
+                                           'fake_vif_id',
+                                           context=task.context)
         self.assertFalse(mock_gfp.called)
         self.assertFalse(mock_upa.called)
         self.assertFalse(mock_save.called)
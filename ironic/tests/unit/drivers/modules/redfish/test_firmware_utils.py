@@ -17,6 +17,7 @@ import tempfile
 from unittest import mock
 from urllib.parse import urlparse
 
+import fixtures
 from oslo_utils import fileutils
 
 from ironic.common import exception
@@ -459,3 +460,75 @@ class FirmwareUtilsTestCase(base.TestCase):
         mock_swift_api.return_value.delete_object.assert_called_with(
             CONF.redfish.swift_container, object_name)
         mock_warning.assert_called_once()
+
+
+class FirmwareCacheTestCase(base.TestCase):
+
+    def setUp(self):
+        super(FirmwareCacheTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        self.config(firmware_cache_dir=self.cache_dir, group='redfish')
+        self.config(http_root=os.path.join(self.tmpdir, 'httpboot'),
+                    group='deploy')
+        temp_dir = os.path.join(self.tmpdir, 'temp')
+        os.mkdir(temp_dir)
+        self.useFixture(fixtures.MockPatchObject(
+            tempfile, 'gettempdir', autospec=True, return_value=temp_dir))
+
+        source = os.path.join(self.tmpdir, 'bios.exe')
+        with open(source, 'wb') as f:
+            f.write(b'firmware')
+        self.url = 'file://' + source
+        self.checksum = fileutils.compute_file_checksum(source,
+                                                        algorithm='sha1')
+        self.node1 = mock.Mock(uuid='9f0f6795-f74e-4b5a-850e-72f586a92435',
+                               driver_internal_info={})
+        self.node2 = mock.Mock(uuid='55cdaba0-1123-4622-8b37-bb52dd6285d3',
+                               driver_internal_info={})
+
+    @mock.patch.object(firmware_utils, 'verify_checksum', autospec=True,
+                       side_effect=firmware_utils.verify_checksum)
+    @mock.patch.object(firmware_utils, 'download_to_temp', autospec=True,
+                       side_effect=firmware_utils.download_to_temp)
+    def test_download_to_cache_shared(self, mock_download, mock_verify):
+        path1 = firmware_utils.download_to_cache(self.node1, self.url,
+                                                 self.checksum)
+        path2 = firmware_utils.download_to_cache(self.node2, self.url,
+                                                 self.checksum)
+
+        self.assertEqual(path1, path2)
+        self.assertEqual('bios.exe', os.path.basename(path1))
+        self.assertTrue(path1.startswith(self.cache_dir))
+        with open(path1, 'rb') as f:
+            self.assertEqual(b'firmware', f.read())
+        mock_download.assert_called_once_with(self.node1, self.url)
+        mock_verify.assert_called_once_with(self.node1, self.checksum,
+                                            mock.ANY)
+
+        # Another checksum is another cache entry
+        self.assertRaises(exception.RedfishError,
+                          firmware_utils.download_to_cache,
+                          self.node1, self.url, 'abc')
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+    def test_cleanup_releases_cached_file(self):
+        path = firmware_utils.download_to_cache(self.node1, self.url,
+                                                self.checksum)
+        firmware_utils.download_to_cache(self.node2, self.url, self.checksum)
+        staged_url, need_cleanup = firmware_utils.stage(self.node1, 'local',
+                                                        path)
+        self.assertEqual('http', need_cleanup)
+        staged_path = os.path.join(CONF.deploy.http_root, 'firmware',
+                                   self.node1.uuid, 'bios.exe')
+        # Staged files are links to the cached file
+        self.assertTrue(os.path.samefile(path, staged_path))
+
+        self.node1.driver_internal_info = {'firmware_cleanup': ['http']}
+        firmware_utils.cleanup(self.node1)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(staged_path))
+
+        firmware_utils.cleanup(self.node2)
+        self.assertEqual([], os.listdir(self.cache_dir))
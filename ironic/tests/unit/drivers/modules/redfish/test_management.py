@@ -1031,6 +1031,8 @@ class RedfishManagementTestCase(db_base.DbTestCase):
                                                  self.context)
 
         management._clear_firmware_updates.assert_not_called()
+        filters = mock_manager.iter_nodes.call_args[1]['filters']
+        self.assertEqual(['firmware_updates'], filters['async_job_in'])
 
     @mock.patch.object(task_manager, 'acquire', autospec=True)
     def test__query_firmware_update_status(self, mock_acquire):
@@ -1074,6 +1076,8 @@ class RedfishManagementTestCase(db_base.DbTestCase):
                                                  self.context)
 
         management._check_node_firmware_update.assert_not_called()
+        filters = mock_manager.iter_nodes.call_args[1]['filters']
+        self.assertEqual(['firmware_updates'], filters['async_job_in'])
 
     @mock.patch.object(redfish_mgmt.LOG, 'warning', autospec=True)
     @mock.patch.object(redfish_utils, 'get_update_service', autospec=True)
@@ -1370,15 +1374,14 @@ class RedfishManagementTestCase(db_base.DbTestCase):
             task.node.save.assert_called_once_with()
             mock_node_power_action.assert_called_once_with(task, states.REBOOT)
 
-    @mock.patch.object(firmware_utils, 'download_to_temp', autospec=True)
-    @mock.patch.object(firmware_utils, 'verify_checksum', autospec=True)
+    @mock.patch.object(firmware_utils, 'download_to_cache', autospec=True)
     @mock.patch.object(firmware_utils, 'stage', autospec=True)
-    def test__stage_firmware_file_https(self, mock_stage, mock_verify_checksum,
-                                        mock_download_to_temp):
+    def test__stage_firmware_file_https(self, mock_stage,
+                                        mock_download_to_cache):
         CONF.set_override('firmware_source', 'local', 'redfish')
         firmware_update = {'url': 'https://test1', 'checksum': 'abc'}
         node = mock.Mock()
-        mock_download_to_temp.return_value = '/tmp/test1'
+        mock_download_to_cache.return_value = '/tmp/test1'
         mock_stage.return_value = ('http://staged/test1', 'http')
 
         management = redfish_mgmt.RedfishManagement()
@@ -1388,17 +1391,16 @@ class RedfishManagementTestCase(db_base.DbTestCase):
 
         self.assertEqual(staged_url, 'http://staged/test1')
         self.assertEqual(needs_cleanup, 'http')
-        mock_download_to_temp.assert_called_with(node, 'https://test1')
-        mock_verify_checksum.assert_called_with(node, 'abc', '/tmp/test1')
+        mock_download_to_cache.assert_called_with(node, 'https://test1',
+                                                  'abc')
         mock_stage.assert_called_with(node, 'local', '/tmp/test1')
 
-    @mock.patch.object(firmware_utils, 'download_to_temp', autospec=True)
-    @mock.patch.object(firmware_utils, 'verify_checksum', autospec=True)
+    @mock.patch.object(firmware_utils, 'download_to_cache', autospec=True)
     @mock.patch.object(firmware_utils, 'stage', autospec=True)
     @mock.patch.object(firmware_utils, 'get_swift_temp_url', autospec=True)
     def test__stage_firmware_file_swift(
-            self, mock_get_swift_temp_url, mock_stage, mock_verify_checksum,
-            mock_download_to_temp):
+            self, mock_get_swift_temp_url, mock_stage,
+            mock_download_to_cache):
         CONF.set_override('firmware_source', 'swift', 'redfish')
         firmware_update = {'url': 'swift://container/bios.exe'}
         node = mock.Mock()
@@ -1411,30 +1413,28 @@ class RedfishManagementTestCase(db_base.DbTestCase):
 
         self.assertEqual(staged_url, 'http://temp')
         self.assertIsNone(needs_cleanup)
-        mock_download_to_temp.assert_not_called()
-        mock_verify_checksum.assert_not_called()
+        mock_download_to_cache.assert_not_called()
         mock_stage.assert_not_called()
 
     @mock.patch.object(firmware_utils, 'cleanup', autospec=True)
-    @mock.patch.object(firmware_utils, 'download_to_temp', autospec=True)
-    @mock.patch.object(firmware_utils, 'verify_checksum', autospec=True)
+    @mock.patch.object(firmware_utils, 'download_to_cache', autospec=True)
     @mock.patch.object(firmware_utils, 'stage', autospec=True)
-    def test__stage_firmware_file_error(self, mock_stage, mock_verify_checksum,
-                                        mock_download_to_temp, mock_cleanup):
+    def test__stage_firmware_file_error(self, mock_stage,
+                                        mock_download_to_cache, mock_cleanup):
         node = mock.Mock()
         firmware_update = {'url': 'https://test1'}
         CONF.set_override('firmware_source', 'local', 'redfish')
         firmware_update = {'url': 'https://test1'}
         node = mock.Mock()
-        mock_download_to_temp.return_value = '/tmp/test1'
+        mock_download_to_cache.return_value = '/tmp/test1'
         mock_stage.side_effect = exception.IronicException
 
         management = redfish_mgmt.RedfishManagement()
         self.assertRaises(exception.IronicException,
                           management._stage_firmware_file, node,
                           firmware_update)
-        mock_download_to_temp.assert_called_with(node, 'https://test1')
-        mock_verify_checksum.assert_called_with(node, None, '/tmp/test1')
+        mock_download_to_cache.assert_called_with(node, 'https://test1',
+                                                  None)
         mock_stage.assert_called_with(node, 'local', '/tmp/test1')
         mock_cleanup.assert_called_with(node)
 
@@ -15,6 +15,7 @@
 
 import collections
 import copy
+import hashlib
 import os
 import time
 from unittest import mock
@@ -310,6 +311,72 @@ class RedfishUtilsAuthTestCase(db_base.DbTestCase):
         self.assertEqual(mock_sushy.call_count, 20)
         self.assertEqual(len(redfish_utils.SessionCache._sessions), 10)
 
+    @mock.patch.object(sushy, 'Sushy', autospec=True)
+    @mock.patch('ironic.drivers.modules.redfish.utils.'
+                'SessionCache._sessions', {})
+    def test_expire_least_recently_used(self, mock_sushy):
+        cfg.CONF.set_override('connection_cache_size', 2, 'redfish')
+        for name in ('foo', 'bar', 'foo', 'baz', 'foo'):
+            self.node.driver_info['redfish_username'] = name
+            redfish_utils.get_system(self.node)
+
+        # "foo" was used recently, so "bar" was evicted to make room for "baz"
+        self.assertEqual(3, mock_sushy.call_count)
+        self.assertEqual(
+            ['baz', 'foo'],
+            [key[1] for key in redfish_utils.SessionCache._sessions])
+
+    @mock.patch.object(sushy, 'Sushy', autospec=True)
+    @mock.patch('ironic.drivers.modules.redfish.utils.'
+                'SessionCache._sessions', {})
+    def test_expire_sessions_ttl(self, mock_sushy):
+        redfish_utils.get_system(self.node)
+        with mock.patch.object(time, 'monotonic', autospec=True,
+                               return_value=time.monotonic() + 3600):
+            redfish_utils.get_system(self.node)
+        self.assertEqual(1, mock_sushy.call_count)
+
+        cfg.CONF.set_override('connection_cache_ttl', 600, 'redfish')
+        with mock.patch.object(time, 'monotonic', autospec=True,
+                               return_value=time.monotonic() + 3600):
+            redfish_utils.get_system(self.node)
+        self.assertEqual(2, mock_sushy.call_count)
+        self.assertEqual(len(redfish_utils.SessionCache._sessions), 1)
+
+    @mock.patch.object(redfish_utils.METRICS, 'send_counter', autospec=True)
+    @mock.patch.object(sushy, 'Sushy', autospec=True)
+    @mock.patch('ironic.drivers.modules.redfish.utils.'
+                'SessionCache._sessions', {})
+    def test_session_cache_metrics(self, mock_sushy, mock_counter):
+        cfg.CONF.set_override('connection_cache_size', 1, 'redfish')
+        redfish_utils.get_system(self.node)
+        redfish_utils.get_system(self.node)
+        self.node.driver_info['redfish_username'] = 'foo'
+        redfish_utils.get_system(self.node)
+        mock_counter.assert_has_calls([
+            mock.call('RedfishSessionCache.Miss', 1),
+            mock.call('RedfishSessionCache.Hit', 1),
+            mock.call('RedfishSessionCache.Miss', 1),
+            mock.call('RedfishSessionCache.Eviction', 1),
+        ])
+
+    @mock.patch.object(hashlib, 'pbkdf2_hmac', autospec=True,
+                       side_effect=hashlib.pbkdf2_hmac)
+    @mock.patch('ironic.drivers.modules.redfish.utils.'
+                'SessionCache._password_hashes', collections.OrderedDict())
+    def test_password_hash_cached(self, mock_pbkdf2):
+        driver_info = redfish_utils.parse_driver_info(self.node)
+        key = redfish_utils.SessionCache(driver_info)._session_key
+        self.assertEqual(
+            key, redfish_utils.SessionCache(dict(driver_info))._session_key)
+        mock_pbkdf2.assert_called_once_with(
+            'sha512', b'password', b'https://example.com' * 4, 40)
+
+        driver_info['password'] = 'other'
+        self.assertNotEqual(
+            key, redfish_utils.SessionCache(driver_info)._session_key)
+        self.assertEqual(2, mock_pbkdf2.call_count)
+
     @mock.patch.object(sushy, 'Sushy', autospec=True)
     @mock.patch('ironic.drivers.modules.redfish.utils.'
                 'SessionCache._sessions', {})
@@ -1987,7 +1987,8 @@ class TestBuildInstanceInfoForHttpProvisioning(db_base.DbTestCase):
             symlink_file = utils._get_http_image_symlink_file_path(
                 self.node.uuid)
             image_path = utils._get_image_file_path(self.node.uuid)
-            self.ensure_tree_mock.assert_called_once_with(symlink_dir)
+            # NOTE: the instance image cache may ensure its master directory
+            self.ensure_tree_mock.assert_called_with(symlink_dir)
             self.create_link_mock.assert_called_once_with(image_path,
                                                           symlink_file)
             validate_mock.assert_called_once_with(mock.ANY, self.expected_url,
@@ -2016,8 +2017,24 @@ class TestBuildInstanceInfoForHttpProvisioning(db_base.DbTestCase):
         self.assertEqual(instance_info['image_os_hash_value'],
                          'fake-checksum')
         self.assertEqual(instance_info['image_disk_format'], 'raw')
-        self.checksum_mock.assert_called_once_with(image_path,
-                                                   algorithm='sha512')
+        self.checksum_mock.assert_called_once_with(
+            image_path, algorithm='sha512',
+            read_chunksize=utils.IMAGE_CHECKSUM_READ_CHUNK_SIZE)
+
+    @mock.patch.object(utils.InstanceImageCache, 'get_checksum',
+                       autospec=True)
+    def test_build_instance_info_force_raw_known_checksum(self,
+                                                          mock_get_checksum):
+        cfg.CONF.set_override('force_raw_images', True)
+        mock_get_checksum.return_value = 'known-checksum'
+        image_path, instance_info = self._test_build_instance_info(
+            image_info=self.image_info, expect_raw=True)
+
+        self.assertEqual(instance_info['image_os_hash_value'],
+                         'known-checksum')
+        mock_get_checksum.assert_called_once_with(
+            mock.ANY, image_path, 'sha512', utils.compute_image_checksum)
+        self.checksum_mock.assert_not_called()
 
     def test_build_instance_info_already_raw(self):
         cfg.CONF.set_override('force_raw_images', True)
@@ -2040,7 +2057,9 @@ class TestBuildInstanceInfoForHttpProvisioning(db_base.DbTestCase):
 
         self.assertIsNone(instance_info['image_checksum'])
         self.assertEqual(instance_info['image_disk_format'], 'raw')
-        calls = [mock.call(image_path, algorithm='sha256')]
+        calls = [mock.call(
+            image_path, algorithm='sha256',
+            read_chunksize=utils.IMAGE_CHECKSUM_READ_CHUNK_SIZE)]
         self.checksum_mock.assert_has_calls(calls)
 
     def test_build_instance_info_already_raw_keeps_md5(self):
@@ -2082,7 +2101,8 @@ class TestBuildInstanceInfoForHttpProvisioning(db_base.DbTestCase):
             self.cache_image_mock.assert_called_once_with(
                 task.context, task.node, force_raw=True)
             self.checksum_mock.assert_called_once_with(
-                self.fake_path, algorithm='sha256')
+                self.fake_path, algorithm='sha256',
+                read_chunksize=utils.IMAGE_CHECKSUM_READ_CHUNK_SIZE)
             validate_href_mock.assert_called_once_with(
                 mock.ANY, expected_url, False)
 
@@ -2114,7 +2134,8 @@ class TestBuildInstanceInfoForHttpProvisioning(db_base.DbTestCase):
             self.cache_image_mock.assert_called_once_with(
                 task.context, task.node, force_raw=True)
             self.checksum_mock.assert_called_once_with(
-                self.fake_path, algorithm='sha256')
+                self.fake_path, algorithm='sha256',
+                read_chunksize=utils.IMAGE_CHECKSUM_READ_CHUNK_SIZE)
             validate_href_mock.assert_called_once_with(
                 mock.ANY, expected_url, False)
 
@@ -2148,7 +2169,8 @@ class TestBuildInstanceInfoForHttpProvisioning(db_base.DbTestCase):
             self.cache_image_mock.assert_called_once_with(
                 task.context, task.node, force_raw=True)
             self.checksum_mock.assert_called_once_with(
-                self.fake_path, algorithm='sha256')
+                self.fake_path, algorithm='sha256',
+                read_chunksize=utils.IMAGE_CHECKSUM_READ_CHUNK_SIZE)
             validate_href_mock.assert_called_once_with(
                 mock.ANY, expected_url, False)
 
@@ -2184,7 +2206,8 @@ class TestBuildInstanceInfoForHttpProvisioning(db_base.DbTestCase):
             self.cache_image_mock.assert_called_once_with(
                 task.context, task.node, force_raw=True)
             self.checksum_mock.assert_called_once_with(
-                self.fake_path, algorithm='sha256')
+                self.fake_path, algorithm='sha256',
+                read_chunksize=utils.IMAGE_CHECKSUM_READ_CHUNK_SIZE)
             validate_href_mock.assert_called_once_with(
                 mock.ANY, expected_url, False)
 
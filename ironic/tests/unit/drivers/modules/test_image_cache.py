@@ -19,10 +19,12 @@
 import datetime
 import os
 import tempfile
+import threading
 import time
 from unittest import mock
 import uuid
 
+import eventlet
 from oslo_utils import uuidutils
 
 from ironic.common import exception
@@ -207,6 +209,243 @@ class TestImageCacheFetch(BaseTest):
         self.assertTrue(mock_clean_up.called)
 
 
+@mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+@mock.patch.object(image_service, 'get_image_service', autospec=True)
+@mock.patch.object(image_cache, '_fetch', autospec=True)
+class TestImageCacheShared(BaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = image_cache.ImageCache(self.master_dir, 1024, 3600)
+        self.img_info = {'os_hash_algo': 'sha512', 'os_hash_value': 'abcd'}
+
+    def _fake_fetch(self, ctx, href, tmp_path, *args):
+        with open(tmp_path, 'w') as fp:
+            fp.write("TEST")
+
+    def _dest(self, name):
+        return os.path.join(self.dest_dir, name)
+
+    def test_content_addressed(self, mock_fetch, mock_image_service,
+                               mock_counter):
+        mock_fetch.side_effect = self._fake_fetch
+        mock_image_service.return_value.show.return_value = self.img_info
+        self.cache.fetch_image('http://a/img', self._dest('1'))
+        self.cache.fetch_image('http://b/img', self._dest('2'))
+
+        mock_fetch.assert_called_once_with(None, 'http://a/img', mock.ANY,
+                                           True)
+        master_path = os.path.join(self.master_dir,
+                                   'sha512-abcd.converted')
+        self.assertEqual([master_path],
+                         [os.path.join(self.master_dir, f)
+                          for f in os.listdir(self.master_dir)])
+        for name in ('1', '2'):
+            self.assertEqual(os.stat(master_path).st_ino,
+                             os.stat(self._dest(name)).st_ino)
+        mock_counter.assert_has_calls([
+            mock.call('ImageCache.Miss', 1),
+            mock.call('ImageCache.Hit', 1),
+            mock.call('ImageCache.BytesSaved', 4),
+        ])
+
+    def test_metadata_refresh_interval(self, mock_fetch, mock_image_service,
+                                       mock_counter):
+        mock_fetch.side_effect = self._fake_fetch
+        mock_show = mock_image_service.return_value.show
+        mock_show.return_value = self.img_info
+
+        self.cache.fetch_image(self.uuid, self._dest('1'))
+        self.cache.fetch_image(self.uuid, self._dest('2'))
+        self.assertEqual(2, mock_show.call_count)
+
+        self.config(image_cache_metadata_refresh_interval=60)
+        self.cache.fetch_image(self.uuid, self._dest('3'))
+        self.cache.fetch_image(self.uuid, self._dest('4'))
+        self.assertEqual(3, mock_show.call_count)
+
+        with mock.patch.object(time, 'monotonic', autospec=True,
+                               return_value=time.monotonic() + 61):
+            self.cache.fetch_image(self.uuid, self._dest('5'))
+        self.assertEqual(4, mock_show.call_count)
+        mock_fetch.assert_called_once_with(None, self.uuid, mock.ANY, True)
+
+    def test_concurrent_download_shared(self, mock_fetch, mock_image_service,
+                                        mock_counter):
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def _slow_fetch(*args):
+            started.set()
+            proceed.wait()
+            self._fake_fetch(*args)
+
+        mock_fetch.side_effect = _slow_fetch
+        mock_image_service.return_value.show.return_value = {}
+
+        first = eventlet.spawn(self.cache.fetch_image, self.uuid,
+                               self._dest('1'))
+        started.wait()
+        second = eventlet.spawn(self.cache.fetch_image, self.uuid,
+                                self._dest('2'))
+        eventlet.sleep(0)
+        self.assertEqual({self.master_path},
+                         set(image_cache._get_index(
+                             self.master_dir).downloads))
+        proceed.set()
+        first.wait()
+        second.wait()
+
+        self.assertEqual(1, mock_fetch.call_count)
+        for name in ('1', '2'):
+            self.assertEqual(os.stat(self.master_path).st_ino,
+                             os.stat(self._dest(name)).st_ino)
+        self.assertEqual({}, image_cache._get_index(self.master_dir).downloads)
+
+    def test_concurrent_download_failed(self, mock_fetch, mock_image_service,
+                                        mock_counter):
+        mock_fetch.side_effect = exception.ImageDownloadFailed(
+            image_href=self.uuid, reason='boom')
+        mock_image_service.return_value.show.return_value = {}
+        self.assertRaises(exception.ImageDownloadFailed,
+                          self.cache.fetch_image, self.uuid, self._dest('1'))
+        # The failed download is no longer registered
+        self.assertEqual({}, image_cache._get_index(self.master_dir).downloads)
+
+    def test_build_image(self, mock_fetch, mock_image_service,
+                         mock_counter):
+        builder = mock.Mock(side_effect=lambda path: self._fake_fetch(
+            None, None, path))
+        self.cache.build_image('base.iso', self._dest('1'), builder)
+        self.cache.build_image('base.iso', self._dest('2'), builder)
+
+        builder.assert_called_once_with(mock.ANY)
+        master_path = os.path.join(self.master_dir, 'base.iso')
+        self.assertEqual(['base.iso'], os.listdir(self.master_dir))
+        for name in ('1', '2'):
+            self.assertEqual(os.stat(master_path).st_ino,
+                             os.stat(self._dest(name)).st_ino)
+        mock_counter.assert_has_calls([
+            mock.call('ImageCache.Miss', 1),
+            mock.call('ImageCache.Hit', 1),
+            mock.call('ImageCache.BytesSaved', 4),
+        ])
+        self.assertFalse(mock_fetch.called)
+
+    def test_build_image_no_master_dir(self, mock_fetch, mock_image_service,
+                                       mock_counter):
+        self.cache.master_dir = None
+        builder = mock.Mock()
+        self.cache.build_image('base.iso', self.dest_path, builder)
+        builder.assert_called_once_with(self.dest_path)
+
+    def test_concurrent_build_shared(self, mock_fetch, mock_image_service,
+                                     mock_counter):
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def _slow_build(path):
+            started.set()
+            proceed.wait()
+            self._fake_fetch(None, None, path)
+
+        builder = mock.Mock(side_effect=_slow_build)
+        first = eventlet.spawn(self.cache.build_image, 'base.iso',
+                               self._dest('1'), builder)
+        started.wait()
+        second = eventlet.spawn(self.cache.build_image, 'base.iso',
+                                self._dest('2'), builder)
+        eventlet.sleep(0)
+        proceed.set()
+        first.wait()
+        second.wait()
+
+        self.assertEqual(1, builder.call_count)
+        self.assertEqual(os.stat(self._dest('1')).st_ino,
+                         os.stat(self._dest('2')).st_ino)
+        self.assertEqual({}, image_cache._get_index(self.master_dir).downloads)
+
+    def test_build_image_failed(self, mock_fetch, mock_image_service,
+                                mock_counter):
+        builder = mock.Mock(side_effect=exception.ImageCreationFailed(
+            image_type='iso', error='boom'))
+        self.assertRaises(exception.ImageCreationFailed,
+                          self.cache.build_image, 'base.iso',
+                          self._dest('1'), builder)
+        self.assertEqual([], os.listdir(self.master_dir))
+        self.assertEqual({}, image_cache._get_index(self.master_dir).downloads)
+
+    def test_get_checksum(self, mock_fetch, mock_image_service,
+                          mock_counter):
+        mock_fetch.side_effect = self._fake_fetch
+        mock_image_service.return_value.show.return_value = self.img_info
+        self.cache.fetch_image(self.uuid, self._dest('1'))
+        self.cache.fetch_image(self.uuid, self._dest('2'))
+        compute = mock.Mock(return_value='abcd')
+
+        for name in ('1', '2'):
+            self.assertEqual('abcd', self.cache.get_checksum(
+                self._dest(name), 'sha256', compute))
+        compute.assert_called_once_with(self._dest('1'), 'sha256')
+        mock_counter.assert_has_calls([
+            mock.call('ImageCache.ChecksumMiss', 1),
+            mock.call('ImageCache.ChecksumHit', 1),
+        ])
+
+        # Another algorithm is computed separately
+        compute.return_value = 'efgh'
+        self.assertEqual('efgh', self.cache.get_checksum(
+            self._dest('1'), 'sha512', compute))
+        checksums_dir = os.path.join(self.master_dir, '.checksums')
+        [master_checksums] = os.listdir(checksums_dir)
+        self.assertEqual(
+            {'sha256', 'sha512'},
+            set(os.listdir(os.path.join(checksums_dir, master_checksums))))
+
+        # Forgotten when the master image is evicted
+        os.unlink(self._dest('1'))
+        os.unlink(self._dest('2'))
+        self.cache.clean_up(amount=4)
+        self.assertEqual([], os.listdir(checksums_dir))
+
+    def test_get_checksum_not_cached(self, mock_fetch, mock_image_service,
+                                     mock_counter):
+        compute = mock.Mock(return_value='abcd')
+        touch(self.dest_path)
+        for _ in range(2):
+            self.assertEqual('abcd', self.cache.get_checksum(
+                self.dest_path, 'sha256', compute))
+        self.assertEqual(2, compute.call_count)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.master_dir, '.checksums')))
+
+    @mock.patch.object(os, 'listdir', autospec=True)
+    def test_clean_up_uses_index(self, mock_listdir, mock_fetch,
+                                 mock_image_service, mock_counter):
+        mock_listdir.return_value = []
+        mock_fetch.side_effect = self._fake_fetch
+        mock_image_service.return_value.show.return_value = self.img_info
+        self.cache.fetch_image(self.uuid, self._dest('1'))
+        mock_listdir.assert_called_once_with(self.master_dir)
+
+        # In use, not evicted
+        new_current_time = time.time() + 7200
+        with mock.patch.object(time, 'time', lambda: new_current_time):
+            self.cache.clean_up()
+        master_path = os.path.join(self.master_dir, 'sha512-abcd.converted')
+        self.assertTrue(os.path.exists(master_path))
+
+        os.unlink(self._dest('1'))
+        new_current_time += 7200
+        with mock.patch.object(time, 'time', lambda: new_current_time):
+            self.cache.clean_up()
+        self.assertFalse(os.path.exists(master_path))
+        mock_listdir.assert_called_once_with(self.master_dir)
+        mock_counter.assert_any_call('ImageCache.Eviction', 1)
+        self.assertEqual(
+            [], image_cache._get_index(self.master_dir).listing())
+
+
 @mock.patch.object(image_cache, '_fetch', autospec=True)
 class TestImageCacheDownload(BaseTest):
 
@@ -290,6 +290,8 @@ class RedfishImageUtilsTestCase(db_base.DbTestCase):
                     enabled_management_interfaces=['redfish'],
                     enabled_inspect_interfaces=['redfish'],
                     enabled_bios_interfaces=['redfish'])
+        # NOTE: build boot ISOs from scratch unless a test enables the cache
+        self.config(iso_master_path='', group='deploy')
         self.node = obj_utils.create_test_node(
             self.context, driver='redfish', driver_info=INFO_DICT,
             provision_state=states.DEPLOYING)
@@ -823,6 +825,88 @@ class RedfishImageUtilsTestCase(db_base.DbTestCase):
                 root_uuid='1be26c0b-03f2-4d2e-ae87-c02d7f33c123',
                 inject_files=None)
 
+    @mock.patch.object(image_utils.ImageHandler, 'publish_image',
+                       autospec=True)
+    @mock.patch.object(image_utils, '_create_boot_iso_from_base',
+                       autospec=True)
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test__prepare_iso_image_from_base(
+            self, mock_create_boot_iso, mock_from_base, mock_publish_image):
+        self.config(iso_master_path='/master', group='deploy')
+        with task_manager.acquire(self.context, self.node.uuid,
+                                  shared=True) as task:
+            task.node.instance_info.update(deploy_boot_mode='uefi')
+
+            image_utils._prepare_iso_image(
+                task, 'http://kernel/img', 'http://ramdisk/img',
+                'http://bootloader/img', root_uuid=task.node.uuid,
+                inject_files={'/tmp/crt': 'ironic.crt'})
+
+            mock_from_base.assert_called_once_with(
+                task, mock.ANY, 'http://kernel/img', 'http://ramdisk/img',
+                bootloader_href='http://bootloader/img',
+                boot_mode='uefi',
+                kernel_params='nofb nomodeset vga=normal',
+                root_uuid='1be26c0b-03f2-4d2e-ae87-c02d7f33c123',
+                inject_files={'/tmp/crt': 'ironic.crt'})
+            self.assertFalse(mock_create_boot_iso.called)
+
+    @mock.patch.object(images, 'overlay_boot_iso', autospec=True)
+    @mock.patch.object(images, 'base_boot_iso_name', autospec=True)
+    @mock.patch.object(image_utils, 'ISOImageCache', autospec=True)
+    def _test__create_boot_iso_from_base(self, mock_cache, mock_name,
+                                         mock_overlay, boot_mode='uefi',
+                                         bootloader_href=None,
+                                         esp_image=None):
+        mock_name.return_value = 'base-1.iso'
+        with task_manager.acquire(self.context, self.node.uuid,
+                                  shared=True) as task:
+            image_utils._create_boot_iso_from_base(
+                task, '/tmp/boot.iso', 'http://kernel/img',
+                'http://ramdisk/img', bootloader_href=bootloader_href,
+                root_uuid='1234', kernel_params='foo=bar',
+                boot_mode=boot_mode, inject_files={b'{}': 'a.json'})
+
+        fetch_image = mock_cache.return_value.fetch_image
+        build_image = mock_cache.return_value.build_image
+        fetched = [c[0][0] for c in fetch_image.call_args_list]
+        expected = ['http://kernel/img', 'http://ramdisk/img']
+        if bootloader_href:
+            expected.append(bootloader_href)
+        self.assertEqual(expected, fetched)
+        kernel_path = fetch_image.call_args_list[0][0][1]
+        ramdisk_path = fetch_image.call_args_list[1][0][1]
+        if bootloader_href:
+            esp_image = fetch_image.call_args_list[2][0][1]
+
+        mock_name.assert_called_once_with(
+            kernel_path, ramdisk_path, esp_image=esp_image,
+            boot_mode=boot_mode, inject_files={b'{}': 'a.json'})
+        build_image.assert_called_once_with('base-1.iso', mock.ANY,
+                                            mock.ANY)
+        base_iso_path = build_image.call_args[0][1]
+        builder = build_image.call_args[0][2]
+        self.assertEqual(images.create_base_boot_iso, builder.func)
+        self.assertEqual({'kernel': kernel_path, 'ramdisk': ramdisk_path,
+                          'esp_image': esp_image, 'boot_mode': boot_mode,
+                          'inject_files': {b'{}': 'a.json'}},
+                         builder.keywords)
+        mock_overlay.assert_called_once_with(
+            base_iso_path, '/tmp/boot.iso', root_uuid='1234',
+            kernel_params='foo=bar', boot_mode=boot_mode,
+            inject_files={b'{}': 'a.json'})
+
+    def test__create_boot_iso_from_base_uefi(self):
+        self._test__create_boot_iso_from_base(
+            bootloader_href='http://bootloader/img')
+
+    def test__create_boot_iso_from_base_uefi_esp_image(self):
+        self.config(esp_image='/path/to/esp.img')
+        self._test__create_boot_iso_from_base(esp_image='/path/to/esp.img')
+
+    def test__create_boot_iso_from_base_bios(self):
+        self._test__create_boot_iso_from_base(boot_mode='bios')
+
     def test__prepare_iso_image_bootable_iso(self):
         with task_manager.acquire(self.context, self.node.uuid,
                                   shared=True) as task:
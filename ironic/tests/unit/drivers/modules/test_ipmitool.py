@@ -44,6 +44,7 @@ import ironic.conf
 from ironic.drivers.modules import boot_mode_utils
 from ironic.drivers.modules import console_utils
 from ironic.drivers.modules import ipmitool as ipmi
+from ironic.drivers.modules import ipmitool_shell
 from ironic.drivers import utils as driver_utils
 from ironic.tests import base
 from ironic.tests.unit.db import base as db_base
@@ -1807,6 +1808,60 @@ class IPMIToolPrivateMethodTestCase(
         mock_exec.assert_called_once_with(self.info, "power status",
                                           kill_on_timeout=True)
 
+    @mock.patch.object(ipmi, '_is_option_supported', autospec=True)
+    @mock.patch.object(ipmitool_shell, 'execute', autospec=True)
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test__power_status_persistent(self, mock_exec, mock_shell,
+                                      mock_support):
+        self.config(use_persistent_sessions=True, group='ipmi')
+        mock_support.return_value = False
+        mock_shell.return_value = "Chassis Power is on\n"
+
+        state = ipmi._power_status(self.info)
+
+        self.assertEqual(states.POWER_ON, state)
+        mock_shell.assert_called_once_with(
+            self.info['address'], ipmi._get_ipmitool_args(self.info),
+            self.info['password'], "power status",
+            CONF.ipmi.command_retry_timeout,
+            expected=r'\AChassis Power is (on|off)\n\Z')
+        self.assertFalse(mock_exec.called)
+
+    @mock.patch.object(ipmi, '_is_option_supported', autospec=True)
+    @mock.patch.object(ipmitool_shell, 'execute', autospec=True)
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test__power_status_persistent_fallback(self, mock_exec, mock_shell,
+                                               mock_support):
+        self.config(use_persistent_sessions=True, group='ipmi')
+        mock_support.return_value = False
+        mock_exec.return_value = ["Chassis Power is off\n", None]
+        for shell_result in (
+                exception.IPMIFailure(cmd='power status'),
+                OSError('boom')):
+            mock_exec.reset_mock()
+            mock_shell.side_effect = [shell_result]
+
+            state = ipmi._power_status(self.info)
+
+            self.assertEqual(states.POWER_OFF, state)
+            mock_exec.assert_called_once_with(self.info, "power status",
+                                              kill_on_timeout=True)
+
+    @mock.patch.object(ipmitool_shell, 'execute', autospec=True)
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test__power_status_persistent_not_used(self, mock_exec, mock_shell):
+        mock_exec.return_value = ["Chassis Power is on\n", None]
+        self.config(use_persistent_sessions=True, group='ipmi')
+        self.info['protocol_version'] = '1.5'
+        ipmi._power_status(self.info)
+
+        self.info['protocol_version'] = '2.0'
+        self.config(cipher_suite_versions=['1', '3'], group='ipmi')
+        ipmi._power_status(self.info)
+
+        self.assertFalse(mock_shell.called)
+        self.assertEqual(2, mock_exec.call_count)
+
     @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
     @mock.patch('oslo_utils.eventletutils.EventletEvent.wait', autospec=True)
     def test__power_on_max_retries(self, sleep_mock, mock_exec):
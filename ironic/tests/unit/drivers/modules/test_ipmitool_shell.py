@@ -0,0 +1,173 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for persistent ipmitool sessions."""
+
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import eventlet
+
+from ironic.common import exception
+from ironic.drivers.modules import ipmitool_shell
+from ironic.tests import base
+
+
+# Emulates "ipmitool ... -E shell": prints a prompt, then runs commands read
+# from stdin until "exit".
+FAKE_IPMITOOL = """
+import os
+import sys
+import time
+
+assert sys.argv[-2:] == ['-E', 'shell'], sys.argv
+echo = '--echo' in sys.argv
+sys.stdout.write('ipmitool> ')
+sys.stdout.flush()
+for line in sys.stdin:
+    command = line.strip()
+    if echo:
+        sys.stdout.write(line)
+    if command == 'exit':
+        break
+    elif command == 'pid':
+        sys.stdout.write('%d\\n' % os.getpid())
+    elif command == 'password':
+        sys.stdout.write(os.environ['IPMI_PASSWORD'] + '\\n')
+    elif command == 'crash':
+        sys.exit(1)
+    elif command.startswith('sleep'):
+        time.sleep(float(command.split()[1]))
+    else:
+        sys.stdout.write('Chassis Power is on\\n')
+    sys.stdout.write('ipmitool> ')
+    sys.stdout.flush()
+"""
+
+
+class IPMIToolShellTestCase(base.TestCase):
+
+    def setUp(self):
+        super(IPMIToolShellTestCase, self).setUp()
+        fd, path = tempfile.mkstemp(suffix='.py')
+        with os.fdopen(fd, 'w') as f:
+            f.write(FAKE_IPMITOOL)
+        self.addCleanup(os.unlink, path)
+        self.args = [sys.executable, path]
+        self.addCleanup(ipmitool_shell._slots.clear)
+        self.addCleanup(ipmitool_shell.close_all)
+
+    def _execute(self, command, address='1.2.3.4', args=None, timeout=10):
+        return ipmitool_shell.execute(address, args or self.args, 'secret',
+                                      command, timeout)
+
+    def test_execute(self):
+        self.assertEqual('Chassis Power is on\n',
+                         self._execute('power status'))
+        self.assertEqual('secret\n', self._execute('password'))
+
+    def test_execute_reuses_shell(self):
+        pid = self._execute('pid')
+        self.assertEqual(pid, self._execute('pid'))
+        # Different credentials or BMCs get their own shell
+        self.assertNotEqual(pid, self._execute('pid',
+                                               args=self.args + ['-U', 'x']))
+        self.assertEqual(2, len(ipmitool_shell._idle))
+
+    def test_execute_expected(self):
+        self.assertEqual('Chassis Power is on\n',
+                         ipmitool_shell.execute('1.2.3.4', self.args,
+                                                'secret', 'power status', 10,
+                                                expected=r'^Chassis Power'))
+
+    def test_execute_unexpected_output(self):
+        pid = self._execute('pid')
+        self.assertRaises(exception.IPMIFailure, ipmitool_shell.execute,
+                          '1.2.3.4', self.args, 'secret', 'power status', 10,
+                          expected=r'^Chassis Power is off')
+        # The desynchronized shell is not reused
+        self.assertNotEqual(pid, self._execute('pid'))
+
+    def test_execute_echo(self):
+        self.assertEqual('Chassis Power is on\n',
+                         self._execute('power status',
+                                       args=self.args + ['--echo']))
+
+    def test_shell_exited(self):
+        pid = self._execute('pid')
+        self.assertRaises(exception.IPMIFailure, self._execute, 'crash')
+        self.assertNotEqual(pid, self._execute('pid'))
+
+    def test_timeout(self):
+        pid = self._execute('pid')
+        self.assertRaises(exception.IPMIFailure, self._execute, 'sleep 10',
+                          timeout=0.1)
+        self.assertNotEqual(pid, self._execute('pid'))
+
+    def test_idle_eviction(self):
+        self.config(persistent_session_idle_timeout=30, group='ipmi')
+        pid = self._execute('pid')
+        other_pid = self._execute('pid', address='1.2.3.5',
+                                  args=self.args + ['-H', '1.2.3.5'])
+        shells = [s for shells in ipmitool_shell._idle.values()
+                  for s in shells]
+
+        with mock.patch.object(time, 'monotonic', autospec=True,
+                               return_value=time.monotonic() + 31):
+            self.assertNotEqual(pid, self._execute('pid'))
+
+        # Both idle shells were closed
+        for shell in shells:
+            self.assertFalse(shell.alive)
+        self.assertNotEqual(other_pid, self._execute(
+            'pid', address='1.2.3.5', args=self.args + ['-H', '1.2.3.5']))
+
+    def test_idle_eviction_closes_without_lock(self):
+        self.config(persistent_session_idle_timeout=30, group='ipmi')
+        self._execute('pid')
+        shell, = ipmitool_shell._idle[(tuple(self.args), 'secret')]
+        close = shell.close
+
+        def _close():
+            self.assertFalse(ipmitool_shell._lock.locked())
+            close()
+
+        with mock.patch.object(shell, 'close', autospec=True,
+                               side_effect=_close) as mock_close:
+            with mock.patch.object(time, 'monotonic', autospec=True,
+                                   return_value=time.monotonic() + 31):
+                self._execute('pid')
+        mock_close.assert_called_once_with()
+
+    def test_max_per_address(self):
+        self.config(persistent_session_max_per_address=2, group='ipmi')
+        pool = eventlet.GreenPool()
+        results = [pool.spawn(self._execute, 'sleep 0.2') for _ in range(4)]
+        pool.waitall()
+        for result in results:
+            result.wait()
+
+        self.assertEqual(2, len(ipmitool_shell._idle[(tuple(self.args),
+                                                      'secret')]))
+        self.assertEqual({'1.2.3.4'}, set(ipmitool_shell._slots))
+
+    def test_no_slot_available(self):
+        slots = ipmitool_shell._slots['1.2.3.4'] = mock.Mock(
+            spec=['acquire', 'release'])
+        slots.acquire.return_value = False
+        self.assertRaises(exception.IPMIFailure, self._execute, 'pid',
+                          timeout=1)
+        slots.acquire.assert_called_once_with(timeout=1)
+        self.assertFalse(slots.release.called)
@@ -0,0 +1,146 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure allocation candidate selection on a large inventory.
+
+Creates available nodes of a single resource class in a temporary SQLite
+database, a fraction of them having the requested traits, then compares
+loading every node object and filtering traits in Python with the database
+side filtering used by the allocation process. Finally runs concurrent
+allocations from green threads.
+"""
+
+import os
+import sys
+import time
+
+import eventlet
+
+eventlet.monkey_patch(os=False)
+
+from oslo_db.sqlalchemy import enginefacade  # noqa
+import sqlalchemy as sa  # noqa
+
+import benchmark_utils  # noqa
+from ironic.common import context as ironic_context  # noqa
+from ironic.common import service as ironic_service  # noqa
+from ironic.common import states  # noqa
+from ironic.conductor import allocations  # noqa
+from ironic.conf import CONF  # noqa
+from ironic.db.sqlalchemy import models  # noqa
+from ironic import objects  # noqa
+
+
+NODE_COUNT = 20000
+# Every TRAIT_EVERY node has all the requested traits.
+TRAIT_EVERY = 10
+TRAITS = ['CUSTOM_GPU', 'CUSTOM_NVME']
+RESOURCE_CLASS = 'baremetal'
+ALLOCATIONS = 50
+
+
+def _add_traits():
+    engine = enginefacade.writer.get_engine()
+    rows = []
+    for node_id in range(1, NODE_COUNT + 1):
+        rows.append({'node_id': node_id, 'trait': 'CUSTOM_OTHER',
+                     'version': objects.Trait.VERSION})
+        if node_id % TRAIT_EVERY == 0:
+            rows.extend({'node_id': node_id, 'trait': trait,
+                         'version': objects.Trait.VERSION}
+                        for trait in TRAITS)
+    with engine.begin() as conn:
+        conn.execute(sa.insert(models.NodeTrait), rows)
+
+
+def _legacy_candidates(context, allocation):
+    filters = {'resource_class': allocation.resource_class,
+               'provision_state': states.AVAILABLE,
+               'associated': False,
+               'with_power_state': True,
+               'maintenance': False}
+    nodes = objects.Node.list(context, filters=filters)
+    traits = set(allocation.traits)
+    return [n for n in nodes
+            if {t.trait for t in n.traits.objects}.issuperset(traits)]
+
+
+def _new_allocation(context, index):
+    allocation = objects.Allocation(context, name='benchmark-%d' % index,
+                                    resource_class=RESOURCE_CLASS,
+                                    traits=TRAITS,
+                                    state=states.ALLOCATING)
+    allocation.create()
+    return allocation
+
+
+def _compare_candidates(context):
+    allocation = _new_allocation(context, -1)
+    for label, func in (('Node objects, traits filtered in Python',
+                         _legacy_candidates),
+                        ('Columns only, traits filtered in the database',
+                         allocations._candidate_nodes)):
+        with benchmark_utils.count_statements() as count:
+            start = time.time()
+            candidates = func(context, allocation)
+            elapsed = time.time() - start
+        print('%s: %d candidates in %0.03f seconds, %d SQL statements.'
+              % (label, len(candidates), elapsed, count[0]))
+    allocation.destroy()
+    print()
+
+
+def _concurrent_allocations(context):
+    pending = [_new_allocation(context, i) for i in range(ALLOCATIONS)]
+    pool = eventlet.GreenPool(ALLOCATIONS)
+    with benchmark_utils.count_statements() as count:
+        start = time.time()
+        for allocation in pending:
+            pool.spawn(allocations.do_allocate, context, allocation)
+        pool.waitall()
+        elapsed = time.time() - start
+    allocated = [a for a in objects.Allocation.list(context)
+                 if a.state == states.ACTIVE]
+    nodes = {a.node_id for a in allocated}
+    print('Allocated %d of %d in %0.03f seconds (%0.02f per second), '
+          '%d SQL statements.' % (len(allocated), ALLOCATIONS, elapsed,
+                                  len(allocated) / elapsed, count[0]))
+    print('Nodes allocated twice: %d\n' % (len(allocated) - len(nodes)))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        CONF.set_override('debug', False)
+        benchmark_utils.create_nodes(NODE_COUNT,
+                                     resource_class=RESOURCE_CLASS,
+                                     provision_state=states.AVAILABLE)
+        _add_traits()
+        context = ironic_context.get_admin_context()
+
+        print('Phase - candidate selection among %d available nodes, %d '
+              'with traits %s' % (NODE_COUNT, NODE_COUNT // TRAIT_EVERY,
+                                  ', '.join(TRAITS)))
+        benchmark_utils.add_a_line()
+        _compare_candidates(context)
+
+        print('Phase - %d concurrent allocations' % ALLOCATIONS)
+        benchmark_utils.add_a_line()
+        _concurrent_allocations(context)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
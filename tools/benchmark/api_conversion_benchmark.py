@@ -0,0 +1,189 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure converting node and port lists for an API response.
+
+Loads nodes and ports from a temporary SQLite database once, then converts
+them to API collections repeatedly with a stand-in for the pecan request,
+so that only the conversion is timed. Compares evaluating the microversion
+feature gates for every item with evaluating them once per request, and
+counts how often the API version of the request is read.
+"""
+
+import os
+import sys
+import time
+import types
+from unittest import mock
+
+import benchmark_utils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import pecan
+import sqlalchemy as sa
+
+from ironic import api
+from ironic.api.controllers.v1 import node as node_api
+from ironic.api.controllers.v1 import port as port_api
+from ironic.api.controllers.v1 import utils as api_utils
+from ironic.api.controllers.v1 import versions
+from ironic.common import context
+from ironic.common import service as ironic_service
+from ironic.conf import CONF
+from ironic.db import api as db_api
+from ironic.db.sqlalchemy import models
+from ironic import objects
+
+
+NODE_COUNT = 1000
+ROUNDS = 5
+
+
+class _Version(object):
+
+    major = 1
+    minor = versions.MINOR_MAX_VERSION
+
+
+class _Request(object):
+    """A stand-in for the request, counting reads of its API version."""
+
+    public_url = 'http://127.0.0.1:6385'
+
+    def __init__(self, ctx, dbapi):
+        self.context = ctx
+        self.dbapi = dbapi
+        self.rpcapi = mock.Mock()
+        self.rpcapi.get_conductor_for.return_value = 'benchmark-host'
+        self.version_reads = 0
+        self.features = api_utils.RequestFeatures(_Version)
+
+    @property
+    def version(self):
+        self.version_reads += 1
+        return _Version
+
+
+class _PerItemFeatures(object):
+    """The feature gates evaluated on every check, as done before."""
+
+    @property
+    def available_state(self):
+        return (api.request.version.minor
+                >= versions.MINOR_2_AVAILABLE_STATE)
+
+    @property
+    def links_node_states_and_driver_properties(self):
+        return api_utils.allow_links_node_states_and_driver_properties()
+
+    @property
+    def port_internal_info(self):
+        return api_utils.allow_port_internal_info()
+
+    @property
+    def port_advanced_net_fields(self):
+        return api_utils.allow_port_advanced_net_fields()
+
+    @property
+    def portgroups_subcontrollers(self):
+        return api_utils.allow_portgroups_subcontrollers()
+
+    @property
+    def volume(self):
+        return api_utils.allow_volume()
+
+    @property
+    def inspect_wait_state(self):
+        return api_utils.allow_inspect_wait_state()
+
+    @property
+    def expose_conductors(self):
+        return api_utils.allow_expose_conductors()
+
+    @property
+    def allocations(self):
+        return api_utils.allow_allocations()
+
+    @property
+    def port_physical_network(self):
+        return api_utils.allow_port_physical_network()
+
+    @property
+    def port_is_smartnic(self):
+        return api_utils.allow_port_is_smartnic()
+
+    @property
+    def disallowed_fields(self):
+        return api_utils.disallowed_fields()
+
+
+def _populate():
+    benchmark_utils.create_nodes(NODE_COUNT)
+    engine = benchmark_utils.enginefacade.writer.get_engine()
+    now = timeutils.utcnow()
+    with engine.begin() as conn:
+        conn.execute(sa.insert(models.Port), [
+            {'uuid': uuidutils.generate_uuid(), 'node_id': index,
+             'address': '52:54:00:%02x:%02x:00' % divmod(index, 256),
+             'extra': {}, 'local_link_connection': {}, 'internal_info': {},
+             'created_at': now, 'version': objects.Port.VERSION}
+            for index in range(1, NODE_COUNT + 1)])
+
+
+def _convert(request, nodes, ports):
+    node_api.node_list_convert_with_links(nodes, NODE_COUNT, 'nodes',
+                                          detail=True)
+    port_api.list_convert_with_links(ports, NODE_COUNT, 'ports',
+                                     detail=True)
+
+
+def _run(label, request, nodes, ports):
+    request.version_reads = 0
+    # NOTE: bind the stand-in to the context-local pecan request, so that
+    # every access goes through the same proxy as in the API service.
+    with mock.patch.object(pecan.core, 'state',
+                           types.SimpleNamespace(request=request)):
+        start = time.time()
+        for _ in range(ROUNDS):
+            _convert(request, nodes, ports)
+        elapsed = (time.time() - start) / ROUNDS
+    print('%s: %0.03f seconds per request, %d version reads per request.'
+          % (label, elapsed, request.version_reads // ROUNDS))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        _populate()
+        ctx = context.get_admin_context()
+        nodes = objects.Node.list(ctx, limit=NODE_COUNT)
+        ports = objects.Port.list(ctx, limit=NODE_COUNT)
+        request = _Request(ctx, db_api.get_instance())
+
+        print('Phase - converting %d nodes and %d ports, API version 1.%d'
+              % (len(nodes), len(ports), versions.MINOR_MAX_VERSION))
+        benchmark_utils.add_a_line()
+        with mock.patch.object(api_utils, 'get_request_features',
+                               _PerItemFeatures):
+            _run('Feature gates for every item', request, nodes, ports)
+        _run('Feature gates once per request', request, nodes, ports)
+        print()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure how asynchronous job pollers find their nodes.
+
+Creates nodes waiting in CLEANWAIT with a large driver_internal_info in a
+temporary SQLite database, a few of them with an outstanding firmware
+update, then compares fetching driver_internal_info of every node and
+checking for the key in Python with the ``async_job_in`` filter, which
+still checks the key of the few nodes it finds. Also measures the check
+made by every poller until the index is ready after an upgrade.
+"""
+
+import os
+import sys
+import time
+
+import benchmark_utils
+
+from ironic.common import async_jobs
+from ironic.common import service as ironic_service
+from ironic.common import states
+from ironic.conf import CONF
+from ironic.db import api as dbapi
+
+
+NODE_COUNT = 10000
+# Every JOB_EVERY node has an outstanding firmware update.
+JOB_EVERY = 1000
+FILTERS = {'reserved': False, 'provision_state': states.CLEANWAIT}
+# Roughly the size of driver_internal_info of a node being cleaned.
+DRIVER_INTERNAL_INFO = {
+    'clean_steps': [{'step': 'step_%d' % i, 'interface': 'deploy',
+                     'priority': i, 'argsinfo': None, 'abortable': True}
+                    for i in range(20)],
+    'agent_cached_clean_steps': {'deploy': [{'step': 'erase_devices',
+                                             'priority': 10}] * 20},
+    'agent_url': 'http://192.0.2.1:9999',
+}
+
+
+def _add_jobs(db, uuids):
+    info = dict(DRIVER_INTERNAL_INFO,
+                firmware_updates=[{'task_monitor': '/task/1', 'url': 'x'}])
+    for uuid in uuids[::JOB_EVERY]:
+        db.update_node(uuid, {'driver_internal_info': info})
+
+
+def _predicate(db):
+    nodes = db.get_nodeinfo_list(columns=['uuid', 'driver_internal_info'],
+                                 filters=FILTERS)
+    return [uuid for uuid, info in nodes
+            if info.get(async_jobs.FIRMWARE_UPDATES)]
+
+
+def _filter(db):
+    filters = dict(FILTERS, async_job_in=[async_jobs.FIRMWARE_UPDATES])
+    nodes = db.get_nodeinfo_list(columns=['uuid', 'driver_internal_info'],
+                                 filters=filters)
+    return [uuid for uuid, info in nodes
+            if info.get(async_jobs.FIRMWARE_UPDATES)]
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        CONF.set_override('debug', False)
+        db = dbapi.get_instance()
+        uuids = benchmark_utils.create_nodes(
+            NODE_COUNT, provision_state=states.CLEANWAIT,
+            driver_internal_info=DRIVER_INTERNAL_INFO)
+        _add_jobs(db, uuids)
+
+        print('Phase - finding %d nodes with a firmware update among %d '
+              'nodes in %s' % (NODE_COUNT // JOB_EVERY, NODE_COUNT,
+                               states.CLEANWAIT))
+        benchmark_utils.add_a_line()
+        for label, func in (('driver_internal_info checked in Python',
+                             _predicate),
+                            ('async_job_in filter', _filter)):
+            with benchmark_utils.count_statements() as count:
+                start = time.time()
+                found = func(db)
+                elapsed = time.time() - start
+            print('%s: %d nodes in %0.03f seconds, %d SQL statements.'
+                  % (label, len(found), elapsed, count[0]))
+        with benchmark_utils.count_statements() as count:
+            start = time.time()
+            db.check_node_async_jobs_backfilled()
+            elapsed = time.time() - start
+        print('Index readiness check, until the upgrade is finished: '
+              '%0.03f seconds, %d SQL statements.' % (elapsed, count[0]))
+        print()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Helpers shared by the self-contained benchmark scripts.
+
+Unlike do_not_run_create_benchmark_data.py, these helpers never touch a
+configured database: everything happens in a throw-away SQLite file.
+"""
+
+import contextlib
+import os
+import tempfile
+import time
+
+from oslo_db.sqlalchemy import enginefacade
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import sqlalchemy as sa
+
+from ironic.common import states
+from ironic.conf import CONF
+from ironic.db.sqlalchemy import models
+from ironic import objects
+
+
+FAKE_INTERFACES = {
+    'bios_interface': 'no-bios',
+    'boot_interface': 'fake',
+    'console_interface': 'no-console',
+    'deploy_interface': 'fake',
+    'inspect_interface': 'fake',
+    'management_interface': 'fake',
+    'network_interface': 'noop',
+    'power_interface': 'fake',
+    'raid_interface': 'fake',
+    'rescue_interface': 'no-rescue',
+    'storage_interface': 'noop',
+    'vendor_interface': 'fake',
+}
+
+
+def add_a_line():
+    print('------------------------------------------------------------')
+
+
+def setup_database():
+    """Point ironic at an empty, temporary SQLite database.
+
+    :returns: the path to the database file, to be removed by the caller.
+    """
+    fd, path = tempfile.mkstemp(prefix='ironic-benchmark-', suffix='.db')
+    os.close(fd)
+    CONF.set_override('connection', 'sqlite:///%s' % path, group='database')
+    CONF.set_override('sqlite_synchronous', False, group='database')
+    engine = enginefacade.writer.get_engine()
+    models.Base.metadata.create_all(engine)
+    objects.register_all()
+    return path
+
+
+def enable_fake_hardware():
+    """Enable the fake-hardware type with the interfaces it defaults to."""
+    CONF.set_override('enabled_hardware_types', ['fake-hardware'])
+    for field, iface in FAKE_INTERFACES.items():
+        option = 'enabled_%ss' % field
+        CONF.set_override(option, [iface])
+
+
+def create_nodes(count, chunk=1000, **overrides):
+    """Bulk insert fake-hardware nodes bypassing the object layer.
+
+    :param count: number of nodes to create.
+    :param chunk: number of rows per INSERT statement.
+    :param overrides: column values applied to every node.
+    :returns: list of created node UUIDs, in id order.
+    """
+    engine = enginefacade.writer.get_engine()
+    now = timeutils.utcnow()
+    uuids = []
+    with engine.begin() as conn:
+        for start in range(0, count, chunk):
+            rows = []
+            for i in range(start, min(start + chunk, count)):
+                uuid = uuidutils.generate_uuid()
+                uuids.append(uuid)
+                row = {'uuid': uuid,
+                       'name': 'benchmark-node-%d' % i,
+                       'driver': 'fake-hardware',
+                       'driver_info': {},
+                       'driver_internal_info': {},
+                       'instance_info': {},
+                       'properties': {'vendor': 'fake'},
+                       'extra': {},
+                       'power_state': states.POWER_ON,
+                       'provision_state': states.ACTIVE,
+                       'maintenance': False,
+                       'conductor_group': '',
+                       'created_at': now,
+                       'version': objects.Node.VERSION}
+                row.update(FAKE_INTERFACES)
+                row.update(overrides)
+                rows.append(row)
+            conn.execute(sa.insert(models.Node), rows)
+    return uuids
+
+
+@contextlib.contextmanager
+def count_statements():
+    """Count the SQL statements issued within the block.
+
+    Yields a single element list holding the running count.
+    """
+    engine = enginefacade.writer.get_engine()
+    counter = [0]
+
+    def _count(*args, **kwargs):
+        counter[0] += 1
+
+    sa.event.listen(engine, 'before_cursor_execute', _count)
+    try:
+        yield counter
+    finally:
+        sa.event.remove(engine, 'before_cursor_execute', _count)
+
+
+@contextlib.contextmanager
+def timed(label):
+    """Print how long the block took."""
+    start = time.time()
+    yield
+    print('%s: %0.03f seconds.' % (label, time.time() - start))
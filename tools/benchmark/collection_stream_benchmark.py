@@ -0,0 +1,104 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the memory used to build large node collections.
+
+Sends ``GET /v1/nodes/detail`` requests through the WSGI application, with
+and without ``[api]collection_stream_page_size``, against fake-hardware
+nodes with large ``properties`` and ``driver_internal_info`` fields stored
+in a temporary SQLite database. The response body is consumed chunk by
+chunk and discarded, like a WSGI server would do.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import benchmark_utils
+import webob
+
+from ironic.api import app as wsgi_app
+from ironic.common import service as ironic_service
+from ironic.conf import CONF
+
+
+NODE_COUNT = 1000
+BLOB_KEYS = 200
+PAGE_SIZE = 100
+
+
+def _request(application, limit):
+    request = webob.Request.blank(
+        '/v1/nodes/detail?limit=%d' % limit,
+        headers={'X-OpenStack-Ironic-API-Version': 'latest'})
+    status = []
+
+    def _start_response(status_line, headers, exc_info=None):
+        status.append(status_line)
+
+    tracemalloc.start()
+    start = time.time()
+    size = 0
+    result = application(request.environ, _start_response)
+    try:
+        for chunk in result:
+            size += len(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert status[0].startswith('200'), status[0]
+    return size, elapsed, peak
+
+
+def _run(application, page_size):
+    CONF.set_override('collection_stream_page_size', page_size, group='api')
+    label = ('streamed (page size %d)' % page_size if page_size
+             else 'built in memory')
+    print('Node list, %s' % label)
+    for limit in (100, 500, NODE_COUNT):
+        size, elapsed, peak = _request(application, limit)
+        print('  limit=%-5d %6.1f MiB sent in %0.03f seconds, peak memory '
+              '%6.1f MiB' % (limit, size / 2 ** 20, elapsed, peak / 2 ** 20))
+    print()
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        CONF.set_override('auth_strategy', 'noauth')
+        CONF.set_override('max_limit', NODE_COUNT, group='api')
+        blob = {'key-%d' % i: 'value-%d' % i * 4 for i in range(BLOB_KEYS)}
+        benchmark_utils.create_nodes(NODE_COUNT, chunk=100,
+                                     properties=blob,
+                                     driver_internal_info=blob)
+        application = wsgi_app.setup_app(
+            pecan_config=wsgi_app.get_pecan_config())
+
+        print('Phase - GET /v1/nodes/detail of %d fake-hardware nodes'
+              % NODE_COUNT)
+        benchmark_utils.add_a_line()
+        _run(application, 0)
+        _run(application, PAGE_SIZE)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
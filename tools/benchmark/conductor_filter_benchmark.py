@@ -0,0 +1,132 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure listing the nodes of one conductor with the API.
+
+Follows the ``next`` links of ``GET /v1/nodes`` through the WSGI
+application for nodes shared by many conductors in a temporary SQLite
+database. Before, the ``conductor`` filter was applied to each page of
+nodes after fetching it, returning a short first page without a next link,
+so clients had to walk all nodes and check their conductor instead. This
+is compared with fetching only the nodes from the hash partitions of the
+conductor.
+"""
+
+import json
+import os
+import sys
+import time
+from unittest import mock
+from urllib import parse as urlparse
+
+import benchmark_utils
+import webob
+
+from ironic.api import app as wsgi_app
+from ironic.api.controllers.v1 import node as node_api
+from ironic.common import hash_ring
+from ironic.common import service as ironic_service
+from ironic.conf import CONF
+from ironic.db import api as db_api
+
+
+NODE_COUNT = 50000
+CONDUCTOR_COUNT = 20
+PAGE_LIMIT = 1000
+HOST = 'benchmark-host-0'
+
+
+def _register_conductors(dbapi):
+    for index in range(CONDUCTOR_COUNT):
+        conductor = dbapi.register_conductor(
+            {'hostname': 'benchmark-host-%d' % index, 'drivers': []})
+        dbapi.register_conductor_hardware_interfaces(
+            conductor.id,
+            [{'hardware_type': 'fake-hardware', 'interface_type': 'deploy',
+              'interface_name': 'fake', 'default': True}])
+
+
+def _get(application, url):
+    request = webob.Request.blank(
+        url, headers={'X-OpenStack-Ironic-API-Version': 'latest'})
+    response = request.get_response(application)
+    assert response.status_int == 200, response.text
+    return json.loads(response.body)
+
+
+def _page_filter(self, fetch_func, conductor, limit, marker):
+    return self._filter_by_conductor(
+        fetch_func(limit=limit, marker=marker), conductor)
+
+
+def _run(application, label, url, conductor=None):
+    requests = 0
+    nodes = 0
+    with benchmark_utils.count_statements() as count:
+        start = time.time()
+        while url:
+            data = _get(application, url)
+            requests += 1
+            nodes += len([node for node in data['nodes']
+                          if conductor in (None, node['conductor'])])
+            url = data.get('next')
+            if url:
+                url = urlparse.urlparse(url)
+                url = '%s?%s' % (url.path, url.query)
+        elapsed = time.time() - start
+    print('%s: %0.03f seconds, %d requests, %d nodes, %d SQL statements.'
+          % (label, elapsed, requests, nodes, count[0]))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        CONF.set_override('auth_strategy', 'noauth')
+        dbapi = db_api.get_instance()
+        benchmark_utils.create_nodes(NODE_COUNT)
+        dbapi.update_node_hash_partitions(None, 0)
+        _register_conductors(dbapi)
+        application = wsgi_app.setup_app(
+            pecan_config=wsgi_app.get_pecan_config())
+
+        print('Phase - listing the nodes of one of %d conductors among %d '
+              'nodes, %d nodes per page'
+              % (CONDUCTOR_COUNT, NODE_COUNT, PAGE_LIMIT))
+        benchmark_utils.add_a_line()
+        url = ('/v1/nodes?conductor=%s&fields=uuid,conductor&limit=%d'
+               % (HOST, PAGE_LIMIT))
+        for page_size in (0, 100):
+            CONF.set_override('collection_stream_page_size', page_size,
+                              group='api')
+            suffix = ', stream page size %d' % page_size
+            # Only filter on the ring membership, once per page.
+            with mock.patch.object(
+                    hash_ring.HashRingManager, 'get_host_rings',
+                    lambda self, host: [(None, ['fake-hardware'], None)]), \
+                    mock.patch.object(node_api.NodesController,
+                                      '_fetch_conductor_nodes', _page_filter):
+                _run(application, 'Filtering every page' + suffix, url)
+            _run(application, 'Walking all nodes' + suffix,
+                 '/v1/nodes?fields=uuid,conductor&limit=%d' % PAGE_LIMIT,
+                 conductor=HOST)
+            _run(application, 'Hash partitions' + suffix, url)
+        print()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure staging of the same firmware image for many nodes.
+
+Serves a firmware image from a local HTTP server and stages it to a
+temporary HTTP root for every node, as the Redfish ``update_firmware``
+step does with ``[redfish]firmware_source = local``. Compares downloading
+and verifying the image for each node with the shared firmware cache.
+"""
+
+import functools
+import hashlib
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import benchmark_utils
+from oslo_utils import uuidutils
+
+from ironic.conf import CONF
+from ironic.drivers.modules.redfish import firmware_utils
+
+
+NODE_COUNT = 100
+IMAGE_SIZE = 32 * 1024 * 1024
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(directory):
+    handler = functools.partial(_Handler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _per_node(node, url, checksum):
+    temp_file = firmware_utils.download_to_temp(node, url)
+    firmware_utils.verify_checksum(node, checksum, temp_file)
+    return firmware_utils.stage(node, 'local', temp_file)
+
+
+def _shared(node, url, checksum):
+    cached_file = firmware_utils.download_to_cache(node, url, checksum)
+    return firmware_utils.stage(node, 'local', cached_file)
+
+
+def _disk_usage(*paths):
+    inodes = set()
+    for path in paths:
+        for root, _dirs, files in os.walk(path):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                inodes.add((stat.st_ino, stat.st_size))
+    return sum(size for _ino, size in inodes)
+
+
+def _run(label, func, url, checksum, workdir):
+    http_root = os.path.join(workdir, 'httpboot')
+    CONF.set_override('http_root', http_root, group='deploy')
+    nodes = [mock.Mock(uuid=uuidutils.generate_uuid(),
+                       driver_internal_info={'firmware_cleanup': ['http']})
+             for _ in range(NODE_COUNT)]
+    _Handler.requests = 0
+    start = time.time()
+    for node in nodes:
+        func(node, url, checksum)
+    elapsed = time.time() - start
+    usage = _disk_usage(http_root, tempfile.gettempdir())
+    print('%s: %0.03f seconds, %d downloads, %0.01f MiB on disk.'
+          % (label, elapsed, _Handler.requests, usage / 1024 / 1024))
+    for node in nodes:
+        firmware_utils.cleanup(node)
+    shutil.rmtree(http_root, ignore_errors=True)
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='ironic-benchmark-')
+    try:
+        image_dir = os.path.join(workdir, 'images')
+        os.mkdir(image_dir)
+        data = os.urandom(IMAGE_SIZE)
+        with open(os.path.join(image_dir, 'bios.exe'), 'wb') as f:
+            f.write(data)
+        checksum = hashlib.sha1(data).hexdigest()
+        server = _serve(image_dir)
+        url = 'http://127.0.0.1:%d/bios.exe' % server.server_address[1]
+
+        temp_dir = os.path.join(workdir, 'tmp')
+        os.mkdir(temp_dir)
+        CONF.set_override('http_url', 'http://127.0.0.1/', group='deploy')
+        with mock.patch.object(tempfile, 'gettempdir', autospec=True,
+                               return_value=temp_dir):
+            print('Phase - staging a %d MiB image for %d nodes'
+                  % (IMAGE_SIZE // 1024 // 1024, NODE_COUNT))
+            benchmark_utils.add_a_line()
+            _run('Download and verify per node', _per_node, url, checksum,
+                 workdir)
+            _run('Shared firmware cache', _shared, url, checksum, workdir)
+            print()
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
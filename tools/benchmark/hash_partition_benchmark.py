@@ -0,0 +1,113 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure how conductors find the nodes mapped to them.
+
+Registers several conductors for the fake-hardware type in a temporary
+SQLite database and runs ``iter_nodes`` of every conductor once, as each
+periodic task does. Compares fetching every node and checking its mapping
+with fetching only the hash partitions of the conductor.
+"""
+
+import os
+import sys
+import time
+
+import benchmark_utils
+
+from ironic.common import hash_ring
+from ironic.common import service as ironic_service
+from ironic.common import states
+from ironic.conductor import manager
+from ironic.conf import CONF
+from ironic.db import api as db_api
+
+
+NODE_COUNT = 50000
+CONDUCTOR_COUNT = 10
+
+
+def _register_conductors(dbapi):
+    hosts = ['benchmark-host-%d' % index for index in range(CONDUCTOR_COUNT)]
+    for host in hosts:
+        conductor = dbapi.register_conductor({'hostname': host,
+                                              'drivers': []})
+        dbapi.register_conductor_hardware_interfaces(
+            conductor.id,
+            [{'hardware_type': 'fake-hardware', 'interface_type': 'deploy',
+              'interface_name': 'fake', 'default': True}])
+    return hosts
+
+
+def _run(label, services, partitions):
+    original = hash_ring.HashRingManager.get_hash_ring_ranges
+    if not partitions:
+        hash_ring.HashRingManager.get_hash_ring_ranges = (
+            lambda self, host: None)
+    fetched = [0]
+    get_nodeinfo_list = services[0].dbapi.get_nodeinfo_list
+
+    def _get_nodeinfo_list(*args, **kwargs):
+        result = get_nodeinfo_list(*args, **kwargs)
+        fetched[0] += len(result)
+        return result
+
+    mapped = 0
+    try:
+        start = time.time()
+        for service in services:
+            service.dbapi.get_nodeinfo_list = _get_nodeinfo_list
+            mapped += len(list(service.iter_nodes(
+                filters={'provision_state': states.ACTIVE})))
+        elapsed = time.time() - start
+    finally:
+        hash_ring.HashRingManager.get_hash_ring_ranges = original
+        for service in services:
+            service.dbapi.get_nodeinfo_list = get_nodeinfo_list
+    print('%s: %0.03f seconds, %0.03f seconds per conductor, %d rows '
+          'fetched, %d nodes mapped.'
+          % (label, elapsed, elapsed / len(services), fetched[0], mapped))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        dbapi = db_api.get_instance()
+        benchmark_utils.create_nodes(NODE_COUNT)
+        with benchmark_utils.timed('Online data migration of %d nodes'
+                                   % NODE_COUNT):
+            dbapi.update_node_hash_partitions(None, 0)
+
+        services = []
+        for host in _register_conductors(dbapi):
+            service = manager.ConductorManager(host, 'benchmark')
+            service.dbapi = db_api.get_instance()
+            service.ring_manager = hash_ring.HashRingManager()
+            service._shutdown = False
+            services.append(service)
+
+        print('Phase - every one of %d conductors looking for its nodes '
+              'among %d nodes' % (CONDUCTOR_COUNT, NODE_COUNT))
+        benchmark_utils.add_a_line()
+        _run('All nodes', services, False)
+        _run('Hash partitions', services, True)
+        print()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
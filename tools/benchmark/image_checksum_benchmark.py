@@ -0,0 +1,98 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure checksumming a converted instance image for many deployments.
+
+When an image is converted to raw for the direct deploy interface, its
+checksum is recalculated for the node. Compares hashing the image for
+every node, as done before, with the checksums kept next to the master
+image in the instance image cache.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import benchmark_utils
+from oslo_utils import fileutils
+
+from ironic.drivers.modules import deploy_utils
+from ironic.drivers.modules import image_cache
+
+
+NODE_COUNT = 200
+# Hashing the image for every node takes long, measure a few of them.
+PER_NODE_SAMPLE = 10
+IMAGE_SIZE = 512 * 1024 * 1024
+ALGORITHM = 'sha256'
+
+
+def _per_node(path, algorithm):
+    return fileutils.compute_file_checksum(path, algorithm=algorithm)
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='ironic-benchmark-')
+    try:
+        master_dir = os.path.join(workdir, 'master_images')
+        os.mkdir(master_dir)
+        master_path = os.path.join(master_dir, 'sha256-image.converted')
+        with open(master_path, 'wb') as f:
+            for _ in range(IMAGE_SIZE // (64 * 1024 * 1024)):
+                f.write(os.urandom(64 * 1024 * 1024))
+        node_paths = []
+        for index in range(NODE_COUNT):
+            path = os.path.join(workdir, 'node-%d' % index)
+            os.link(master_path, path)
+            node_paths.append(path)
+
+        print('Phase - %s checksum of a %d MiB image for %d nodes'
+              % (ALGORITHM, IMAGE_SIZE // 1024 // 1024, NODE_COUNT))
+        benchmark_utils.add_a_line()
+
+        start = time.time()
+        for path in node_paths[:PER_NODE_SAMPLE]:
+            _per_node(path, ALGORITHM)
+        per_node = (time.time() - start) / PER_NODE_SAMPLE
+        print('Hashing for every node (64 KiB reads): %0.03f seconds per '
+              'node, %0.03f seconds for %d nodes (projected).'
+              % (per_node, per_node * NODE_COUNT, NODE_COUNT))
+
+        start = time.time()
+        deploy_utils.compute_image_checksum(master_path, ALGORITHM)
+        print('Single hash (4 MiB reads): %0.03f seconds.'
+              % (time.time() - start))
+
+        cache = image_cache.ImageCache(master_dir, 0, 0)
+        computed = []
+
+        def _compute(path, algorithm):
+            computed.append(path)
+            return deploy_utils.compute_image_checksum(path, algorithm)
+
+        start = time.time()
+        checksums = {cache.get_checksum(path, ALGORITHM, _compute)
+                     for path in node_paths}
+        print('Checksums kept in the image cache: %0.03f seconds for %d '
+              'nodes, %d hash computation(s), %d distinct checksum(s).'
+              % (time.time() - start, NODE_COUNT, len(computed),
+                 len(checksums)))
+        print()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure one pass of the inspection status check for many nodes.
+
+Runs ``Inspector._periodic_check_result`` for nodes waiting in INSPECTWAIT
+in a temporary SQLite database against a local stand-in for the
+ironic-inspector API, which answers every request after a fixed delay.
+A share of the introspections has finished. Compares requesting the
+status of every node with listing the statuses.
+"""
+
+import http.server
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from urllib import parse as urlparse
+
+import benchmark_utils
+import sqlalchemy as sa
+
+from ironic.common import context
+from ironic.common import service as ironic_service
+from ironic.common import states
+from ironic.conductor import task_manager
+from ironic.conf import CONF
+from ironic.db import api as db_api
+from ironic.db.sqlalchemy import models
+from ironic.drivers.modules.inspector import interface as inspector
+
+
+NODE_COUNT = 1000
+FINISHED_EVERY = 10
+# Delay of each ironic-inspector API response, in seconds.
+LATENCY = 0.005
+API_VERSION = '1.18'
+
+
+class _Inspector(http.server.BaseHTTPRequestHandler):
+    """A minimal ironic-inspector API serving introspection statuses."""
+
+    # List of status dictionaries, the most recently started first.
+    statuses = []
+    requests = 0
+
+    def _reply(self, body):
+        type(self).requests += 1
+        time.sleep(LATENCY)
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for header in ('X-OpenStack-Ironic-Inspector-API-Minimum-Version',
+                       'X-OpenStack-Ironic-Inspector-API-Maximum-Version'):
+            self.send_header(header, API_VERSION)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        path = url.path.rstrip('/')
+        root = 'http://%s:%d' % self.server.server_address
+        if path in ('', '/v1'):
+            self._reply({'versions': [{
+                'id': API_VERSION, 'status': 'CURRENT',
+                'links': [{'href': root + '/v1', 'rel': 'self'}]}]})
+        elif path == '/v1/introspection':
+            query = urlparse.parse_qs(url.query)
+            limit = int(query.get('limit', [1000])[0])
+            marker = query.get('marker', [None])[0]
+            start = 0
+            if marker:
+                start = next(i for i, s in enumerate(self.statuses)
+                             if s['uuid'] == marker) + 1
+            self._reply({'introspection':
+                         self.statuses[start:start + limit]})
+        elif path.startswith('/v1/introspection/'):
+            uuid = path.rsplit('/', 1)[-1]
+            self._reply(next(s for s in self.statuses if s['uuid'] == uuid))
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Inspector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _reset(uuids):
+    engine = benchmark_utils.enginefacade.writer.get_engine()
+    with engine.begin() as conn:
+        conn.execute(sa.update(models.Node)
+                     .values(provision_state=states.INSPECTWAIT,
+                             reservation=None))
+    _Inspector.statuses = [
+        {'uuid': uuid, 'finished': not index % FINISHED_EVERY,
+         'error': None, 'state': 'finished' if not index % FINISHED_EVERY
+         else 'waiting', 'links': []}
+        for index, uuid in enumerate(reversed(uuids))]
+
+
+class _Manager(object):
+
+    def __init__(self, dbapi):
+        self.dbapi = dbapi
+
+    def iter_nodes(self, fields=None, **kwargs):
+        columns = ['uuid', 'driver', 'conductor_group'] + list(fields or ())
+        return self.dbapi.get_nodeinfo_list(columns=columns, **kwargs)
+
+
+def _count_locks():
+    counter = [0]
+    original = task_manager.TaskManager.__init__
+
+    def _init(self, *args, **kwargs):
+        counter[0] += 1
+        original(self, *args, **kwargs)
+
+    task_manager.TaskManager.__init__ = _init
+    return counter, lambda: setattr(task_manager.TaskManager, '__init__',
+                                    original)
+
+
+def _run(label, page_size, uuids, iface, manager, ctx):
+    CONF.set_override('status_check_page_size', page_size, group='inspector')
+    _reset(uuids)
+    _Inspector.requests = 0
+    locks, restore = _count_locks()
+    try:
+        with benchmark_utils.count_statements() as count:
+            start = time.time()
+            iface._periodic_check_result(manager, ctx)
+            elapsed = time.time() - start
+    finally:
+        restore()
+    done = manager.dbapi.get_nodeinfo_list(
+        columns=['uuid'], filters={'provision_state': states.MANAGEABLE})
+    print('%s: %0.03f seconds, %d inspector requests, %d node locks, %d SQL '
+          'statements, %d nodes finished.'
+          % (label, elapsed, _Inspector.requests, locks[0], count[0],
+             len(done)))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('enabled_inspect_interfaces', ['inspector'])
+        CONF.set_override('debug', False)
+        # Every finished inspection is logged otherwise
+        logging.getLogger('ironic').setLevel(logging.WARNING)
+        CONF.set_override('data_backend', 'none', group='inventory')
+        uuids = benchmark_utils.create_nodes(
+            NODE_COUNT, provision_state=states.INSPECTWAIT,
+            inspect_interface='inspector')
+
+        server = _serve()
+        CONF.set_override('auth_type', 'none', group='inspector')
+        CONF.set_override('endpoint_override',
+                          'http://127.0.0.1:%d' % server.server_address[1],
+                          group='inspector')
+
+        manager = _Manager(db_api.get_instance())
+        iface = inspector.Inspector()
+        ctx = context.get_admin_context()
+
+        print('Phase - checking inspection of %d nodes, %d finished, '
+              '%d ms per inspector request'
+              % (NODE_COUNT, NODE_COUNT // FINISHED_EVERY, LATENCY * 1000))
+        benchmark_utils.add_a_line()
+        _run('Status of each node', 0, uuids, iface, manager, ctx)
+        _run('Listing statuses', 1000, uuids, iface, manager, ctx)
+        print()
+        server.shutdown()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare one-off ipmitool calls with persistent ipmitool sessions.
+
+Runs ``power status`` for a number of BMCs from green threads, like the
+power state sync does, once starting an ipmitool process per command and
+once with ``[ipmi]use_persistent_sessions``.
+
+By default a simulated ipmitool is put first in PATH: it spends
+SESSION_SETUP seconds negotiating a session when it starts and
+COMMAND_TIME seconds per command. To measure against real BMCs, for
+example ones emulated with virtualbmc or ipmi_sim, pass their addresses
+as ``host:port`` arguments; the real ipmitool is then used with the
+credentials from the IPMI_USERNAME and IPMI_PASSWORD environment
+variables.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import eventlet
+
+eventlet.monkey_patch(os=False)
+
+from ironic.common import service as ironic_service  # noqa
+from ironic.conf import CONF  # noqa
+from ironic.drivers.modules import ipmitool  # noqa
+from ironic.drivers.modules import ipmitool_shell  # noqa
+
+import benchmark_utils  # noqa
+
+
+BMC_COUNT = 50
+COMMANDS_PER_BMC = 10
+SESSION_SETUP = 0.2
+COMMAND_TIME = 0.01
+
+FAKE_IPMITOOL = """#!%(python)s
+import sys
+import time
+
+if '-h' in sys.argv:
+    sys.exit(0)
+# Process start up and RMCP+ session negotiation.
+time.sleep(%(setup)f)
+
+
+def run(command):
+    time.sleep(%(command)f)
+    return 'Chassis Power is on\\n'
+
+
+if sys.argv[-1] != 'shell':
+    sys.stdout.write(run(' '.join(sys.argv[-2:])))
+    sys.exit(0)
+
+sys.stdout.write('ipmitool> ')
+sys.stdout.flush()
+for line in sys.stdin:
+    if line.strip() == 'exit':
+        break
+    sys.stdout.write(run(line.strip()) + 'ipmitool> ')
+    sys.stdout.flush()
+"""
+
+
+def _install_fake_ipmitool():
+    path = tempfile.mkdtemp(prefix='ironic-benchmark-')
+    script = os.path.join(path, 'ipmitool')
+    with open(script, 'w') as f:
+        f.write(FAKE_IPMITOOL % {'python': sys.executable,
+                                 'setup': SESSION_SETUP,
+                                 'command': COMMAND_TIME})
+    os.chmod(script, 0o755)
+    os.environ['PATH'] = path + os.pathsep + os.environ['PATH']
+    return path
+
+
+def _driver_info(address):
+    host, _sep, port = address.partition(':')
+    return {'uuid': address, 'address': host, 'dest_port': port or None,
+            'username': os.environ.get('IPMI_USERNAME', 'admin'),
+            'password': os.environ.get('IPMI_PASSWORD', 'password'),
+            'hex_kg_key': None, 'cipher_suite': None,
+            'priv_level': 'ADMINISTRATOR', 'protocol_version': '2.0',
+            'local_address': None, 'transit_channel': None,
+            'transit_address': None, 'target_channel': None,
+            'target_address': None}
+
+
+class _NoThrottle(dict):
+    """Replaces LAST_CMD_TIME so that commands are not spaced."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+def _worker(driver_info):
+    for _ in range(COMMANDS_PER_BMC):
+        ipmitool._power_status(driver_info)
+
+
+def _run(infos, persistent):
+    CONF.set_override('use_persistent_sessions', persistent, group='ipmi')
+    pool = eventlet.GreenPool(len(infos))
+    start = time.time()
+    for info in infos:
+        pool.spawn(_worker, info)
+    pool.waitall()
+    elapsed = time.time() - start
+    ipmitool_shell.close_all()
+    count = len(infos) * COMMANDS_PER_BMC
+    print('%s: %d commands in %0.03f seconds, %0.01f commands per second.'
+          % ('Persistent sessions' if persistent else 'One-off ipmitool',
+             count, elapsed, count / elapsed))
+
+
+def main():
+    addresses = sys.argv[1:]
+    sys.argv[1:] = []
+    ironic_service.prepare_command()
+    CONF.set_override('debug', False)
+    # Only measure process and session overhead, not the spacing of
+    # commands to the same BMC.
+    ipmitool.LAST_CMD_TIME = _NoThrottle()
+    fake_path = None
+    if not addresses:
+        fake_path = _install_fake_ipmitool()
+        addresses = ['10.0.0.%d' % i for i in range(1, BMC_COUNT + 1)]
+    try:
+        infos = [_driver_info(address) for address in addresses]
+        print('Phase - %d x power status for %d BMCs (%s)'
+              % (COMMANDS_PER_BMC, len(infos),
+                 'simulated' if fake_path else 'real'))
+        benchmark_utils.add_a_line()
+        _run(infos, False)
+        _run(infos, True)
+        print()
+    finally:
+        if fake_path:
+            shutil.rmtree(fake_path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the neutron requests made to provision the ports of many nodes.
+
+For nodes with four NICs in a temporary SQLite database, looks up the
+provisioning network, creates the neutron ports of every node on it with a
+security group and finds the physical networks of one of the ports, as
+done when provisioning and attaching VIFs. Runs against a local stand-in
+for the neutron API, which answers every request after a fixed delay.
+Compares creating and binding the ports one by one without caching with
+creating them in bulk with the network lookup cache.
+"""
+
+import http.server
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from urllib import parse as urlparse
+
+import benchmark_utils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import sqlalchemy as sa
+
+from ironic.common import context
+from ironic.common import neutron
+from ironic.common import service as ironic_service
+from ironic.conductor import task_manager
+from ironic.conf import CONF
+from ironic.db.sqlalchemy import models
+from ironic import objects
+
+
+NODE_COUNT = 50
+NICS_PER_NODE = 4
+# Delay of each neutron API response, in seconds.
+LATENCY = 0.005
+NETWORK_NAME = 'provisioning'
+NETWORK_ID = uuidutils.generate_uuid()
+SECURITY_GROUP_ID = uuidutils.generate_uuid()
+
+
+class _Neutron(http.server.BaseHTTPRequestHandler):
+    """A minimal neutron API serving networks, security groups and ports."""
+
+    protocol_version = 'HTTP/1.1'
+    requests = {}
+    ports = {}
+    _macs = itertools.count()
+
+    def _reply(self, body, status=200):
+        time.sleep(LATENCY)
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _count(self, path):
+        resource = path.split('/')[2] if path.count('/') > 1 else 'versions'
+        key = '%s %s' % (self.command, resource)
+        type(self).requests[key] = type(self).requests.get(key, 0) + 1
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _port(self, attrs):
+        port = {'id': uuidutils.generate_uuid(), 'status': 'DOWN',
+                'fixed_ips': [{'subnet_id': 'subnet',
+                               'ip_address': '192.0.2.10'}],
+                'mac_address': 'fa:16:3e:00:%02x:%02x'
+                % divmod(next(self._macs) % 65536, 256)}
+        port.update(attrs)
+        self.ports[port['id']] = port
+        return port
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        path = url.path.rstrip('/')
+        query = urlparse.parse_qs(url.query)
+        self._count(path)
+        network = {'id': NETWORK_ID, 'name': NETWORK_NAME,
+                   'provider:physical_network': 'physnet1'}
+        if path == '':
+            root = 'http://%s:%d' % self.server.server_address
+            self._reply({'versions': [{
+                'id': 'v2.0', 'status': 'CURRENT',
+                'links': [{'href': root + '/v2.0/', 'rel': 'self'}]}]})
+        elif path == '/v2.0/networks':
+            matches = (query.get('name') == [NETWORK_NAME]
+                       or query.get('id') == [NETWORK_ID])
+            self._reply({'networks': [network] if matches else []})
+        elif path.startswith('/v2.0/networks/'):
+            if path.rsplit('/', 1)[-1] == NETWORK_ID:
+                self._reply({'network': network})
+            else:
+                self._reply({'NeutronError': {}}, status=404)
+        elif path == '/v2.0/security-groups':
+            self._reply({'security_groups': [
+                {'id': i} for i in query.get('id', [])
+                if i == SECURITY_GROUP_ID]})
+        elif path.startswith('/v2.0/ports/'):
+            self._reply({'port': self.ports[path.rsplit('/', 1)[-1]]})
+        else:
+            self._reply({'NeutronError': {}}, status=404)
+
+    def do_POST(self):
+        path = urlparse.urlparse(self.path).path.rstrip('/')
+        self._count(path)
+        body = self._body()
+        if 'ports' in body:
+            self._reply({'ports': [self._port(attrs)
+                                   for attrs in body['ports']]}, status=201)
+        else:
+            self._reply({'port': self._port(body['port'])}, status=201)
+
+    def do_PUT(self):
+        path = urlparse.urlparse(self.path).path.rstrip('/')
+        self._count(path)
+        port = self.ports[path.rsplit('/', 1)[-1]]
+        port.update(self._body()['port'])
+        self._reply({'port': port})
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Neutron)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _create_ports(node_uuids):
+    engine = benchmark_utils.enginefacade.writer.get_engine()
+    now = timeutils.utcnow()
+    with engine.begin() as conn:
+        conn.execute(sa.insert(models.Port), [
+            {'uuid': uuidutils.generate_uuid(), 'node_id': node_id,
+             'address': '52:54:00:%02x:%02x:%02x'
+             % (node_id // 256, node_id % 256, nic),
+             'pxe_enabled': nic == 0, 'extra': {}, 'internal_info': {},
+             'local_link_connection': {'switch_id': 'aa:bb:cc:dd:ee:ff',
+                                       'port_id': 'Ethernet%d' % nic},
+             'created_at': now, 'version': objects.Port.VERSION}
+            for node_id in range(1, len(node_uuids) + 1)
+            for nic in range(NICS_PER_NODE)])
+
+
+def _provision(ctx, node_uuid):
+    with task_manager.acquire(ctx, node_uuid, shared=True) as task:
+        network_uuid = neutron.validate_network(
+            NETWORK_NAME, context=task.context)
+        vifs = neutron.add_ports_to_network(
+            task, network_uuid, security_groups=[SECURITY_GROUP_ID])
+        client = neutron.get_client(context=task.context)
+        neutron.get_physnets_by_port_uuid(
+            client, next(iter(vifs.values())), context=task.context)
+    return len(vifs)
+
+
+def _run(label, ctx, node_uuids, bulk, cache_ttl):
+    CONF.set_override('create_ports_in_bulk', bulk, group='neutron')
+    CONF.set_override('lookup_cache_ttl', cache_ttl, group='neutron')
+    neutron._LOOKUP_CACHE.clear()
+    _Neutron.requests = {}
+    _Neutron.ports = {}
+    start = time.time()
+    created = sum(_provision(ctx, node_uuid) for node_uuid in node_uuids)
+    elapsed = time.time() - start
+    requests = _Neutron.requests
+    print('%s: %0.03f seconds, %d neutron requests (%0.01f per node), %d '
+          'ports created.' % (label, elapsed, sum(requests.values()),
+                              sum(requests.values()) / len(node_uuids),
+                              created))
+    print('    ' + ', '.join('%s: %d' % item
+                             for item in sorted(requests.items())))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        node_uuids = benchmark_utils.create_nodes(
+            NODE_COUNT, provision_state='deploying')
+        _create_ports(node_uuids)
+
+        server = _serve()
+        CONF.set_override('auth_type', 'none', group='neutron')
+        CONF.set_override('endpoint_override',
+                          'http://127.0.0.1:%d' % server.server_address[1],
+                          group='neutron')
+        CONF.set_override('add_all_ports', True, group='neutron')
+        CONF.set_override('dhcpv6_stateful_address_count', 1,
+                          group='neutron')
+        ctx = context.get_admin_context()
+
+        print('Phase - provisioning ports of %d nodes with %d NICs, %d ms '
+              'per neutron request' % (NODE_COUNT, NICS_PER_NODE,
+                                       LATENCY * 1000))
+        benchmark_utils.add_a_line()
+        _run('One by one, no cache', ctx, node_uuids, False, 0)
+        _run('Bulk, lookup cache', ctx, node_uuids, True, 60)
+        print()
+        server.shutdown()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
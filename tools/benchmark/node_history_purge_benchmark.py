@@ -0,0 +1,148 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure finding the node history records to purge.
+
+Creates a large node history table in a temporary SQLite database, then
+compares loading every record and grouping them in Python with the
+ROW_NUMBER() query and the grouped fallback used when the database does
+not support window functions.
+"""
+
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+from unittest import mock
+
+import benchmark_utils
+from oslo_db.sqlalchemy import enginefacade
+from oslo_utils import uuidutils
+import sqlalchemy as sa
+
+from ironic.common import service as ironic_service
+from ironic.conf import CONF
+from ironic.db import api as dbapi
+from ironic.db.sqlalchemy import api as sqlalchemy_api
+from ironic.db.sqlalchemy import models
+from ironic import objects
+
+
+NODE_COUNT = 5000
+RECORDS_PER_NODE = 200
+MAX_ENTRIES = 50
+BATCH_COUNT = 1000
+CONDUCTOR = 'benchmark-conductor'
+
+
+def _add_history(conductor_id):
+    engine = enginefacade.writer.get_engine()
+    start = datetime.datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(sa.update(models.Node).values(
+            conductor_affinity=conductor_id))
+        for node_id in range(1, NODE_COUNT + 1):
+            rows = [{'uuid': uuidutils.generate_uuid(),
+                     'node_id': node_id,
+                     'conductor': CONDUCTOR,
+                     'event': 'benchmark event %d' % i,
+                     'severity': 'INFO',
+                     'event_type': 'benchmark',
+                     'user': 'benchmark',
+                     'created_at': start + datetime.timedelta(minutes=i),
+                     'version': objects.NodeHistory.VERSION}
+                    for i in range(RECORDS_PER_NODE)]
+            conn.execute(sa.insert(models.NodeHistory), rows)
+
+
+def _legacy_purge_ids(conductor_id):
+    """Load every record and group them in Python, as done previously."""
+    max_num = CONF.conductor.node_history_max_entries
+    with sqlalchemy_api._session_for_read() as session:
+        nodes = sa.select(models.Node.id).where(
+            models.Node.conductor_affinity == conductor_id)
+        query = sa.select(
+            models.NodeHistory.node_id, models.NodeHistory.id
+        ).where(
+            models.NodeHistory.node_id.in_(nodes)
+        ).order_by(models.NodeHistory.created_at.asc())
+        result_set = {}
+        for node_id, history_id in session.execute(query):
+            result_set.setdefault(node_id, []).append(history_id)
+    ids = []
+    for entries in result_set.values():
+        if len(entries) > max_num:
+            ids.extend(entries[:len(entries) - max_num])
+    return ids
+
+
+def _measure(label, func):
+    tracemalloc.start()
+    with benchmark_utils.count_statements() as count:
+        start = time.time()
+        ids = func()
+        elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('%s: %d records in %0.03f seconds, peak memory %0.01f MiB, '
+          '%d SQL statements.' % (label, len(ids), elapsed,
+                                  peak / 1024 / 1024, count[0]))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        CONF.set_override('debug', False)
+        CONF.set_override('node_history_max_entries', MAX_ENTRIES,
+                          group='conductor')
+        CONF.set_override('node_history_minimum_days', 0, group='conductor')
+        db = dbapi.get_instance()
+        conductor = db.register_conductor({'hostname': CONDUCTOR,
+                                           'drivers': ['fake-hardware']})
+        benchmark_utils.create_nodes(NODE_COUNT)
+        _add_history(conductor.id)
+
+        print('Phase - all records to purge, %d nodes with %d records '
+              'each, keeping %d' % (NODE_COUNT, RECORDS_PER_NODE,
+                                    MAX_ENTRIES))
+        benchmark_utils.add_a_line()
+        _measure('All records, grouped in Python',
+                 lambda: _legacy_purge_ids(conductor.id))
+        _measure('ROW_NUMBER() in the database',
+                 lambda: db.query_node_history_ids_for_purge(conductor.id))
+        with mock.patch.object(sqlalchemy_api, '_supports_window_functions',
+                               autospec=True, return_value=False):
+            _measure('Grouped count and per node queries',
+                     lambda: db.query_node_history_ids_for_purge(
+                         conductor.id))
+        print()
+
+        print('Phase - one cleanup batch of %d records' % BATCH_COUNT)
+        benchmark_utils.add_a_line()
+        _measure('ROW_NUMBER() in the database',
+                 lambda: db.query_node_history_ids_for_purge(
+                     conductor.id, limit=BATCH_COUNT + 1))
+        with mock.patch.object(sqlalchemy_api, '_supports_window_functions',
+                               autospec=True, return_value=False):
+            _measure('Grouped count and per node queries',
+                     lambda: db.query_node_history_ids_for_purge(
+                         conductor.id, limit=BATCH_COUNT + 1))
+        print()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
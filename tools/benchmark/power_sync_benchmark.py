@@ -0,0 +1,118 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the per-node and batched modes of the power state sync.
+
+Runs ``ConductorManager._sync_power_states`` against fake-hardware nodes
+stored in a temporary SQLite database. A small share of the nodes report
+a power state different from the recorded one, the rest are in sync or
+are expected to be skipped (maintenance, reserved, DEPLOYWAIT/CLEANWAIT).
+"""
+
+import os
+import sys
+
+import eventlet
+
+eventlet.monkey_patch(os=False)
+
+import futurist  # noqa
+import sqlalchemy as sa  # noqa
+
+import benchmark_utils  # noqa
+from ironic.common import context  # noqa
+from ironic.common import service as ironic_service  # noqa
+from ironic.common import states  # noqa
+from ironic.conductor import manager  # noqa
+from ironic.conf import CONF  # noqa
+from ironic.db import api as db_api  # noqa
+from ironic.db.sqlalchemy import models  # noqa
+from ironic.drivers.modules import fake  # noqa
+
+
+NODE_COUNT = 10000
+DRIFTED_EVERY = 100
+BATCH_SIZE = 100
+
+
+def _populate():
+    uuids = benchmark_utils.create_nodes(NODE_COUNT)
+    engine = benchmark_utils.enginefacade.writer.get_engine()
+    with engine.begin() as conn:
+        node = models.Node.__table__
+        conn.execute(sa.update(node).where(node.c.id % 10 == 1)
+                     .values(maintenance=True))
+        conn.execute(sa.update(node).where(node.c.id % 20 == 2)
+                     .values(provision_state=states.CLEANWAIT))
+        conn.execute(sa.update(node).where(node.c.id % 20 == 3)
+                     .values(provision_state=states.DEPLOYWAIT))
+        conn.execute(sa.update(node).where(node.c.id % 50 == 4)
+                     .values(reservation='another-conductor'))
+    return set(uuids[::DRIFTED_EVERY])
+
+
+def _reset_power_state():
+    engine = benchmark_utils.enginefacade.writer.get_engine()
+    with engine.begin() as conn:
+        conn.execute(sa.update(models.Node)
+                     .values(power_state=states.POWER_ON))
+
+
+def _run(service, ctx, batch_size):
+    CONF.set_override('sync_power_state_batch_size', batch_size,
+                      group='conductor')
+    _reset_power_state()
+    label = ('batched (batch size %d)' % batch_size if batch_size
+             else 'per node')
+    with benchmark_utils.count_statements() as count:
+        with benchmark_utils.timed('Power sync, %s' % label):
+            service._sync_power_states(ctx)
+    print('SQL statements issued: %d\n' % count[0])
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        CONF.set_override('force_power_state_during_sync', False,
+                          group='conductor')
+        drifted = _populate()
+
+        def _get_power_state(self, task):
+            if task.node.uuid in drifted:
+                return states.POWER_OFF
+            return states.POWER_ON
+
+        fake.FakePower.get_power_state = _get_power_state
+
+        service = manager.ConductorManager('benchmark-host', 'benchmark')
+        service.dbapi = db_api.get_instance()
+        service._executor = futurist.GreenThreadPoolExecutor(
+            max_workers=CONF.conductor.workers_pool_size)
+        # Every node is mapped to this single conductor.
+        service._mapped_to_this_conductor = lambda *args: True
+
+        print('Phase - Power sync of %d fake-hardware nodes, %d drifted'
+              % (NODE_COUNT, len(drifted)))
+        benchmark_utils.add_a_line()
+        ctx = context.get_admin_context()
+        _run(service, ctx, 0)
+        _run(service, ctx, BATCH_SIZE)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
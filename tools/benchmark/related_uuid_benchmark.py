@@ -0,0 +1,153 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the queries made to build collections referencing other resources.
+
+Sends ``GET /v1/nodes/detail`` and ``GET /v1/ports/detail`` requests through
+the WSGI application against nodes with a chassis and an allocation, and
+ports in port groups, stored in a temporary SQLite database. Compares
+looking up the UUIDs of the related resources for every item with looking
+them up once per page.
+"""
+
+import os
+import sys
+import time
+from unittest import mock
+
+import benchmark_utils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import sqlalchemy as sa
+import webob
+
+from ironic.api import app as wsgi_app
+from ironic.api.controllers.v1 import node as node_api
+from ironic.api.controllers.v1 import port as port_api
+from ironic.common import service as ironic_service
+from ironic.common import states
+from ironic.conf import CONF
+from ironic.db import api as db_api
+from ironic.db.sqlalchemy import models
+from ironic import objects
+
+
+NODE_COUNT = 1000
+CHASSIS_COUNT = 10
+PAGE_SIZE = 100
+
+
+def _populate():
+    dbapi = db_api.get_instance()
+    conductor = dbapi.register_conductor({'hostname': 'benchmark-host',
+                                          'drivers': []})
+    dbapi.register_conductor_hardware_interfaces(
+        conductor.id,
+        [{'hardware_type': 'fake-hardware', 'interface_type': 'deploy',
+          'interface_name': 'fake', 'default': True}])
+    engine = benchmark_utils.enginefacade.writer.get_engine()
+    now = timeutils.utcnow()
+    with engine.begin() as conn:
+        conn.execute(sa.insert(models.Chassis), [
+            {'uuid': uuidutils.generate_uuid(), 'extra': {},
+             'created_at': now, 'version': objects.Chassis.VERSION}
+            for _ in range(CHASSIS_COUNT)])
+    benchmark_utils.create_nodes(NODE_COUNT)
+    with engine.begin() as conn:
+        conn.execute(sa.insert(models.Allocation), [
+            {'id': index, 'uuid': uuidutils.generate_uuid(),
+             'node_id': index, 'state': states.ALLOCATING, 'traits': [],
+             'candidate_nodes': [], 'extra': {}, 'created_at': now,
+             'version': objects.Allocation.VERSION}
+            for index in range(1, NODE_COUNT + 1)])
+        conn.execute(sa.update(models.Node).values(
+            chassis_id=models.Node.id % CHASSIS_COUNT + 1,
+            allocation_id=models.Node.id))
+        conn.execute(sa.insert(models.Portgroup), [
+            {'id': index, 'uuid': uuidutils.generate_uuid(),
+             'node_id': index, 'address': '52:54:00:%02x:%02x:ff'
+             % divmod(index, 256), 'extra': {}, 'internal_info': {},
+             'properties': {}, 'created_at': now,
+             'version': objects.Portgroup.VERSION}
+            for index in range(1, NODE_COUNT + 1)])
+        conn.execute(sa.insert(models.Port), [
+            {'uuid': uuidutils.generate_uuid(), 'node_id': index,
+             'portgroup_id': index, 'address': '52:54:00:%02x:%02x:00'
+             % divmod(index, 256), 'extra': {}, 'local_link_connection': {},
+             'internal_info': {}, 'created_at': now,
+             'version': objects.Port.VERSION}
+            for index in range(1, NODE_COUNT + 1)])
+
+
+def _request(application, url):
+    request = webob.Request.blank(
+        url, headers={'X-OpenStack-Ironic-API-Version': 'latest'})
+    status = []
+
+    def _start_response(status_line, headers, exc_info=None):
+        status.append(status_line)
+
+    with benchmark_utils.count_statements() as count:
+        start = time.time()
+        result = application(request.environ, _start_response)
+        try:
+            for _chunk in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        elapsed = time.time() - start
+    assert status[0].startswith('200'), status[0]
+    return elapsed, count[0]
+
+
+def _run(application, label, page_size):
+    CONF.set_override('collection_stream_page_size', page_size, group='api')
+    for url in ('/v1/nodes/detail?limit=%d' % NODE_COUNT,
+                '/v1/ports/detail?limit=%d' % NODE_COUNT):
+        elapsed, count = _request(application, url)
+        print('%s, %s: %0.03f seconds, %d SQL statements.'
+              % (label, url, elapsed, count))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        CONF.set_override('auth_strategy', 'noauth')
+        CONF.set_override('max_limit', NODE_COUNT, group='api')
+        _populate()
+        application = wsgi_app.setup_app(
+            pecan_config=wsgi_app.get_pecan_config())
+
+        print('Phase - %d nodes with a chassis and an allocation, %d ports '
+              'in port groups' % (NODE_COUNT, NODE_COUNT))
+        benchmark_utils.add_a_line()
+        for page_size in (0, PAGE_SIZE):
+            with mock.patch.object(node_api, '_get_related_uuids',
+                                   lambda *args, **kwargs: None), \
+                    mock.patch.object(port_api, '_get_portgroup_uuids',
+                                      lambda *args, **kwargs: None):
+                _run(application, 'Each item, page size %d' % page_size,
+                     page_size)
+            _run(application, 'Each page, page size %d' % page_size,
+                 page_size)
+        print()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
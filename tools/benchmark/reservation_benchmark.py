@@ -0,0 +1,96 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure node reservation throughput under concurrency.
+
+Many green threads reserve and release nodes stored in a temporary SQLite
+database. Every node is contended by several threads, the benchmark checks
+that a node is never held by two threads at once.
+"""
+
+import os
+import random
+import sys
+import time
+
+import eventlet
+
+eventlet.monkey_patch(os=False)
+
+import benchmark_utils  # noqa
+from ironic.common import exception  # noqa
+from ironic.common import service as ironic_service  # noqa
+from ironic.conf import CONF  # noqa
+from ironic.db import api as db_api  # noqa
+
+
+NODE_COUNT = 2000
+THREADS = 100
+# Number of threads competing for each node.
+CONTENTION = 4
+
+
+def _worker(dbapi, uuids, holders, stats):
+    tag = 'conductor-%s' % id(eventlet.getcurrent())
+    for uuid in uuids:
+        try:
+            dbapi.reserve_node(tag, uuid)
+        except exception.NodeLocked:
+            stats['locked'] += 1
+            continue
+        if holders.get(uuid):
+            stats['violations'] += 1
+        holders[uuid] = tag
+        stats['reserved'] += 1
+        # Let other threads try to grab the same node.
+        eventlet.sleep(0)
+        holders[uuid] = None
+        dbapi.release_node(tag, uuid)
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        CONF.set_override('debug', False)
+        uuids = benchmark_utils.create_nodes(NODE_COUNT)
+        dbapi = db_api.get_instance()
+
+        print('Phase - %d green threads reserving and releasing %d nodes, '
+              '%d threads per node' % (THREADS, NODE_COUNT, CONTENTION))
+        benchmark_utils.add_a_line()
+        stats = {'reserved': 0, 'locked': 0, 'violations': 0}
+        holders = {}
+        per_thread = len(uuids) * CONTENTION // THREADS
+        pool = eventlet.GreenPool(THREADS)
+        with benchmark_utils.count_statements() as count:
+            start = time.time()
+            for _ in range(THREADS):
+                pool.spawn(_worker, dbapi,
+                           random.sample(uuids, per_thread), holders, stats)
+            pool.waitall()
+            elapsed = time.time() - start
+        attempts = stats['reserved'] + stats['locked']
+        print('Attempts: %d, reserved and released: %d, already locked: %d'
+              % (attempts, stats['reserved'], stats['locked']))
+        print('Took %0.03f seconds, %0.01f attempts per second.'
+              % (elapsed, attempts / elapsed))
+        print('SQL statements issued: %d (%0.02f per attempt)'
+              % (count[0], count[0] / attempts))
+        print('Nodes held by two threads at once: %d\n' % stats['violations'])
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure rendering the boot configuration templates for many nodes.
+
+Renders the PXE, iPXE and GRUB configuration templates for every node,
+compiling the templates for every rendering, as done before, and with the
+compiled templates kept by the template registry. Then measures the first
+rendering of a new process with and without the on-disk bytecode cache.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import benchmark_utils
+import jinja2
+
+from ironic.common import utils
+from ironic.conf import CONF
+
+
+NODE_COUNT = 1000
+MODULES_DIR = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'ironic', 'drivers', 'modules')
+TEMPLATES = [os.path.abspath(os.path.join(MODULES_DIR, name))
+             for name in ('pxe_config.template', 'ipxe_config.template',
+                          'pxe_grub_config.template')]
+
+
+def _params(index):
+    return {
+        'pxe_options': {
+            'deployment_aki_path': '/tftpboot/node-%d/deploy_kernel' % index,
+            'deployment_ari_path': '/tftpboot/node-%d/deploy_ramdisk' % index,
+            'aki_path': '/tftpboot/node-%d/kernel' % index,
+            'ari_path': '/tftpboot/node-%d/ramdisk' % index,
+            'pxe_append_params': 'nofb nomodeset vga=normal',
+            'tftp_server': '192.0.2.1',
+            'ipxe_timeout': 0,
+        },
+        'ROOT': '{{ ROOT }}',
+        'DISK_IDENTIFIER': '{{ DISK_IDENTIFIER }}',
+    }
+
+
+def _render_uncached(template, params):
+    tmpl_path, tmpl_name = os.path.split(template)
+    env = jinja2.Environment(  # nosec B701
+        loader=jinja2.FileSystemLoader(tmpl_path),
+        autoescape=jinja2.select_autoescape(),
+        undefined=jinja2.Undefined)
+    return env.get_template(tmpl_name).render(params, enumerate=enumerate)
+
+
+def _run(label, render):
+    utils._template_registry.clear()
+    start = time.time()
+    for index in range(NODE_COUNT):
+        params = _params(index)
+        for template in TEMPLATES:
+            render(template, params)
+    elapsed = time.time() - start
+    print('%s: %0.03f seconds, %0.03f ms per node.'
+          % (label, elapsed, elapsed * 1000 / NODE_COUNT))
+
+
+def _first_render(label):
+    utils._template_registry.clear()
+    start = time.time()
+    for template in TEMPLATES:
+        utils.render_template(template, _params(0))
+    print('%s: %0.03f ms.' % (label, (time.time() - start) * 1000))
+
+
+def main():
+    cache_dir = tempfile.mkdtemp(prefix='ironic-benchmark-')
+    try:
+        print('Phase - rendering %d templates for %d nodes'
+              % (len(TEMPLATES), NODE_COUNT))
+        benchmark_utils.add_a_line()
+        _run('Compiled for every rendering', _render_uncached)
+        _run('Template registry', utils.render_template)
+        print()
+
+        print('Phase - first rendering of a new process')
+        benchmark_utils.add_a_line()
+        _first_render('No bytecode cache')
+        CONF.set_override('template_bytecode_cache_dir', cache_dir)
+        # Fill the on-disk cache, as a previous process would have.
+        _first_render('Empty bytecode cache')
+        _first_render('Filled bytecode cache')
+        print()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
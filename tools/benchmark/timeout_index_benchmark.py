@@ -0,0 +1,161 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the queries of the timeout periodic tasks and history purge.
+
+Runs the node queries of the deploy, cleaning, rescue and inspection
+timeout checks, and finds the node history records to purge, in a
+temporary SQLite database where most nodes are ACTIVE. Compares the
+single column indexes with the composite indexes shaped for these
+queries.
+"""
+
+import datetime
+import os
+import sys
+import time
+
+import benchmark_utils
+from oslo_db.sqlalchemy import enginefacade
+from oslo_utils import uuidutils
+import sqlalchemy as sa
+
+from ironic.common import service as ironic_service
+from ironic.common import states
+from ironic.conf import CONF
+from ironic.db import api as db_api
+from ironic.db.sqlalchemy import models
+from ironic import objects
+
+
+NODE_COUNT = 50000
+# Nodes waiting in each state, of which TIMED_OUT_COUNT timed out.
+WAITING_COUNT = 5000
+TIMED_OUT_COUNT = 10
+HISTORY_NODE_COUNT = 2000
+RECORDS_PER_NODE = 100
+REPEAT = 20
+COMPOSITE_INDEXES = {
+    'nodes': [('provision_timeout_idx',
+               ['provision_state', 'maintenance', 'provision_updated_at']),
+              ('inspect_timeout_idx',
+               ['provision_state', 'maintenance', 'inspection_started_at'])],
+    'node_history': [('history_node_id_created_at_idx',
+                      ['node_id', 'created_at'])],
+}
+PERIODICS = [
+    ('deploy', {'provision_state': states.DEPLOYWAIT,
+                'provisioned_before': 1800}, 'provision_updated_at'),
+    ('cleaning', {'provision_state': states.CLEANWAIT,
+                  'provisioned_before': 1800}, 'provision_updated_at'),
+    ('rescue', {'provision_state': states.RESCUEWAIT,
+                'provisioned_before': 1800}, 'provision_updated_at'),
+    ('inspection', {'provision_state': states.INSPECTWAIT,
+                    'inspection_started_before': 1800},
+     'inspection_started_at'),
+]
+
+
+def _populate(dbapi):
+    conductor = dbapi.register_conductor({'hostname': 'benchmark-host',
+                                          'drivers': []})
+    now = datetime.datetime.utcnow()
+    waiting = len(PERIODICS) * WAITING_COUNT
+    benchmark_utils.create_nodes(NODE_COUNT - waiting,
+                                 provision_updated_at=now)
+    for _label, filters, column in PERIODICS:
+        old = now - datetime.timedelta(hours=1)
+        # Only the first batch of nodes is named.
+        benchmark_utils.create_nodes(
+            TIMED_OUT_COUNT, name=None,
+            provision_state=filters['provision_state'], **{column: old})
+        benchmark_utils.create_nodes(
+            WAITING_COUNT - TIMED_OUT_COUNT, name=None,
+            provision_state=filters['provision_state'], **{column: now})
+
+    engine = enginefacade.writer.get_engine()
+    start = datetime.datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(sa.update(models.Node).where(
+            models.Node.id <= HISTORY_NODE_COUNT).values(
+                conductor_affinity=conductor.id))
+        for node_id in range(1, HISTORY_NODE_COUNT + 1):
+            conn.execute(sa.insert(models.NodeHistory), [
+                {'uuid': uuidutils.generate_uuid(), 'node_id': node_id,
+                 'conductor': 'benchmark-host', 'event': 'event %d' % i,
+                 'severity': 'INFO', 'event_type': 'benchmark',
+                 'user': 'benchmark',
+                 'created_at': start + datetime.timedelta(minutes=i),
+                 'version': objects.NodeHistory.VERSION}
+                for i in range(RECORDS_PER_NODE)])
+    return conductor
+
+
+def _set_indexes(create):
+    engine = enginefacade.writer.get_engine()
+    with engine.begin() as conn:
+        for table, indexes in COMPOSITE_INDEXES.items():
+            for name, columns in indexes:
+                if create:
+                    conn.exec_driver_sql('CREATE INDEX %s ON %s (%s)'
+                                         % (name, table, ', '.join(columns)))
+                else:
+                    conn.exec_driver_sql('DROP INDEX IF EXISTS %s' % name)
+        conn.exec_driver_sql('ANALYZE')
+
+
+def _run(label, dbapi, conductor):
+    for name, filters, sort_key in PERIODICS:
+        filters = dict(filters, reserved=False, maintenance=False)
+        start = time.time()
+        for _ in range(REPEAT):
+            nodes = dbapi.get_nodeinfo_list(
+                columns=['uuid', 'driver', 'conductor_group'],
+                filters=filters, sort_key=sort_key, sort_dir='asc')
+        print('%s, %s timeouts: %0.02f ms per query, %d nodes.'
+              % (label, name, (time.time() - start) * 1000 / REPEAT,
+                 len(nodes)))
+    start = time.time()
+    records = dbapi.query_node_history_ids_for_purge(conductor.id)
+    print('%s, history purge: %0.03f seconds, %d records.'
+          % (label, time.time() - start, len(records)))
+
+
+def main():
+    ironic_service.prepare_command()
+    path = benchmark_utils.setup_database()
+    try:
+        benchmark_utils.enable_fake_hardware()
+        CONF.set_override('debug', False)
+        CONF.set_override('node_history_max_entries', RECORDS_PER_NODE // 2,
+                          group='conductor')
+        CONF.set_override('node_history_minimum_days', 0, group='conductor')
+        dbapi = db_api.get_instance()
+        conductor = _populate(dbapi)
+
+        print('Phase - timeout checks among %d nodes, %d waiting in each '
+              'state; history purge of %d nodes with %d records'
+              % (NODE_COUNT, WAITING_COUNT, HISTORY_NODE_COUNT,
+                 RECORDS_PER_NODE))
+        benchmark_utils.add_a_line()
+        _set_indexes(False)
+        _run('Single column indexes', dbapi, conductor)
+        _set_indexes(True)
+        _run('Composite indexes', dbapi, conductor)
+        print()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure preparing virtual media boot ISOs for many nodes at once.
+
+Serves a kernel and a ramdisk from a local HTTP server and builds a boot
+ISO with node specific kernel parameters and injected files for every
+node from a pool of threads, as the virtual media boot interfaces do on
+deploy. Compares building each ISO from scratch with the cached base ISO
+and the per-node overlay.
+
+If mkisofs is not installed, it is emulated with pycdlib, which writes
+the same amount of data.
+"""
+
+import concurrent.futures
+import functools
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import benchmark_utils
+from oslo_utils import uuidutils
+import pycdlib
+
+from ironic.common import images
+from ironic.common import utils
+from ironic.conf import CONF
+from ironic.drivers.modules import image_utils
+
+
+NODE_COUNT = 100
+CONCURRENCY = 100
+KERNEL_SIZE = 8 * 1024 * 1024
+RAMDISK_SIZE = 64 * 1024 * 1024
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(directory):
+    handler = functools.partial(_Handler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _fake_mkisofs(*args, **kwargs):
+    """Create the ISO image like mkisofs, only supporting our arguments."""
+    args = list(args)
+    root = args[-1]
+    output = args[args.index('-o') + 1]
+    iso = pycdlib.PyCdlib()
+    iso.new(interchange_level=3, rock_ridge='1.09',
+            vol_ident=args[args.index('-V') + 1])
+    iso_paths = {root: '/'}
+    for dirpath, dirnames, filenames in os.walk(root):
+        parent = iso_paths[dirpath]
+        for index, name in enumerate(sorted(dirnames)):
+            iso_path = '%s/D%d' % (parent.rstrip('/'), index)
+            iso.add_directory(iso_path, rr_name=name)
+            iso_paths[os.path.join(dirpath, name)] = iso_path
+        for index, name in enumerate(sorted(filenames)):
+            path = os.path.join(dirpath, name)
+            iso_path = '%s/F%d.;1' % (parent.rstrip('/'), index)
+            iso.add_file(path, iso_path=iso_path, rr_name=name)
+            iso_paths[path] = iso_path
+    boot_file = args[args.index('-b' if '-b' in args else '-e') + 1]
+    iso.add_eltorito(iso_paths[os.path.join(root, boot_file)],
+                     bootcatfile='/BOOT.CAT;1', rr_bootcatname='boot.cat',
+                     efi='-e' in args)
+    iso.write(output)
+    iso.close()
+    return '', ''
+
+
+def _from_scratch(task, output, kernel_href, ramdisk_href, **kwargs):
+    images.create_boot_iso(task.context, output, kernel_href,
+                           ramdisk_href, **kwargs)
+
+
+def _from_base(task, output, kernel_href, ramdisk_href, **kwargs):
+    image_utils._create_boot_iso_from_base(task, output, kernel_href,
+                                           ramdisk_href, **kwargs)
+
+
+def _prepare(func, kernel_href, ramdisk_href, workdir):
+    node_uuid = uuidutils.generate_uuid()
+    task = mock.Mock(context=None)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        output = os.path.join(tmpdir, 'boot.iso')
+        func(task, output, kernel_href, ramdisk_href,
+             kernel_params='ipa-api-url=http://127.0.0.1:6385 '
+                           'ipa-agent-token=%s' % node_uuid,
+             boot_mode='bios',
+             inject_files={('{"node": "%s"}' % node_uuid).encode():
+                           'etc/ironic-python-agent.d/config.json'})
+        return os.path.getsize(output)
+
+
+def _run(label, func, kernel_href, ramdisk_href, workdir):
+    _Handler.requests = 0
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(CONCURRENCY) as executor:
+        sizes = list(executor.map(
+            lambda _: _prepare(func, kernel_href, ramdisk_href, workdir),
+            range(NODE_COUNT)))
+    elapsed = time.time() - start
+    print('%s: %0.03f seconds, %0.03f seconds per node, %d downloads, '
+          '%d MiB ISOs.' % (label, elapsed, elapsed / NODE_COUNT,
+                            _Handler.requests, sizes[0] / 1024 / 1024))
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='ironic-benchmark-')
+    try:
+        image_dir = os.path.join(workdir, 'images')
+        os.mkdir(image_dir)
+        for name, size in (('vmlinuz', KERNEL_SIZE),
+                           ('initramfs', RAMDISK_SIZE)):
+            with open(os.path.join(image_dir, name), 'wb') as f:
+                f.write(os.urandom(size))
+        isolinux_bin = os.path.join(image_dir, 'isolinux.bin')
+        with open(isolinux_bin, 'wb') as f:
+            f.write(b'\0' * 2048)
+        server = _serve(image_dir)
+        base_url = 'http://127.0.0.1:%d/' % server.server_address[1]
+
+        CONF.set_override('isolinux_bin', isolinux_bin)
+        CONF.set_override('ldlinux_c32', '')
+        CONF.set_override('tempdir', workdir)
+        CONF.set_override('iso_master_path',
+                          os.path.join(workdir, 'master_iso_images'),
+                          group='deploy')
+        CONF.set_override('parallel_image_downloads', True)
+
+        execute = utils.execute
+        if shutil.which('mkisofs') is None:
+            execute = mock.Mock(side_effect=_fake_mkisofs)
+        with mock.patch.object(utils, 'execute', execute):
+            print('Phase - preparing boot ISOs for %d nodes, %d at a time'
+                  % (NODE_COUNT, CONCURRENCY))
+            benchmark_utils.add_a_line()
+            _run('Build from scratch', _from_scratch,
+                 base_url + 'vmlinuz', base_url + 'initramfs', workdir)
+            _run('Cached base ISO and overlay', _from_base,
+                 base_url + 'vmlinuz', base_url + 'initramfs', workdir)
+            print()
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())